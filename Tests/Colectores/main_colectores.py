@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import threading
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from libs.colectores.main_colectores import (
+    Collector,
+    CollectorExecutor,
+    MultiRateScheduler,
+    TickClock,
+    combinar_metricas,
+    ESTADO_OK,
+    ESTADO_VACIO,
+    ESTADO_ERROR,
+    ESTADO_TIMEOUT,
+    ESTADO_EN_CURSO,
+    ESTADO_CACHE
+)
+
+def prueba_ejecucion_paralela_con_plazos():
+    print("\n### Ejecución paralela con plazos por colector")
+    liberar_lento = threading.Event()
+
+    def rapido():
+        time.sleep(0.2)
+        return {'cpu_percent': 12.5}
+
+    def com():
+        time.sleep(0.2)
+        return {'os_name': 'Windows'}
+
+    def lento():
+        liberar_lento.wait(5)
+        return {'cpu_temperatura_celsius': 50.0}
+
+    def con_error():
+        raise RuntimeError("fallo simulado")
+
+    executor = CollectorExecutor(
+        [
+            Collector('psutil', rapido, 1.0),
+            Collector('wmi', com, 1.0),
+            Collector('ohm', lento, 0.5),
+            Collector('fallo', con_error, 1.0),
+            Collector('procesos', lambda: [], 1.0),
+        ],
+        max_workers=4
+    )
+
+    inicio = time.monotonic()
+    resultados, estados = executor.run()
+    duracion = time.monotonic() - inicio
+    print(f"Estados: {estados} ({duracion:.2f}s)")
+    assert estados == {
+        'psutil': ESTADO_OK,
+        'wmi': ESTADO_OK,
+        'ohm': ESTADO_TIMEOUT,
+        'fallo': ESTADO_ERROR,
+        'procesos': ESTADO_VACIO,
+    }
+    # Los colectores corren en paralelo: el ciclo dura lo que el plazo más largo, no la suma.
+    assert duracion < 1.0
+
+    metricas = combinar_metricas(resultados, estados, ['psutil', 'wmi', 'ohm'])
+    print(f"Muestra parcial: {metricas}")
+    assert metricas['cpu_percent'] == 12.5
+    assert metricas['fuente_ohm'] == ESTADO_TIMEOUT
+    assert 'cpu_temperatura_celsius' not in metricas
+
+    # Mientras el colector lento siga ocupado no se lanza otra ejecución.
+    resultados, estados = executor.run(['ohm'])
+    assert estados == {'ohm': ESTADO_EN_CURSO}
+
+    liberar_lento.set()
+    time.sleep(0.1)
+    resultados, estados = executor.run(['ohm'])
+    assert estados == {'ohm': ESTADO_OK}
+    executor.shutdown(wait=True)
+
+def prueba_planificador_multifrecuencia():
+    print("\n### Planificador multifrecuencia")
+    llamadas = {'rapido': 0, 'procesos': 0, 'inventario': 0}
+    reloj = {'ahora': 0.0}
+    arranque = {'valor': 1000.0}
+
+    def contar(nombre, valor):
+        def colector():
+            llamadas[nombre] += 1
+            return {f'{nombre}_valor': valor(llamadas[nombre])}
+        return colector
+
+    executor = CollectorExecutor(
+        [
+            Collector('rapido', contar('rapido', lambda n: n), 1.0),
+            Collector('procesos', contar('procesos', lambda n: n), 1.0),
+            Collector('inventario', contar('inventario', lambda n: 'Windows'), 1.0),
+        ],
+        max_workers=2
+    )
+    scheduler = MultiRateScheduler(
+        executor,
+        {'rapido': 0, 'procesos': 30, 'inventario': 3600},
+        static=['inventario'],
+        boot_time_func=lambda: arranque['valor'],
+        clock=lambda: reloj['ahora']
+    )
+
+    # 12 ciclos de 5 segundos (60s): procesos 2 veces, inventario 1 vez.
+    for ciclo in range(12):
+        reloj['ahora'] = ciclo * 5.0
+        resultados, estados = scheduler.run_cycle()
+        if ciclo == 1:
+            assert estados['procesos'] == ESTADO_CACHE
+            # La muestra combina el último valor de cada nivel.
+            assert resultados['procesos']['procesos_valor'] == 1
+            assert resultados['inventario']['inventario_valor'] == 'Windows'
+    print(f"Llamadas tras 60s: {llamadas}")
+    assert llamadas == {'rapido': 12, 'procesos': 2, 'inventario': 1}
+
+    # Un cambio en la hora de arranque fuerza el nivel estático.
+    arranque['valor'] = 5000.0
+    reloj['ahora'] = 60.0
+    resultados, estados = scheduler.run_cycle()
+    assert estados['inventario'] == ESTADO_OK
+    assert llamadas['inventario'] == 2
+    executor.shutdown(wait=True)
+
+class RelojSimulado:
+    """Relojes monotónico y de pared simulados que avanzan con las esperas y el trabajo."""
+
+    def __init__(self, wall):
+        self.mono = 1000.0
+        self.wall = wall
+        self.stop_at = None
+
+    def avanzar(self, segundos):
+        self.mono += segundos
+        self.wall += segundos
+
+    def esperar(self, timeout):
+        # Simula WaitForSingleObject: retorna True si la parada llega antes del timeout.
+        if self.stop_at is not None and self.mono + timeout >= self.stop_at:
+            self.avanzar(max(0.0, self.stop_at - self.mono))
+            return True
+        self.avanzar(timeout)
+        return False
+
+def prueba_reloj_de_ciclos():
+    print("\n### Reloj de ciclos sin deriva")
+    reloj = RelojSimulado(wall=1_700_000_007.3)
+    tick_clock = TickClock(10, reloj.esperar, clock=lambda: reloj.mono, wall_clock=lambda: reloj.wall)
+
+    # Ciclos con trabajo de duración variable: las marcas quedan alineadas a múltiplos de 10s.
+    marcas = []
+    for duracion in (0.5, 3.2, 7.9, 1.0):
+        marcas.append(tick_clock.wait_next())
+        reloj.avanzar(duracion)
+    print(f"Marcas: {marcas}")
+    assert marcas == [1_700_000_010.0, 1_700_000_020.0, 1_700_000_030.0, 1_700_000_040.0]
+    assert tick_clock.stats()['ciclos_desbordados'] == 0
+
+    # Un ciclo que dura 26s (de 40 a 66) pierde el ciclo de 50 y el de 60 se ejecuta de inmediato.
+    reloj.avanzar(25)
+    marca = tick_clock.wait_next()
+    print(f"Tras desbordamiento: {marca} {tick_clock.stats()}")
+    assert marca == 1_700_000_060.0
+    assert tick_clock.stats()['ciclos_perdidos'] == 1
+    assert tick_clock.stats()['ciclos_desbordados'] == 1
+
+    # Un ajuste del reloj de pared realinea los ciclos.
+    reloj.wall += 5.0
+    marca = tick_clock.wait_next()
+    assert marca % 10 == 0
+    assert tick_clock.stats()['resincronizaciones'] == 1
+
+    # La parada se atiende durante la espera, sin completar el intervalo.
+    reloj.stop_at = reloj.mono + 0.05
+    inicio = reloj.mono
+    assert tick_clock.wait_next() is None
+    print(f"Parada atendida en {reloj.mono - inicio:.3f}s")
+    assert reloj.mono - inicio <= 0.05
+
+if __name__ == "__main__":
+    print("--- Pruebas del ejecutor de colectores ---")
+    prueba_ejecucion_paralela_con_plazos()
+    prueba_planificador_multifrecuencia()
+    prueba_reloj_de_ciclos()
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del ejecutor de colectores pasaron. ---")
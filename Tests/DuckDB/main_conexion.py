@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import duckdb
+
+from libs.muestra.main_muestra import MetricSample
+import main_duckdb
+
+ESCRITURAS = 200
+
+def _abrir(db_path, **conexion):
+    # Se descarta la instancia Singleton anterior para abrir otra base de datos.
+    main_duckdb.DBManager._instance = None
+    db = main_duckdb.DBManager(db_path)
+    db.configure_connection(**conexion)
+    db.create_table()
+    return db
+
+def _muestra(i):
+    return MetricSample.from_metrics({
+        'timestamp': f"2025-10-01T12:{i // 60:02d}:{i % 60:02d}.{i:06d}",
+        'hostname': 'PC-01', 'username': 'usuario', 'cpu_percent': float(i % 100),
+    })
+
+def _bloquear(db_path, segundos):
+    """Otro proceso abre la base y retiene el bloqueo del archivo durante 'segundos'."""
+    proceso = subprocess.Popen(
+        [sys.executable, "-c",
+         f"import duckdb, time; c = duckdb.connect({db_path!r}); print('listo', flush=True); time.sleep({segundos})"],
+        stdout=subprocess.PIPE, text=True
+    )
+    assert proceso.stdout.readline().strip() == 'listo'
+    return proceso
+
+def _contar(db_path, tabla='metricas'):
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        return con.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+    finally:
+        con.close()
+
+def prueba_reutilizacion(tmp_dir):
+    print("\n### La conexión se reutiliza mientras llegan escrituras")
+    db = _abrir(os.path.join(tmp_dir, "reuso.duckdb"), idle_seconds=60)
+    for i in range(50):
+        db.insert_metrics(_muestra(i))
+    db.upsert_machine_info(_muestra(0))
+    estadisticas = db.stats()
+    print(estadisticas)
+    assert estadisticas['aperturas'] == 1 and estadisticas['conexion_abierta']
+    assert estadisticas['reutilizaciones'] >= 50 and estadisticas['desvios_cola'] == 0
+    db.close_connection()
+    assert not db.stats()['conexion_abierta']
+    assert _contar(db._db_path) == 50
+
+def prueba_cierre_por_inactividad(tmp_dir):
+    print("\n### Tras el periodo sin escrituras se libera el archivo")
+    db_path = os.path.join(tmp_dir, "inactividad.duckdb")
+    db = _abrir(db_path, idle_seconds=0.3)
+    db.insert_metrics(_muestra(0))
+    time.sleep(0.15)
+    db.insert_metrics(_muestra(1))
+    # La escritura reciente aplaza el cierre.
+    time.sleep(0.2)
+    assert db.stats()['conexion_abierta']
+    time.sleep(0.4)
+    estadisticas = db.stats()
+    assert not estadisticas['conexion_abierta'] and estadisticas['cierres_inactividad'] == 1
+    # Un lector externo (otro proceso) ya puede abrir la base.
+    lector = subprocess.run(
+        [sys.executable, "-c",
+         f"import duckdb; print(duckdb.connect({db_path!r}, read_only=True).execute('SELECT COUNT(*) FROM metricas').fetchone()[0])"],
+        capture_output=True, text=True
+    )
+    assert lector.stdout.strip() == '2', lector.stderr
+    # La siguiente escritura vuelve a abrir la conexión.
+    db.insert_metrics(_muestra(2))
+    assert db.stats()['aperturas'] == 2
+    db.close_connection()
+
+def prueba_reintento_ante_bloqueo(tmp_dir):
+    print("\n### Un bloqueo breve se reintenta sin desviar la fila al spool")
+    db_path = os.path.join(tmp_dir, "reintento.duckdb")
+    db = _abrir(db_path, idle_seconds=0, lock_retries=8, backoff_seconds=0.05)
+    time.sleep(0.1)     # Cierre por inactividad inmediato tras create_table
+    proceso = _bloquear(db_path, 0.5)
+    inicio = time.perf_counter()
+    db.insert_metrics(_muestra(0))
+    espera = time.perf_counter() - inicio
+    proceso.wait()
+    estadisticas = db.stats()
+    print(f"Escritura tras {estadisticas['reintentos_bloqueo']} reintentos en {espera:.2f} s")
+    assert estadisticas['reintentos_bloqueo'] > 0 and estadisticas['desvios_cola'] == 0
+    assert not os.path.exists(db._queue_db_path)
+    db.close_connection()
+    assert _contar(db_path) == 1
+
+def prueba_clasificacion_de_errores():
+    print("\n### Solo los errores de bloqueo del archivo se reintentan")
+    assert main_duckdb.es_error_de_bloqueo(duckdb.IOException(
+        'IO Error: Could not set lock on file "metricas.duckdb": Conflicting lock is held in python.exe (PID 1234)'
+    ))
+    assert not main_duckdb.es_error_de_bloqueo(duckdb.IOException('IO Error: Could not read block 42 of file'))
+    assert not main_duckdb.es_error_de_bloqueo(duckdb.IOException('IO Error: Block 7 is corrupted'))
+
+def prueba_bloqueo_prolongado(tmp_dir):
+    print("\n### Un bloqueo prolongado agota los reintentos y desvía la fila al spool")
+    db_path = os.path.join(tmp_dir, "cola.duckdb")
+    db = _abrir(db_path, idle_seconds=0, lock_retries=2, backoff_seconds=0.01)
+    db.configure_spool(probe_seconds=0)
+    time.sleep(0.1)
+    proceso = _bloquear(db_path, 1.5)
+    db.insert_metrics(_muestra(0))
+    estadisticas = db.stats()
+    assert estadisticas['reintentos_bloqueo'] == 2 and estadisticas['desvios_cola'] == 1
+    assert estadisticas['spool_pendientes'] == 1
+    proceso.wait()
+    # Liberado el archivo, la siguiente escritura vacía el spool.
+    db.insert_metrics(_muestra(1))
+    assert db.stats()['spool_pendientes'] == 0
+    db.close_connection()
+    assert _contar(db_path) == 2
+
+def benchmark_transitoria_vs_persistente(tmp_dir):
+    print(f"\n### {ESCRITURAS} inserciones de métricas")
+    muestras = [_muestra(i) for i in range(ESCRITURAS)]
+    resultados = {}
+    for nombre in ('Conexión transitoria', 'Conexión persistente'):
+        db = _abrir(os.path.join(tmp_dir, f"bench_{len(resultados)}.duckdb"), idle_seconds=60)
+        inicio = time.perf_counter()
+        for muestra in muestras:
+            db.insert_metrics(muestra)
+            if nombre == 'Conexión transitoria':
+                # Comportamiento anterior: abrir y cerrar la base en cada sentencia.
+                db.close_connection()
+        resultados[nombre] = (time.perf_counter() - inicio) / ESCRITURAS * 1000
+        db.close_connection()
+        assert _contar(db._db_path) == ESCRITURAS
+        print(f"{nombre:<22} {resultados[nombre]:>8.2f} ms/inserción")
+    assert resultados['Conexión persistente'] < resultados['Conexión transitoria']
+
+if __name__ == "__main__":
+    print("--- Pruebas de la conexión persistente de DuckDB ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_reutilizacion(tmp_dir)
+        prueba_cierre_por_inactividad(tmp_dir)
+        prueba_reintento_ante_bloqueo(tmp_dir)
+        prueba_clasificacion_de_errores()
+        prueba_bloqueo_prolongado(tmp_dir)
+        benchmark_transitoria_vs_persistente(tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de la conexión DuckDB pasaron. ---")
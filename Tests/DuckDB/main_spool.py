@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, RAIZ)
+
+import duckdb
+
+from libs.muestra.main_muestra import MetricSample
+from main_spool import CABECERA, SegmentSpool, leer_registros
+import main_duckdb
+
+ESCRITURAS_BLOQUEADA = 100
+
+def _abrir(db_path, **spool):
+    # Se descarta la instancia Singleton anterior para abrir otra base de datos.
+    main_duckdb.DBManager._instance = None
+    db = main_duckdb.DBManager(db_path)
+    db.configure_connection(idle_seconds=60, lock_retries=0)
+    db.configure_spool(**spool)
+    return db
+
+def _muestra(i):
+    return MetricSample.from_metrics({
+        'timestamp': f"2025-10-01T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        'hostname': 'PC-01', 'username': 'usuario', 'cpu_percent': float(i % 100),
+    })
+
+def _bloquear(db_path):
+    """Otro proceso abre la base y retiene el bloqueo del archivo hasta que se le termina."""
+    proceso = subprocess.Popen(
+        [sys.executable, "-c",
+         f"import duckdb, time; c = duckdb.connect({db_path!r}); print('listo', flush=True); time.sleep(60)"],
+        stdout=subprocess.PIPE, text=True
+    )
+    assert proceso.stdout.readline().strip() == 'listo'
+    return proceso
+
+def _terminar(proceso):
+    proceso.kill()
+    proceso.wait()
+
+def _hijo(codigo, db_path, segment_bytes=1 << 20):
+    """Lanza un proceso del agente que ejecuta 'codigo' con 'db' abierto sobre 'db_path'."""
+    preambulo = (
+        f"import os, sys\n"
+        f"sys.path.insert(0, {RAIZ!r})\n"
+        f"import main_duckdb, main_spool\n"
+        f"from libs.muestra.main_muestra import MetricSample\n"
+        f"def muestra(i):\n"
+        f"    return MetricSample.from_metrics({{'timestamp': f\"2025-10-01T{{i // 3600:02d}}:{{i // 60 % 60:02d}}:{{i % 60:02d}}\","
+        f" 'hostname': 'PC-01', 'username': 'usuario', 'cpu_percent': float(i % 100)}})\n"
+        f"db = main_duckdb.DBManager({db_path!r})\n"
+        f"db.configure_connection(idle_seconds=60, lock_retries=0)\n"
+        f"db.configure_spool(probe_seconds=3600, segment_bytes={segment_bytes})\n"
+    )
+    return subprocess.Popen([sys.executable, "-c", preambulo + codigo], stdout=subprocess.PIPE, text=True)
+
+def _timestamps(db_path):
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        return [ts for (ts,) in con.execute("SELECT timestamp FROM metricas").fetchall()]
+    finally:
+        con.close()
+
+def prueba_formato_segmentos(tmp_dir):
+    print("\n### Registros con prefijo de longitud y CRC32")
+    directorio = os.path.join(tmp_dir, "formato")
+    spool = SegmentSpool(directorio, segment_bytes=400, fsync=False)
+    for i in range(20):
+        assert spool.append('metricas', (f"ts{i}", i, None))
+    spool.seal()
+    segmentos = spool.segments()
+    assert len(segmentos) > 1 and spool.pending == 20
+    assert [fila for s in segmentos for _, fila in spool.read_segment(s)] == [(f"ts{i}", i, None) for i in range(20)]
+
+    # Un byte alterado invalida solo su registro; un registro a medias (corte) termina la lectura.
+    primero = segmentos[0]
+    antes = len(spool.read_segment(primero))
+    with open(primero, 'r+b') as f:
+        f.seek(CABECERA.size + 2)
+        byte = f.read(1)
+        f.seek(CABECERA.size + 2)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    with open(primero, 'ab') as f:
+        f.write(CABECERA.pack(100, 0) + b'incompleto')
+    registros, corruptos = leer_registros(primero)
+    print(f"Primer segmento: {len(registros)} de {antes} registros válidos, {corruptos} dañados")
+    assert corruptos == 2 and len(registros) == antes - 1
+    assert registros == [('metricas', (f"ts{i}", i, None)) for i in range(1, antes)]
+    # Un spool reabierto cuenta los registros completos pendientes y escribe en un segmento nuevo.
+    reabierto = SegmentSpool(directorio, fsync=False)
+    assert reabierto.pending == 20
+    reabierto.append('metricas', ('ts20', 20, None))
+    assert len(reabierto.segments()) == len(segmentos)
+
+def prueba_sondeo_sin_migracion(tmp_dir):
+    print("\n### Con la base bloqueada las escrituras van al spool sin abrir bases")
+    db_path = os.path.join(tmp_dir, "sondeo.duckdb")
+    db = _abrir(db_path, probe_seconds=2)
+    db.create_table()
+    db.close_connection()
+    bloqueo = _bloquear(db_path)
+    aperturas = db.stats()['aperturas']
+    for i in range(50):
+        db.insert_metrics(_muestra(i))
+    db.upsert_machine_info(_muestra(0))
+    estadisticas = db.stats()
+    print(estadisticas)
+    # Un único intento fallido de apertura: el resto de escrituras no toca la base.
+    assert estadisticas['aperturas'] == aperturas and estadisticas['sondeos'] == 0
+    assert estadisticas['desvios_cola'] == 51 and estadisticas['spool_pendientes'] == 51
+    assert not os.path.exists(db._queue_db_path)
+    _terminar(bloqueo)
+
+    # Pasado el intervalo de sondeo, la siguiente escritura vacía el spool y luego se escribe.
+    time.sleep(2.1)
+    db.insert_metrics(_muestra(50))
+    estadisticas = db.stats()
+    assert estadisticas['sondeos'] == 1 and estadisticas['filas_vaciadas'] == 51
+    assert estadisticas['spool_pendientes'] == 0 and not db._spool.segments()
+    db.close_connection()
+    assert sorted(_timestamps(db_path)) == sorted(_muestra(i).timestamp for i in range(51))
+
+# Esquema de 'metricas' en la cola de las versiones anteriores (23 columnas, sin las tasas de red).
+DDL_COLA_ANTERIOR = """
+    CREATE TABLE metricas (
+        timestamp TEXT PRIMARY KEY, hostname TEXT, username TEXT, cpu_percent DOUBLE,
+        cpu_freq DOUBLE, ram_percent DOUBLE, ram_used DOUBLE, ram_total DOUBLE, ram_free DOUBLE,
+        disk_percent DOUBLE, disk_used DOUBLE, disk_total DOUBLE, disk_free DOUBLE,
+        swap_percent DOUBLE, swap_usado DOUBLE, swap_total DOUBLE, red_bytes_sent BIGINT,
+        red_bytes_recv BIGINT, cpu_temp_celsius DOUBLE, battery_percent DOUBLE,
+        cpu_power_package DOUBLE, cpu_power_cores DOUBLE, cpu_clocks DOUBLE
+    );
+    CREATE TABLE info_maquina (
+        hostname TEXT NOT NULL, username TEXT NOT NULL, timestamp TEXT, os_name TEXT,
+        placa_base TEXT, procesador_nombre TEXT, cores_logicos INTEGER, cores_fisicos INTEGER,
+        fecha_arranque TEXT, PRIMARY KEY (hostname, username)
+    );
+"""
+
+def prueba_cola_anterior(tmp_dir):
+    print("\n### La cola DuckDB de versiones anteriores se migra una vez")
+    db_path = os.path.join(tmp_dir, "anterior.duckdb")
+    db = _abrir(db_path)
+    con = duckdb.connect(db._queue_db_path)
+    con.execute(DDL_COLA_ANTERIOR)
+    con.execute("INSERT INTO metricas VALUES (" + ", ".join("?" * 23) + ")",
+                [_muestra(0).timestamp, 'PC-01', 'usuario', 42.0] + [None] * 12 + [1000, 2000] + [None] * 5)
+    con.execute("INSERT INTO info_maquina VALUES ('PC-01', 'usuario', '2025-10-01T00:00:00', 'Windows 10',"
+                " 'Placa', 'CPU', 8, 4, '2025-10-01T00:00:00')")
+    con.close()
+    db.insert_metrics(_muestra(1))
+    assert not os.path.exists(db._queue_db_path)
+    db.close_connection()
+    assert len(_timestamps(db_path)) == 2
+    con = duckdb.connect(db_path, read_only=True)
+    fila = con.execute("SELECT cpu_percent, red_bytes_sent, red_bytes_enviados_seg FROM metricas "
+                       "WHERE timestamp = ?", [_muestra(0).timestamp]).fetchone()
+    maquina = con.execute("SELECT os_name, cores_logicos FROM info_maquina").fetchall()
+    con.close()
+    print(f"Fila migrada: {fila}, info_maquina: {maquina}")
+    assert fila == (42.0, 1000, None)
+    assert maquina == [('Windows 10', 8)]
+
+    # Una cola ilegible no se vuelve a adjuntar en cada escritura: espera al siguiente sondeo.
+    db_path = os.path.join(tmp_dir, "cola_danada.duckdb")
+    db = _abrir(db_path, probe_seconds=3600)
+    with open(db._queue_db_path, 'wb') as f:
+        f.write(b'no es una base DuckDB' * 100)
+    intentos = []
+    leer_columnas = db._queue_columns
+    db._queue_columns = lambda: intentos.append(1) or leer_columnas()
+    for i in range(5):
+        db.insert_metrics(_muestra(i))
+    db.close_connection()
+    print(f"Intentos de migración con la cola dañada: {len(intentos)}")
+    assert len(intentos) == 1
+    assert os.path.exists(db._queue_db_path)
+    assert len(_timestamps(db_path)) == 5
+    assert db.stats()['spool_pendientes'] == 0
+
+def prueba_corte_durante_escritura(tmp_dir):
+    print("\n### Un corte del agente mientras escribe en el spool no pierde muestras confirmadas")
+    db_path = os.path.join(tmp_dir, "corte.duckdb")
+    db = _abrir(db_path)
+    db.create_table()
+    db.close_connection()
+    bloqueo = _bloquear(db_path)
+    hijo = _hijo(
+        "for i in range(100000):\n"
+        "    db.insert_metrics(muestra(i))\n"
+        "    print(i, flush=True)\n",
+        db_path, segment_bytes=4096
+    )
+    confirmadas = set()
+    while len(confirmadas) < 300:
+        confirmadas.add(int(hijo.stdout.readline()))
+    _terminar(hijo)      # Corte sin cerrar archivos, posiblemente a mitad de un registro
+    _terminar(bloqueo)
+
+    db = _abrir(db_path)
+    pendientes = db.stats()['spool_pendientes']
+    assert db.drain_spool()
+    db.close_connection()
+    guardadas = _timestamps(db_path)
+    print(f"{len(confirmadas)} muestras confirmadas, {pendientes} en el spool, {len(guardadas)} guardadas")
+    assert len(guardadas) == len(set(guardadas)) == pendientes
+    assert {_muestra(i).timestamp for i in confirmadas} <= set(guardadas)
+    assert set(guardadas) == {_muestra(i).timestamp for i in range(len(guardadas))}
+
+def prueba_corte_durante_vaciado(tmp_dir):
+    print("\n### Un corte durante el vaciado no pierde ni duplica muestras")
+    db_path = os.path.join(tmp_dir, "vaciado.duckdb")
+    total = 400
+    db = _abrir(db_path, segment_bytes=4096, fsync=False)
+    db.create_table()
+    db.close_connection()
+    bloqueo = _bloquear(db_path)
+    for i in range(total):
+        db.insert_metrics(_muestra(i))
+    db.close_connection()
+    _terminar(bloqueo)
+    segmentos = len(db._spool.segments())
+    assert segmentos > 3
+
+    # 1. Corte a mitad de la transacción de un segmento: no se confirma nada de él.
+    hijo = _hijo(
+        "original = main_duckdb.sql_varias_filas\n"
+        "llamadas = []\n"
+        "def sql_con_corte(*args):\n"
+        "    llamadas.append(1)\n"
+        "    if len(llamadas) == 2:\n"
+        "        os._exit(1)\n"
+        "    return original(*args)\n"
+        "main_duckdb.FILAS_POR_SENTENCIA = 10\n"
+        "main_duckdb.sql_varias_filas = sql_con_corte\n"
+        "db.drain_spool()\n",
+        db_path
+    )
+    assert hijo.wait() == 1
+    assert len(_timestamps(db_path)) == 0
+
+    # 2. Corte tras confirmar el segundo segmento y antes de eliminarlo: se reescribirá.
+    hijo = _hijo(
+        "eliminar = main_spool.SegmentSpool.remove\n"
+        "eliminados = []\n"
+        "def remove_con_corte(self, ruta):\n"
+        "    if len(eliminados) == 1:\n"
+        "        os._exit(1)\n"
+        "    eliminados.append(ruta)\n"
+        "    eliminar(self, ruta)\n"
+        "main_spool.SegmentSpool.remove = remove_con_corte\n"
+        "db.drain_spool()\n",
+        db_path
+    )
+    assert hijo.wait() == 1
+    parciales = len(_timestamps(db_path))
+    assert 0 < parciales < total
+
+    # 3. El agente reiniciado vacía lo que queda, incluido el segmento ya confirmado.
+    db = _abrir(db_path)
+    assert db.drain_spool()
+    estadisticas = db.stats()
+    db.close_connection()
+    guardadas = _timestamps(db_path)
+    print(f"{segmentos} segmentos: {parciales} filas tras el corte, {len(guardadas)} al terminar "
+          f"({estadisticas['filas_vaciadas']} reescritas por el reinicio)")
+    assert len(guardadas) == len(set(guardadas)) == total
+    assert estadisticas['filas_vaciadas'] > total - parciales
+    assert not db._spool.segments()
+
+def _escritura_cola_anterior(db, queue_path, muestra):
+    """Escritura anterior con la base bloqueada: migración intentada, tablas de la cola y una apertura por sentencia."""
+    for _ in range(5):      # process_queue (2 tablas + 2 migraciones) e intento en la base principal
+        try:
+            duckdb.connect(db._db_path).close()
+        except duckdb.Error:
+            pass
+    db._create_table_metricas(queue_path)
+    db._create_table_machine_info(queue_path)
+    db._connect_and_execute(queue_path, main_duckdb.SQL_INSERT_METRICAS, muestra.metric_row(), is_write=True)
+
+def benchmark_escritura_bloqueada(tmp_dir):
+    print(f"\n### {ESCRITURAS_BLOQUEADA} escrituras con la base principal bloqueada")
+    db_path = os.path.join(tmp_dir, "bench.duckdb")
+    db = _abrir(db_path)
+    db.create_table()
+    db.close_connection()
+    bloqueo = _bloquear(db_path)
+    muestras = [_muestra(i) for i in range(ESCRITURAS_BLOQUEADA)]
+
+    inicio = time.perf_counter()
+    for muestra in muestras:
+        _escritura_cola_anterior(db, os.path.join(tmp_dir, "bench_queue.duckdb"), muestra)
+    cola = (time.perf_counter() - inicio) / ESCRITURAS_BLOQUEADA * 1000
+
+    inicio = time.perf_counter()
+    for muestra in muestras:
+        db.insert_metrics(muestra)
+    spool = (time.perf_counter() - inicio) / ESCRITURAS_BLOQUEADA * 1000
+    _terminar(bloqueo)
+
+    inicio = time.perf_counter()
+    assert db.drain_spool()
+    vaciado = (time.perf_counter() - inicio) * 1000
+    db.close_connection()
+    assert len(_timestamps(db_path)) == ESCRITURAS_BLOQUEADA
+    print(f"{'Cola DuckDB (anterior)':<24} {cola:>8.2f} ms/escritura")
+    print(f"{'Spool de segmentos':<24} {spool:>8.2f} ms/escritura (vaciado completo {vaciado:.1f} ms)")
+    assert spool < cola
+
+if __name__ == "__main__":
+    print("--- Pruebas del spool de segmentos de DuckDB ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_formato_segmentos(tmp_dir)
+        prueba_sondeo_sin_migracion(tmp_dir)
+        prueba_cola_anterior(tmp_dir)
+        prueba_corte_durante_escritura(tmp_dir)
+        prueba_corte_durante_vaciado(tmp_dir)
+        benchmark_escritura_bloqueada(tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del spool pasaron. ---")
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import duckdb
+
+from libs.muestra.main_muestra import MetricSample, COLUMNAS_METRICAS
+from sqlite.main_sqlite import DBManager
+import main_duckdb
+
+CICLOS = 20000
+
+def _metricas_ciclo():
+    """Diccionario combinado típico de un ciclo (psutil + WMI + OHM)."""
+    return {
+        'timestamp': '2025-10-01T12:00:00', 'hostname': 'PC-01', 'username': 'usuario',
+        'cpu_percent': 0.0, 'cpu_load_percent': 37.5, 'cpu_freq_current_mhz': 2400.0,
+        'memoria_percent': 61.2, 'memoria_usada_gb': 9.8, 'memoria_total_gb': 16.0, 'memoria_libre_gb': 6.2,
+        'disco_percent': 40.0, 'disco_usado_gb': 200.0, 'disco_total_gb': 500.0, 'disco_libre_gb': 300.0,
+        'swap_percent': 5.0, 'swap_usado_gb': 0.4, 'swap_total_gb': 8.0,
+        'red_bytes_enviados_seg': 1024.0, 'red_bytes_recibidos_seg': 4096.0,
+        'cpu_temperatura_celsius': 55.0, 'bateria_porcentaje': None, 'cpu_power_package_watts': 12.5,
+        'cpu_power_cores_watts': 8.1, 'cpu_clocks_mhz': 100.0,
+        'os_name': 'Microsoft Windows 11 Pro', 'placa_base_fabricante': 'ASUSTeK',
+        'placa_base_producto': 'Desconocido', 'procesador_nombre': 'Intel Core i7',
+        'procesador_nucleos_logicos': 8, 'procesador_nucleos_fisicos': 4,
+        'os_last_boot_up_time': '20251001080000', 'fuente_psutil': 'ok', 'fuente_ohm': 'ok',
+    }
+
+def _destinos_con_diccionario(data):
+    """Normalización anterior: cada destino (SQLite, DuckDB y log) repetía sus cadenas .get()."""
+    for _ in range(2):
+        cpu_percent = data.get('cpu_percent') or data.get('cpu_freq_current_mhz') or 0
+        ram_percent = data.get('memoria_percent') or data.get('ram_load_percent') or 0
+        ram_used = data.get('memoria_usada_gb') or data.get('ram_load_used_gb') or 0
+        ram_free = data.get('memoria_libre_gb') or data.get('ram_load_free_gb') or 0
+        disk_percent = data.get('disco_percent') or data.get('hdd_used_gb') or 0
+        fila = (data.get('timestamp'), data.get('hostname'), data.get('username'), cpu_percent,
+                data.get('cpu_freq_current_mhz'), ram_percent, ram_used, data.get('memoria_total_gb'),
+                ram_free, disk_percent, data.get('disco_usado_gb'), data.get('disco_total_gb'),
+                data.get('disco_libre_gb'), data.get('swap_percent'), data.get('swap_usado_gb'),
+                data.get('swap_total_gb'), data.get('red_bytes_enviados_seg'), data.get('red_bytes_recibidos_seg'),
+                data.get('cpu_temperatura_celsius'), data.get('bateria_porcentaje'),
+                data.get('cpu_power_package_watts'), data.get('cpu_power_cores_watts'), data.get('cpu_clocks_mhz'))
+        fabricante = data.get('placa_base_fabricante', 'Desconocido')
+        producto = data.get('placa_base_producto', 'Desconocido')
+        placa = f"{fabricante} - {producto}".replace("Desconocido - ", "").replace(" - Desconocido", "")
+        info = (data.get('hostname'), data.get('username'), data.get('timestamp'), data.get('os_name'), placa,
+                data.get('procesador_nombre'), data.get('procesador_nucleos_logicos'),
+                data.get('procesador_nucleos_fisicos'), data.get('os_last_boot_up_time'))
+    cpu_percent = data.get('cpu_percent') or data.get('cpu_load_percent') or 0
+    return fila, info, cpu_percent
+
+def _destinos_con_muestra(data):
+    muestra = MetricSample.from_metrics(data)
+    return muestra.metric_row(), muestra.machine_info_row(), muestra.cpu_percent
+
+def prueba_normalizacion():
+    print("\n### Normalización única de las cadenas de respaldo")
+    muestra = MetricSample.from_metrics(_metricas_ciclo())
+    # Un 0 medido por psutil es un valor válido: no se sustituye por la carga de OHM.
+    assert muestra.cpu_percent == 0.0
+    assert muestra.placa_base == 'ASUSTeK'
+    assert muestra.battery_percent is None
+    assert not hasattr(muestra, '__dict__')
+
+    # Sin psutil, la muestra toma los valores de OHM; sin ninguna fuente, el valor por defecto.
+    solo_ohm = MetricSample.from_metrics({'cpu_load_percent': 37.5, 'ram_load_percent': 70.0})
+    assert solo_ohm.cpu_percent == 37.5 and solo_ohm.ram_percent == 70.0
+    assert solo_ohm.disk_percent == 0 and solo_ohm.placa_base == 'Desconocido'
+    assert len(muestra.metric_row()) == len(COLUMNAS_METRICAS)
+    print(muestra.metrics_message())
+    print(muestra.machine_info_message())
+
+def prueba_destinos(tmp_dir):
+    print("\n### SQLite y DuckDB consumen la misma muestra")
+    muestra = MetricSample.from_metrics(_metricas_ciclo())
+
+    DBManager._instance = None
+    db = DBManager(os.path.join(tmp_dir, "muestra.db"))
+    db.create_machine_info_table()
+    db.insert_metrics(muestra)
+    db.upsert_machine_info(muestra)
+    db.upsert_machine_info(muestra)
+    fila = db._cursor.execute("SELECT cpu_percent, ram_percent, red_bytes_recibidos_seg FROM metricas_v2").fetchone()
+    assert fila == (0.0, 61.2, 4096.0)
+    assert db._cursor.execute("SELECT placa_base, cores_logicos FROM info_maquina").fetchall() == [('ASUSTeK', 8)]
+    db.close_connection()
+
+    ruta_duckdb = os.path.join(tmp_dir, "muestra.duckdb")
+    main_duckdb.DBManager._instance = None
+    duck = main_duckdb.DBManager(ruta_duckdb)
+    duck.create_table()
+    duck.insert_metrics(muestra)
+    duck.upsert_machine_info(muestra)
+    con = duckdb.connect(ruta_duckdb)
+    assert con.execute("SELECT cpu_percent, ram_percent FROM metricas").fetchone() == (0.0, 61.2)
+    assert con.execute("SELECT placa_base FROM info_maquina").fetchone() == ('ASUSTeK',)
+    con.close()
+    duck.close_connection()
+    main_duckdb.DBManager._instance = None
+
+def benchmark_destinos():
+    print(f"\n### Normalización por ciclo en los destinos ({CICLOS} ciclos)")
+    data = _metricas_ciclo()
+    for nombre, funcion in (('Diccionario (3 cadenas .get())', _destinos_con_diccionario),
+                            ('MetricSample', _destinos_con_muestra)):
+        inicio = time.perf_counter()
+        for _ in range(CICLOS):
+            funcion(data)
+        duracion = (time.perf_counter() - inicio) / CICLOS * 1e6
+        tracemalloc.start()
+        funcion(data)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{nombre:<32} {duracion:>7.2f} µs/ciclo  {pico:>6} bytes asignados (pico)")
+    muestra = MetricSample.from_metrics(data)
+    como_diccionario = {campo: getattr(muestra, campo) for campo in MetricSample.__slots__}
+    print(f"Tamaño de la muestra: {sys.getsizeof(muestra)} bytes con __slots__ "
+          f"frente a {sys.getsizeof(como_diccionario)} bytes como diccionario")
+    assert sys.getsizeof(muestra) < sys.getsizeof(como_diccionario)
+
+if __name__ == "__main__":
+    print("--- Pruebas de la muestra tipada de métricas ---")
+    prueba_normalizacion()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_destinos(tmp_dir)
+    benchmark_destinos()
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de la muestra de métricas pasaron. ---")
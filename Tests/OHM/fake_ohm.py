@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Modelo de objetos simulado de OpenHardwareMonitor (Hardware.Computer) para ejecutar
+las pruebas de OHM fuera de Windows. Registra módulos 'clr' y 'System' simulados en
+sys.modules al importarse, antes de importar libs.ohm.main_ohm.
+"""
+import sys
+import time
+import types
+
+COSTO_UPDATE = 0.001        # Segundos por Hardware.Update() (lectura de registros/SMBus)
+COSTO_INTEROP = 0.00002     # Segundos por cada llamada a .NET (ToString, Name, Value)
+
+contadores = {'update': 0, 'to_string': 0}
+
+class FakeEnum:
+    def __init__(self, nombre):
+        self._nombre = nombre
+
+    def ToString(self):
+        contadores['to_string'] += 1
+        time.sleep(COSTO_INTEROP)
+        return self._nombre
+
+class FakeSensor:
+    def __init__(self, tipo, nombre, valor):
+        self.SensorType = FakeEnum(tipo)
+        self.Name = nombre
+        self.Value = valor
+
+class FakeHardware:
+    def __init__(self, tipo, nombre, sensores, sub_hardware=()):
+        self.HardwareType = FakeEnum(tipo)
+        self.Name = nombre
+        self.Sensors = [FakeSensor(*s) for s in sensores]
+        self.SubHardware = list(sub_hardware)
+
+    def Update(self):
+        contadores['update'] += 1
+        time.sleep(COSTO_UPDATE)
+
+def crear_computer(nucleos=8, discos=4, gpu=True, superio=True):
+    """Crea un Hardware.Computer simulado con un conjunto de sensores realista."""
+    cpu_sensores = [('Temperature', 'CPU Package', 55.25), ('Power', 'CPU Package', 35.5),
+                    ('Power', 'CPU Cores', 28.125), ('Load', 'CPU Total', 17.5), ('Clock', 'Bus Speed', 99.8)]
+    for i in range(1, nucleos + 1):
+        cpu_sensores += [('Temperature', f'CPU Core #{i}', 50.0 + i), ('Load', f'CPU Core #{i}', 10.0 + i),
+                         ('Clock', f'CPU Core #{i}', 3600.0 + i)]
+    hardware = [
+        FakeHardware('CPU', 'Intel Core i7-9700', cpu_sensores),
+        FakeHardware('RAM', 'Generic Memory', [('Data', 'Used Memory', 9.5), ('Data', 'Available Memory', 6.25),
+                                               ('Load', 'Memory', 60.3)]),
+    ]
+    for i in range(discos):
+        hardware.append(FakeHardware('HDD', f'Disk {i}', [('Load', 'Used Space', 40.0 + i), ('Temperature', 'Temperature', 35.0)]))
+    if gpu:
+        hardware.append(FakeHardware('GpuNvidia', 'NVIDIA GeForce GTX 1660',
+                                     [('Temperature', 'GPU Core', 45.0), ('Load', 'GPU Core', 5.0), ('Fan', 'GPU', 1100.0),
+                                      ('Clock', 'GPU Core', 300.0), ('Clock', 'GPU Memory', 405.0), ('Power', 'GPU Power', 12.0)]))
+    if superio:
+        superio_hw = FakeHardware('SuperIO', 'Nuvoton NCT6798D',
+                                  [('Voltage', f'Voltage #{i}', 1.0 + i / 10) for i in range(1, 10)] +
+                                  [('Fan', f'Fan #{i}', 800.0 + i) for i in range(1, 5)] +
+                                  [('Temperature', f'Temperature #{i}', 30.0 + i) for i in range(1, 6)])
+        hardware.append(FakeHardware('Mainboard', 'ASUS PRIME Z390-A', [], sub_hardware=[superio_hw]))
+
+    computer = types.SimpleNamespace(Hardware=hardware)
+    return computer
+
+fake_clr = types.ModuleType('clr')
+fake_clr.AddReference = lambda path: None
+fake_system = types.ModuleType('System')
+fake_system.Nullable = object
+sys.modules.setdefault('clr', fake_clr)
+sys.modules.setdefault('System', fake_system)
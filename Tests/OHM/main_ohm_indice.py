@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Registra los módulos 'clr' y 'System' simulados antes de importar el agente.
+from fake_ohm import contadores, crear_computer
+
+from libs.ohm.main_ohm import (
+    construir_indice_ohm,
+    obtener_metricas_ohm
+)
+
+CICLOS = 20
+
+def obtener_metricas_ohm_recorrido_completo(handle):
+    """
+    Versión anterior de obtener_metricas_ohm (referencia para el benchmark): actualiza
+    todo el hardware y recorre todos sus sensores comparando cadenas en cada ciclo.
+    """
+    metricas_ohm = {}
+    for hardware_item in handle.Hardware:
+        hardware_item.Update()
+        hw_type_name = hardware_item.HardwareType.ToString()
+        if hw_type_name == 'CPU':
+            metricas_ohm['cpu_name'] = hardware_item.Name
+            for sensor in hardware_item.Sensors:
+                sensor_type_str = sensor.SensorType.ToString()
+                if sensor.Value is None:
+                    continue
+                if sensor.Name == 'CPU Package':
+                    if sensor_type_str == 'Temperature':
+                        metricas_ohm['cpu_temperatura_celsius'] = round(float(sensor.Value), 2)
+                    elif sensor_type_str == 'Power':
+                        metricas_ohm['cpu_power_package_watts'] = round(float(sensor.Value), 2)
+                elif sensor.Name == 'CPU Total' and sensor_type_str == 'Load':
+                    metricas_ohm['cpu_load_percent'] = round(float(sensor.Value), 2)
+                elif sensor.Name == 'CPU Cores' and sensor_type_str == 'Power':
+                    metricas_ohm['cpu_power_cores_watts'] = round(float(sensor.Value), 2)
+                elif sensor.Name == 'Bus Speed' and sensor_type_str == 'Clock':
+                    metricas_ohm['cpu_clocks_mhz'] = round(float(sensor.Value), 2)
+        elif hw_type_name == 'RAM':
+            metricas_ohm['ram_name'] = hardware_item.Name
+            for sensor in hardware_item.Sensors:
+                sensor_type_str = sensor.SensorType.ToString()
+                if sensor.Value is None:
+                    continue
+                if sensor.Name == 'Used Memory' and sensor_type_str == 'Data':
+                    metricas_ohm['ram_load_used_gb'] = round(float(sensor.Value), 2)
+                elif sensor.Name == 'Available Memory' and sensor_type_str == 'Data':
+                    metricas_ohm['ram_load_free_gb'] = round(float(sensor.Value), 2)
+                elif sensor.Name == 'Memory' and sensor_type_str == 'Load':
+                    metricas_ohm['ram_load_percent'] = round(float(sensor.Value), 2)
+        elif hw_type_name == 'HDD':
+            metricas_ohm['hdd_name'] = hardware_item.Name
+            for sensor in hardware_item.Sensors:
+                sensor_type_str = sensor.SensorType.ToString()
+                if sensor.Value is None:
+                    continue
+                if sensor.Name == 'Used Space' and sensor_type_str == 'Load':
+                    metricas_ohm['hdd_used_gb'] = round(float(sensor.Value), 2)
+    return metricas_ohm
+
+def medir(func):
+    contadores['update'] = 0
+    contadores['to_string'] = 0
+    inicio = time.perf_counter()
+    for _ in range(CICLOS):
+        metricas = func()
+    ms = (time.perf_counter() - inicio) * 1000 / CICLOS
+    return metricas, ms, contadores['update'] / CICLOS, contadores['to_string'] / CICLOS
+
+def benchmark_indice_de_sensores():
+    print(f"\n### Recorrido completo vs índice de sensores ({CICLOS} ciclos)")
+    handle = crear_computer(nucleos=8, discos=4)
+
+    anterior, ms_anterior, upd_anterior, str_anterior = medir(lambda: obtener_metricas_ohm_recorrido_completo(handle))
+
+    contadores['to_string'] = 0
+    index = construir_indice_ohm(handle)
+    print(f"Construcción del índice: {contadores['to_string']} llamadas a ToString() (una sola vez)")
+    nuevo, ms_nuevo, upd_nuevo, str_nuevo = medir(lambda: obtener_metricas_ohm(handle, index))
+
+    print(f"{'Modo':<20} {'ms/ciclo':>10} {'Update()':>10} {'ToString()':>12}")
+    print(f"{'Recorrido completo':<20} {ms_anterior:>10.2f} {upd_anterior:>10.0f} {str_anterior:>12.0f}")
+    print(f"{'Índice':<20} {ms_nuevo:>10.2f} {upd_nuevo:>10.0f} {str_nuevo:>12.0f}")
+
+    # Mismas métricas con el índice y con el recorrido completo.
+    assert nuevo == anterior, (nuevo, anterior)
+    # Solo se actualizan CPU, RAM y el disco publicado (no GPU ni placa base) y no se convierte nada a texto.
+    assert upd_nuevo == 3
+    assert str_nuevo == 0
+    assert ms_nuevo < ms_anterior
+
+def prueba_valores_nulos():
+    print("\n### Sensores sin valor")
+    handle = crear_computer(nucleos=2, discos=1, gpu=False, superio=False)
+    index = construir_indice_ohm(handle)
+    handle.Hardware[0].Sensors[0].Value = None
+    metricas = obtener_metricas_ohm(handle, index)
+    assert 'cpu_temperatura_celsius' not in metricas
+    assert metricas['cpu_power_package_watts'] == 35.5
+    assert obtener_metricas_ohm(None) == {}
+
+if __name__ == "__main__":
+    print("--- Pruebas del índice de sensores de OpenHardwareMonitor ---")
+    benchmark_indice_de_sensores()
+    prueba_valores_nulos()
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del índice de sensores OHM pasaron. ---")
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import sqlite3
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Registra los módulos 'clr' y 'System' simulados antes de importar el agente.
+from fake_ohm import contadores, crear_computer
+
+from libs.ohm.main_ohm import (
+    configurar_actualizacion_ohm,
+    construir_indice_ohm,
+    construir_flujo_sensores_ohm,
+    obtener_metricas_ohm,
+    obtener_sensores_ohm
+)
+from sqlite.main_sqlite import DBManager
+
+CICLOS = 60
+
+def prueba_flujo_completo():
+    print("\n### Todos los sensores como pares (sensor_id, valor)")
+    handle = crear_computer(nucleos=8, discos=2)
+    stream = construir_flujo_sensores_ohm(handle)
+    sensor_ids, valores = obtener_sensores_ohm(stream)
+    print(f"Sensores leídos: {len(sensor_ids)} ({sensor_ids.dtype}, {valores.dtype})")
+    assert sensor_ids.dtype == np.uint16 and valores.dtype == np.float32
+    assert len(sensor_ids) == len(stream.definitions)
+
+    tipos = {d['tipo'] for d in stream.definitions.values()}
+    # Ventiladores y voltajes del Super I/O (sub-hardware de la placa base) incluidos.
+    assert {'Fan', 'Voltage', 'Temperature', 'Clock'} <= tipos
+    ventiladores = [d for d in stream.definitions.values() if d['tipo'] == 'Fan']
+    assert all(d['unidad'] == 'RPM' for d in ventiladores)
+    assert any(d['hardware'] == 'Nuvoton NCT6798D' for d in ventiladores)
+    nucleos = [d for d in stream.definitions.values() if d['tipo'] == 'Temperature' and d['nombre'].startswith('CPU Core')]
+    assert len(nucleos) == 8
+
+    # Los sensores sin valor se omiten.
+    handle.Hardware[0].Sensors[0].Value = None
+    sensor_ids_2, _ = obtener_sensores_ohm(stream)
+    assert len(sensor_ids_2) == len(sensor_ids) - 1
+    assert obtener_sensores_ohm(None) is None
+
+def prueba_un_update_por_ciclo():
+    print("\n### El índice y el flujo de sensores comparten el Update() del ciclo")
+    handle = crear_computer(nucleos=8, discos=2)
+    index = construir_indice_ohm(handle)
+    stream = construir_flujo_sensores_ohm(handle)
+    componentes = len(stream._hardware)
+    try:
+        configurar_actualizacion_ohm(30)
+        for _ in range(2):
+            contadores['update'] = 0
+            sensor_ids, _ = obtener_sensores_ohm(stream)
+            metricas = obtener_metricas_ohm(handle, index)
+            print(f"Update() en el ciclo: {contadores['update']} ({componentes} componentes)")
+            assert contadores['update'] == componentes
+            assert metricas['cpu_temperatura_celsius'] == 55.25 and len(sensor_ids) == len(stream.definitions)
+            # Reconfigurar descarta los Update() registrados, como si la vigencia hubiera pasado.
+            configurar_actualizacion_ohm(30)
+    finally:
+        configurar_actualizacion_ohm(0)
+
+    # Sin vigencia cada colector actualiza su hardware.
+    contadores['update'] = 0
+    obtener_sensores_ohm(stream)
+    obtener_metricas_ohm(handle, index)
+    assert contadores['update'] == componentes + len(index._hardware)
+
+def prueba_identificadores_estables(db_path):
+    print("\n### Catálogo persistido y sensor_id estables")
+    db = DBManager(db_path)
+    db.create_sensor_tables()
+
+    stream = construir_flujo_sensores_ohm(crear_computer(nucleos=4, discos=1))
+    db.upsert_sensor_catalog(stream.take_new_definitions())
+    assert stream.take_new_definitions() == []
+    catalogo = db.load_sensor_catalog()
+    assert len(catalogo) == len(stream.definitions)
+
+    # Reinicio del servicio con un disco más: los sensores conocidos conservan su id.
+    stream_2 = construir_flujo_sensores_ohm(crear_computer(nucleos=4, discos=2), catalogo)
+    nuevas = stream_2.take_new_definitions()
+    print(f"Sensores nuevos tras añadir un disco: {[d['clave'] for d in nuevas]}")
+    assert [d['hardware'] for d in nuevas] == ['Disk 1', 'Disk 1']
+    assert min(d['sensor_id'] for d in nuevas) == max(catalogo.values()) + 1
+    for clave, sensor_id in catalogo.items():
+        assert stream_2.definitions[sensor_id]['clave'] == clave
+    db.upsert_sensor_catalog(nuevas)
+    assert len(db.load_sensor_catalog()) == len(catalogo) + 2
+    db.close_connection()
+
+def _bytes_tabla(conexion, tabla):
+    """Bytes de las páginas que ocupa una tabla (sin índices secundarios)."""
+    return conexion.execute("SELECT sum(pgsize) FROM dbstat WHERE name = ?", (tabla,)).fetchone()[0]
+
+def benchmark_tamano_en_disco(db_path, tmp_dir):
+    print(f"\n### Tamaño en disco ({CICLOS} ciclos)")
+    db = DBManager(db_path)
+    db._connect()
+    db.create_sensor_tables()
+    stream = construir_flujo_sensores_ohm(crear_computer(nucleos=8, discos=2), db.load_sensor_catalog())
+    db.upsert_sensor_catalog(stream.take_new_definitions())
+
+    # Referencia: formato largo ingenuo con rowid, marca de tiempo y nombre del sensor en texto.
+    ingenua_path = os.path.join(tmp_dir, "ingenua.db")
+    ingenua = sqlite3.connect(ingenua_path)
+    ingenua.execute("CREATE TABLE sensores (timestamp TEXT, hardware TEXT, sensor TEXT, tipo TEXT, valor REAL)")
+
+    inicio = 1759300000
+    lecturas = 0
+    for ciclo in range(CICLOS):
+        ts = inicio + ciclo * 60
+        sensor_ids, valores = obtener_sensores_ohm(stream)
+        db.insert_sensor_readings(ts * 1000, sensor_ids, valores)
+        marca = datetime.fromtimestamp(ts).isoformat()
+        ingenua.executemany("INSERT INTO sensores VALUES (?, ?, ?, ?, ?)", [
+            (marca, stream.definitions[s]['hardware'], stream.definitions[s]['nombre'], stream.definitions[s]['tipo'], v)
+            for s, v in zip(sensor_ids.tolist(), valores.tolist())
+        ])
+        lecturas += len(sensor_ids)
+    ingenua.commit()
+    ingenua.execute("VACUUM")
+    db._connection.execute("VACUUM")
+
+    filas = db._connection.execute("SELECT COUNT(*) FROM sensores_ohm").fetchone()[0]
+    assert filas == lecturas
+
+    # Se miden solo las páginas de cada tabla (dbstat): el archivo del agente contiene además
+    # las tablas de métricas y agregados, cuyas páginas fijas no dependen de las lecturas.
+    bytes_estrecha = _bytes_tabla(db._connection, 'sensores_ohm') / lecturas
+    bytes_ingenua = _bytes_tabla(ingenua, 'sensores') / lecturas
+    ingenua.close()
+    db.close_connection()
+    print(f"{'Tabla':<32} {'bytes/lectura':>14}")
+    print(f"{'sensores_ohm (WITHOUT ROWID)':<32} {bytes_estrecha:>14.1f}")
+    print(f"{'Formato largo con texto':<32} {bytes_ingenua:>14.1f}")
+    assert bytes_estrecha < bytes_ingenua / 2
+
+if __name__ == "__main__":
+    print("--- Pruebas del flujo completo de sensores de OpenHardwareMonitor ---")
+    prueba_flujo_completo()
+    prueba_un_update_por_ciclo()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "sensores.db")
+        prueba_identificadores_estables(db_path)
+        benchmark_tamano_en_disco(db_path, tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del flujo de sensores OHM pasaron. ---")
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Tabla de procesos simulada con la interfaz de psutil (pids, Process, process_iter)
+para medir los colectores de procesos con cientos de PIDs y rotación controlada.
+Cada lectura de un atributo tiene un costo fijo, como una llamada al sistema.
+"""
+import contextlib
+import time
+
+import psutil
+
+COSTO_LLAMADA = 0.00002     # Segundos por lectura de atributo (OpenProcess + consulta)
+
+contadores = {'llamadas': 0}
+
+class FakeSistema:
+    """Estado de la tabla de procesos: pid -> atributos."""
+
+    def __init__(self, procesos=600, nombres=40):
+        self.procesos = {}
+        self.siguiente_pid = 1000
+        self.nombres = [f"app{i}.exe" for i in range(nombres)]
+        for _ in range(procesos):
+            self.iniciar()
+
+    def iniciar(self, nombre=None, create_time=None):
+        pid = self.siguiente_pid
+        self.siguiente_pid += 4
+        self.procesos[pid] = {
+            'name': nombre or self.nombres[(pid // 4) % len(self.nombres)],
+            'create_time': create_time if create_time is not None else 1759300000.0 + pid,
+            'ppid': 4,
+            'username': 'EMPRESA\\usuario',
+            'cpu_user': 0.0,
+            'cpu_system': 0.0,
+            'rss': 50 * 1024 * 1024 + pid * 1024,
+            'read_bytes': 0,
+            'write_bytes': 0,
+        }
+        return pid
+
+    def avanzar(self, segundos):
+        """Acumula CPU y E/S en cada proceso con una carga fija derivada del PID."""
+        for pid, datos in self.procesos.items():
+            carga = (pid % 97) / 97
+            datos['cpu_user'] += segundos * carga * 0.5
+            datos['cpu_system'] += segundos * carga * 0.1
+            datos['read_bytes'] += int(segundos * (pid % 89) * 1024)
+            datos['write_bytes'] += int(segundos * (pid % 83) * 512)
+
+    def reutilizar(self, pid, nombre=None):
+        """Termina el proceso 'pid' e inicia otro con el mismo PID y un create_time posterior."""
+        anterior = self.procesos.pop(pid)
+        siguiente, self.siguiente_pid = self.siguiente_pid, pid
+        self.iniciar(nombre=nombre, create_time=anterior['create_time'] + 1000)
+        self.siguiente_pid = siguiente
+        return pid
+
+    def terminar(self, pid):
+        self.procesos.pop(pid, None)
+
+    def rotar(self, cantidad):
+        """Termina los 'cantidad' procesos más antiguos e inicia otros tantos."""
+        for pid in sorted(self.procesos)[:cantidad]:
+            self.terminar(pid)
+        for _ in range(cantidad):
+            self.iniciar()
+
+class FakeProcess:
+    def __init__(self, sistema, pid):
+        if pid not in sistema.procesos:
+            raise psutil.NoSuchProcess(pid)
+        self._sistema = sistema
+        self.pid = pid
+        self._cache = None
+        # Como psutil.Process, el create_time se lee al construir el objeto y queda en caché.
+        self._create_time = sistema.procesos[pid]['create_time']
+
+    @contextlib.contextmanager
+    def oneshot(self):
+        # Como en psutil: dentro del bloque, una sola consulta al sistema sirve a todos los atributos.
+        contadores['llamadas'] += 1
+        time.sleep(COSTO_LLAMADA)
+        self._cache = dict(self._datos())
+        try:
+            yield
+        finally:
+            self._cache = None
+
+    def _datos(self):
+        datos = self._sistema.procesos.get(self.pid)
+        if datos is None:
+            raise psutil.NoSuchProcess(self.pid)
+        return datos
+
+    def _leer(self, campo):
+        if self._cache is not None:
+            return self._cache[campo]
+        contadores['llamadas'] += 1
+        time.sleep(COSTO_LLAMADA)
+        return self._datos()[campo]
+
+    def create_time(self):
+        # None simula un proceso protegido cuyo create_time no se puede leer.
+        if self._create_time is None:
+            raise psutil.AccessDenied(self.pid)
+        return self._create_time
+
+    def name(self):
+        return self._leer('name')
+
+    def ppid(self):
+        return self._leer('ppid')
+
+    def username(self):
+        return self._leer('username')
+
+    def cpu_times(self):
+        return _pcputimes(self._leer('cpu_user'), self._leer('cpu_system'))
+
+    def memory_info(self):
+        return _pmem(self._leer('rss'))
+
+    def io_counters(self):
+        return _pio(self._leer('read_bytes'), self._leer('write_bytes'))
+
+    def cpu_percent(self, interval=None):
+        if interval:
+            time.sleep(interval)
+        return 0.0
+
+class _pcputimes:
+    def __init__(self, user, system):
+        self.user = user
+        self.system = system
+
+class _pmem:
+    def __init__(self, rss):
+        self.rss = rss
+        self.vms = rss * 2
+
+class _pio:
+    def __init__(self, read_bytes, write_bytes):
+        self.read_bytes = read_bytes
+        self.write_bytes = write_bytes
+
+class FakePsutil:
+    """Módulo psutil simulado sobre un FakeSistema."""
+    NoSuchProcess = psutil.NoSuchProcess
+    ZombieProcess = psutil.ZombieProcess
+    AccessDenied = psutil.AccessDenied
+
+    def __init__(self, sistema):
+        self.sistema = sistema
+
+    def pids(self):
+        contadores['llamadas'] += 1
+        return list(self.sistema.procesos)
+
+    def Process(self, pid):
+        contadores['llamadas'] += 1
+        time.sleep(COSTO_LLAMADA)
+        return FakeProcess(self.sistema, pid)
+
+    def process_iter(self, attrs=None):
+        contadores['llamadas'] += 1
+        for pid in list(self.sistema.procesos):
+            try:
+                yield FakeProcess(self.sistema, pid)
+            except psutil.NoSuchProcess:
+                continue
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+from collections import namedtuple
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from libs.psutil.main_psutil import CPUSampler
+
+# Mismos campos que psutil.cpu_times() en Windows.
+scputimes = namedtuple('scputimes', ['user', 'system', 'idle', 'interrupt', 'dpc'])
+
+# Secuencia grabada de contadores por núcleo (2 núcleos) y del reloj monotónico.
+# Cada entrada: (instante monotónico, [núcleo 0, núcleo 1])
+SECUENCIA_GRABADA = [
+    (100.0, [scputimes(10.0, 5.0, 85.0, 0.0, 0.0), scputimes(20.0, 10.0, 70.0, 0.0, 0.0)]),
+    # +10s: núcleo 0 al 50% (5 ocupado / 10), núcleo 1 al 100% (10 ocupado / 10)
+    (110.0, [scputimes(13.0, 7.0, 90.0, 0.0, 0.0), scputimes(28.0, 12.0, 70.0, 0.0, 0.0)]),
+    # +10s: ambos núcleos inactivos
+    (120.0, [scputimes(13.0, 7.0, 100.0, 0.0, 0.0), scputimes(28.0, 12.0, 80.0, 0.0, 0.0)]),
+    # +5s: núcleo 0 al 20% con tiempo de interrupción, núcleo 1 al 0%
+    (125.0, [scputimes(13.5, 7.0, 104.0, 0.25, 0.25), scputimes(28.0, 12.0, 85.0, 0.0, 0.0)]),
+]
+
+def crear_muestreador(secuencia):
+    """Crea un CPUSampler alimentado por la secuencia grabada en lugar de psutil."""
+    iterador = iter(secuencia)
+    actual = {}
+
+    def cpu_times_func():
+        actual['instante'], nucleos = next(iterador)
+        return nucleos
+
+    return CPUSampler(cpu_times_func=cpu_times_func, clock=lambda: actual['instante'])
+
+def prueba_secuencia_grabada():
+    print("\n### Secuencia grabada de contadores")
+    sampler = crear_muestreador(SECUENCIA_GRABADA)
+
+    # Primera muestra: promedio desde el arranque (sin instantánea previa).
+    muestra = sampler.sample()
+    print(f"Muestra 1: {muestra}")
+    assert muestra['intervalo_segundos'] is None
+    assert muestra['cpu_percent'] == 22.5
+    assert muestra['cpu_percent_por_nucleo'] == [15.0, 30.0]
+
+    muestra = sampler.sample()
+    print(f"Muestra 2: {muestra}")
+    assert muestra['intervalo_segundos'] == 10.0
+    assert muestra['cpu_percent_por_nucleo'] == [50.0, 100.0]
+    assert muestra['cpu_percent'] == 75.0
+
+    muestra = sampler.sample()
+    print(f"Muestra 3: {muestra}")
+    assert muestra['cpu_percent'] == 0.0
+    assert muestra['cpu_percent_por_nucleo'] == [0.0, 0.0]
+
+    muestra = sampler.sample()
+    print(f"Muestra 4: {muestra}")
+    assert muestra['intervalo_segundos'] == 5.0
+    assert muestra['cpu_percent_por_nucleo'] == [20.0, 0.0]
+    assert muestra['cpu_percent'] == 10.0
+
+def prueba_cambio_de_nucleos():
+    print("\n### Cambio en el número de núcleos")
+    secuencia = [
+        (0.0, [scputimes(1.0, 1.0, 8.0, 0.0, 0.0)]),
+        (5.0, [scputimes(2.0, 1.0, 12.0, 0.0, 0.0), scputimes(1.0, 0.0, 4.0, 0.0, 0.0)]),
+    ]
+    sampler = crear_muestreador(secuencia)
+    sampler.sample()
+    muestra = sampler.sample()
+    print(f"Muestra tras hotplug: {muestra}")
+    # Sin instantánea comparable se vuelve al promedio desde el arranque.
+    assert muestra['intervalo_segundos'] is None
+    assert len(muestra['cpu_percent_por_nucleo']) == 2
+
+def prueba_sin_bloqueo():
+    print("\n### Muestreo real sin bloqueo")
+    sampler = CPUSampler()
+    sampler.sample()
+    inicio = time.perf_counter()
+    muestra = sampler.sample()
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    print(f"Muestra real: {muestra['cpu_percent']}% en {duracion_ms:.3f} ms")
+    assert duracion_ms < 100
+
+if __name__ == "__main__":
+    print("--- Pruebas del muestreador de CPU por deltas ---")
+    prueba_secuencia_grabada()
+    prueba_cambio_de_nucleos()
+    prueba_sin_bloqueo()
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del muestreador de CPU pasaron. ---")
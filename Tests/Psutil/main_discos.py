@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+from collections import namedtuple
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from libs.psutil.main_disco import DiskCollector
+from sqlite.main_sqlite import DBManager
+
+sdiskpart = namedtuple('sdiskpart', ['device', 'mountpoint', 'fstype', 'opts'])
+sdiskio = namedtuple('sdiskio', ['read_count', 'write_count', 'read_bytes', 'write_bytes',
+                                 'read_time', 'write_time', 'busy_time'])
+sdiskusage = namedtuple('sdiskusage', ['total', 'used', 'free', 'percent'])
+
+class FakePsutilDiscos:
+    """Volúmenes y contadores de disco simulados, con contador de llamadas a disk_partitions()."""
+
+    def __init__(self):
+        self.particiones = [
+            sdiskpart('/dev/sda1', '/', 'ext4', 'rw'),
+            sdiskpart('/dev/sdb1', '/datos', 'xfs', 'rw'),
+            sdiskpart('/dev/sr0', '/media/cdrom', '', 'ro'),
+        ]
+        self.contadores = {
+            'sda': sdiskio(100, 200, 4096000, 8192000, 50, 80, 100),
+            'sdb': sdiskio(10, 20, 409600, 819200, 5, 8, 10),
+        }
+        self.fallar = set()
+        self.llamadas_particiones = 0
+
+    def disk_partitions(self, all=False):
+        self.llamadas_particiones += 1
+        return list(self.particiones)
+
+    def disk_usage(self, path):
+        if path in self.fallar:
+            raise OSError(f"volumen no disponible: {path}")
+        return sdiskusage(100 * 1024 ** 3, 40 * 1024 ** 3, 60 * 1024 ** 3, 40.0)
+
+    def disk_io_counters(self, perdisk=False):
+        return dict(self.contadores)
+
+    def avanzar(self, disco, lecturas, escrituras, bytes_leidos, bytes_escritos, ocupado_ms):
+        c = self.contadores[disco]
+        self.contadores[disco] = c._replace(
+            read_count=c.read_count + lecturas, write_count=c.write_count + escrituras,
+            read_bytes=c.read_bytes + bytes_leidos, write_bytes=c.write_bytes + bytes_escritos,
+            busy_time=c.busy_time + ocupado_ms
+        )
+
+def prueba_mapa_de_particiones():
+    print("\n### Mapa de particiones cacheado")
+    fake = FakePsutilDiscos()
+    reloj = {'t': 0.0}
+    colector = DiskCollector(fake, clock=lambda: reloj['t'], refresh_interval=300)
+    for _ in range(10):
+        reloj['t'] += 10
+        datos = colector.collect()
+    print(f"Volúmenes: {[v['mountpoint'] for v in datos['volumenes']]}, lecturas del mapa en 10 ciclos: {fake.llamadas_particiones}")
+    # El lector de CD sin sistema de archivos se descarta.
+    assert [v['mountpoint'] for v in datos['volumenes']] == ['/', '/datos']
+    assert fake.llamadas_particiones == 1
+
+    # Nuevo disco en los contadores de E/S: se relee el mapa.
+    fake.particiones.append(sdiskpart('/dev/sdc1', '/backup', 'ext4', 'rw'))
+    fake.contadores['sdc'] = sdiskio(0, 0, 0, 0, 0, 0, 0)
+    reloj['t'] += 10
+    assert [v['mountpoint'] for v in colector.collect()['volumenes']] == ['/', '/datos', '/backup']
+    assert fake.llamadas_particiones == 2
+
+    # Volumen extraído: falla su lectura y el mapa se relee en el mismo ciclo.
+    fake.particiones.pop()
+    fake.fallar.add('/backup')
+    reloj['t'] += 10
+    assert [v['mountpoint'] for v in colector.collect()['volumenes']] == ['/', '/datos']
+    assert fake.llamadas_particiones == 3
+
+    # Relectura periódica de respaldo.
+    reloj['t'] += 300
+    colector.collect()
+    assert fake.llamadas_particiones == 4
+
+def prueba_tasas_de_disco():
+    print("\n### Tasas de E/S por disco a partir de deltas")
+    fake = FakePsutilDiscos()
+    reloj = {'t': 0.0}
+    colector = DiskCollector(fake, clock=lambda: reloj['t'])
+    assert colector.collect()['discos'] == []
+
+    fake.avanzar('sda', 600, 1200, 60 * 1024 ** 2, 120 * 1024 ** 2, 15000)
+    reloj['t'] += 60
+    sda = next(d for d in colector.collect()['discos'] if d['disco'] == 'sda')
+    print(f"sda: {sda}")
+    assert sda['lecturas_seg'] == 10.0 and sda['escrituras_seg'] == 20.0
+    assert sda['lectura_bytes_seg'] == 1024 ** 2 and sda['escritura_bytes_seg'] == 2 * 1024 ** 2
+    assert sda['ocupado_percent'] == 25.0
+
+    # Contadores reiniciados (ej. disco reconectado): no se producen tasas negativas.
+    fake.contadores['sda'] = sdiskio(0, 0, 0, 0, 0, 0, 0)
+    reloj['t'] += 60
+    assert [d['disco'] for d in colector.collect()['discos']] == ['sdb']
+
+def prueba_montajes_linux_reales(db_path):
+    print("\n### Puntos de montaje reales de este sistema")
+    colector = DiskCollector()
+    colector.collect()
+    datos = colector.collect()
+    for v in datos['volumenes']:
+        print(f"{v['mountpoint']:<40} {v['fstype']:<6} {v['percent']:>6.1f} %")
+    assert any(v['mountpoint'] == os.path.abspath(os.sep) for v in datos['volumenes'])
+    assert all(d['lectura_bytes_seg'] >= 0 for d in datos['discos'])
+
+    DBManager._instance = None
+    db = DBManager(db_path)
+    db.create_disk_tables()
+    db.insert_disk_metrics(1759300000000, datos)
+    filas = db._cursor.execute("SELECT COUNT(*) FROM volumenes").fetchone()[0]
+    assert filas == len(datos['volumenes'])
+    assert db._cursor.execute("SELECT COUNT(*) FROM discos_io").fetchone()[0] == len(datos['discos'])
+    db.close_connection()
+
+if __name__ == "__main__":
+    print("--- Pruebas del colector de volúmenes y discos ---")
+    prueba_mapa_de_particiones()
+    prueba_tasas_de_disco()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_montajes_linux_reales(os.path.join(tmp_dir, "discos.db"))
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del colector de discos pasaron. ---")
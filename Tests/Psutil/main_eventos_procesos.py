@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from fake_procesos import FakePsutil, FakeSistema
+
+from libs.psutil.main_procesos import (
+    ProcessTracker,
+    ProcessEventPoller,
+    ProcessRateSampler,
+    EVENTO_INICIO,
+    EVENTO_FIN
+)
+from sqlite.main_sqlite import DBManager
+
+def prueba_eventos_por_diferencia():
+    print("\n### Eventos de inicio y fin por diferencia de conjuntos")
+    sistema = FakeSistema(20)
+    reloj = {'t': 1759400000.0}
+    tracker = ProcessTracker(FakePsutil(sistema), wall_clock=lambda: reloj['t'])
+    tracker.update()
+    # El estado inicial no genera eventos de inicio.
+    assert tracker.take_events() == []
+
+    viejo = min(sistema.procesos)
+    sistema.terminar(viejo)
+    nuevo = sistema.iniciar(nombre='backup.exe', create_time=reloj['t'] + 10)
+    reloj['t'] += 60
+    tracker.update()
+    eventos = tracker.take_events()
+    print(f"Eventos: {[(e['evento'], e['pid'], e['name']) for e in eventos]}")
+    assert [(e['evento'], e['pid']) for e in eventos] == [(EVENTO_FIN, viejo), (EVENTO_INICIO, nuevo)]
+    assert eventos[1]['name'] == 'backup.exe' and eventos[1]['ts'] == int(reloj['t'] * 1000)
+    assert eventos[0]['duracion_segundos'] > 0
+    assert tracker.take_events() == []
+
+    # Un PID reutilizado (mismo pid, create_time distinto) no cambia la lista de PIDs que
+    # revisa poll(); el muestreador lo detecta y genera fin e inicio.
+    sampler = ProcessRateSampler(tracker, cpu_count=1, clock=lambda: reloj['t'])
+    sistema.avanzar(60)
+    sampler.sample()
+    reutilizado = min(sistema.procesos)
+    sistema.reutilizar(reutilizado, nombre='updater.exe')
+    reloj['t'] += 60
+    tracker.poll()
+    assert tracker.take_events() == []
+    sampler.sample()
+    eventos = tracker.take_events()
+    print(f"PID reutilizado: {[(e['evento'], e['pid'], e['name']) for e in eventos]}")
+    assert [(e['evento'], e['pid']) for e in eventos] == [(EVENTO_FIN, reutilizado), (EVENTO_INICIO, reutilizado)]
+    assert eventos[0]['create_time'] != eventos[1]['create_time'] and eventos[1]['name'] == 'updater.exe'
+
+def prueba_procesos_de_vida_corta():
+    print("\n### Procesos de vida corta entre dos ciclos")
+    for con_revision_rapida in (False, True):
+        sistema = FakeSistema(20)
+        tracker = ProcessTracker(FakePsutil(sistema))
+        tracker.update()
+        # Un proceso vive 10 s dentro de un ciclo de 60 s revisado cada 5 s.
+        corto = sistema.iniciar(nombre='corto.exe')
+        if con_revision_rapida:
+            tracker.poll()
+        sistema.terminar(corto)
+        if con_revision_rapida:
+            tracker.poll()
+        cambios = tracker.update()
+        eventos = [(e['evento'], e['name']) for e in tracker.take_events()]
+        print(f"Revisión rápida={con_revision_rapida}: eventos {eventos}")
+        # La tabla de procesos activos no cambia en ningún caso.
+        assert cambios['iniciados'] == [] and cambios['finalizados'] == []
+        if con_revision_rapida:
+            assert eventos == [(EVENTO_INICIO, 'corto.exe'), (EVENTO_FIN, 'corto.exe')]
+        else:
+            assert eventos == []
+
+    # Los cambios detectados por poll() se entregan en el siguiente update().
+    sistema = FakeSistema(5)
+    tracker = ProcessTracker(FakePsutil(sistema))
+    tracker.poll()
+    primera = tracker.update()
+    assert primera['completo'] and len(primera['iniciados']) == 5
+    largo = sistema.iniciar()
+    tracker.poll()
+    assert [p['pid'] for p in tracker.update()['iniciados']] == [largo]
+
+def prueba_hilo_de_revision():
+    print("\n### Hilo de revisión rápida")
+    sistema = FakeSistema(50)
+    tracker = ProcessTracker(FakePsutil(sistema))
+    tracker.update()
+    poller = ProcessEventPoller(tracker, interval=0.02)
+    poller.start()
+    pid = sistema.iniciar(nombre='instalador.exe')
+    time.sleep(0.15)
+    sistema.terminar(pid)
+    time.sleep(0.15)
+    poller.stop()
+    eventos = [(e['evento'], e['pid']) for e in tracker.take_events()]
+    print(f"Revisiones: {poller.polls}, eventos: {eventos}")
+    assert eventos == [(EVENTO_INICIO, pid), (EVENTO_FIN, pid)]
+
+def prueba_persistencia(db_path):
+    print("\n### Tabla 'procesos_eventos' (solo inserciones)")
+    DBManager._instance = None
+    db = DBManager(db_path)
+    db.create_process_tables()
+    sistema = FakeSistema(10)
+    tracker = ProcessTracker(FakePsutil(sistema))
+    tracker.update()
+    for _ in range(3):
+        sistema.rotar(2)
+        tracker.poll()
+        db.insert_process_events(tracker.take_events())
+    filas = db._cursor.execute("SELECT evento, COUNT(*) FROM procesos_eventos GROUP BY evento ORDER BY evento").fetchall()
+    print(f"Eventos guardados: {filas}")
+    assert filas == [(EVENTO_FIN, 6), (EVENTO_INICIO, 6)]
+    db.close_connection()
+
+if __name__ == "__main__":
+    print("--- Pruebas de los eventos de inicio y fin de procesos ---")
+    prueba_eventos_por_diferencia()
+    prueba_procesos_de_vida_corta()
+    prueba_hilo_de_revision()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_persistencia(os.path.join(tmp_dir, "eventos.db"))
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de los eventos de procesos pasaron. ---")
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from fake_procesos import FakePsutil, FakeSistema
+
+from libs.psutil.main_procesos import (
+    NameDictionary,
+    ProcessTracker,
+    ProcessRateSampler,
+    agrupar_procesos
+)
+from sqlite.main_sqlite import DBManager
+
+REPETICIONES = 50
+CRITERIOS = ('name', 'cpu', 'ram', 'disk')
+
+def agrupar_anterior(rows, sort_by):
+    """Agrupación anterior (referencia, de listar_procesos_agrupar): diccionario de diccionarios y sorted()."""
+    aggregated_data = {}
+    for p_info in rows:
+        name = p_info['name']
+        if name not in aggregated_data:
+            aggregated_data[name] = {'count': 0, 'cpu_percent': 0.0, 'ram_bytes': 0, 'disk': 0.0}
+        aggregated_data[name]['count'] += 1
+        aggregated_data[name]['cpu_percent'] += p_info['cpu_percent']
+        aggregated_data[name]['ram_bytes'] += p_info['rss_bytes']
+        aggregated_data[name]['disk'] += p_info['io_read_bytes_seg'] + p_info['io_write_bytes_seg']
+    claves = {
+        'name': lambda item: item[0].lower(),
+        'cpu': lambda item: item[1]['cpu_percent'],
+        'ram': lambda item: item[1]['ram_bytes'],
+        'disk': lambda item: item[1]['disk'],
+    }
+    return sorted(aggregated_data.items(), key=claves[sort_by], reverse=True)
+
+def muestra(procesos, nombres):
+    sistema = FakeSistema(procesos, nombres)
+    reloj = {'t': 0.0}
+    tracker = ProcessTracker(FakePsutil(sistema))
+    sampler = ProcessRateSampler(tracker, cpu_count=8, clock=lambda: reloj['t'])
+    tracker.update()
+    sampler.sample()
+    sistema.avanzar(60)
+    reloj['t'] = 60.0
+    sampler.sample()
+    return tracker, sampler
+
+def benchmark_agrupacion():
+    print(f"\n### Agrupación por ejecutable, 4 criterios ({REPETICIONES} repeticiones)")
+    print(f"{'Procesos':>9} {'Grupos':>7} {'Bucle (ms)':>11} {'NumPy (ms)':>11}")
+    for procesos, nombres in ((600, 40), (5000, 300)):
+        tracker, sampler = muestra(procesos, nombres)
+
+        inicio = time.perf_counter()
+        for _ in range(REPETICIONES):
+            anteriores = {c: agrupar_anterior(sampler.rows, c) for c in CRITERIOS}
+        ms_anterior = (time.perf_counter() - inicio) * 1000 / REPETICIONES
+
+        inicio = time.perf_counter()
+        for _ in range(REPETICIONES):
+            nuevos = {c: agrupar_procesos(sampler.columns, tracker.names.names, c) for c in CRITERIOS}
+        ms_nuevo = (time.perf_counter() - inicio) * 1000 / REPETICIONES
+
+        print(f"{procesos:>9} {len(nuevos['ram']['name']):>7} {ms_anterior:>11.3f} {ms_nuevo:>11.3f}")
+        assert ms_nuevo < ms_anterior
+
+        # Mismos grupos, conteos y orden que la agrupación anterior.
+        for criterio in ('name', 'ram'):
+            assert list(nuevos[criterio]['name']) == [n for n, _ in anteriores[criterio]], criterio
+        ram = dict(zip(nuevos['ram']['name'], nuevos['ram']['rss_bytes'].tolist()))
+        conteos = dict(zip(nuevos['ram']['name'], nuevos['ram']['procesos'].tolist()))
+        for name, datos in anteriores['ram']:
+            assert ram[name] == datos['ram_bytes'] and conteos[name] == datos['count']
+        cpu = dict(zip(nuevos['cpu']['name'], nuevos['cpu']['cpu_percent'].tolist()))
+        for name, datos in anteriores['cpu']:
+            assert abs(cpu[name] - datos['cpu_percent']) < 0.05, name
+
+def prueba_persistencia(db_path):
+    print("\n### Tablas 'procesos_nombres' y 'procesos_grupos'")
+    db = DBManager(db_path)
+    db.create_process_tables()
+    tracker, sampler = muestra(200, 25)
+    db.insert_process_names(tracker.names.take_new())
+    grupos = agrupar_procesos(sampler.columns, tracker.names.names)
+    db.insert_process_groups(1759300000000, grupos)
+
+    filas = db._cursor.execute('''
+        SELECT n.name, g.procesos, g.rss FROM procesos_grupos g
+        JOIN procesos_nombres n USING (name_id) ORDER BY g.rss DESC
+    ''').fetchall()
+    print(f"{len(filas)} grupos; mayor consumo: {filas[0][0]} usa {filas[0][2] / 1024 ** 3:.2f} GB en {filas[0][1]} procesos")
+    assert len(filas) == 25 and sum(f[1] for f in filas) == 200
+    assert filas[0][0] == grupos['name'][0]
+
+    # Reinicio: los name_id persistidos se reutilizan y solo se registran los nombres nuevos.
+    nombres = NameDictionary(db.load_process_names())
+    assert nombres.id('app3.exe') == tracker.names.id('app3.exe')
+    assert nombres.take_new() == []
+    assert nombres.id('nuevo.exe') == 25 and nombres.take_new() == [(25, 'nuevo.exe')]
+    db.close_connection()
+
+if __name__ == "__main__":
+    print("--- Pruebas de la agrupación de procesos por ejecutable ---")
+    benchmark_agrupacion()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_persistencia(os.path.join(tmp_dir, "grupos.db"))
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de la agrupación de procesos pasaron. ---")
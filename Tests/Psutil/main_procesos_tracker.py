@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from fake_procesos import FakePsutil, FakeSistema, contadores
+
+from libs.psutil.main_procesos import ProcessTracker, ProcessRateSampler
+from sqlite.main_sqlite import DBManager
+
+CICLOS = 20
+PROCESOS = 600
+ROTACION = 5    # Procesos que terminan e inician entre ciclos
+
+def lista_procesos_reescaneo(psutil_module):
+    """Versión anterior de obtener_lista_procesos (referencia): recorre y lee el nombre de todos los procesos."""
+    procesos = []
+    for proc in psutil_module.process_iter(['pid', 'name']):
+        procesos.append({'pid': proc.pid, 'name': proc.name()})
+    return procesos
+
+def medir(sistema, func):
+    contadores['llamadas'] = 0
+    inicio = time.perf_counter()
+    for _ in range(CICLOS):
+        sistema.rotar(ROTACION)
+        func()
+    ms = (time.perf_counter() - inicio) * 1000 / CICLOS
+    return ms, contadores['llamadas'] / CICLOS
+
+def benchmark_reescaneo_vs_incremental():
+    print(f"\n### Reescaneo completo vs seguimiento incremental ({PROCESOS} procesos, {CICLOS} ciclos)")
+    sistema = FakeSistema(PROCESOS)
+    fake = FakePsutil(sistema)
+    ms_anterior, llamadas_anterior = medir(sistema, lambda: lista_procesos_reescaneo(fake))
+
+    tracker = ProcessTracker(fake)
+    tracker.update()
+    ms_nuevo, llamadas_nuevo = medir(sistema, tracker.update)
+
+    print(f"{'Modo':<22} {'ms/ciclo':>10} {'llamadas/ciclo':>16}")
+    print(f"{'Reescaneo completo':<22} {ms_anterior:>10.2f} {llamadas_anterior:>16.0f}")
+    print(f"{'Incremental':<22} {ms_nuevo:>10.2f} {llamadas_nuevo:>16.0f}")
+    # pids() y Process() + oneshot() por cada proceso nuevo; nombre, ppid y usuario solo se leen una vez.
+    assert llamadas_nuevo == 1 + 2 * ROTACION
+    assert ms_nuevo < ms_anterior / 5
+    assert sorted(p['pid'] for p in tracker.snapshot()) == sorted(sistema.procesos)
+
+def prueba_diferencias():
+    print("\n### Diferencias de procesos iniciados y finalizados")
+    sistema = FakeSistema(10)
+    tracker = ProcessTracker(FakePsutil(sistema), wall_clock=lambda: 1759300000.0 + 5000)
+    primera = tracker.update()
+    assert primera['completo'] and len(primera['iniciados']) == 10 and primera['activos'] == 10
+
+    viejo = min(sistema.procesos)
+    sistema.terminar(viejo)
+    nuevo = sistema.iniciar(nombre='corto.exe')
+    cambios = tracker.update()
+    print(f"Iniciados: {[p['name'] for p in cambios['iniciados']]}, finalizados: {[p['pid'] for p in cambios['finalizados']]}")
+    assert not cambios['completo']
+    assert [p['pid'] for p in cambios['iniciados']] == [nuevo]
+    assert [p['pid'] for p in cambios['finalizados']] == [viejo]
+    assert cambios['finalizados'][0]['duracion_segundos'] == 5000 - viejo
+
+    # Un proceso que termina entre pids() y su lectura se ignora.
+    sistema.iniciar()
+    fake = tracker._psutil
+    pids_originales = fake.pids
+    fake.pids = lambda: pids_originales() + [99999]
+    cambios = tracker.update()
+    fake.pids = pids_originales
+    assert len(cambios['iniciados']) == 1 and cambios['activos'] == 11
+
+    # Un PID reutilizado por otro proceso no cambia la lista de PIDs: el muestreador ve
+    # retroceder sus contadores y verify() lo confirma como un fin más un inicio.
+    sampler = ProcessRateSampler(tracker, cpu_count=1, clock=lambda: 0.0)
+    sistema.avanzar(60)
+    sampler.sample()
+    reutilizado = min(sistema.procesos)
+    create_time_anterior = sistema.procesos[reutilizado]['create_time']
+    sistema.reutilizar(reutilizado, nombre='reutilizado.exe')
+    assert tracker.update()['iniciados'] == []
+    contadores['llamadas'] = 0
+    filas = sampler.sample()
+    # Solo el PID sospechoso se vuelve a leer: Process() + oneshot() además de las oneshot() de la muestra.
+    assert contadores['llamadas'] == 11 + 2
+    assert [f['name'] for f in filas if f['pid'] == reutilizado] == ['reutilizado.exe']
+    cambios = tracker.update()
+    print(f"PID reutilizado {reutilizado}: iniciados {[p['name'] for p in cambios['iniciados']]}")
+    assert [(p['pid'], p['create_time']) for p in cambios['finalizados']] == [(reutilizado, create_time_anterior)]
+    assert [(p['pid'], p['name']) for p in cambios['iniciados']] == [(reutilizado, 'reutilizado.exe')]
+    assert tracker.info((reutilizado, create_time_anterior)) is None
+    assert tracker.info((reutilizado, create_time_anterior + 1000))['name'] == 'reutilizado.exe'
+    assert cambios['activos'] == 11
+
+    # Sin acceso a create_time el proceso se identifica por PID y conserva sus demás atributos.
+    protegido = sistema.iniciar(nombre='lsass.exe')
+    sistema.procesos[protegido]['create_time'] = None
+    tracker.update()
+    info = tracker.info((protegido, 0.0))
+    assert info['name'] == 'lsass.exe' and info['username'] == 'EMPRESA\\usuario'
+
+def prueba_persistencia(db_path):
+    print("\n### Persistencia incremental en 'procesos_activos'")
+    sistema = FakeSistema(50)
+    tracker = ProcessTracker(FakePsutil(sistema))
+    db = DBManager(db_path)
+    db.create_process_tables()
+    # Filas de una ejecución anterior del servicio: se descartan con la primera diferencia completa.
+    db._cursor.execute("INSERT INTO procesos_activos (pid, create_time, name) VALUES (1, 1.0, 'viejo.exe')")
+
+    db.apply_process_changes(tracker.update())
+    for _ in range(5):
+        sistema.rotar(3)
+        db.apply_process_changes(tracker.update())
+
+    filas = db._cursor.execute("SELECT pid, create_time FROM procesos_activos").fetchall()
+    esperado = sorted((p['pid'], p['create_time']) for p in tracker.snapshot())
+    print(f"Filas persistidas: {len(filas)}")
+    assert sorted(filas) == esperado
+    db.close_connection()
+
+def prueba_psutil_real():
+    print("\n### Seguimiento con psutil real")
+    tracker = ProcessTracker()
+    primera = tracker.update()
+    assert primera['activos'] > 0
+    assert any(p['pid'] == os.getpid() for p in primera['iniciados'])
+    print(f"Procesos en el sistema: {primera['activos']}")
+
+if __name__ == "__main__":
+    print("--- Pruebas del seguimiento incremental de procesos ---")
+    benchmark_reescaneo_vs_incremental()
+    prueba_diferencias()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_persistencia(os.path.join(tmp_dir, "procesos.db"))
+    prueba_psutil_real()
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del seguimiento de procesos pasaron. ---")
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+from collections import namedtuple
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from libs.psutil.main_red import NetworkRateCollector, _delta_contador
+from sqlite.main_sqlite import DBManager, epoch_ms
+
+snetio = namedtuple('snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+                               'errin', 'errout', 'dropin', 'dropout'])
+
+ARRANQUE = 1759300000.0
+
+class FakePsutilRed:
+    """Contadores de red por interfaz y hora de arranque simulados."""
+
+    def __init__(self):
+        self.contadores = {
+            'Ethernet': snetio(1000, 2000, 10, 20, 0, 0, 0, 0),
+            'Wi-Fi': snetio(500, 500, 5, 5, 0, 0, 0, 0),
+        }
+        self.arranque = ARRANQUE
+
+    def net_io_counters(self, pernic=False):
+        return dict(self.contadores)
+
+    def boot_time(self):
+        return self.arranque
+
+    def avanzar(self, nic, enviados, recibidos, paquetes, errores=0, descartes=0):
+        c = self.contadores[nic]
+        self.contadores[nic] = c._replace(
+            bytes_sent=c.bytes_sent + enviados, bytes_recv=c.bytes_recv + recibidos,
+            packets_sent=c.packets_sent + paquetes, packets_recv=c.packets_recv + paquetes,
+            errin=c.errin + errores, dropin=c.dropin + descartes
+        )
+
+def _fila(datos, nic):
+    return next(f for f in datos['interfaces'] if f['interfaz'] == nic)
+
+def prueba_tasas_por_interfaz():
+    print("\n### Tasas por interfaz a partir de deltas")
+    fake = FakePsutilRed()
+    reloj = {'t': ARRANQUE + 1000}
+    colector = NetworkRateCollector(None, fake, wall_clock=lambda: reloj['t'])
+    primera = colector.collect()
+    assert primera['interfaces'] == [] and primera['red_bytes_enviados_seg'] is None
+
+    fake.avanzar('Ethernet', 60 * 1024, 120 * 1024, 600, errores=3, descartes=2)
+    reloj['t'] += 60
+    datos = colector.collect()
+    eth = _fila(datos, 'Ethernet')
+    print(f"Ethernet: {eth}")
+    assert eth['bytes_sent_seg'] == 1024 and eth['bytes_recv_seg'] == 2048
+    assert eth['packets_sent_seg'] == 10 and eth['errin'] == 3 and eth['dropin'] == 2
+    assert _fila(datos, 'Wi-Fi')['bytes_sent_seg'] == 0
+    assert datos['red_bytes_enviados_seg'] == 1024
+
+    # Una interfaz que aparece (o reaparece) con contadores acumulados no produce una tasa
+    # fantasma: su primera lectura es la referencia y la tasa llega en la siguiente.
+    fake.contadores['VPN'] = snetio(50_000_000, 80_000_000, 40_000, 60_000, 0, 0, 0, 0)
+    del fake.contadores['Wi-Fi']
+    reloj['t'] += 60
+    datos = colector.collect()
+    assert [f['interfaz'] for f in datos['interfaces']] == ['Ethernet']
+    fake.contadores['Wi-Fi'] = snetio(9_000_000, 9_000_000, 9_000, 9_000, 0, 0, 0, 0)
+    fake.avanzar('VPN', 6000, 0, 0)
+    reloj['t'] += 60
+    datos = colector.collect()
+    print(f"Interfaz nueva en su segunda lectura: {_fila(datos, 'VPN')['bytes_sent_seg']} B/s")
+    assert _fila(datos, 'VPN')['bytes_sent_seg'] == 100
+    assert 'Wi-Fi' not in [f['interfaz'] for f in datos['interfaces']]
+
+def prueba_desbordamiento_y_reinicio_de_contador():
+    print("\n### Desbordamiento de 32 bits y reinicio del contador")
+    fake = FakePsutilRed()
+    reloj = {'t': ARRANQUE + 1000}
+    colector = NetworkRateCollector(None, fake, wall_clock=lambda: reloj['t'])
+    fake.contadores['Ethernet'] = fake.contadores['Ethernet']._replace(bytes_recv=2 ** 32 - 600)
+    colector.collect()
+
+    # El contador de 32 bits da la vuelta: 600 bytes hasta el límite + 600 después.
+    fake.contadores['Ethernet'] = fake.contadores['Ethernet']._replace(bytes_recv=600)
+    reloj['t'] += 10
+    eth = _fila(colector.collect(), 'Ethernet')
+    print(f"Tras el desbordamiento: {eth['bytes_recv_seg']} B/s")
+    assert eth['bytes_recv_seg'] == 120
+
+    # Contador de 64 bits que retrocede: reinicio de la interfaz, el delta es la lectura actual.
+    fake.contadores['Ethernet'] = fake.contadores['Ethernet']._replace(bytes_sent=2 ** 40)
+    reloj['t'] += 10
+    colector.collect()
+    fake.contadores['Ethernet'] = fake.contadores['Ethernet']._replace(bytes_sent=5000)
+    reloj['t'] += 10
+    eth = _fila(colector.collect(), 'Ethernet')
+    print(f"Tras el reinicio de la interfaz: {eth['bytes_sent_seg']} B/s")
+    assert eth['bytes_sent_seg'] == 500
+
+    # Contador de 64 bits reiniciado lejos del límite de 32 bits (reconexión de una VPN):
+    # no es un desbordamiento, el delta es la lectura actual y no ~4 GB fantasma.
+    assert _delta_contador(1000, 50_000_000) == 1000
+    fake.contadores['Ethernet'] = fake.contadores['Ethernet']._replace(bytes_sent=50_000_000, packets_sent=2 ** 32 - 10)
+    reloj['t'] += 10
+    colector.collect()
+    fake.contadores['Ethernet'] = fake.contadores['Ethernet']._replace(bytes_sent=1000, packets_sent=2 ** 28)
+    reloj['t'] += 10
+    eth = _fila(colector.collect(), 'Ethernet')
+    print(f"Tras la reconexión de la interfaz: {eth['bytes_sent_seg']} B/s, {eth['packets_sent_seg']} paquetes/s")
+    assert eth['bytes_sent_seg'] == 100
+    # Un desbordamiento de 2**28 paquetes en 10 s supera la tasa de línea: también es un reinicio.
+    assert eth['packets_sent_seg'] == 2 ** 28 / 10
+
+def prueba_persistencia_entre_reinicios(tmp_dir):
+    print("\n### Primera muestra correcta tras reiniciar el servicio y el equipo")
+    ruta = os.path.join(tmp_dir, "red_contadores.json")
+    fake = FakePsutilRed()
+    reloj = {'t': ARRANQUE + 1000}
+    NetworkRateCollector(ruta, fake, wall_clock=lambda: reloj['t']).collect()
+
+    # Reinicio del servicio: el nuevo colector usa los contadores persistidos.
+    fake.avanzar('Ethernet', 6000, 0, 60)
+    reloj['t'] += 60
+    datos = NetworkRateCollector(ruta, fake, wall_clock=lambda: reloj['t']).collect()
+    print(f"Primera muestra tras reiniciar el servicio: {datos['red_bytes_enviados_seg']} B/s")
+    assert _fila(datos, 'Ethernet')['bytes_sent_seg'] == 100
+
+    # Reinicio del equipo: los contadores parten de cero en el nuevo arranque.
+    fake.arranque = reloj['t'] + 3600
+    reloj['t'] = fake.arranque + 100
+    fake.contadores = {'Ethernet': snetio(10000, 20000, 100, 200, 0, 0, 0, 0)}
+    datos = NetworkRateCollector(ruta, fake, wall_clock=lambda: reloj['t']).collect()
+    eth = _fila(datos, 'Ethernet')
+    print(f"Primera muestra tras reiniciar el equipo: {eth}")
+    assert eth['bytes_sent_seg'] == 100 and eth['bytes_recv_seg'] == 200
+    assert [f['interfaz'] for f in datos['interfaces']] == ['Ethernet']
+
+def prueba_interfaces_reales(db_path):
+    print("\n### Interfaces reales de este sistema")
+    colector = NetworkRateCollector()
+    colector.collect()
+    datos = colector.collect()
+    for f in datos['interfaces']:
+        print(f"{f['interfaz']:<20} tx {f['bytes_sent_seg']:>12.2f} B/s  rx {f['bytes_recv_seg']:>12.2f} B/s")
+    assert all(f['bytes_sent_seg'] >= 0 and f['bytes_recv_seg'] >= 0 for f in datos['interfaces'])
+
+    DBManager._instance = None
+    db = DBManager(db_path)
+    db.create_network_table()
+    db.insert_network_metrics(1759300000000, datos['interfaces'])
+    assert db._cursor.execute("SELECT COUNT(*) FROM red").fetchone()[0] == len(datos['interfaces'])
+    db.insert_metrics({'timestamp': '2025-10-01T00:00:00', 'red_bytes_enviados_seg': 1024.0,
+                       'red_bytes_recibidos_seg': 2048.0})
+    fila = db._cursor.execute(
+        "SELECT ts, red_bytes_enviados_seg, red_bytes_recibidos_seg FROM metricas_v2"
+    ).fetchone()
+    assert fila == (epoch_ms('2025-10-01T00:00:00'), 1024.0, 2048.0)
+    db.close_connection()
+
+if __name__ == "__main__":
+    print("--- Pruebas del colector de red por interfaz ---")
+    prueba_tasas_por_interfaz()
+    prueba_desbordamiento_y_reinicio_de_contador()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_persistencia_entre_reinicios(tmp_dir)
+        prueba_interfaces_reales(os.path.join(tmp_dir, "red.db"))
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del colector de red pasaron. ---")
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from fake_procesos import FakePsutil, FakeSistema
+
+from libs.psutil.main_procesos import (
+    ProcessTracker,
+    ProcessRateSampler,
+    filtrar_procesos_activos
+)
+from sqlite.main_sqlite import DBManager
+
+PROCESOS = 600
+CICLOS = 30
+INTERVALO = 60
+
+def simular_actividad(sistema, ciclo):
+    """Uno de cada diez procesos consume CPU y E/S; el resto está inactivo."""
+    for i, (pid, datos) in enumerate(sorted(sistema.procesos.items())):
+        if i % 10 == ciclo % 10:
+            datos['cpu_user'] += INTERVALO * 0.05
+            datos['read_bytes'] += INTERVALO * 200 * 1024
+            datos['write_bytes'] += INTERVALO * 50 * 1024
+        elif i % 50 == 0:
+            # Actividad residual por debajo del umbral.
+            datos['cpu_user'] += INTERVALO * 0.001
+
+def kb_por_ciclo(db_path, min_cpu, min_io):
+    # Se descarta la instancia Singleton anterior para abrir una base de datos nueva.
+    DBManager._instance = None
+    db = DBManager(db_path)
+    db.create_process_tables()
+    sistema = FakeSistema(PROCESOS)
+    reloj = {'t': 0.0}
+    tracker = ProcessTracker(FakePsutil(sistema))
+    sampler = ProcessRateSampler(tracker, cpu_count=8, clock=lambda: reloj['t'])
+    tracker.update()
+    sampler.sample()
+    db.insert_process_names(tracker.names.take_new())
+    db._connection.execute("VACUUM")
+    # Con journal WAL las páginas nuevas quedan en el -wal hasta el checkpoint.
+    db._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    tamano_inicial = os.path.getsize(db_path)
+
+    filas = 0
+    for ciclo in range(CICLOS):
+        simular_actividad(sistema, ciclo)
+        reloj['t'] += INTERVALO
+        sampler.sample()
+        activos = filtrar_procesos_activos(sampler.columns, min_cpu, min_io)
+        db.insert_process_samples((1759300000 + reloj['t']) * 1000, activos)
+        filas += len(activos['pid'])
+    db._connection.execute("VACUUM")
+    guardadas = db._connection.execute("SELECT COUNT(*) FROM procesos").fetchone()[0]
+    db.close_connection()
+    assert guardadas == filas
+    return (os.path.getsize(db_path) - tamano_inicial) / 1024 / CICLOS, filas / CICLOS
+
+def benchmark_tamano_por_ciclo(tmp_dir):
+    print(f"\n### Tabla 'procesos' ({PROCESOS} procesos, {CICLOS} ciclos)")
+    kb_todos, filas_todos = kb_por_ciclo(os.path.join(tmp_dir, "todos.db"), 0.0, 0.0)
+    kb_activos, filas_activos = kb_por_ciclo(os.path.join(tmp_dir, "activos.db"), 0.5, 1024)
+    print(f"{'Umbral':<30} {'filas/ciclo':>12} {'KB/ciclo':>10}")
+    print(f"{'Sin umbral (todos)':<30} {filas_todos:>12.0f} {kb_todos:>10.1f}")
+    print(f"{'CPU >= 0.5 % o E/S >= 1 KB/s':<30} {filas_activos:>12.0f} {kb_activos:>10.1f}")
+    assert filas_activos == PROCESOS / 10
+    assert kb_activos < 5
+    assert kb_activos < kb_todos / 5
+
+def prueba_filtro():
+    print("\n### Filtro de actividad mínima")
+    import numpy as np
+    columnas = {
+        'pid': np.array([1, 2, 3, 4], dtype=np.int64),
+        'name_id': np.array([0, 1, 1, 2], dtype=np.int32),
+        'cpu_percent': np.array([0.0, 0.7, 0.1, 0.0], dtype=np.float32),
+        'rss_bytes': np.array([10, 20, 30, 40], dtype=np.int64),
+        'io_read_bytes_seg': np.array([0.0, 0.0, 600.0, 100.0], dtype=np.float32),
+        'io_write_bytes_seg': np.array([0.0, 0.0, 600.0, 100.0], dtype=np.float32),
+    }
+    activos = filtrar_procesos_activos(columnas, 0.5, 1024)
+    assert activos['pid'].tolist() == [2, 3]
+    assert activos['rss_bytes'].tolist() == [20, 30]
+
+if __name__ == "__main__":
+    print("--- Pruebas de la serie temporal por proceso ---")
+    prueba_filtro()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        benchmark_tamano_por_ciclo(tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de la serie temporal por proceso pasaron. ---")
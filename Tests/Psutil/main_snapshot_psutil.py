@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from libs.psutil.main_psutil import PsutilSnapshot
+
+# Llamadas por ciclo que realizaba la versión anterior de obtener_metricas_psutil
+# (cpu_freq() hasta seis veces, cpu_times() tres veces, cpu_count() dos veces...).
+LLAMADAS_POR_CICLO_ANTERIOR = {
+    'cpu_percent': 1,
+    'cpu_count': 2,
+    'cpu_freq': 6,
+    'cpu_times': 3,
+    'virtual_memory': 1,
+    'swap_memory': 1,
+    'disk_usage': 1,
+    'net_io_counters': 1,
+    'users': 1,
+}
+
+CICLOS = 10
+
+def prueba_contadores_por_fuente():
+    print(f"\n### Contadores de llamadas tras {CICLOS} ciclos")
+    # Se usa la raíz del sistema para que la prueba funcione también fuera de Windows.
+    snapshot = PsutilSnapshot(disk_path=os.path.abspath(os.sep))
+    for _ in range(CICLOS):
+        metricas = snapshot.collect()
+
+    print(f"{'Fuente':<18} {'Antes':>8} {'Ahora':>8}")
+    total_antes = 0
+    for fuente, por_ciclo in LLAMADAS_POR_CICLO_ANTERIOR.items():
+        antes = por_ciclo * CICLOS
+        ahora = snapshot.call_counts.get(fuente, 0)
+        total_antes += antes
+        print(f"{fuente:<18} {antes:>8} {ahora:>8}")
+    total_ahora = sum(snapshot.call_counts.values())
+    print(f"{'TOTAL':<18} {total_antes:>8} {total_ahora:>8}")
+
+    # Cada fuente dinámica se lee exactamente una vez por ciclo.
+    for fuente in ('cpu_times', 'virtual_memory', 'swap_memory', 'disk_usage', 'net_io_counters', 'users'):
+        assert snapshot.call_counts[fuente] == CICLOS, fuente
+    # cpu_freq: una lectura por ciclo más la lectura estática inicial.
+    assert snapshot.call_counts['cpu_freq'] == CICLOS + 1
+    # cpu_count: solo la lectura estática (lógicos y físicos).
+    assert snapshot.call_counts['cpu_count'] == 2
+    assert 'cpu_percent' not in snapshot.call_counts
+    assert metricas['cpu_core_logical'] >= 1
+
+def prueba_refresco_explicito():
+    print("\n### Refresco explícito de datos estáticos")
+    snapshot = PsutilSnapshot(disk_path=os.path.abspath(os.sep))
+    snapshot.collect()
+    snapshot.collect()
+    assert snapshot.call_counts['cpu_count'] == 2
+    snapshot.refresh_static()
+    snapshot.collect()
+    print(f"Contadores: {snapshot.call_counts}")
+    assert snapshot.call_counts['cpu_count'] == 4
+
+if __name__ == "__main__":
+    print("--- Pruebas de la capa de instantánea de psutil ---")
+    prueba_contadores_por_fuente()
+    prueba_refresco_explicito()
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de la instantánea de psutil pasaron. ---")
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from fake_procesos import FakePsutil, FakeSistema, contadores
+
+from libs.psutil.main_procesos import (
+    ProcessTracker,
+    ProcessRateSampler,
+    obtener_estado_procesos
+)
+
+PROCESOS = 600
+MUESTRA_ANTERIOR = 10   # Procesos medidos con el método anterior (se extrapola a PROCESOS)
+INTERVALO_ANTERIOR = 0.1
+
+def ranking_anterior(psutil_module, limite):
+    """
+    Método anterior (referencia, de listar_procesos_agrupar): cpu_percent(interval=0.1)
+    bloqueante y dos llamadas a io_counters() por proceso, con ordenamiento completo.
+    """
+    datos = []
+    for i, proc in enumerate(psutil_module.process_iter()):
+        if i == limite:
+            break
+        datos.append({
+            'pid': proc.pid,
+            'cpu_percent': proc.cpu_percent(interval=INTERVALO_ANTERIOR),
+            'ram_bytes': proc.memory_info().rss,
+            'disk_read': proc.io_counters().read_bytes,
+            'disk_write': proc.io_counters().write_bytes,
+        })
+    return sorted(datos, key=lambda d: d['cpu_percent'], reverse=True)[:5]
+
+def benchmark_ranking():
+    print(f"\n### Ranking de procesos ({PROCESOS} procesos)")
+    sistema = FakeSistema(PROCESOS)
+    fake = FakePsutil(sistema)
+
+    inicio = time.perf_counter()
+    ranking_anterior(fake, MUESTRA_ANTERIOR)
+    s_anterior = (time.perf_counter() - inicio) / MUESTRA_ANTERIOR * PROCESOS
+
+    reloj = {'t': 0.0}
+    tracker = ProcessTracker(fake)
+    sampler = ProcessRateSampler(tracker, cpu_count=4, clock=lambda: reloj['t'])
+    tracker.update()
+    sampler.sample()
+    sistema.avanzar(60)
+    reloj['t'] += 60
+    contadores['llamadas'] = 0
+    inicio = time.perf_counter()
+    tracker.update()
+    filas = sampler.sample()
+    top = {criterio: sampler.top(5, criterio) for criterio in ('cpu', 'ram', 'disco')}
+    ms_nuevo = (time.perf_counter() - inicio) * 1000
+    llamadas = contadores['llamadas']
+
+    print(f"{'Modo':<30} {'ms/ciclo':>12}")
+    print(f"{'cpu_percent(interval=0.1)':<30} {s_anterior * 1000:>12.0f}  (extrapolado de {MUESTRA_ANTERIOR} procesos)")
+    print(f"{'Deltas + heap acotado':<30} {ms_nuevo:>12.2f}  ({llamadas} llamadas, una oneshot() por proceso)")
+    assert llamadas == 1 + PROCESOS
+    assert ms_nuevo < 1000
+    assert ms_nuevo / 1000 < s_anterior / 50
+
+    # El heap acotado devuelve lo mismo que ordenar todo.
+    for criterio, campo in (('cpu', 'cpu_percent'), ('ram', 'rss_bytes'), ('disco', 'io_bytes_seg')):
+        esperado = sorted(filas, key=lambda f: f[campo], reverse=True)[:5]
+        assert [f[campo] for f in top[criterio]] == [f[campo] for f in esperado], criterio
+    print(f"Top CPU: {[(p['name'], p['cpu_percent']) for p in top['cpu']]}")
+
+def prueba_tasas():
+    print("\n### Tasas por proceso a partir de deltas")
+    sistema = FakeSistema(3)
+    reloj = {'t': 100.0}
+    tracker = ProcessTracker(FakePsutil(sistema))
+    sampler = ProcessRateSampler(tracker, cpu_count=2, clock=lambda: reloj['t'])
+    tracker.update()
+    primera = sampler.sample()
+    assert all(f['cpu_percent'] == 0.0 and f['io_bytes_seg'] == 0.0 for f in primera)
+
+    pid = min(sistema.procesos)
+    datos = sistema.procesos[pid]
+    datos['cpu_user'] += 3.0
+    datos['cpu_system'] += 1.0
+    datos['read_bytes'] += 10 * 1024
+    datos['write_bytes'] += 5 * 1024
+    reloj['t'] += 10
+    fila = next(f for f in sampler.sample() if f['pid'] == pid)
+    print(f"Proceso {pid}: {fila}")
+    # 4 s de CPU en 10 s sobre 2 núcleos = 20 %.
+    assert fila['cpu_percent'] == 20.0
+    assert fila['io_read_bytes_seg'] == 1024.0 and fila['io_write_bytes_seg'] == 512.0
+
+    # PID reutilizado: los contadores retroceden y no se producen tasas negativas.
+    sistema.reutilizar(pid, nombre='nuevo.exe')
+    reloj['t'] += 10
+    fila = next(f for f in sampler.sample() if f['pid'] == pid)
+    assert fila['name'] == 'nuevo.exe'
+    assert fila['cpu_percent'] == 0.0 and fila['io_read_bytes_seg'] == 0.0
+
+def prueba_psutil_real():
+    print("\n### Estado de procesos con psutil real")
+    obtener_estado_procesos()
+    inicio = time.perf_counter()
+    estado = obtener_estado_procesos(top_n=3)
+    ms = (time.perf_counter() - inicio) * 1000
+    print(f"{len(estado['muestra'])} procesos en {ms:.2f} ms; top RAM: {[p['name'] for p in estado['top']['ram']]}")
+    assert len(estado['top']['ram']) == 3
+    assert estado['top']['ram'][0]['rss_bytes'] >= estado['top']['ram'][-1]['rss_bytes']
+
+if __name__ == "__main__":
+    print("--- Pruebas del ranking de procesos ---")
+    benchmark_ranking()
+    prueba_tasas()
+    prueba_psutil_real()
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del ranking de procesos pasaron. ---")
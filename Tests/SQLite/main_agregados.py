@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from libs.muestra.main_muestra import MetricSample
+from sqlite.main_sqlite import DBManager
+
+INICIO_MS = 1759276800000       # Múltiplo exacto de una hora
+DIAS = 7
+INTERVALO = 10                  # Segundos entre muestras
+FILAS = DIAS * 86400 // INTERVALO
+
+def _muestra(i, hostname='PC-01', **extra):
+    metricas = {
+        'ts': INICIO_MS + i * INTERVALO * 1000, 'hostname': hostname, 'username': 'usuario',
+        'cpu_percent': float(i % 100), 'memoria_percent': 50.0 + i % 10,
+        'cpu_temperatura_celsius': None if i % 2 else 40.0 + i % 7,
+    }
+    metricas.update(extra)
+    return MetricSample.from_metrics(metricas)
+
+def _abrir(db_path, intervalo=INTERVALO, lote=60):
+    # Se descarta la instancia Singleton anterior para abrir una base de datos nueva.
+    DBManager._instance = None
+    db = DBManager(db_path)
+    db.configure_batching(lote, 3600)
+    db.configure_rollups(intervalo)
+    return db
+
+def prueba_agregados_incrementales(tmp_dir):
+    print("\n### Los agregados coinciden con las filas crudas")
+    db = _abrir(os.path.join(tmp_dir, "incremental.db"), lote=7)
+    for i in range(500):
+        db.insert_metrics(_muestra(i))
+    # Una fila repetida falla en la escritura fila a fila y no se suma a los agregados.
+    db.insert_metrics(_muestra(3))
+    db.flush()
+
+    for tabla, segundos in (('metricas_1m', 60), ('metricas_1h', 3600)):
+        crudo = db._connection.execute(f'''
+            SELECT ts - ts % {segundos * 1000} AS t, COUNT(*), MIN(cpu_percent), MAX(cpu_percent), SUM(cpu_percent),
+                   COUNT(cpu_temp_celsius), MAX(cpu_temp_celsius)
+            FROM metricas_v2 GROUP BY t ORDER BY t
+        ''').fetchall()
+        agregado = db._connection.execute(f'''
+            SELECT ts, muestras, cpu_percent_min, cpu_percent_max, cpu_percent_suma,
+                   cpu_temp_celsius_n, cpu_temp_celsius_max
+            FROM {tabla} ORDER BY ts
+        ''').fetchall()
+        print(f"{tabla}: {len(agregado)} filas para {crudo and sum(f[1] for f in crudo)} muestras")
+        assert agregado == crudo
+
+    # El último valor es el de la muestra más reciente; los nulos no lo reemplazan.
+    ultimo = db._connection.execute(
+        "SELECT cpu_percent_ultimo, cpu_temp_celsius_ultimo FROM metricas_1h ORDER BY ts DESC LIMIT 1"
+    ).fetchone()
+    assert ultimo == (99.0, 40.0 + 498 % 7)
+    # Una fila fuera de orden se suma pero no cambia el último valor.
+    db.insert_metrics(_muestra(0, ts=INICIO_MS + 5000, cpu_percent=77.0))
+    db.flush()
+    assert db._connection.execute(
+        f"SELECT muestras, cpu_percent_max, cpu_percent_ultimo FROM metricas_1m WHERE ts = {INICIO_MS}"
+    ).fetchone() == (7, 77.0, 5.0)
+    db.close_connection()
+
+def prueba_eleccion_de_nivel(tmp_dir):
+    print("\n### query_metrics elige el nivel más grueso que cumple la resolución")
+    db = _abrir(os.path.join(tmp_dir, "niveles.db"))
+    for i in range(720):
+        db.insert_metrics(_muestra(i))
+        db.insert_metrics(_muestra(i, hostname='PC-02'))
+    casos = ((10, 'metricas_v2'), (60, 'metricas_1m'), (90, 'metricas_v2'), (300, 'metricas_1m'),
+             (3600, 'metricas_1h'), (86400, 'metricas_1h'))
+    for resolucion, nivel in casos:
+        resultado = db.query_metrics(INICIO_MS, INICIO_MS + 7200000, resolucion, ('cpu_percent', 'ram_percent'))
+        print(f"Resolución {resolucion:>6} s -> {resultado['nivel']:<12} ({len(resultado['filas'])} filas)")
+        assert resultado['nivel'] == nivel
+
+    # Cualquier nivel da el mismo promedio, mínimo y máximo.
+    por_hora = db.query_metrics(INICIO_MS, INICIO_MS + 7200000, 3600, hostname='PC-02')
+    crudo = db._connection.execute(f'''
+        SELECT {INICIO_MS}, 'PC-02', AVG(cpu_percent), MIN(cpu_percent), MAX(cpu_percent)
+        FROM metricas_v2 WHERE host_id = (SELECT host_id FROM hosts WHERE hostname = 'PC-02') AND ts < {INICIO_MS + 3600000}
+    ''').fetchone()
+    assert por_hora['columnas'] == ['ts', 'hostname', 'cpu_percent_avg', 'cpu_percent_min', 'cpu_percent_max']
+    assert por_hora['filas'][0] == crudo and len(por_hora['filas']) == 2
+
+    # Con una muestra por minuto no se mantiene 'metricas_1m' (repetiría las filas crudas).
+    db.configure_rollups(60)
+    assert db.query_metrics(INICIO_MS, INICIO_MS + 7200000, 300)['nivel'] == 'metricas_v2'
+    assert db.query_metrics(INICIO_MS, INICIO_MS + 7200000, 3600, ('no_existe',)) == {}
+    db.close_connection()
+
+def benchmark_grafico_semanal(tmp_dir):
+    print(f"\n### Gráfico semanal sobre {FILAS} muestras ({DIAS} días cada {INTERVALO} s)")
+    db = _abrir(os.path.join(tmp_dir, "semana.db"))
+    muestras = [_muestra(i) for i in range(FILAS)]
+    db.configure_rollups(86400)     # Sin agregados: escritura de referencia
+    inicio = time.perf_counter()
+    for muestra in muestras[:FILAS // 2]:
+        db.insert_metrics(muestra)
+    db.flush()
+    sin_agregados = (time.perf_counter() - inicio) / (FILAS // 2) * 1e6
+    db.configure_rollups(INTERVALO)
+    inicio = time.perf_counter()
+    for muestra in muestras[FILAS // 2:]:
+        db.insert_metrics(muestra)
+    db.flush()
+    con_agregados = (time.perf_counter() - inicio) / (FILAS - FILAS // 2) * 1e6
+    print(f"Escritura por muestra: {sin_agregados:.1f} µs sin agregados, {con_agregados:.1f} µs con 1m + 1h")
+
+    fin_ms = INICIO_MS + DIAS * 86400000
+    desde_ms = INICIO_MS + DIAS // 2 * 86400000     # Solo la mitad con agregados
+    print(f"{'Nivel':<12} {'filas leídas':>12} {'consulta ms':>11}")
+    for nivel, intervalo in (('metricas_v2', 86400), ('metricas_1h', INTERVALO)):
+        # Sin agregados mantenidos la consulta recorre las filas crudas.
+        db.configure_rollups(intervalo)
+        filas_leidas = db._connection.execute(
+            f"SELECT COUNT(*) FROM {nivel} WHERE ts >= ? AND ts < ?", (desde_ms, fin_ms)
+        ).fetchone()[0]
+        inicio = time.perf_counter()
+        for _ in range(10):
+            resultado = db.query_metrics(desde_ms, fin_ms, 3600, ('cpu_percent', 'ram_percent'))
+        ms = (time.perf_counter() - inicio) / 10 * 1000
+        assert resultado['nivel'] == nivel
+        print(f"{nivel:<12} {filas_leidas:>12} {ms:>11.2f}")
+    db.close_connection()
+
+if __name__ == "__main__":
+    print("--- Pruebas de los agregados de 1 minuto y 1 hora ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_agregados_incrementales(tmp_dir)
+        prueba_eleccion_de_nivel(tmp_dir)
+        benchmark_grafico_semanal(tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de los agregados pasaron. ---")
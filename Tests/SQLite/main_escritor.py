@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from datetime import datetime
+
+from libs.muestra.main_muestra import MetricSample
+from sqlite.main_sqlite import DBManager
+from sqlite.main_escritor import (
+    SQLiteWriter, POLITICA_DESCARTAR_NUEVO, POLITICA_DESCARTAR_ANTIGUO, POLITICA_VOLCAR
+)
+
+PRODUCTORES = 4
+MUESTRAS_POR_PRODUCTOR = 250
+
+def _muestra(i):
+    return MetricSample.from_metrics({
+        'timestamp': datetime.fromtimestamp(1759300000 + i).isoformat(),
+        'hostname': 'PC-01', 'username': 'usuario', 'cpu_percent': float(i % 100),
+    })
+
+def _abrir(db_path, lote=1):
+    # Se descarta la instancia Singleton anterior para abrir una base de datos nueva.
+    DBManager._instance = None
+    db = DBManager(db_path)
+    db.create_machine_info_table()
+    db.create_disk_tables()
+    db.configure_batching(lote, 3600)
+    return db
+
+def _contar(db_path, tabla):
+    DBManager._instance = None
+    db = DBManager(db_path)
+    filas = db._connection.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+    db.close_connection()
+    return filas
+
+class DBManagerLento:
+    """Envuelve el DBManager con una escritura lenta para saturar la cola."""
+
+    def __init__(self, db, retardo):
+        self._db = db
+        self._retardo = retardo
+        self.hilos = set()
+
+    def __getattr__(self, nombre):
+        metodo = getattr(self._db, nombre)
+        if not nombre.startswith('insert'):
+            return metodo
+
+        def lento(*args):
+            self.hilos.add(threading.current_thread().name)
+            time.sleep(self._retardo)
+            return metodo(*args)
+        return lento
+
+def prueba_productores_concurrentes(tmp_dir):
+    print(f"\n### {PRODUCTORES} productores encolando desde sus propios hilos")
+    db_path = os.path.join(tmp_dir, "concurrente.db")
+    db = DBManagerLento(_abrir(db_path, lote=50), 0.0)
+    escritor = SQLiteWriter(db, max_queue=10000)
+    escritor.start()
+
+    def productor(n):
+        for i in range(MUESTRAS_POR_PRODUCTOR):
+            escritor.submit('insert_metrics', _muestra(n * MUESTRAS_POR_PRODUCTOR + i))
+
+    hilos = [threading.Thread(target=productor, args=(n,)) for n in range(PRODUCTORES)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    escritor.stop()
+    estadisticas = escritor.stats()
+    print(f"Estadísticas: {estadisticas}")
+    print(f"Hilos que escribieron en la base: {db.hilos}")
+    # Todas las escrituras las hizo el hilo escritor; el lote pendiente se escribió al detenerlo.
+    assert db.hilos == {'sqlite-writer'}
+    assert estadisticas['procesadas'] == PRODUCTORES * MUESTRAS_POR_PRODUCTOR
+    assert _contar(db_path, 'metricas_v2') == PRODUCTORES * MUESTRAS_POR_PRODUCTOR
+
+def _saturar(tmp_dir, politica):
+    db_path = os.path.join(tmp_dir, f"{politica}.db")
+    spill_path = os.path.join(tmp_dir, f"{politica}.pkl")
+    db = DBManagerLento(_abrir(db_path), 0.01)
+    db.create_process_tables()
+    escritor = SQLiteWriter(db, max_queue=10, policy=politica, spill_path=spill_path)
+    escritor.start()
+    inicio = time.perf_counter()
+    aceptadas = sum(escritor.submit('insert_metrics', _muestra(i)) for i in range(100))
+    # Las operaciones críticas se encolan aunque la cola esté llena.
+    escritor.submit('upsert_machine_info', _muestra(0))
+    escritor.submit('insert_process_events', [{'ts': 1759300000000, 'evento': 'inicio', 'pid': 4242}])
+    espera_ms = (time.perf_counter() - inicio) * 1000
+    assert escritor.wait_idle(timeout=30)
+    escritor.stop()
+    return escritor.stats(), aceptadas, espera_ms, db_path
+
+def prueba_politicas_de_cola_llena(tmp_dir):
+    print("\n### Cola de 10 operaciones con 100 muestras y escritura lenta (10 ms)")
+    print(f"{'Política':<20} {'aceptadas':>9} {'guardadas':>9} {'descartadas':>11} {'volcadas':>8} {'prof. máx':>9} {'espera ms':>9}")
+    for politica in (POLITICA_DESCARTAR_NUEVO, POLITICA_DESCARTAR_ANTIGUO, POLITICA_VOLCAR):
+        estadisticas, aceptadas, espera_ms, db_path = _saturar(tmp_dir, politica)
+        guardadas = _contar(db_path, 'metricas_v2')
+        print(f"{politica:<20} {aceptadas:>9} {guardadas:>9} {estadisticas['descartadas']:>11} "
+              f"{estadisticas['volcadas']:>8} {estadisticas['profundidad_max']:>9} {espera_ms:>9.1f}")
+        # Los productores no esperan a la base de datos.
+        assert espera_ms < 500
+        assert _contar(db_path, 'info_maquina') == 1
+        assert _contar(db_path, 'procesos_eventos') == 1
+        if politica == POLITICA_VOLCAR:
+            assert guardadas == 100 and estadisticas['recuperadas'] == estadisticas['volcadas'] > 0
+        else:
+            assert estadisticas['descartadas'] > 0 and guardadas == 100 - estadisticas['descartadas']
+
+def prueba_volcado_entre_reinicios(tmp_dir):
+    print("\n### Las operaciones volcadas se reaplican al reiniciar el escritor")
+    db_path = os.path.join(tmp_dir, "reinicio.db")
+    spill_path = os.path.join(tmp_dir, "reinicio.pkl")
+    db = _abrir(db_path)
+    # Escritor sin iniciar: la cola se llena y el resto se vuelca a disco.
+    escritor = SQLiteWriter(db, max_queue=5, spill_path=spill_path)
+    for i in range(20):
+        escritor.submit('insert_metrics', _muestra(i))
+    assert escritor.stats()['volcadas'] == 15 and os.path.exists(spill_path)
+    db.close_connection()
+
+    escritor = SQLiteWriter(_abrir(db_path), spill_path=spill_path)
+    escritor.start()
+    assert escritor.wait_idle(timeout=10)
+    escritor.stop()
+    print(f"Recuperadas tras el reinicio: {escritor.stats()['recuperadas']}")
+    assert escritor.stats()['recuperadas'] == 15 and not os.path.exists(spill_path)
+    assert _contar(db_path, 'metricas_v2') == 15
+
+    # Tras stop() el escritor rechaza las operaciones en lugar de dejarlas en una cola sin hilo.
+    assert not escritor.submit('insert_metrics', _muestra(99))
+    assert not escritor.submit('insert_process_events', [{'ts': 1759300000000, 'evento': 'fin', 'pid': 4242}])
+    assert escritor.stats()['encoladas'] == 0 and not escritor._queue
+
+if __name__ == "__main__":
+    print("--- Pruebas del escritor único de SQLite ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_productores_concurrentes(tmp_dir)
+        prueba_politicas_de_cola_llena(tmp_dir)
+        prueba_volcado_entre_reinicios(tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del escritor de SQLite pasaron. ---")
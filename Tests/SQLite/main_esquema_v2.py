@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from datetime import datetime
+
+from sqlite.main_sqlite import DBManager, epoch_ms
+
+DIAS = 30
+FILAS = DIAS * 24 * 60          # Una muestra por minuto
+INICIO = 1759300000
+CONSULTAS = 20
+
+# Esquema anterior de 'metricas': clave TEXT ISO 8601 en una tabla con rowid y tamaños en GB.
+ESQUEMA_V1 = '''
+    CREATE TABLE metricas (
+        timestamp TEXT PRIMARY KEY, hostname TEXT, username TEXT, cpu_percent REAL, cpu_freq REAL,
+        ram_percent REAL, ram_used REAL, ram_total REAL, ram_free REAL, disk_percent REAL,
+        disk_used REAL, disk_total REAL, disk_free REAL, swap_percent REAL, swap_usado REAL,
+        swap_total REAL, red_bytes_sent INTEGER, red_bytes_recv INTEGER, cpu_temp_celsius REAL,
+        battery_percent REAL, cpu_power_package REAL, cpu_power_cores REAL, cpu_clocks REAL,
+        red_bytes_enviados_seg REAL, red_bytes_recibidos_seg REAL
+    )
+'''
+
+def _fila_v1(i):
+    return (
+        datetime.fromtimestamp(INICIO + i * 60).isoformat(), 'PC-CONTABILIDAD-01', 'DOMINIO\\usuario',
+        round(10.0 + i % 70 * 0.5, 2), 2400.0, 61.2, 9.78, 15.86, 6.08, 40.0, 200.55, 476.34, 275.79,
+        5.0, 0.4, 8.0, None, None, 55.0, None, 12.5, 8.1, 100.0, float(i % 5000), float(i % 9000),
+    )
+
+def _crear_v1(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute(ESQUEMA_V1)
+    con.executemany(f"INSERT INTO metricas VALUES ({', '.join('?' * 25)})", (_fila_v1(i) for i in range(FILAS)))
+    con.commit()
+    con.close()
+
+def _abrir(db_path):
+    # Se descarta la instancia Singleton anterior para abrir otra base de datos.
+    DBManager._instance = None
+    return DBManager(db_path)
+
+def _migrar(db_path, tramo=5000):
+    db = _abrir(db_path)
+    # Con una muestra por minuto (intervalo por defecto) solo se mantiene el agregado horario.
+    db.configure_rollups(60)
+    assert db.legacy_pending
+    tramos = 0
+    while db.legacy_pending:
+        db.migrate_legacy_metrics(tramo)
+        tramos += 1
+    db.close_connection()
+    return tramos
+
+def prueba_migracion(tmp_dir):
+    print("\n### Migración por tramos de 'metricas' a 'metricas_v2'")
+    db_path = os.path.join(tmp_dir, "migracion.db")
+    con = sqlite3.connect(db_path)
+    # Base anterior a las tasas de red (sin esas columnas) con una fila de marca de tiempo inválida.
+    con.execute(ESQUEMA_V1.replace(",\n        red_bytes_enviados_seg REAL, red_bytes_recibidos_seg REAL", ""))
+    con.executemany(f"INSERT INTO metricas VALUES ({', '.join('?' * 23)})", [_fila_v1(i)[:23] for i in range(10)])
+    con.execute("INSERT INTO metricas (timestamp, hostname) VALUES ('sin fecha', 'PC-CONTABILIDAD-01')")
+    con.commit()
+    con.close()
+
+    db = _abrir(db_path)
+    # El agente sigue escribiendo durante la migración.
+    db.insert_metrics({'ts': (INICIO + 3600) * 1000, 'hostname': 'PC-CONTABILIDAD-01', 'cpu_percent': 1.0,
+                       'memoria_usada_bytes': 10 * 1024 ** 3})
+    # Fila ya escrita con el esquema nuevo para el mismo (ts, host) que una de 'metricas': se conserva.
+    db.insert_metrics({'ts': (INICIO + 60) * 1000, 'hostname': 'PC-CONTABILIDAD-01', 'cpu_percent': 2.0})
+    assert db.migrate_legacy_metrics(4) == 4
+    assert db._connection.execute("SELECT COUNT(*) FROM metricas").fetchone()[0] == 7
+    while db.legacy_pending:
+        db.migrate_legacy_metrics(4)
+    tablas = {fila[0] for fila in db._connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'metricas' not in tablas
+    assert db._connection.execute("PRAGMA user_version").fetchone()[0] == 2
+
+    filas = db._connection.execute('''
+        SELECT m.ts, h.hostname, u.username, m.cpu_percent, m.ram_used_bytes, m.red_bytes_enviados_seg
+        FROM metricas_v2 m JOIN hosts h USING (host_id) LEFT JOIN usuarios u USING (user_id)
+        ORDER BY m.ts
+    ''').fetchall()
+    print(f"Primera fila migrada: {filas[0]}")
+    assert len(filas) == 11
+    assert filas[0] == (INICIO * 1000, 'PC-CONTABILIDAD-01', 'DOMINIO\\usuario', 10.0, round(9.78 * 1024 ** 3), None)
+    assert filas[-1][4] == 10 * 1024 ** 3
+    assert db._connection.execute("SELECT COUNT(*) FROM hosts").fetchone()[0] == 1
+    # Las filas de 'metricas' ignoradas por existir ya en 'metricas_v2' no se suman a los agregados.
+    assert filas[1][3] == 2.0
+    for tabla in ('metricas_1m', 'metricas_1h'):
+        assert db._connection.execute(
+            f"SELECT SUM(muestras), SUM(cpu_percent_n) FROM {tabla}"
+        ).fetchone() == (len(filas), len(filas))
+    db.close_connection()
+
+    # Al reabrir la base ya migrada no queda trabajo pendiente.
+    db = _abrir(db_path)
+    assert not db.legacy_pending and db.migrate_legacy_metrics() == 0
+    db.close_connection()
+
+def _consulta_rango(db_path, sql, limites):
+    con = sqlite3.connect(db_path)
+    inicio = time.perf_counter()
+    for desde, hasta in limites:
+        resultado = con.execute(sql, (desde, hasta)).fetchone()
+    duracion = (time.perf_counter() - inicio) / len(limites) * 1000
+    con.close()
+    return duracion, resultado
+
+def benchmark_tamano_y_consultas(tmp_dir):
+    print(f"\n### {FILAS} filas ({DIAS} días, una por minuto): tamaño del archivo y consulta de un día")
+    ruta_v1 = os.path.join(tmp_dir, "v1.db")
+    ruta_v2 = os.path.join(tmp_dir, "v2.db")
+    _crear_v1(ruta_v1)
+    shutil.copy(ruta_v1, ruta_v2)
+
+    inicio = time.perf_counter()
+    tramos = _migrar(ruta_v2)
+    print(f"Migración: {tramos} tramos en {time.perf_counter() - inicio:.2f} s")
+    # El espacio de la tabla anterior queda libre en el archivo; VACUUM lo devuelve para comparar tamaños.
+    for ruta in (ruta_v1, ruta_v2):
+        con = sqlite3.connect(ruta)
+        con.execute("VACUUM")
+        con.close()
+
+    dias = [(INICIO + d * 86400, INICIO + (d + 1) * 86400) for d in range(CONSULTAS)]
+    ms_v1, res_v1 = _consulta_rango(
+        ruta_v1, "SELECT COUNT(*), AVG(cpu_percent) FROM metricas WHERE timestamp >= ? AND timestamp < ?",
+        [(datetime.fromtimestamp(a).isoformat(), datetime.fromtimestamp(b).isoformat()) for a, b in dias]
+    )
+    ms_v2, res_v2 = _consulta_rango(
+        ruta_v2, "SELECT COUNT(*), AVG(cpu_percent) FROM metricas_v2 WHERE ts >= ? AND ts < ?",
+        [(a * 1000, b * 1000) for a, b in dias]
+    )
+    assert res_v1 == res_v2 and res_v1[0] == 24 * 60
+
+    tamano_v1 = os.path.getsize(ruta_v1)
+    tamano_v2 = os.path.getsize(ruta_v2)
+    print(f"{'Esquema':<45} {'archivo KB':>10} {'bytes/fila':>10} {'consulta ms':>11}")
+    print(f"{'v1 (TEXT ISO 8601, rowid, GB, texto por fila)':<45} {tamano_v1 / 1024:>10.0f} {tamano_v1 / FILAS:>10.1f} {ms_v1:>11.2f}")
+    print(f"{'v2 (epoch ms, WITHOUT ROWID, ids, bytes)':<45} {tamano_v2 / 1024:>10.0f} {tamano_v2 / FILAS:>10.1f} {ms_v2:>11.2f}")
+    assert tamano_v2 < tamano_v1
+
+if __name__ == "__main__":
+    print("--- Pruebas del esquema compacto de métricas (v2) ---")
+    assert epoch_ms(datetime.fromtimestamp(INICIO).isoformat()) == INICIO * 1000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_migracion(tmp_dir)
+        benchmark_tamano_y_consultas(tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del esquema compacto pasaron. ---")
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from datetime import datetime
+
+from libs.muestra.main_muestra import MetricSample
+from sqlite.main_sqlite import DBManager
+
+FILAS_BENCHMARK = 600
+
+def _muestra(i, hostname='PC-01'):
+    return MetricSample.from_metrics({
+        'timestamp': datetime.fromtimestamp(1759300000 + i * 60).isoformat(),
+        'hostname': hostname, 'username': 'usuario',
+        'cpu_percent': 10.0 + i % 50, 'memoria_percent': 60.0, 'disco_percent': 40.0,
+        'os_name': 'Microsoft Windows 11 Pro', 'procesador_nombre': 'Intel Core i7',
+    })
+
+def _abrir(db_path):
+    # Se descarta la instancia Singleton anterior para abrir una base de datos nueva.
+    DBManager._instance = None
+    db = DBManager(db_path)
+    db.create_machine_info_table()
+    return db
+
+def _contar(db, tabla):
+    return db._connection.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+def prueba_umbrales(tmp_dir):
+    print("\n### Escritura del lote por número de filas y por antigüedad")
+    db = _abrir(os.path.join(tmp_dir, "umbrales.db"))
+    assert db._connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert db._connection.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    db.configure_batching(5, 300)
+
+    for i in range(4):
+        db.insert_metrics(_muestra(i))
+        db.upsert_machine_info(_muestra(i))
+    assert _contar(db, 'metricas_v2') == 0 and db.pending_rows() == 4
+    db.insert_metrics(_muestra(4))
+    assert _contar(db, 'metricas_v2') == 5 and db.pending_rows() == 0
+    # Solo se conserva la última fila de info_maquina por (hostname, username).
+    assert _contar(db, 'info_maquina') == 1
+
+    # Antigüedad: el lote se escribe en la siguiente inserción tras superar el plazo.
+    db.insert_metrics(_muestra(5))
+    db._pending_since -= 301
+    db.insert_metrics(_muestra(6))
+    assert _contar(db, 'metricas_v2') == 7
+    print(f"Filas tras 7 inserciones con lote de 5 filas / 300 s: {_contar(db, 'metricas_v2')}")
+    db.close_connection()
+
+def prueba_vaciado_al_cerrar(tmp_dir):
+    print("\n### El lote pendiente se escribe al cerrar (SvcStop)")
+    db_path = os.path.join(tmp_dir, "cierre.db")
+    db = _abrir(db_path)
+    db.configure_batching(100, 3600)
+    for i in range(3):
+        db.insert_metrics(_muestra(i))
+    db.close_connection()
+
+    db = _abrir(db_path)
+    assert _contar(db, 'metricas_v2') == 3
+    db.close_connection()
+
+def prueba_fila_invalida(tmp_dir):
+    print("\n### Una fila inválida no descarta el resto del lote")
+    db = _abrir(os.path.join(tmp_dir, "invalida.db"))
+    db.configure_batching(4, 3600)
+    db.insert_metrics(_muestra(0))
+    db.flush()
+    # La marca de tiempo repetida viola la clave primaria; las otras tres filas se conservan.
+    for i in (1, 0, 2, 3):
+        db.insert_metrics(_muestra(i))
+    assert _contar(db, 'metricas_v2') == 4
+    db.close_connection()
+
+def _filas_por_segundo(db_path, lote, journal_anterior):
+    db = _abrir(db_path)
+    if journal_anterior:
+        # Configuración anterior: journal en modo DELETE y synchronous=FULL (fsync en cada commit).
+        db._connection.execute("PRAGMA journal_mode=DELETE").fetchone()
+        db._connection.execute("PRAGMA synchronous=FULL")
+    db.configure_batching(lote, 3600)
+    muestras = [_muestra(i) for i in range(FILAS_BENCHMARK)]
+    inicio = time.perf_counter()
+    for muestra in muestras:
+        db.insert_metrics(muestra)
+        db.upsert_machine_info(muestra)
+    db.flush()
+    duracion = time.perf_counter() - inicio
+    assert _contar(db, 'metricas_v2') == FILAS_BENCHMARK
+    db.close_connection()
+    return FILAS_BENCHMARK / duracion
+
+def benchmark_filas_por_segundo(tmp_dir):
+    print(f"\n### Escritura de {FILAS_BENCHMARK} ciclos (metricas + info_maquina)")
+    casos = (
+        ('Fila a fila, DELETE + FULL', 1, True),
+        ('Fila a fila, WAL + NORMAL', 1, False),
+        ('Lotes de 60, WAL + NORMAL', 60, False),
+    )
+    resultados = {}
+    for i, (nombre, lote, anterior) in enumerate(casos):
+        resultados[nombre] = _filas_por_segundo(os.path.join(tmp_dir, f"bench_{i}.db"), lote, anterior)
+        print(f"{nombre:<30} {resultados[nombre]:>10.0f} filas/s")
+    assert resultados['Lotes de 60, WAL + NORMAL'] > resultados['Fila a fila, DELETE + FULL']
+
+if __name__ == "__main__":
+    print("--- Pruebas de la escritura por lotes en SQLite ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_umbrales(tmp_dir)
+        prueba_vaciado_al_cerrar(tmp_dir)
+        prueba_fila_invalida(tmp_dir)
+        benchmark_filas_por_segundo(tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de la escritura por lotes pasaron. ---")
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from datetime import datetime
+
+import numpy as np
+
+from libs.muestra.main_muestra import MetricSample
+from sqlite.main_particiones import DIA_MS, TABLAS_PARTICIONADAS, nombre_archivo_particion
+from sqlite.main_sqlite import DBManager
+
+DIA0 = 20362                    # 2025-10-01 UTC (días desde epoch)
+INICIO_MS = DIA0 * DIA_MS
+SENSORES = 20
+DIAS_BENCHMARK = 30
+
+def _abrir(db_path, particiones=None):
+    # Se descarta la instancia Singleton anterior para abrir otra base de datos.
+    DBManager._instance = None
+    db = DBManager(db_path)
+    db.create_machine_info_table()
+    db.create_sensor_tables()
+    db.create_process_tables()
+    db.create_disk_tables()
+    db.create_network_table()
+    db.configure_batching(100, 3600)
+    db.configure_rollups(60)
+    if particiones:
+        db.configure_partitioning(particiones)
+    return db
+
+def _muestra(ts, cpu):
+    return MetricSample.from_metrics({'ts': ts, 'hostname': 'PC-01', 'username': 'usuario', 'cpu_percent': cpu})
+
+def _sensores(db, ts):
+    db.insert_sensor_readings(ts, np.arange(SENSORES), np.full(SENSORES, 42.0, dtype=np.float32))
+
+def _cargar(db, dias, paso_ms=600000):
+    """Una muestra y una lectura de sensores cada 'paso_ms' durante 'dias' días."""
+    for i in range(dias * DIA_MS // paso_ms):
+        ts = INICIO_MS + i * paso_ms
+        db.insert_metrics(_muestra(ts, float(i % 100)))
+        _sensores(db, ts)
+    db.flush()
+
+def prueba_escritura_por_dia(tmp_dir):
+    print("\n### Cada día se escribe en su propio archivo")
+    directorio = os.path.join(tmp_dir, "particiones")
+    db = _abrir(os.path.join(tmp_dir, "particionada.db"), directorio)
+    # El lote de 100 filas cruza la medianoche: cada día va a su partición.
+    _cargar(db, 3)
+    db.insert_process_events([
+        {'ts': INICIO_MS + 1000, 'evento': 'inicio', 'pid': 1},
+        {'ts': INICIO_MS + DIA_MS + 1000, 'evento': 'fin', 'pid': 1},
+    ])
+    particiones = db.list_partitions()
+    print(f"Catálogo: {[os.path.basename(ruta) for _, ruta in particiones]}")
+    assert [dia for dia, _ in particiones] == [DIA0, DIA0 + 1, DIA0 + 2]
+    assert os.path.basename(particiones[0][1]) == nombre_archivo_particion(DIA0) == "metricas_20251001.db"
+
+    # Las tablas del archivo principal quedan vacías (solo sirven de plantilla); los agregados siguen en él.
+    assert db._connection.execute("SELECT COUNT(*) FROM main.metricas_v2").fetchone()[0] == 0
+    assert db._connection.execute("SELECT SUM(muestras) FROM metricas_1h").fetchone()[0] == 3 * 144
+    # Solo las particiones más recientes quedan adjuntadas.
+    adjuntadas = [fila[1] for fila in db._connection.execute("PRAGMA database_list")]
+    assert len(adjuntadas) <= 3
+
+    for dia, ruta in particiones:
+        con = sqlite3.connect(ruta)
+        filas, minimo, maximo = con.execute("SELECT COUNT(*), MIN(ts), MAX(ts) FROM metricas_v2").fetchone()
+        assert filas == 144 and minimo // DIA_MS == maximo // DIA_MS == dia
+        assert con.execute("SELECT COUNT(*) FROM sensores_ohm").fetchone()[0] == 144 * SENSORES
+        assert {fila[0] for fila in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")} >= set(TABLAS_PARTICIONADAS)
+        assert con.execute("SELECT COUNT(*) FROM procesos_eventos").fetchone()[0] == (1 if dia < DIA0 + 2 else 0)
+        con.close()
+    db.close_connection()
+
+def prueba_consultas_entre_particiones(tmp_dir):
+    print("\n### Las consultas recorren las particiones del rango")
+    unico = _abrir(os.path.join(tmp_dir, "unico.db"))
+    _cargar(unico, 3, paso_ms=60000)
+    particionada = _abrir(os.path.join(tmp_dir, "consultas.db"), os.path.join(tmp_dir, "consultas"))
+    _cargar(particionada, 3, paso_ms=60000)
+
+    desde, hasta = INICIO_MS + DIA_MS // 2, INICIO_MS + 2 * DIA_MS + 3600000
+    filas = particionada.query_range('metricas_v2', desde, hasta, ('ts', 'cpu_percent'))
+    assert filas == unico.query_range('metricas_v2', desde, hasta, ('ts', 'cpu_percent'))
+    assert len(filas) == (hasta - desde) // 60000
+    # Intervalos de 7 minutos: algunos se reparten entre dos archivos y se combinan.
+    for db in (unico, particionada):
+        db.configure_rollups(86400)
+    resultado = particionada.query_metrics(desde, hasta, 420, ('cpu_percent',), hostname='PC-01')
+    assert resultado['nivel'] == 'metricas_v2'
+    assert resultado['filas'] == unico.query_metrics(desde, hasta, 420, ('cpu_percent',), hostname='PC-01')['filas']
+    print(f"{len(filas)} filas y {len(resultado['filas'])} intervalos iguales a los del archivo único")
+    unico.close_connection()
+    particionada.close_connection()
+
+def prueba_retencion_por_archivo(tmp_dir):
+    print("\n### La retención borra archivos completos")
+    directorio = os.path.join(tmp_dir, "retencion")
+    db = _abrir(os.path.join(tmp_dir, "retencion.db"), directorio)
+    _cargar(db, 5)
+    retencion = {tabla: 3 for tabla in TABLAS_PARTICIONADAS}
+    retencion['sensores_ohm'] = 1
+    db.configure_retention(retencion)
+    ahora = INICIO_MS + 5 * DIA_MS
+    # Solo quedan adjuntadas las dos últimas particiones: el archivo del día 2 ya está cerrado.
+    ruta_dia2 = os.path.join(directorio, nombre_archivo_particion(DIA0 + 2))
+    tamano_antes = os.path.getsize(ruta_dia2)
+    db.apply_retention(ahora)
+
+    dias = [dia for dia, _ in db.list_partitions()]
+    print(f"Particiones tras la retención: {dias}")
+    assert dias == [DIA0 + 2, DIA0 + 3, DIA0 + 4]
+    assert sorted(os.listdir(directorio)) == sorted(
+        os.path.basename(ruta) + sufijo for _, ruta in db.list_partitions() for sufijo in ('', '-shm', '-wal')
+        if os.path.exists(ruta + sufijo)
+    )
+    # Las lecturas de sensores solo se conservan un día: se eliminó su tabla en las particiones anteriores.
+    assert {ts // DIA_MS for (ts,) in db.query_range('sensores_ohm', 0, ahora, ('ts',))} == {DIA0 + 4}
+    # Con auto_vacuum=FULL, eliminar la tabla de sensores reduce el archivo de la partición.
+    con = sqlite3.connect(ruta_dia2)
+    assert con.execute("PRAGMA auto_vacuum").fetchone()[0] == 1
+    assert con.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    con.close()
+    print(f"Partición {DIA0 + 2}: {tamano_antes / 1024:.0f} KB -> {os.path.getsize(ruta_dia2) / 1024:.0f} KB sin sensores")
+    assert os.path.getsize(ruta_dia2) < tamano_antes * 0.75
+    assert len(db.query_range('metricas_v2', 0, ahora, ('ts',))) == 3 * 144
+    db.close_connection()
+
+def prueba_filas_anteriores_a_las_particiones(tmp_dir):
+    print("\n### Las filas escritas antes de activar las particiones se mueven a ellas")
+    db_path = os.path.join(tmp_dir, "activacion.db")
+    db = _abrir(db_path)
+    _cargar(db, 2)
+    db.close_connection()
+
+    db = _abrir(db_path, os.path.join(tmp_dir, "activacion"))
+    assert db.partition_backlog
+    # La retención sigue borrando las filas aún en el archivo principal.
+    db.configure_retention({'sensores_ohm': 1})
+    db.apply_retention(INICIO_MS + 2 * DIA_MS)
+    assert db._connection.execute("SELECT COUNT(*) FROM main.sensores_ohm").fetchone()[0] == 144 * SENSORES
+
+    tramos = 0
+    while db.partition_backlog:
+        db.migrate_to_partitions(1000)
+        tramos += 1
+    print(f"{tramos} tramos para mover 2 días de métricas y sensores")
+    for tabla in ('metricas_v2', 'sensores_ohm'):
+        assert db._connection.execute(f"SELECT COUNT(*) FROM main.{tabla}").fetchone()[0] == 0
+    assert [dia for dia, _ in db.list_partitions()] == [DIA0, DIA0 + 1]
+    assert len(db.query_range('metricas_v2', 0, INICIO_MS + 2 * DIA_MS, ('ts',))) == 2 * 144
+    assert len(db.query_range('sensores_ohm', 0, INICIO_MS + 2 * DIA_MS, ('ts',))) == 144 * SENSORES
+    # Los agregados ya incluían las filas movidas.
+    assert db._connection.execute("SELECT SUM(muestras) FROM metricas_1h").fetchone()[0] == 2 * 144
+
+    # Una vez movidas, vencen con las particiones.
+    db.configure_retention({tabla: 1 for tabla in TABLAS_PARTICIONADAS})
+    db.apply_retention(INICIO_MS + 3 * DIA_MS)
+    assert db.query_range('metricas_v2', 0, INICIO_MS + 3 * DIA_MS, ('ts',)) == []
+    assert db.list_partitions() == []
+    db.close_connection()
+
+def prueba_migracion_particionada(tmp_dir):
+    print("\n### La migración de 'metricas' escribe un día por tramo")
+    db_path = os.path.join(tmp_dir, "migracion.db")
+    con = sqlite3.connect(db_path)
+    con.execute("CREATE TABLE metricas (timestamp TEXT PRIMARY KEY, hostname TEXT, username TEXT, cpu_percent REAL)")
+    con.executemany("INSERT INTO metricas VALUES (?, 'PC-01', 'usuario', 1.0)",
+                    [(datetime.fromtimestamp((INICIO_MS + i * 3600000) / 1000).isoformat(),) for i in range(72)])
+    con.commit()
+    con.close()
+
+    db = _abrir(db_path, os.path.join(tmp_dir, "migracion"))
+    tramos = 0
+    while db.legacy_pending:
+        db.migrate_legacy_metrics(1000)
+        tramos += 1
+    assert len(db.list_partitions()) == 3 and tramos >= 4
+    assert len(db.query_range('metricas_v2', 0, INICIO_MS + 4 * DIA_MS, ('ts',))) == 72
+    db.close_connection()
+
+def _benchmark(tmp_dir, nombre, particionada):
+    db_path = os.path.join(tmp_dir, f"bench_{particionada}.db")
+    db = _abrir(db_path, os.path.join(tmp_dir, "bench_particiones") if particionada else None)
+    ids = np.arange(SENSORES)
+    valores = np.full(SENSORES, 42.0, dtype=np.float32)
+    ciclos_dia = 24 * 60
+    for i in range((DIAS_BENCHMARK - 1) * ciclos_dia):
+        db.insert_sensor_readings(INICIO_MS + i * 60000, ids, valores)
+
+    # Escritura del último día con 29 días ya almacenados.
+    inicio = time.perf_counter()
+    for i in range((DIAS_BENCHMARK - 1) * ciclos_dia, DIAS_BENCHMARK * ciclos_dia):
+        db.insert_sensor_readings(INICIO_MS + i * 60000, ids, valores)
+    escritura = (time.perf_counter() - inicio) / ciclos_dia * 1000
+
+    # Consulta de un día completo.
+    dia_ms = INICIO_MS + 10 * DIA_MS
+    inicio = time.perf_counter()
+    filas = db.query_range('sensores_ohm', dia_ms, dia_ms + DIA_MS, ('ts', 'sensor_id', 'valor'))
+    consulta = (time.perf_counter() - inicio) * 1000
+    assert len(filas) == ciclos_dia * SENSORES
+
+    # Retención de los 7 días más antiguos.
+    retencion = {tabla: DIAS_BENCHMARK - 7 for tabla in TABLAS_PARTICIONADAS}
+    db.configure_retention(retencion, chunk_rows=10 ** 9)
+    inicio = time.perf_counter()
+    db.apply_retention(INICIO_MS + DIAS_BENCHMARK * DIA_MS)
+    borrado = (time.perf_counter() - inicio) * 1000
+    assert len(db.query_range('sensores_ohm', 0, INICIO_MS + 7 * DIA_MS, ('ts',))) == 0
+    db.close_connection()
+    print(f"{nombre:<22} {escritura:>14.3f} {consulta:>14.1f} {borrado:>16.1f}")
+
+def benchmark_archivo_unico_vs_particiones(tmp_dir):
+    print(f"\n### {DIAS_BENCHMARK} días de {SENSORES} sensores por minuto "
+          f"({DIAS_BENCHMARK * 24 * 60 * SENSORES} lecturas)")
+    print(f"{'Modo':<22} {'ms/ciclo día 30':>14} {'consulta 1 día':>14} {'retención 7 días':>16}")
+    _benchmark(tmp_dir, 'Archivo único', False)
+    _benchmark(tmp_dir, 'Particiones diarias', True)
+
+if __name__ == "__main__":
+    print("--- Pruebas del modo particionado por día de SQLite ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_escritura_por_dia(tmp_dir)
+        prueba_consultas_entre_particiones(tmp_dir)
+        prueba_retencion_por_archivo(tmp_dir)
+        prueba_filas_anteriores_a_las_particiones(tmp_dir)
+        prueba_migracion_particionada(tmp_dir)
+        benchmark_archivo_unico_vs_particiones(tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas del modo particionado pasaron. ---")
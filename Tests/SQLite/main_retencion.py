@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from libs.muestra.main_muestra import MetricSample
+from sqlite.main_sqlite import DBManager
+
+DIA_MS = 86400000
+AHORA_MS = 1760000000000
+SENSORES = 50
+MINUTOS = 10 * 24 * 60          # 10 días de lecturas, una por minuto
+
+def _abrir(db_path):
+    # Se descarta la instancia Singleton anterior para abrir otra base de datos.
+    DBManager._instance = None
+    db = DBManager(db_path)
+    db.create_sensor_tables()
+    db.create_process_tables()
+    db.create_disk_tables()
+    db.create_network_table()
+    return db
+
+def _cargar_sensores(db, minutos=MINUTOS):
+    inicio = AHORA_MS - minutos * 60000
+    db._cursor.executemany(
+        "INSERT INTO sensores_ohm (ts, sensor_id, valor) VALUES (?, ?, ?)",
+        ((inicio + m * 60000, s, float(s)) for m in range(minutos) for s in range(SENSORES))
+    )
+    db._connection.commit()
+
+def _contar(db, tabla, where=""):
+    return db._connection.execute(f"SELECT COUNT(*) FROM {tabla} {where}").fetchone()[0]
+
+def prueba_retencion_por_tramos(tmp_dir):
+    print("\n### Retención por tabla en tramos acotados")
+    db = _abrir(os.path.join(tmp_dir, "tramos.db"))
+    _cargar_sensores(db, minutos=3 * 24 * 60)
+    db._cursor.executemany(
+        "INSERT INTO procesos_eventos (ts, evento, pid) VALUES (?, 'inicio', ?)",
+        ((AHORA_MS - d * DIA_MS, d) for d in range(10))
+    )
+    db._connection.commit()
+    db.configure_retention({'sensores_ohm': 1, 'procesos_eventos': 5, 'red': 0, 'no_existe': 3}, chunk_rows=1000)
+
+    # Cada llamada borra un tramo por tabla (más las lecturas que comparten el último ts).
+    llamadas = 0
+    while True:
+        borradas = db.apply_retention(AHORA_MS)
+        if not borradas:
+            break
+        assert borradas <= 1000 + SENSORES + 5
+        llamadas += 1
+    print(f"{llamadas} llamadas para vaciar 2 días de lecturas vencidas")
+    assert _contar(db, 'sensores_ohm', f"WHERE ts < {AHORA_MS - DIA_MS}") == 0
+    assert _contar(db, 'sensores_ohm') == 24 * 60 * SENSORES
+    assert _contar(db, 'procesos_eventos') == 6
+    # El plan de borrado usa el índice por ts.
+    plan = db._connection.execute(
+        "EXPLAIN QUERY PLAN SELECT ts FROM procesos_eventos WHERE ts < 0 ORDER BY ts LIMIT 1 OFFSET 10"
+    ).fetchall()
+    assert 'procesos_eventos_ts' in str(plan)
+    db.close_connection()
+
+def prueba_vacuum_incremental(tmp_dir):
+    print("\n### auto_vacuum=INCREMENTAL devuelve el espacio por partes")
+    db_path = os.path.join(tmp_dir, "vacuum.db")
+    db = _abrir(db_path)
+    assert db._connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    _cargar_sensores(db)
+    db.configure_retention({'sensores_ohm': 2})
+    while db.apply_retention(AHORA_MS):
+        pass
+    db._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    antes = os.path.getsize(db_path)
+    liberadas = db.incremental_vacuum(pages=100)
+    assert liberadas == 100
+    while db.incremental_vacuum(pages=2000):
+        pass
+    db._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    despues = os.path.getsize(db_path)
+    print(f"Archivo: {antes / 1024:.0f} KB -> {despues / 1024:.0f} KB tras el vacuum incremental")
+    assert despues < antes / 2
+    assert db._connection.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    db.close_connection()
+
+def prueba_vacuum_con_lotes(tmp_dir):
+    print("\n### El vacuum de cada ciclo no vacía el lote pendiente")
+    db = _abrir(os.path.join(tmp_dir, "lotes.db"))
+    db.configure_batching(5, 300)
+    pendientes = []
+    for i in range(10):
+        db.insert_metrics(MetricSample.from_metrics({'ts': AHORA_MS + i * 60000, 'hostname': 'PC-01', 'cpu_percent': 1.0}))
+        db.apply_retention(AHORA_MS)
+        db.incremental_vacuum()
+        pendientes.append(db.pending_rows())
+    print(f"Filas pendientes tras cada ciclo: {pendientes}")
+    assert pendientes == [1, 2, 3, 4, 0] * 2
+    assert _contar(db, 'metricas_v2') == 10
+    db.close_connection()
+
+def prueba_conversion_base_anterior(tmp_dir):
+    print("\n### Una base sin auto_vacuum se convierte tras la retención")
+    db_path = os.path.join(tmp_dir, "anterior.db")
+    con = sqlite3.connect(db_path)
+    con.execute("CREATE TABLE sensores_ohm (ts INTEGER NOT NULL, sensor_id INTEGER NOT NULL, valor REAL, "
+                "PRIMARY KEY (ts, sensor_id)) WITHOUT ROWID")
+    con.commit()
+    con.close()
+
+    db = _abrir(db_path)
+    assert db._connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    _cargar_sensores(db, minutos=2 * 24 * 60)
+    db.configure_retention({'sensores_ohm': 1}, chunk_rows=20000)
+    db.apply_retention(AHORA_MS)
+    # Con filas vencidas pendientes todavía no se hace el VACUUM de conversión.
+    assert db.incremental_vacuum() == 0
+    while db.apply_retention(AHORA_MS):
+        pass
+    assert db.incremental_vacuum() > 0
+    assert db._connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert _contar(db, 'sensores_ohm') == 24 * 60 * SENSORES
+    db.close_connection()
+
+def benchmark_pausa_maxima(tmp_dir):
+    print(f"\n### Borrado de {MINUTOS * SENSORES // 2} lecturas vencidas: pausa máxima de la conexión")
+    resultados = {}
+    for nombre in ('DELETE único', 'Tramos de 5000 filas'):
+        db = _abrir(os.path.join(tmp_dir, f"pausa_{len(resultados)}.db"))
+        _cargar_sensores(db)
+        corte = AHORA_MS - MINUTOS // 2 * 60000
+        pausas = []
+        if nombre == 'DELETE único':
+            inicio = time.perf_counter()
+            with db._connection:
+                db._cursor.execute("DELETE FROM sensores_ohm WHERE ts < ?", (corte,))
+            pausas.append(time.perf_counter() - inicio)
+        else:
+            db.configure_retention({'sensores_ohm': MINUTOS // 2 / (24 * 60)}, chunk_rows=5000)
+            while True:
+                inicio = time.perf_counter()
+                borradas = db.apply_retention(AHORA_MS)
+                pausas.append(time.perf_counter() - inicio)
+                if not borradas:
+                    break
+            inicio = time.perf_counter()
+            while db.incremental_vacuum(256):
+                pausas.append(time.perf_counter() - inicio)
+                inicio = time.perf_counter()
+        assert _contar(db, 'sensores_ohm') == MINUTOS // 2 * SENSORES
+        resultados[nombre] = max(pausas) * 1000
+        print(f"{nombre:<22} pausa máxima {resultados[nombre]:>8.1f} ms en {len(pausas)} pasos "
+              f"(total {sum(pausas) * 1000:.0f} ms)")
+        db.close_connection()
+    assert resultados['Tramos de 5000 filas'] < resultados['DELETE único']
+
+if __name__ == "__main__":
+    print("--- Pruebas de la retención y el vacuum incremental de SQLite ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prueba_retencion_por_tramos(tmp_dir)
+        prueba_vacuum_incremental(tmp_dir)
+        prueba_vacuum_con_lotes(tmp_dir)
+        prueba_conversion_base_anterior(tmp_dir)
+        benchmark_pausa_maxima(tmp_dir)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de la retención pasaron. ---")
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Módulos 'wmi' y 'pythoncom' simulados para ejecutar las pruebas de WMI fuera de Windows.
+Se registran en sys.modules al importar este archivo, antes de importar libs.wmi.main_wmi.
+"""
+import sys
+import time
+import types
+import threading
+
+COSTO_CONEXION = 0.030   # Segundos que tarda en establecerse wmi.WMI()
+COSTO_CONSULTA = 0.002   # Segundos por consulta sobre una conexión abierta
+
+# Estado compartido que las pruebas pueden inspeccionar y modificar.
+estado_fake = {
+    'conexiones': 0,
+    'consultas': [],
+    'fallar_consultas': 0,
+    'retardo_extra': 0.0,
+    'hora_arranque': "20251001083000.500000+000",
+    'com_inicializado': set(),
+}
+
+class FakeObjeto:
+    def __init__(self, **props):
+        self.__dict__.update(props)
+
+class FakeConexion:
+    def __init__(self):
+        estado_fake['conexiones'] += 1
+        time.sleep(COSTO_CONEXION)
+
+    def _consulta(self, clase, fields, props):
+        if threading.get_ident() not in estado_fake['com_inicializado']:
+            raise RuntimeError("CoInitialize no ha sido llamado en este hilo.")
+        if estado_fake['fallar_consultas'] > 0:
+            estado_fake['fallar_consultas'] -= 1
+            raise RuntimeError("El servidor RPC no está disponible.")
+        estado_fake['consultas'].append((clase, tuple(fields or ())))
+        time.sleep(COSTO_CONSULTA + estado_fake['retardo_extra'])
+        if fields:
+            # Consulta proyectada: solo se devuelven las propiedades solicitadas.
+            props = {campo: props[campo] for campo in fields}
+        return [FakeObjeto(**props)]
+
+    def Win32_OperatingSystem(self, fields=None):
+        return self._consulta('Win32_OperatingSystem', fields, dict(
+            Caption="Microsoft Windows 11 Pro", OSArchitecture="64 bits",
+            SerialNumber="00330-80000-00000-AA123", LastBootUpTime=estado_fake['hora_arranque']))
+
+    def Win32_BaseBoard(self, fields=None):
+        return self._consulta('Win32_BaseBoard', fields, dict(
+            Manufacturer="ASUSTeK", Product="PRIME B450M-A", SerialNumber="ABC123"))
+
+    def Win32_Processor(self, fields=None):
+        return self._consulta('Win32_Processor', fields, dict(
+            Name="AMD Ryzen 5 3600 ", NumberOfLogicalProcessors=12, NumberOfCores=6))
+
+    def Win32_Battery(self, fields=None):
+        return self._consulta('Win32_Battery', fields, dict(
+            EstimatedChargeRemaining=87, BatteryStatus=2))
+
+fake_wmi = types.ModuleType('wmi')
+fake_wmi.WMI = FakeConexion
+fake_pythoncom = types.ModuleType('pythoncom')
+fake_pythoncom.CoInitialize = lambda: estado_fake['com_inicializado'].add(threading.get_ident())
+fake_pythoncom.CoUninitialize = lambda: estado_fake['com_inicializado'].discard(threading.get_ident())
+sys.modules.setdefault('wmi', fake_wmi)
+sys.modules.setdefault('pythoncom', fake_pythoncom)
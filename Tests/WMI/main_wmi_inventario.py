@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Registra los módulos 'wmi' y 'pythoncom' simulados antes de importar el agente.
+from fake_wmi import estado_fake
+
+from libs.wmi.main_wmi import (
+    WMISession,
+    WMIInventoryCache,
+    obtener_inventario_wmi
+)
+
+def clases_consultadas():
+    return [clase for clase, _ in estado_fake['consultas']]
+
+def prueba_cache_de_inventario(cache_path):
+    print("\n### Caché de inventario indexada por la hora de arranque")
+    session = WMISession(timeout=5)
+
+    # Primer arranque del servicio: sin caché se consulta el inventario completo y se persiste.
+    cache = WMIInventoryCache(cache_path)
+    estado_fake['consultas'].clear()
+    inventario = obtener_inventario_wmi(session, cache)
+    print(f"Consultas sin caché: {estado_fake['consultas']}")
+    assert inventario['procesador_nombre'] == "AMD Ryzen 5 3600"
+    assert os.path.exists(cache_path)
+    # Las consultas se proyectan solo sobre las propiedades usadas.
+    assert ('Win32_BaseBoard', ('Manufacturer', 'Product', 'SerialNumber')) in estado_fake['consultas']
+
+    # Ciclos siguientes: solo se consulta LastBootUpTime.
+    estado_fake['consultas'].clear()
+    for _ in range(5):
+        assert obtener_inventario_wmi(session, cache)['placa_base_producto'] == "PRIME B450M-A"
+    print(f"Consultas con caché (5 ciclos): {estado_fake['consultas']}")
+    assert estado_fake['consultas'] == [('Win32_OperatingSystem', ('LastBootUpTime',))] * 5
+
+    # Reinicio del servicio: la caché persistida evita la consulta completa.
+    cache = WMIInventoryCache(cache_path)
+    estado_fake['consultas'].clear()
+    obtener_inventario_wmi(session, cache)
+    assert clases_consultadas() == ['Win32_OperatingSystem']
+
+    # Reinicio del equipo: cambia la hora de arranque y se vuelve a consultar el inventario.
+    estado_fake['hora_arranque'] = "20251002090000.500000+000"
+    estado_fake['consultas'].clear()
+    inventario = obtener_inventario_wmi(session, cache)
+    assert inventario['os_last_boot_up_time'] == "20251002090000"
+    assert 'Win32_Processor' in clases_consultadas()
+    session.stop()
+
+def prueba_respaldo_si_wmi_es_lento(cache_path):
+    print("\n### Respaldo con la caché cuando WMI es lento")
+    session = WMISession(timeout=5)
+    cache = WMIInventoryCache(cache_path, timeout=0.1)
+    estado_fake['retardo_extra'] = 0.5
+    inventario = obtener_inventario_wmi(session, cache)
+    estado_fake['retardo_extra'] = 0.0
+    print(f"Inventario en caché: {inventario['os_name']}")
+    assert inventario['os_last_boot_up_time'] == "20251002090000"
+    session.stop()
+
+if __name__ == "__main__":
+    print("--- Pruebas de la caché de inventario WMI ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_path = os.path.join(tmp_dir, "inventario_wmi.json")
+        prueba_cache_de_inventario(cache_path)
+        prueba_respaldo_si_wmi_es_lento(cache_path)
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de la caché de inventario WMI pasaron. ---")
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+
+# Permite importar los módulos del agente al ejecutar el script desde cualquier ruta.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Registra los módulos 'wmi' y 'pythoncom' simulados antes de importar el agente.
+from fake_wmi import estado_fake, fake_pythoncom
+
+from libs.wmi.main_wmi import (
+    WMISession,
+    obtener_inventario_wmi,
+    obtener_metricas_dinamicas_wmi
+)
+
+CICLOS = 20
+
+def con_com(func):
+    """Comportamiento anterior: cada colector abre su propia conexión en el hilo llamador."""
+    fake_pythoncom.CoInitialize()
+    try:
+        return func()
+    finally:
+        fake_pythoncom.CoUninitialize()
+
+def benchmark_latencia_por_ciclo():
+    # Como en el agente, el inventario estático se lee una vez y las métricas dinámicas en cada ciclo.
+    print(f"\n### Latencia por ciclo ({CICLOS} ciclos)")
+    estado_fake['conexiones'] = 0
+    inicio = time.perf_counter()
+    inventario = con_com(obtener_inventario_wmi)
+    for _ in range(CICLOS):
+        dinamicas = con_com(obtener_metricas_dinamicas_wmi)
+    por_llamada_ms = (time.perf_counter() - inicio) * 1000 / CICLOS
+    conexiones_por_llamada = estado_fake['conexiones']
+    assert inventario['procesador_nombre'] == "AMD Ryzen 5 3600"
+    # Una conexión por ciclo, más la del inventario.
+    assert conexiones_por_llamada == CICLOS + 1
+
+    estado_fake['conexiones'] = 0
+    session = WMISession(timeout=5)
+    inicio = time.perf_counter()
+    inventario = obtener_inventario_wmi(session)
+    for _ in range(CICLOS):
+        dinamicas = obtener_metricas_dinamicas_wmi(session)
+    sesion_ms = (time.perf_counter() - inicio) * 1000 / CICLOS
+    session.stop()
+    assert inventario['os_last_boot_up_time'] == "20251001083000"
+    assert dinamicas['bateria_porcentaje'] == 87
+
+    print(f"{'Modo':<24} {'ms/ciclo':>10} {'Conexiones':>12}")
+    print(f"{'Conexión por llamada':<24} {por_llamada_ms:>10.2f} {conexiones_por_llamada:>12}")
+    print(f"{'Sesión persistente':<24} {sesion_ms:>10.2f} {estado_fake['conexiones']:>12}")
+    assert estado_fake['conexiones'] == 1
+    assert sesion_ms < por_llamada_ms
+
+def prueba_reconexion():
+    print("\n### Reconexión automática")
+    estado_fake['conexiones'] = 0
+    session = WMISession(timeout=5)
+    assert obtener_metricas_dinamicas_wmi(session)['bateria_porcentaje'] == 87
+    # La siguiente consulta falla: la sesión descarta la conexión y reintenta con una nueva.
+    estado_fake['fallar_consultas'] = 1
+    assert obtener_metricas_dinamicas_wmi(session)['bateria_porcentaje'] == 87
+    print(f"Conexiones: {session.connects}, reconexiones: {session.reconnects}")
+    assert session.reconnects == 1
+    # Si también falla el reintento se reporta el error sin detener la sesión.
+    estado_fake['fallar_consultas'] = 2
+    assert obtener_metricas_dinamicas_wmi(session) is None
+    assert obtener_inventario_wmi(session)['placa_base_fabricante'] == "ASUSTeK"
+    session.stop()
+
+if __name__ == "__main__":
+    print("--- Pruebas de la sesión WMI persistente ---")
+    benchmark_latencia_por_ciclo()
+    prueba_reconexion()
+    print("\n" + "-" * 50)
+    print("--- Todas las pruebas de la sesión WMI pasaron. ---")
@@ -0,0 +1,313 @@
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Estados posibles de un colector en un ciclo.
+ESTADO_OK = 'ok'
+ESTADO_VACIO = 'vacio'          # El colector respondió sin datos (None o colección vacía).
+ESTADO_ERROR = 'error'          # El colector lanzó una excepción.
+ESTADO_TIMEOUT = 'timeout'      # El colector no respondió antes de su plazo.
+ESTADO_EN_CURSO = 'en_curso'    # La ejecución de un ciclo anterior sigue sin terminar.
+ESTADO_CACHE = 'cache'          # El colector no tocaba en este ciclo; se reutiliza su último valor.
+
+class Collector:
+    """
+    Definición de un colector de métricas.
+    """
+
+    def __init__(self, name, func, timeout):
+        """
+        Args:
+            name (str): Nombre único del colector (ej. 'psutil', 'wmi').
+            func (callable): Función sin argumentos que retorna las métricas.
+            timeout (float): Plazo máximo en segundos para obtener el resultado.
+        """
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+
+class CollectorExecutor:
+    """
+    Ejecuta los colectores de forma concurrente con un plazo individual por colector.
+
+    Los colectores comparten un pool acotado de hilos; WMI no necesita un hilo
+    propio porque WMISession serializa las consultas en su hilo COM. Si un colector
+    no responde en su plazo, el ciclo continúa con los resultados parciales y se
+    marca su estado; mientras siga ocupado no se vuelve a lanzar.
+    """
+
+    def __init__(self, collectors, max_workers=4):
+        """
+        Args:
+            collectors (list): Lista de objetos Collector.
+            max_workers (int): Número máximo de hilos del pool.
+        """
+        self._collectors = {collector.name: collector for collector in collectors}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="colector")
+        # Ejecuciones de ciclos anteriores que aún no han terminado.
+        self._pending = {}
+
+    def run(self, names=None):
+        """
+        Ejecuta los colectores indicados y espera a cada uno hasta su plazo.
+
+        Args:
+            names (list): Nombres de los colectores a ejecutar. Por defecto todos.
+
+        Returns:
+            tuple: (resultados, estados). 'resultados' mapea nombre -> datos de los
+                   colectores que respondieron; 'estados' mapea nombre -> estado.
+        """
+        if names is None:
+            names = list(self._collectors)
+
+        start = time.monotonic()
+        futures = {}
+        estados = {}
+        for name in names:
+            collector = self._collectors[name]
+            previous = self._pending.get(name)
+            if previous is not None and not previous.done():
+                # No se acumulan ejecuciones de un colector bloqueado.
+                estados[name] = ESTADO_EN_CURSO
+                continue
+            futures[name] = self._pool.submit(collector.func)
+
+        resultados = {}
+        # Se espera por orden de plazo para que cada colector disponga de su tiempo completo.
+        for name in sorted(futures, key=lambda n: self._collectors[n].timeout):
+            future = futures[name]
+            deadline = start + self._collectors[name].timeout
+            try:
+                data = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                logging.warning(f"El colector '{name}' superó su plazo de {self._collectors[name].timeout}s.")
+                self._pending[name] = future
+                estados[name] = ESTADO_TIMEOUT
+                continue
+            except Exception as e:
+                logging.error(f"Error en el colector '{name}': {e}")
+                estados[name] = ESTADO_ERROR
+                continue
+
+            self._pending.pop(name, None)
+            if data is None or (hasattr(data, '__len__') and len(data) == 0):
+                estados[name] = ESTADO_VACIO
+            else:
+                estados[name] = ESTADO_OK
+            resultados[name] = data
+
+        return resultados, estados
+
+    def shutdown(self, wait=False):
+        """Detiene el pool de hilos. Las tareas pendientes se cancelan."""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+class MultiRateScheduler:
+    """
+    Planificador multifrecuencia de colectores.
+
+    Cada colector tiene su propia cadencia: los de periodo 0 se ejecutan en cada
+    ciclo (nivel rápido) y el resto solo cuando ha transcurrido su periodo (ej.
+    procesos cada 30s, inventario estático cada hora). Los colectores estáticos
+    se fuerzan además cuando cambia la hora de arranque del sistema. La muestra
+    de cada ciclo combina el último valor obtenido de cada nivel.
+    """
+
+    def __init__(self, executor, periods, static=(), boot_time_func=None, clock=time.monotonic, tolerance=0.5):
+        """
+        Args:
+            executor (CollectorExecutor): Ejecutor usado para lanzar los colectores.
+            periods (dict): Periodo en segundos por nombre de colector (0 = cada ciclo).
+            static (iterable): Colectores que se invalidan al cambiar la hora de arranque.
+            boot_time_func (callable): Función que retorna la hora de arranque (ej. psutil.boot_time).
+            clock (callable): Reloj monotónico.
+            tolerance (float): Margen en segundos para no perder un ciclo por variaciones del reloj.
+        """
+        self._executor = executor
+        self._periods = dict(periods)
+        self._static = set(static)
+        self._boot_time_func = boot_time_func
+        self._clock = clock
+        self._tolerance = tolerance
+        self._last_run = {}
+        self._latest = {}
+        self._boot_time = None
+
+    def _boot_time_changed(self):
+        """Comprueba si la hora de arranque cambió desde la última consulta."""
+        if self._boot_time_func is None:
+            return False
+        try:
+            boot_time = self._boot_time_func()
+        except Exception as e:
+            logging.error(f"Error al obtener la hora de arranque del sistema: {e}")
+            return False
+        # psutil.boot_time() puede variar ligeramente en Windows; se ignoran diferencias menores a 2s.
+        changed = self._boot_time is not None and abs(boot_time - self._boot_time) > 2
+        self._boot_time = boot_time
+        return changed
+
+    def due(self, now=None):
+        """
+        Determina los colectores que deben ejecutarse en este ciclo.
+
+        Args:
+            now (float): Instante monotónico actual. Por defecto el reloj del planificador.
+
+        Returns:
+            list: Nombres de los colectores a ejecutar.
+        """
+        if now is None:
+            now = self._clock()
+        if self._boot_time_changed():
+            logging.info("Cambio en la hora de arranque detectado. Se refresca el inventario estático.")
+            for name in self._static:
+                self._last_run.pop(name, None)
+
+        names = []
+        for name, period in self._periods.items():
+            last_run = self._last_run.get(name)
+            if last_run is None or now - last_run >= period - self._tolerance:
+                names.append(name)
+        return names
+
+    def run_cycle(self):
+        """
+        Ejecuta los colectores que tocan en este ciclo y combina con el último valor del resto.
+
+        Returns:
+            tuple: (resultados, estados). 'resultados' contiene el último valor conocido
+                   de cada colector; 'estados' el estado de este ciclo (ESTADO_CACHE si
+                   el colector no se ejecutó).
+        """
+        now = self._clock()
+        names = self.due(now)
+        resultados, estados = self._executor.run(names)
+        for name, data in resultados.items():
+            # Solo se reprograma un colector cuando respondió con datos; si falla
+            # (excepción, plazo superado o None) se reintenta en el siguiente ciclo.
+            if data is None:
+                continue
+            self._last_run[name] = now
+            self._latest[name] = data
+        for name in self._periods:
+            estados.setdefault(name, ESTADO_CACHE)
+        return dict(self._latest), estados
+
+class TickClock:
+    """
+    Reloj de ciclos sin deriva para el bucle principal.
+
+    Los ciclos se alinean a múltiplos del intervalo en la hora de pared (ej. cada
+    minuto en punto) y los plazos se calculan con el reloj monotónico, por lo que
+    la duración de la recolección no desplaza el periodo. La espera se delega en
+    wait_func (ej. WaitForSingleObject sobre hWaitStop), que retorna en cuanto se
+    solicita la parada. Los ciclos perdidos y desbordados se cuentan y se reportan.
+    """
+
+    def __init__(self, interval, wait_func, clock=time.monotonic, wall_clock=time.time, resync_threshold=1.0):
+        """
+        Args:
+            interval (float): Periodo de los ciclos en segundos.
+            wait_func (callable): Recibe un timeout en segundos y retorna True si se solicitó la parada.
+            clock (callable): Reloj monotónico.
+            wall_clock (callable): Reloj de pared (segundos desde la época).
+            resync_threshold (float): Desfase en segundos entre ambos relojes a partir del
+                                      cual se vuelve a alinear (ej. ajuste NTP).
+        """
+        self.interval = interval
+        self._wait_func = wait_func
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._resync_threshold = resync_threshold
+        self._next_mono = None
+        self._next_wall = None
+        self.ticks = 0
+        self.missed = 0
+        self.overruns = 0
+        self.resyncs = 0
+
+    def _anchor(self):
+        """Alinea el siguiente ciclo con el próximo múltiplo del intervalo en la hora de pared."""
+        wall = self._wall_clock()
+        mono = self._clock()
+        self._next_wall = float((math.floor(wall / self.interval) + 1) * self.interval)
+        self._next_mono = mono + (self._next_wall - wall)
+
+    def wait_next(self):
+        """
+        Espera hasta el siguiente ciclo.
+
+        Returns:
+            float: Marca de tiempo nominal (alineada) del ciclo en segundos desde la época,
+                   o None si se solicitó la parada durante la espera.
+        """
+        if self._next_mono is None:
+            self._anchor()
+        else:
+            now = self._clock()
+            # Si el reloj de pared se desvió del monotónico (ajuste horario), se realinea.
+            drift = self._wall_clock() - (self._next_wall - (self._next_mono - now))
+            if abs(drift) > self._resync_threshold:
+                self.resyncs += 1
+                logging.warning(f"Desfase de {drift:.3f}s entre el reloj de pared y el monotónico. Se realinean los ciclos.")
+                self._anchor()
+            elif now > self._next_mono:
+                # El ciclo anterior duró más que el intervalo: se ejecuta de inmediato el
+                # último ciclo vencido y se descartan los anteriores.
+                skipped = int((now - self._next_mono) // self.interval)
+                self.overruns += 1
+                self.missed += skipped
+                self._next_mono += skipped * self.interval
+                self._next_wall += skipped * self.interval
+                logging.warning(
+                    f"Ciclo desbordado: {skipped} ciclo(s) perdido(s). "
+                    f"Totales: desbordados={self.overruns}, perdidos={self.missed}."
+                )
+
+        timeout = self._next_mono - self._clock()
+        if timeout > 0 and self._wait_func(timeout):
+            return None
+
+        tick_wall = self._next_wall
+        self._next_mono += self.interval
+        self._next_wall += self.interval
+        self.ticks += 1
+        return tick_wall
+
+    def stats(self):
+        """
+        Returns:
+            dict: Contadores de ciclos ejecutados, perdidos, desbordados y realineados.
+        """
+        return {
+            'ciclos': self.ticks,
+            'ciclos_perdidos': self.missed,
+            'ciclos_desbordados': self.overruns,
+            'resincronizaciones': self.resyncs,
+        }
+
+def combinar_metricas(resultados, estados, fuentes):
+    """
+    Combina los diccionarios de métricas de las fuentes indicadas en una sola muestra.
+
+    Cada fuente deja un marcador 'fuente_<nombre>' con su estado, de modo que una
+    muestra parcial indica qué fuentes faltan en lugar de descartarse.
+
+    Args:
+        resultados (dict): Resultados por colector retornados por CollectorExecutor.run().
+        estados (dict): Estados por colector retornados por CollectorExecutor.run().
+        fuentes (list): Nombres de los colectores cuyos diccionarios se combinan.
+
+    Returns:
+        dict: Las métricas combinadas con los marcadores de estado.
+    """
+    metricas = {}
+    for fuente in fuentes:
+        data = resultados.get(fuente)
+        if isinstance(data, dict):
+            metricas.update(data)
+        metricas[f'fuente_{fuente}'] = estados.get(fuente, ESTADO_VACIO)
+    return metricas
@@ -0,0 +1,185 @@
+from operator import attrgetter
+
+# Mapa de campos de la muestra, construido una sola vez: (campo, claves de origen en
+# orden de preferencia, valor por defecto). Gana la primera clave con un valor distinto
+# de None, de modo que un 0 medido por psutil no se sustituye por el valor de OHM.
+MAPA_CAMPOS = (
+    ('timestamp', ('timestamp',), None),
+    ('ts', ('ts',), None),
+    ('hostname', ('hostname',), None),
+    ('username', ('username',), None),
+    ('cpu_percent', ('cpu_percent', 'cpu_load_percent'), 0),
+    ('cpu_freq', ('cpu_freq_current_mhz',), None),
+    ('ram_percent', ('memoria_percent', 'ram_load_percent'), 0),
+    ('ram_used', ('memoria_usada_gb', 'ram_load_used_gb'), 0),
+    ('ram_total', ('memoria_total_gb',), None),
+    ('ram_free', ('memoria_libre_gb', 'ram_load_free_gb'), 0),
+    ('disk_percent', ('disco_percent', 'hdd_used_gb'), 0),
+    ('disk_used', ('disco_usado_gb',), None),
+    ('disk_total', ('disco_total_gb',), None),
+    ('disk_free', ('disco_libre_gb',), None),
+    ('swap_percent', ('swap_percent',), None),
+    ('swap_usado', ('swap_usado_gb',), None),
+    ('swap_total', ('swap_total_gb',), None),
+    ('cpu_temp_celsius', ('cpu_temperatura_celsius',), None),
+    ('battery_percent', ('bateria_porcentaje',), None),
+    ('cpu_power_package', ('cpu_power_package_watts',), None),
+    ('cpu_power_cores', ('cpu_power_cores_watts',), None),
+    ('cpu_clocks', ('cpu_clocks_mhz',), None),
+    ('red_bytes_enviados_seg', ('red_bytes_enviados_seg',), None),
+    ('red_bytes_recibidos_seg', ('red_bytes_recibidos_seg',), None),
+    ('ram_used_bytes', ('memoria_usada_bytes',), None),
+    ('ram_total_bytes', ('memoria_total_bytes',), None),
+    ('ram_free_bytes', ('memoria_libre_bytes',), None),
+    ('disk_used_bytes', ('disco_usado_bytes',), None),
+    ('disk_total_bytes', ('disco_total_bytes',), None),
+    ('disk_free_bytes', ('disco_libre_bytes',), None),
+    ('swap_used_bytes', ('swap_usado_bytes',), None),
+    ('swap_total_bytes', ('swap_total_bytes',), None),
+    ('os_name', ('os_name',), None),
+    ('procesador_nombre', ('procesador_nombre',), None),
+    ('cores_logicos', ('procesador_nucleos_logicos',), None),
+    ('cores_fisicos', ('procesador_nucleos_fisicos',), None),
+    ('fecha_arranque', ('os_last_boot_up_time',), None),
+    ('placa_base_fabricante', ('placa_base_fabricante',), 'Desconocido'),
+    ('placa_base_producto', ('placa_base_producto',), 'Desconocido'),
+)
+
+# Columnas de la tabla 'metricas' escritas a partir de la muestra (mismo nombre que el campo).
+COLUMNAS_METRICAS = (
+    'timestamp', 'hostname', 'username', 'cpu_percent', 'cpu_freq',
+    'ram_percent', 'ram_used', 'ram_total', 'ram_free', 'disk_percent',
+    'disk_used', 'disk_total', 'disk_free', 'swap_percent', 'swap_usado',
+    'swap_total', 'cpu_temp_celsius', 'battery_percent', 'cpu_power_package',
+    'cpu_power_cores', 'cpu_clocks', 'red_bytes_enviados_seg', 'red_bytes_recibidos_seg',
+)
+
+# Columnas de valores de la tabla 'metricas_v2' (esquema compacto de SQLite); la clave
+# (ts, host_id) y user_id las resuelve el DBManager. Los tamaños se guardan en bytes.
+COLUMNAS_METRICAS_V2 = (
+    'cpu_percent', 'cpu_freq', 'ram_percent', 'ram_used_bytes', 'ram_total_bytes',
+    'ram_free_bytes', 'disk_percent', 'disk_used_bytes', 'disk_total_bytes', 'disk_free_bytes',
+    'swap_percent', 'swap_used_bytes', 'swap_total_bytes', 'cpu_temp_celsius', 'battery_percent',
+    'cpu_power_package', 'cpu_power_cores', 'cpu_clocks', 'red_bytes_enviados_seg', 'red_bytes_recibidos_seg',
+)
+
+# Columnas de la tabla 'info_maquina' (clave primaria: hostname, username).
+COLUMNAS_INFO_MAQUINA = (
+    'hostname', 'username', 'timestamp', 'os_name', 'placa_base',
+    'procesador_nombre', 'cores_logicos', 'cores_fisicos', 'fecha_arranque',
+)
+
+# Sentencias de escritura de la muestra, comunes a SQLite y DuckDB.
+SQL_INSERT_METRICAS = (
+    f"INSERT INTO metricas ({', '.join(COLUMNAS_METRICAS)}) "
+    f"VALUES ({', '.join('?' * len(COLUMNAS_METRICAS))})"
+)
+SQL_UPSERT_INFO_MAQUINA = (
+    f"INSERT INTO info_maquina ({', '.join(COLUMNAS_INFO_MAQUINA)}) "
+    f"VALUES ({', '.join('?' * len(COLUMNAS_INFO_MAQUINA))}) "
+    f"ON CONFLICT (hostname, username) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in COLUMNAS_INFO_MAQUINA[2:])
+)
+
+# Lectores compilados de las filas de cada tabla (retornan una tupla en el orden de las columnas).
+_fila_metricas = attrgetter(*COLUMNAS_METRICAS)
+_valores_metricas_v2 = attrgetter(*COLUMNAS_METRICAS_V2)
+_fila_info_maquina = attrgetter(*COLUMNAS_INFO_MAQUINA)
+
+def combinar_placa_base(fabricante, producto):
+    """
+    Combina fabricante y producto de la placa base en 'Fabricante - Producto'.
+    Se elimina el separador si alguna de las partes es 'Desconocido'.
+    """
+    if fabricante == 'Desconocido' and producto == 'Desconocido':
+        return 'Desconocido'
+    return f"{fabricante} - {producto}".replace("Desconocido - ", "").replace(" - Desconocido", "")
+
+def _o(valor, defecto=0):
+    """Valor a mostrar en el log: el defecto si la métrica no está disponible."""
+    return defecto if valor is None else valor
+
+class MetricSample:
+    """
+    Muestra de métricas de un ciclo con los campos ya normalizados.
+
+    Reemplaza al diccionario combinado como entrada de los destinos (SQLite,
+    DuckDB y log): las cadenas de respaldo entre fuentes (psutil -> OHM) se
+    resuelven una sola vez al construir la muestra con from_metrics(), y cada
+    destino toma sus columnas con metric_row() o machine_info_row().
+    """
+    __slots__ = tuple(campo for campo, _, _ in MAPA_CAMPOS) + ('placa_base',)
+
+    @classmethod
+    def from_metrics(cls, metricas):
+        """
+        Construye la muestra a partir del diccionario combinado de las fuentes.
+
+        Args:
+            metricas (dict): Métricas combinadas (psutil, WMI y OHM) del ciclo.
+
+        Returns:
+            MetricSample: La muestra normalizada.
+        """
+        sample = cls.__new__(cls)
+        get = metricas.get
+        for campo, claves, defecto in MAPA_CAMPOS:
+            valor = None
+            for clave in claves:
+                valor = get(clave)
+                if valor is not None:
+                    break
+            setattr(sample, campo, defecto if valor is None else valor)
+        sample.placa_base = combinar_placa_base(sample.placa_base_fabricante, sample.placa_base_producto)
+        return sample
+
+    def metric_row(self):
+        """Retorna los valores de la fila de 'metricas' en el orden de COLUMNAS_METRICAS."""
+        return _fila_metricas(self)
+
+    def metric_values_v2(self):
+        """Retorna los valores de 'metricas_v2' en el orden de COLUMNAS_METRICAS_V2 (sin la clave)."""
+        return _valores_metricas_v2(self)
+
+    def machine_info_row(self):
+        """Retorna los valores de la fila de 'info_maquina' en el orden de COLUMNAS_INFO_MAQUINA."""
+        return _fila_info_maquina(self)
+
+    def metrics_message(self):
+        """Mensaje de log con las métricas del ciclo."""
+        return (
+            f"Hostname: {_o(self.hostname, 'N/A')}"
+            f" | User: {_o(self.username, 'N/A')}"
+            f" | CPU %: {self.cpu_percent}"
+            f" | CPU MHz: {_o(self.cpu_freq)}"
+            f" | CPU Bus MHz: {_o(self.cpu_clocks)}"
+            f" | RAM %: {self.ram_percent}"
+            f" | RAM Used GB: {self.ram_used}"
+            f" | RAM Total GB: {_o(self.ram_total)}"
+            f" | RAM free GB: {self.ram_free}"
+            f" | Disco %: {self.disk_percent}"
+            f" | Disco Used GB: {_o(self.disk_used)}"
+            f" | Disco Total GB: {_o(self.disk_total)}"
+            f" | Disco Free GB: {_o(self.disk_free)}"
+            f" | SWAP %: {_o(self.swap_percent)}"
+            f" | SWAP Used GB: {_o(self.swap_usado)}"
+            f" | SWAP Total GB: {_o(self.swap_total)}"
+            f" | Red Bytes/s: Sent: {_o(self.red_bytes_enviados_seg)} - Recv: {_o(self.red_bytes_recibidos_seg)}"
+            f" | CPU ºC: {_o(self.cpu_temp_celsius)}"
+            f" | Battery %: {_o(self.battery_percent)}"
+            f" | CPU W: {_o(self.cpu_power_package)}"
+            f" | CPU Core W: {_o(self.cpu_power_cores)}"
+        )
+
+    def machine_info_message(self):
+        """Mensaje de log con la información de la máquina."""
+        return (
+            f"Hostname: {_o(self.hostname, 'N/A')}"
+            f" | User: {_o(self.username, 'N/A')}"
+            f" | OS Name: {_o(self.os_name, 'Desconocido')}"
+            f" | Motherboard Name: {self.placa_base}"
+            f" | Processor Name: {_o(self.procesador_nombre, 'Desconocido')}"
+            f" - Cores: Logical: {_o(self.cores_logicos, 'N/A')}"
+            f" / Physical: {_o(self.cores_fisicos, 'N/A')}"
+            f" | OS Last Bot Up Time: {_o(self.fecha_arranque, 'Desconocido')}"
+        )
@@ -1,5 +1,8 @@
 import logging
 import os
+import threading
+import time
+import numpy as np
 import clr # Se necesita la biblioteca 'pythonnet'
 from System import Nullable # Importación necesaria para el uso de la DLL
 
@@ -10,6 +13,55 @@ openhardwaremonitor_hwtypes = {
     'HDD': 'Disco Duro'
 }
 
+# Diccionario para mapear tipos de sensores a sus unidades.
+sensor_units = {
+    'Temperature': '°C',
+    'Fan': 'RPM',
+    'Load': '%',
+    'Power': 'W',
+    'Clock': 'MHz',
+    'Voltage': 'V',
+    'Data': 'GB',
+    'Flow': 'L/h',
+    'Control': '%',
+    'Factor': ''
+}
+
+# Serializa las llamadas a Update() sobre el mismo handle desde distintos colectores.
+_ohm_lock = threading.Lock()
+
+# Segundos durante los que un Update() sigue vigente para otro colector (0 = siempre se actualiza)
+# y último Update() de cada componente: id -> (componente, instante monotónico).
+_vigencia_update = 0.0
+_ultimo_update = {}
+
+def configurar_actualizacion_ohm(vigencia):
+    """
+    Configura cuánto tiempo sirve el Update() de un componente a los demás colectores.
+
+    El índice de sensores y el flujo genérico leen el mismo hardware en cada ciclo; con
+    una vigencia menor que el intervalo del agente, el segundo colector del ciclo lee
+    los valores que dejó el primero sin volver a actualizar el componente.
+
+    Args:
+        vigencia (float): Segundos de vigencia de un Update(). 0 desactiva la reutilización.
+    """
+    global _vigencia_update
+    with _ohm_lock:
+        _vigencia_update = max(0.0, float(vigencia))
+        _ultimo_update.clear()
+
+def _actualizar_hardware(hardware_items):
+    """Llama a Update() en los componentes sin un Update() vigente. Debe llamarse con _ohm_lock."""
+    ahora = time.monotonic()
+    for hardware_item in hardware_items:
+        ultimo = _ultimo_update.get(id(hardware_item))
+        if ultimo is not None and ultimo[0] is hardware_item and ahora - ultimo[1] < _vigencia_update:
+            continue
+        hardware_item.Update()
+        if _vigencia_update:
+            _ultimo_update[id(hardware_item)] = (hardware_item, ahora)
+
 def initialize_openhardwaremonitor(dll_path):
     """
     Inicializa OpenHardwareMonitor llamando directamente a la DLL.
@@ -26,9 +78,12 @@ def initialize_openhardwaremonitor(dll_path):
         from OpenHardwareMonitor import Hardware
         handle = Hardware.Computer()
         
-        # Habilitar los sensores principales.
+        # Habilitar los sensores principales. La placa base (Super I/O) y la GPU
+        # aportan ventiladores, voltajes y temperaturas adicionales.
+        handle.MainboardEnabled = True
         handle.CPUEnabled = True
         handle.RAMEnabled = True
+        handle.GPUEnabled = True
         handle.HDDEnabled = True
         
         handle.Open()
@@ -37,12 +92,123 @@ def initialize_openhardwaremonitor(dll_path):
         logging.error(f"No se pudo inicializar OpenHardwareMonitor. Error: {e}")
         return None
 
-def obtener_metricas_ohm(handle):
+# Sensores que publica el agente: (tipo de hardware, tipo de sensor, nombre del sensor) -> métrica.
+sensores_ohm = {
+    ('CPU', 'Temperature', 'CPU Package'): 'cpu_temperatura_celsius',
+    ('CPU', 'Power', 'CPU Package'): 'cpu_power_package_watts',
+    ('CPU', 'Load', 'CPU Total'): 'cpu_load_percent',
+    ('CPU', 'Power', 'CPU Cores'): 'cpu_power_cores_watts',
+    ('CPU', 'Clock', 'Bus Speed'): 'cpu_clocks_mhz',
+    ('RAM', 'Data', 'Used Memory'): 'ram_load_used_gb',
+    ('RAM', 'Data', 'Available Memory'): 'ram_load_free_gb',
+    ('RAM', 'Load', 'Memory'): 'ram_load_percent',
+    ('HDD', 'Load', 'Used Space'): 'hdd_used_gb',
+}
+
+# Métrica con el nombre del componente por tipo de hardware.
+nombres_hardware_ohm = {
+    'CPU': 'cpu_name',
+    'RAM': 'ram_name',
+    'HDD': 'hdd_name',
+}
+
+class OHMSensorIndex:
+    """
+    Índice precalculado de los sensores de OpenHardwareMonitor que usa el agente.
+
+    Se construye una sola vez recorriendo el hardware y resolviendo cada
+    (tipo de hardware, tipo de sensor, nombre) a su objeto sensor. En cada ciclo
+    solo se actualiza el hardware que posee algún sensor buscado y se lee
+    directamente su 'Value', sin recorrer ni convertir a texto el resto.
+    """
+
+    def __init__(self, handle, wanted=None):
+        """
+        Args:
+            handle (Hardware.Computer): El handle de la clase Computer de OpenHardwareMonitor.
+            wanted (dict): Mapeo (tipo de hardware, tipo de sensor, nombre) -> métrica.
+                           Por defecto 'sensores_ohm'.
+        """
+        self._handle = handle
+        self._wanted = wanted if wanted is not None else sensores_ohm
+        self._sensors = {}
+        self._hardware = []
+        self._names = {}
+        self.build()
+
+    def build(self):
+        """Recorre el hardware y construye el índice de sensores."""
+        sensors = {}
+        owners = {}
+        names = {}
+        for hardware_item in self._handle.Hardware:
+            hw_type = hardware_item.HardwareType.ToString()
+            name_metric = nombres_hardware_ohm.get(hw_type)
+            if name_metric:
+                names[name_metric] = hardware_item.Name
+
+            for sensor in hardware_item.Sensors:
+                metric = self._wanted.get((hw_type, sensor.SensorType.ToString(), sensor.Name))
+                if metric:
+                    # Si varios componentes publican la misma métrica prevalece el último,
+                    # igual que en el recorrido completo.
+                    sensors[metric] = sensor
+                    owners[metric] = hardware_item
+
+        # Solo se actualiza el hardware que posee algún sensor indexado (sin duplicados).
+        hardware = []
+        for hardware_item in owners.values():
+            if not any(hardware_item is item for item in hardware):
+                hardware.append(hardware_item)
+
+        self._sensors = sensors
+        self._hardware = hardware
+        self._names = names
+        logging.debug(f"Índice de sensores OHM construido: {len(sensors)} sensores en {len(hardware)} componentes.")
+
+    def read(self):
+        """
+        Actualiza el hardware indexado (salvo el que tenga un Update() vigente) y lee los sensores.
+
+        Returns:
+            dict: Un diccionario con las métricas de OHM.
+        """
+        with _ohm_lock:
+            _actualizar_hardware(self._hardware)
+
+            metricas_ohm = dict(self._names)
+            for metric, sensor in self._sensors.items():
+                value = sensor.Value
+                if value is not None:
+                    metricas_ohm[metric] = round(float(value), 2)
+        return metricas_ohm
+
+def construir_indice_ohm(handle):
+    """
+    Construye el índice de sensores a partir del handle de OpenHardwareMonitor.
+
+    Args:
+        handle (Hardware.Computer): El handle retornado por initialize_openhardwaremonitor.
+
+    Returns:
+        OHMSensorIndex: El índice de sensores, o None si no hay handle o falla la construcción.
+    """
+    if not handle:
+        return None
+    try:
+        return OHMSensorIndex(handle)
+    except Exception as e:
+        logging.error(f"Error al construir el índice de sensores de OpenHardwareMonitor: {e}")
+        return None
+
+def obtener_metricas_ohm(handle, index=None):
     """
     Obtiene métricas de la CPU, RAM y disco duro usando la DLL de OpenHardwareMonitor.
 
     Args:
         handle (Hardware.Computer): El handle de la clase Computer de OpenHardwareMonitor.
+        index (OHMSensorIndex): Índice de sensores precalculado. Si es None se construye
+                                uno temporal (recorrido completo del hardware).
 
     Returns:
         dict: Un diccionario con las métricas de OHM. Retorna un diccionario vacío en caso de error.
@@ -50,67 +216,170 @@ def obtener_metricas_ohm(handle):
     if not handle:
         return {} # Retornar un diccionario vacío para evitar errores
 
-    metricas_ohm = {}
-    
     try:
-        # Itera sobre los componentes de hardware principales (CPU, RAM, HDD, etc.).
-        for hardware_item in handle.Hardware:
-            hardware_item.Update()  # Actualiza los datos del hardware.
-            
-            # Obtiene el nombre del componente de hardware para una mejor presentación.
-            hw_type_name = openhardwaremonitor_hwtypes.get(hardware_item.HardwareType.ToString(), hardware_item.HardwareType.ToString())
-
-            if hw_type_name == 'CPU':
-                metricas_ohm['cpu_name'] = hardware_item.Name
-                for sensor in hardware_item.Sensors:
-                    sensor_type_str = sensor.SensorType.ToString()
-                    sensor_name = sensor.Name
-                    
-                    if sensor.Value is None:
-                        continue
-
-                    if sensor_name == 'CPU Package':
-                        if sensor_type_str == 'Temperature':
-                            metricas_ohm['cpu_temperatura_celsius'] = round(float(sensor.Value), 2)
-                        elif sensor_type_str == 'Power':
-                            metricas_ohm['cpu_power_package_watts'] = round(float(sensor.Value), 2)
-                    elif sensor_name == 'CPU Total' and sensor_type_str == 'Load':
-                        metricas_ohm['cpu_load_percent'] = round(float(sensor.Value), 2)
-                    elif sensor_name == 'CPU Cores' and sensor_type_str == 'Power':
-                        metricas_ohm['cpu_power_cores_watts'] = round(float(sensor.Value), 2)
-                    elif sensor_name == 'Bus Speed' and sensor_type_str == 'Clock':
-                        metricas_ohm['cpu_clocks_mhz'] = round(float(sensor.Value), 2)
-
-            elif hw_type_name == 'RAM':
-                metricas_ohm['ram_name'] = hardware_item.Name
-                for sensor in hardware_item.Sensors:
-                    sensor_type_str = sensor.SensorType.ToString()
-                    sensor_name = sensor.Name
-                    
-                    if sensor.Value is None:
-                        continue
-                    
-                    if sensor_name == 'Used Memory' and sensor_type_str == 'Data':
-                        metricas_ohm['ram_load_used_gb'] = round(float(sensor.Value), 2)
-                    elif sensor_name == 'Available Memory' and sensor_type_str == 'Data':
-                        metricas_ohm['ram_load_free_gb'] = round(float(sensor.Value), 2)
-                    elif sensor_name == 'Memory' and sensor_type_str == 'Load':
-                        metricas_ohm['ram_load_percent'] = round(float(sensor.Value), 2)
-
-            elif hw_type_name == 'Disco Duro':
-                metricas_ohm['hdd_name'] = hardware_item.Name
-                for sensor in hardware_item.Sensors:
-                    sensor_type_str = sensor.SensorType.ToString()
-                    sensor_name = sensor.Name
-
-                    if sensor.Value is None:
-                        continue
-
-                    if sensor_name == 'Used Space' and sensor_type_str == 'Load':
-                        metricas_ohm['hdd_used_gb'] = round(float(sensor.Value), 2)
-
+        if index is None:
+            index = OHMSensorIndex(handle)
+        return index.read()
     except Exception as e:
         logging.error(f"Error al obtener métricas con OpenHardwareMonitor DLL: {e}")
+        if index is not None:
+            # El hardware pudo cambiar (ej. disco extraído): se reconstruye el índice para el siguiente ciclo.
+            try:
+                index.build()
+            except Exception as rebuild_error:
+                logging.error(f"Error al reconstruir el índice de sensores de OpenHardwareMonitor: {rebuild_error}")
         return {} # Retornar un diccionario vacío para evitar fallos en el log
 
-    return metricas_ohm
+def _recorrer_hardware(hardware_items):
+    """Recorre el hardware y su sub-hardware (ej. el Super I/O de la placa base)."""
+    for hardware_item in hardware_items:
+        yield hardware_item
+        yield from _recorrer_hardware(getattr(hardware_item, 'SubHardware', None) or [])
+
+def _clave_sensor(hardware_item, hw_type, sensor, sensor_type):
+    """
+    Clave estable de un sensor: el Identifier de OHM (ej. '/intelcpu/0/temperature/0')
+    o, si no está disponible, la combinación de hardware, tipo y nombre.
+    """
+    identifier = getattr(sensor, 'Identifier', None)
+    if identifier is not None:
+        return identifier.ToString()
+    return f"{hw_type}/{hardware_item.Name}/{sensor_type}/{sensor.Name}"
+
+class OHMSensorStream:
+    """
+    Colector genérico de todos los sensores de OpenHardwareMonitor en formato largo.
+
+    Cada sensor recibe un identificador numérico (sensor_id) estable, registrado en
+    un catálogo (clave -> sensor_id) que se persiste en la tabla diccionario. Cada
+    lectura devuelve dos arreglos paralelos: los sensor_id (uint16) y sus valores
+    (float32), sin añadir columnas a la tabla 'metricas'.
+    """
+
+    def __init__(self, handle, catalog=None):
+        """
+        Args:
+            handle (Hardware.Computer): El handle de la clase Computer de OpenHardwareMonitor.
+            catalog (dict): Catálogo clave -> sensor_id ya persistido. Los sensores nuevos
+                            reciben el siguiente identificador libre.
+        """
+        self._handle = handle
+        self._catalog = dict(catalog) if catalog else {}
+        self._hardware = []
+        self._sensors = []
+        self._ids = np.empty(0, dtype=np.uint16)
+        self._values = np.empty(0, dtype=np.float32)
+        self._new_definitions = []
+        self.definitions = {}
+        self.build()
+
+    def _next_id(self):
+        return max(self._catalog.values(), default=0) + 1
+
+    def build(self):
+        """Recorre el hardware (incluido el sub-hardware) y asigna un sensor_id a cada sensor."""
+        hardware = []
+        sensors = []
+        ids = []
+        for hardware_item in _recorrer_hardware(self._handle.Hardware):
+            hardware.append(hardware_item)
+            hw_type = hardware_item.HardwareType.ToString()
+            for sensor in hardware_item.Sensors:
+                sensor_type = sensor.SensorType.ToString()
+                clave = _clave_sensor(hardware_item, hw_type, sensor, sensor_type)
+                sensor_id = self._catalog.get(clave)
+                nuevo = sensor_id is None
+                if nuevo:
+                    sensor_id = self._next_id()
+                    self._catalog[clave] = sensor_id
+                if sensor_id not in self.definitions:
+                    definition = {
+                        'sensor_id': sensor_id,
+                        'clave': clave,
+                        'hardware': hardware_item.Name,
+                        'tipo_hardware': hw_type,
+                        'nombre': sensor.Name,
+                        'tipo': sensor_type,
+                        'unidad': sensor_units.get(sensor_type, ''),
+                    }
+                    self.definitions[sensor_id] = definition
+                    if nuevo:
+                        # Solo los sensores sin sensor_id persistido se entregan para el catálogo.
+                        self._new_definitions.append(definition)
+                sensors.append(sensor)
+                ids.append(sensor_id)
+
+        self._hardware = hardware
+        self._sensors = sensors
+        self._ids = np.array(ids, dtype=np.uint16)
+        self._values = np.empty(len(sensors), dtype=np.float32)
+        logging.debug(f"Flujo de sensores OHM construido: {len(sensors)} sensores en {len(hardware)} componentes.")
+
+    def take_new_definitions(self):
+        """
+        Retorna las definiciones de sensores aún no persistidas y las marca como entregadas.
+
+        Returns:
+            list: Diccionarios con sensor_id, clave, hardware, tipo_hardware, nombre, tipo y unidad.
+        """
+        nuevas, self._new_definitions = self._new_definitions, []
+        return nuevas
+
+    def read(self):
+        """
+        Actualiza todo el hardware (salvo el que tenga un Update() vigente) y lee todos los sensores.
+
+        Returns:
+            tuple: (sensor_ids uint16, valores float32). Se omiten los sensores sin valor.
+        """
+        values = self._values
+        with _ohm_lock:
+            _actualizar_hardware(self._hardware)
+            for i, sensor in enumerate(self._sensors):
+                value = sensor.Value
+                values[i] = np.nan if value is None else value
+        valid = ~np.isnan(values)
+        return self._ids[valid], values[valid]
+
+def construir_flujo_sensores_ohm(handle, catalog=None):
+    """
+    Construye el colector genérico de sensores a partir del handle de OpenHardwareMonitor.
+
+    Args:
+        handle (Hardware.Computer): El handle retornado por initialize_openhardwaremonitor.
+        catalog (dict): Catálogo clave -> sensor_id ya persistido.
+
+    Returns:
+        OHMSensorStream: El colector de sensores, o None si no hay handle o falla la construcción.
+    """
+    if not handle:
+        return None
+    try:
+        return OHMSensorStream(handle, catalog)
+    except Exception as e:
+        logging.error(f"Error al construir el flujo de sensores de OpenHardwareMonitor: {e}")
+        return None
+
+def obtener_sensores_ohm(stream):
+    """
+    Obtiene todos los sensores de OpenHardwareMonitor como pares (sensor_id, valor).
+
+    Args:
+        stream (OHMSensorStream): El colector construido con construir_flujo_sensores_ohm.
+
+    Returns:
+        tuple: (sensor_ids uint16, valores float32). Retorna None en caso de error.
+    """
+    if stream is None:
+        return None
+
+    try:
+        return stream.read()
+    except Exception as e:
+        logging.error(f"Error al obtener los sensores de OpenHardwareMonitor: {e}")
+        # El hardware pudo cambiar: se reconstruye el flujo (los sensores nuevos reciben un id nuevo).
+        try:
+            stream.build()
+        except Exception as rebuild_error:
+            logging.error(f"Error al reconstruir el flujo de sensores de OpenHardwareMonitor: {rebuild_error}")
+        return None
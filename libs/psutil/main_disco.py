@@ -0,0 +1,146 @@
+import psutil
+import logging
+import time
+
+def _es_volumen_valido(particion):
+    """Descarta unidades sin sistema de archivos (ej. lectores de CD vacíos en Windows)."""
+    return bool(particion.fstype) and 'cdrom' not in particion.opts
+
+class DiskCollector:
+    """
+    Colector de todos los volúmenes y discos del equipo.
+
+    El mapa de particiones (disk_partitions()) se cachea y solo se vuelve a leer
+    cuando cambia el conjunto de discos de disk_io_counters(perdisk=True), cuando
+    falla la lectura de un volumen (unidad extraída) o cada 'refresh_interval'
+    segundos como respaldo. Las tasas de E/S por disco se calculan a partir de la
+    diferencia entre dos lecturas consecutivas de los contadores.
+    """
+
+    def __init__(self, psutil_module=psutil, clock=time.monotonic, refresh_interval=300):
+        """
+        Args:
+            psutil_module (module): Módulo psutil (o un sustituto para pruebas).
+            clock (callable): Reloj monotónico usado para el intervalo entre lecturas.
+            refresh_interval (float): Segundos máximos entre relecturas del mapa de particiones.
+        """
+        self._psutil = psutil_module
+        self._clock = clock
+        self._refresh_interval = refresh_interval
+        self._partitions = None
+        self._partitions_time = None
+        self._disk_keys = None
+        self._previous = None
+        self._previous_time = None
+        self.partition_refreshes = 0
+
+    def _refresh_partitions(self, now):
+        """Relee el mapa de particiones (un volumen por punto de montaje)."""
+        volumenes = {}
+        for particion in self._psutil.disk_partitions(all=False):
+            if _es_volumen_valido(particion) and particion.mountpoint not in volumenes:
+                volumenes[particion.mountpoint] = particion
+        self._partitions = list(volumenes.values())
+        self._partitions_time = now
+        self.partition_refreshes += 1
+        logging.debug(f"Mapa de particiones actualizado: {[p.mountpoint for p in self._partitions]}")
+
+    def _leer_volumenes(self):
+        """Lee el uso de cada volumen. Retorna (volúmenes, True si falló alguno)."""
+        volumenes = []
+        fallo = False
+        for particion in self._partitions:
+            try:
+                uso = self._psutil.disk_usage(particion.mountpoint)
+            except (OSError, RuntimeError) as e:
+                logging.warning(f"No se pudo leer el volumen {particion.mountpoint}: {e}")
+                fallo = True
+                continue
+            volumenes.append({
+                'mountpoint': particion.mountpoint,
+                'device': particion.device,
+                'fstype': particion.fstype,
+                'total_bytes': uso.total,
+                'usado_bytes': uso.used,
+                'libre_bytes': uso.free,
+                'percent': uso.percent,
+            })
+        return volumenes, fallo
+
+    def _tasas_discos(self, counters, elapsed):
+        """Calcula las tasas por disco a partir de los contadores de la lectura anterior."""
+        discos = []
+        if self._previous is None or elapsed <= 0:
+            return discos
+        for disco, actual in counters.items():
+            anterior = self._previous.get(disco)
+            if anterior is None:
+                continue
+            deltas = (
+                actual.read_bytes - anterior.read_bytes,
+                actual.write_bytes - anterior.write_bytes,
+                actual.read_count - anterior.read_count,
+                actual.write_count - anterior.write_count,
+            )
+            # Un contador que retrocede indica un reinicio del contador: se omite el disco en este ciclo.
+            if min(deltas) < 0:
+                continue
+            # busy_time solo existe en Linux; en Windows se aproxima con el tiempo de lectura + escritura.
+            if hasattr(actual, 'busy_time'):
+                ocupado_ms = actual.busy_time - anterior.busy_time
+            else:
+                ocupado_ms = (actual.read_time + actual.write_time) - (anterior.read_time + anterior.write_time)
+            discos.append({
+                'disco': disco,
+                'lectura_bytes_seg': round(deltas[0] / elapsed, 2),
+                'escritura_bytes_seg': round(deltas[1] / elapsed, 2),
+                'lecturas_seg': round(deltas[2] / elapsed, 2),
+                'escrituras_seg': round(deltas[3] / elapsed, 2),
+                'ocupado_percent': round(min(max(ocupado_ms, 0) / (elapsed * 1000) * 100, 100.0), 2),
+            })
+        return discos
+
+    def collect(self):
+        """
+        Lee el uso de todos los volúmenes y las tasas de E/S de cada disco.
+
+        Returns:
+            dict: 'volumenes' (uso por punto de montaje) y 'discos' (tasas por disco;
+                  vacío en la primera lectura).
+        """
+        now = self._clock()
+        counters = self._psutil.disk_io_counters(perdisk=True) or {}
+        disk_keys = frozenset(counters)
+
+        if (self._partitions is None or disk_keys != self._disk_keys
+                or now - self._partitions_time >= self._refresh_interval):
+            self._refresh_partitions(now)
+        self._disk_keys = disk_keys
+
+        volumenes, fallo = self._leer_volumenes()
+        if fallo:
+            # Un volumen dejó de estar disponible: el mapa se relee en este mismo ciclo.
+            self._refresh_partitions(now)
+            volumenes, _ = self._leer_volumenes()
+
+        elapsed = now - self._previous_time if self._previous_time is not None else 0.0
+        discos = self._tasas_discos(counters, elapsed)
+        self._previous = counters
+        self._previous_time = now
+        return {'volumenes': volumenes, 'discos': discos}
+
+# Colector compartido entre ciclos de recolección.
+_collector = DiskCollector()
+
+def obtener_metricas_discos():
+    """
+    Recopila el uso de todos los volúmenes y las tasas de E/S por disco.
+
+    Returns:
+        dict: 'volumenes' y 'discos' (ver DiskCollector.collect()). Retorna None en caso de error.
+    """
+    try:
+        return _collector.collect()
+    except Exception as e:
+        logging.error(f"Error al obtener métricas de discos: {e}")
+        return None
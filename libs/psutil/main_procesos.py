@@ -0,0 +1,635 @@
+import psutil
+import logging
+import time
+import heapq
+import threading
+from operator import itemgetter
+import numpy as np
+
+def _leer_atributo(func, default=None):
+    """Lee un atributo de un proceso; retorna default si el acceso es denegado."""
+    try:
+        return func()
+    except (psutil.AccessDenied, psutil.ZombieProcess):
+        return default
+
+class NameDictionary:
+    """
+    Diccionario de nombres de proceso: asigna a cada nombre un identificador entero
+    estable (name_id) para codificar las columnas y las tablas por identificador.
+    """
+
+    def __init__(self, catalog=None):
+        """
+        Args:
+            catalog (dict): Catálogo nombre -> name_id ya persistido.
+        """
+        self._lock = threading.Lock()
+        self._ids = {}
+        self.names = []
+        self._new = []
+        if catalog:
+            self.load(catalog)
+
+    def load(self, catalog):
+        """Incorpora un catálogo nombre -> name_id persistido (sin marcarlo como nuevo)."""
+        with self._lock:
+            for name, name_id in catalog.items():
+                self._ids[name] = name_id
+                if name_id >= len(self.names):
+                    self.names.extend([''] * (name_id + 1 - len(self.names)))
+                self.names[name_id] = name
+
+    def id(self, name):
+        """Retorna el name_id del nombre, asignando uno nuevo si no existe."""
+        name_id = self._ids.get(name)
+        if name_id is None:
+            with self._lock:
+                name_id = self._ids.get(name)
+                if name_id is None:
+                    name_id = len(self.names)
+                    self._ids[name] = name_id
+                    self.names.append(name)
+                    self._new.append((name_id, name))
+        return name_id
+
+    def take_new(self):
+        """
+        Retorna los pares (name_id, nombre) aún no persistidos y los marca como entregados.
+
+        Returns:
+            list: Tuplas (name_id, nombre).
+        """
+        with self._lock:
+            nuevos, self._new = self._new, []
+        return nuevos
+
+# Tipos de evento del ciclo de vida de un proceso.
+EVENTO_INICIO = 'inicio'
+EVENTO_FIN = 'fin'
+
+class ProcessTracker:
+    """
+    Seguimiento incremental de la tabla de procesos.
+
+    Conserva los objetos psutil.Process entre ciclos indexados por (pid, create_time).
+    Cada revisión solo consulta la lista de PIDs y la compara con la de la revisión
+    anterior; los atributos se leen una única vez, dentro de un bloque oneshot(), para
+    los PIDs nuevos. Un PID reutilizado por otro proceso entre dos revisiones no cambia
+    la lista: lo detecta ProcessRateSampler (sus contadores retroceden) y se confirma
+    con verify(), que lo registra como fin + inicio.
+
+    Cada revisión registra eventos de inicio y fin (diferencia de conjuntos entre
+    revisiones). update() entrega además la diferencia acumulada desde la anterior
+    llamada a update(), de modo que las revisiones rápidas intermedias (poll())
+    detectan los procesos de vida corta sin alterar la tabla de procesos activos.
+    """
+
+    def __init__(self, psutil_module=psutil, wall_clock=time.time, names=None):
+        """
+        Args:
+            psutil_module: Módulo que provee pids() y Process() (inyectable para pruebas).
+            wall_clock (callable): Reloj de pared usado para los eventos y las duraciones.
+            names (NameDictionary): Diccionario de nombres. Por defecto uno nuevo.
+        """
+        self._psutil = psutil_module
+        self._wall_clock = wall_clock
+        self.names = names if names is not None else NameDictionary()
+        self._lock = threading.Lock()
+        self._procesos = {}
+        self._claves_por_pid = {}
+        self._primera = True
+        self._entregada = False
+        # Diferencia acumulada desde el último update() y eventos pendientes de entregar.
+        self._iniciados = {}
+        self._finalizados = {}
+        self._eventos = []
+
+    @property
+    def initialized(self):
+        """True si ya se realizó al menos una actualización."""
+        return not self._primera
+
+    def _leer_proceso_nuevo(self, pid):
+        """
+        Crea el psutil.Process de un PID nuevo y lee sus atributos en un bloque oneshot().
+        Retorna None si el proceso terminó antes de leerlo.
+        """
+        try:
+            proc = self._psutil.Process(pid)
+            try:
+                create_time = proc.create_time()
+            except self._psutil.AccessDenied:
+                # Sin acceso a create_time (procesos del sistema): se identifica por PID.
+                create_time = 0.0
+            with proc.oneshot():
+                info = {
+                    'pid': pid,
+                    'create_time': create_time,
+                    'name': _leer_atributo(proc.name, ''),
+                    'ppid': _leer_atributo(proc.ppid),
+                    'username': _leer_atributo(proc.username),
+                }
+        except (self._psutil.NoSuchProcess, self._psutil.ZombieProcess):
+            return None
+        info['name_id'] = self.names.id(info['name'])
+        return proc, info
+
+    def _registrar_fin(self, clave, ahora, ts):
+        """Elimina un proceso del seguimiento, registra su evento de fin y acumula la diferencia."""
+        entry = self._procesos.pop(clave)
+        if self._claves_por_pid.get(clave[0]) == clave:
+            del self._claves_por_pid[clave[0]]
+        info = dict(entry['info'])
+        if info['create_time']:
+            info['duracion_segundos'] = round(max(ahora - info['create_time'], 0.0), 3)
+        self._eventos.append({'ts': ts, 'evento': EVENTO_FIN, **info})
+        # Un proceso iniciado y finalizado entre dos update() no altera la tabla de activos.
+        if self._iniciados.pop(clave, None) is None:
+            self._finalizados[clave] = info
+
+    def _registrar_inicio(self, proc, info, ts, evento=True):
+        """Incorpora un proceso leído al seguimiento y acumula la diferencia."""
+        clave = (info['pid'], info['create_time'])
+        self._procesos[clave] = {'process': proc, 'info': info}
+        self._claves_por_pid[info['pid']] = clave
+        self._iniciados[clave] = info
+        if evento:
+            self._eventos.append({'ts': ts, 'evento': EVENTO_INICIO, **info})
+        return clave
+
+    def _scan(self):
+        """
+        Revisa la lista de PIDs, actualiza el seguimiento, registra los eventos y
+        acumula la diferencia. Debe llamarse con el bloqueo adquirido.
+        """
+        pids = set(self._psutil.pids())
+        ahora = self._wall_clock()
+        ts = int(ahora * 1000)
+        primera = self._primera
+        self._primera = False
+
+        for pid in self._claves_por_pid.keys() - pids:
+            self._registrar_fin(self._claves_por_pid[pid], ahora, ts)
+
+        for pid in pids - self._claves_por_pid.keys():
+            leido = self._leer_proceso_nuevo(pid)
+            if leido is not None:
+                # La primera revisión es el estado inicial, no inicios de proceso.
+                self._registrar_inicio(*leido, ts, evento=not primera)
+
+    def poll(self):
+        """
+        Revisión rápida: actualiza el seguimiento y registra eventos sin entregar la
+        diferencia (se acumula hasta el siguiente update()). Solo consulta la lista de
+        PIDs; los atributos se leen únicamente para los PIDs nuevos.
+
+        Returns:
+            int: Número de procesos en seguimiento.
+        """
+        with self._lock:
+            self._scan()
+            return len(self._procesos)
+
+    def update(self):
+        """
+        Actualiza el seguimiento con la lista de PIDs actual.
+
+        Returns:
+            dict: 'iniciados' y 'finalizados' desde el último update() (listas de
+                  diccionarios con pid, create_time, name, name_id, ppid y username),
+                  'activos' (número de procesos) y 'completo' (True en la primera
+                  actualización, cuando 'iniciados' es la tabla entera).
+        """
+        with self._lock:
+            # La primera diferencia entregada contiene la tabla entera, aunque poll() se adelante.
+            completo = not self._entregada
+            self._entregada = True
+            self._scan()
+            iniciados = list(self._iniciados.values())
+            finalizados = list(self._finalizados.values())
+            self._iniciados = {}
+            self._finalizados = {}
+            return {
+                'iniciados': iniciados,
+                'finalizados': finalizados,
+                'activos': len(self._procesos),
+                'completo': completo,
+            }
+
+    def verify(self, clave):
+        """
+        Comprueba que el PID de la clave siga siendo el mismo proceso (mismo create_time).
+
+        La revisión por lista de PIDs no ve un PID reutilizado entre dos revisiones;
+        se llama solo para los PIDs sospechosos (contadores que retroceden). Si el PID
+        pasó a otro proceso registra el fin del anterior y el inicio del nuevo, que se
+        entregan en el siguiente update().
+
+        Returns:
+            tuple: La clave (pid, create_time) del proceso que ocupa el PID, o None si
+                   ya no existe.
+        """
+        pid, create_time = clave
+        with self._lock:
+            if clave not in self._procesos:
+                return self._claves_por_pid.get(pid)
+            if not create_time:
+                return clave
+            leido = self._leer_proceso_nuevo(pid)
+            if leido is not None and leido[1]['create_time'] == create_time:
+                return clave
+            ahora = self._wall_clock()
+            ts = int(ahora * 1000)
+            self._registrar_fin(clave, ahora, ts)
+            return self._registrar_inicio(*leido, ts) if leido is not None else None
+
+    def take_events(self):
+        """
+        Retorna los eventos de inicio y fin registrados y los marca como entregados.
+
+        Returns:
+            list: Diccionarios con ts (milisegundos epoch), evento ('inicio' o 'fin'),
+                  pid, create_time, name, name_id, ppid, username y, en los de fin,
+                  duracion_segundos.
+        """
+        with self._lock:
+            eventos, self._eventos = self._eventos, []
+        return eventos
+
+    def info(self, clave):
+        """Retorna la información del proceso identificado por (pid, create_time)."""
+        entry = self._procesos.get(clave)
+        return entry['info'] if entry else None
+
+    def processes(self):
+        """Retorna los pares ((pid, create_time), psutil.Process) en seguimiento."""
+        with self._lock:
+            return [(clave, entry['process']) for clave, entry in self._procesos.items()]
+
+    def snapshot(self):
+        """
+        Retorna la tabla de procesos actual.
+
+        Returns:
+            list: Diccionarios con pid, create_time, name, name_id, ppid y username.
+        """
+        with self._lock:
+            return [dict(entry['info']) for entry in self._procesos.values()]
+
+class ProcessEventPoller:
+    """
+    Revisión rápida de la tabla de procesos en un hilo propio.
+
+    Llama a ProcessTracker.poll() cada 'interval' segundos (menor que el intervalo
+    del agente) para capturar los procesos de vida corta sin ejecutar con más
+    frecuencia el colector completo.
+    """
+
+    def __init__(self, tracker, interval=2.0):
+        """
+        Args:
+            tracker (ProcessTracker): Seguimiento de procesos a revisar.
+            interval (float): Segundos entre revisiones.
+        """
+        self._tracker = tracker
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+
+    def start(self):
+        """Arranca el hilo de revisión si no está en ejecución."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="procesos_eventos", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        """Detiene el hilo de revisión y espera a que termine."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self._tracker.poll()
+                self.polls += 1
+            except Exception as e:
+                logging.error(f"Error en la revisión rápida de procesos: {e}")
+
+# Criterios de ranking: nombre -> campo de la muestra por proceso.
+CRITERIOS_TOP = {
+    'cpu': 'cpu_percent',
+    'ram': 'rss_bytes',
+    'disco': 'io_bytes_seg',
+}
+
+class ProcessRateSampler:
+    """
+    Muestreador sin bloqueo de CPU, memoria y E/S por proceso.
+
+    En cada muestra lee cpu_times(), memory_info() e io_counters() de los procesos
+    del ProcessTracker dentro de un único bloque oneshot() y calcula las tasas a
+    partir de la diferencia con la muestra anterior, en lugar de bloquear con
+    cpu_percent(interval=...) por proceso. El ranking usa un heap acotado (top N).
+    """
+
+    def __init__(self, tracker, cpu_count=None, clock=time.monotonic):
+        """
+        Args:
+            tracker (ProcessTracker): Seguimiento de procesos que provee los psutil.Process.
+            cpu_count (int): Núcleos lógicos para normalizar el % de CPU a 0-100.
+                             Por defecto psutil.cpu_count().
+            clock (callable): Reloj monotónico usado para medir el intervalo entre muestras.
+        """
+        self._tracker = tracker
+        self._cpu_count = cpu_count or psutil.cpu_count() or 1
+        self._clock = clock
+        self._previous = {}
+        self._previous_time = None
+        self.rows = []
+        self.columns = _columnas([])
+
+    def _leer_contadores(self, proc):
+        """Lee (tiempo de CPU, RSS, bytes leídos, bytes escritos) en un bloque oneshot()."""
+        with proc.oneshot():
+            cpu = _leer_atributo(proc.cpu_times)
+            mem = _leer_atributo(proc.memory_info)
+            io = _leer_atributo(proc.io_counters)
+        return (
+            cpu.user + cpu.system if cpu is not None else None,
+            mem.rss if mem is not None else 0,
+            io.read_bytes if io is not None else None,
+            io.write_bytes if io is not None else None,
+        )
+
+    def sample(self):
+        """
+        Calcula las tasas por proceso desde la muestra anterior.
+
+        Returns:
+            list: Diccionarios con pid, name, name_id, cpu_percent, rss_bytes, io_read_bytes_seg,
+                  io_write_bytes_seg e io_bytes_seg (también disponibles como columnas
+                  NumPy en 'columns'). En la primera muestra de un proceso
+                  las tasas son 0.
+        """
+        now = self._clock()
+        elapsed = now - self._previous_time if self._previous_time is not None else 0.0
+        previous = self._previous
+        current = {}
+        rows = []
+        for clave, proc in self._tracker.processes():
+            try:
+                counters = self._leer_contadores(proc)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            before = previous.get(clave)
+            if before is not None and _retrocede(counters, before):
+                # Un contador acumulado que retrocede indica un PID reutilizado: se confirma
+                # con el create_time y el proceso nuevo se trata como primera muestra.
+                clave = self._tracker.verify(clave)
+                if clave is None:
+                    continue
+                before = None
+            current[clave] = counters
+            cpu_time, rss, read_bytes, write_bytes = counters
+
+            cpu_percent = read_rate = write_rate = 0.0
+            if before is not None and elapsed > 0:
+                if cpu_time is not None and before[0] is not None:
+                    cpu_percent = round((cpu_time - before[0]) / elapsed * 100 / self._cpu_count, 2)
+                if read_bytes is not None and before[2] is not None:
+                    read_rate = (read_bytes - before[2]) / elapsed
+                if write_bytes is not None and before[3] is not None:
+                    write_rate = (write_bytes - before[3]) / elapsed
+
+            info = self._tracker.info(clave) or {'name': '', 'name_id': self._tracker.names.id('')}
+            rows.append({
+                'pid': clave[0],
+                'name': info['name'],
+                'name_id': info['name_id'],
+                'cpu_percent': cpu_percent,
+                'rss_bytes': rss,
+                'io_read_bytes_seg': round(read_rate, 2),
+                'io_write_bytes_seg': round(write_rate, 2),
+                'io_bytes_seg': round(read_rate + write_rate, 2),
+            })
+
+        # Solo se conserva el estado de los procesos vivos.
+        self._previous = current
+        self._previous_time = now
+        self.rows = rows
+        self.columns = _columnas(rows)
+        return rows
+
+    def top(self, n=5, criterio='cpu', rows=None):
+        """
+        Retorna los n procesos con mayor consumo según el criterio.
+
+        Args:
+            n (int): Número de procesos.
+            criterio (str): 'cpu', 'ram' o 'disco'.
+            rows (list): Muestra a ordenar. Por defecto la última.
+
+        Returns:
+            list: Los n diccionarios de mayor consumo, de mayor a menor.
+        """
+        return heapq.nlargest(n, self.rows if rows is None else rows, key=itemgetter(CRITERIOS_TOP[criterio]))
+
+def _retrocede(counters, before):
+    """True si el tiempo de CPU o los bytes de E/S acumulados son menores que en la muestra anterior."""
+    return any(
+        actual is not None and anterior is not None and actual < anterior
+        for actual, anterior in ((counters[0], before[0]), (counters[2], before[2]), (counters[3], before[3]))
+    )
+
+# Columnas NumPy de la muestra de procesos y su tipo.
+COLUMNAS_PROCESOS = {
+    'pid': np.int64,
+    'name_id': np.int32,
+    'cpu_percent': np.float32,
+    'rss_bytes': np.int64,
+    'io_read_bytes_seg': np.float32,
+    'io_write_bytes_seg': np.float32,
+}
+
+def _columnas(rows):
+    """Convierte la muestra por proceso en columnas NumPy (ver COLUMNAS_PROCESOS)."""
+    return {
+        campo: np.fromiter((row[campo] for row in rows), dtype=dtype, count=len(rows))
+        for campo, dtype in COLUMNAS_PROCESOS.items()
+    }
+
+# Criterios de agrupación: nombre -> columna agregada por la que se ordena.
+CRITERIOS_GRUPOS = {
+    'name': 'name',
+    'cpu': 'cpu_percent',
+    'ram': 'rss_bytes',
+    'disk': 'io_bytes_seg',
+}
+
+def agrupar_procesos(columns, names, sort_by='ram', direction='desc'):
+    """
+    Agrupa la muestra de procesos por nombre de ejecutable en una sola pasada vectorizada.
+
+    Los nombres vienen codificados como name_id, de modo que las sumas y conteos por
+    grupo se calculan con np.bincount y el orden con un único argsort.
+
+    Args:
+        columns (dict): Columnas NumPy de la muestra (ProcessRateSampler.columns).
+        names (list): Nombres indexados por name_id (NameDictionary.names).
+        sort_by (str): Criterio de orden: 'name', 'cpu', 'ram' o 'disk'.
+        direction (str): 'asc' (ascendente) o 'desc' (descendente).
+
+    Returns:
+        dict: Columnas NumPy por grupo, ordenadas: name_id, name, procesos,
+              cpu_percent, rss_bytes e io_bytes_seg.
+    """
+    name_ids = columns['name_id']
+    size = max(len(names), int(name_ids.max()) + 1 if len(name_ids) else 0)
+    procesos = np.bincount(name_ids, minlength=size)
+    cpu = np.bincount(name_ids, weights=columns['cpu_percent'], minlength=size)
+    rss = np.bincount(name_ids, weights=columns['rss_bytes'], minlength=size)
+    io = np.bincount(name_ids, weights=columns['io_read_bytes_seg'] + columns['io_write_bytes_seg'], minlength=size)
+
+    presentes = np.flatnonzero(procesos)
+    grupos = {
+        'name_id': presentes.astype(np.int32),
+        'name': np.array([names[i] if i < len(names) else '' for i in presentes], dtype=object),
+        'procesos': procesos[presentes],
+        'cpu_percent': np.round(cpu[presentes], 2),
+        'rss_bytes': rss[presentes].astype(np.int64),
+        'io_bytes_seg': np.round(io[presentes], 2),
+    }
+
+    clave = grupos[CRITERIOS_GRUPOS[sort_by]]
+    if sort_by == 'name':
+        clave = np.char.lower(clave.astype(str))
+    orden = np.argsort(clave, kind='stable')
+    if direction == 'desc':
+        orden = orden[::-1]
+    return {campo: valores[orden] for campo, valores in grupos.items()}
+
+def filtrar_procesos_activos(columns, min_cpu_percent=0.5, min_io_bytes_seg=1024):
+    """
+    Filtra las columnas de la muestra y conserva solo los procesos con actividad.
+
+    Args:
+        columns (dict): Columnas NumPy de la muestra (ProcessRateSampler.columns).
+        min_cpu_percent (float): % de CPU mínimo para considerar activo un proceso.
+        min_io_bytes_seg (float): Bytes/s de E/S (lectura + escritura) mínimos.
+
+    Returns:
+        dict: Las mismas columnas, con las filas de los procesos activos.
+    """
+    io = columns['io_read_bytes_seg'] + columns['io_write_bytes_seg']
+    activos = (columns['cpu_percent'] >= min_cpu_percent) | (io >= min_io_bytes_seg)
+    return {campo: valores[activos] for campo, valores in columns.items()}
+
+# Seguimiento y muestreador compartidos por las funciones de alto nivel.
+_tracker = ProcessTracker()
+_sampler = ProcessRateSampler(_tracker)
+
+def obtener_seguimiento_procesos():
+    """
+    Retorna el seguimiento de procesos compartido por los colectores.
+
+    Returns:
+        ProcessTracker: El seguimiento incremental de la tabla de procesos.
+    """
+    return _tracker
+
+def obtener_cambios_procesos():
+    """
+    Actualiza el seguimiento de procesos y retorna los iniciados y finalizados
+    desde el ciclo anterior.
+
+    Returns:
+        dict: El resultado de ProcessTracker.update(). Retorna None en caso de error.
+    """
+    try:
+        return _tracker.update()
+    except Exception as e:
+        logging.error(f"Error al actualizar el seguimiento de procesos: {e}")
+        return None
+
+def obtener_tabla_procesos():
+    """
+    Retorna la tabla de procesos del seguimiento incremental (sin volver a leer los atributos).
+
+    Returns:
+        list: Diccionarios con pid, create_time, name, ppid y username.
+    """
+    return _tracker.snapshot()
+
+def obtener_estado_procesos(top_n=5):
+    """
+    Actualiza el seguimiento de procesos, muestrea sus tasas y calcula los procesos
+    de mayor consumo de CPU, RAM y disco.
+
+    Args:
+        top_n (int): Número de procesos por ranking.
+
+    Returns:
+        dict: 'cambios' (iniciados/finalizados, ver ProcessTracker.update()), 'muestra'
+              (tasas por proceso), 'columnas' (la muestra como columnas NumPy), 'top'
+              (criterio -> lista de procesos) y 'grupos' (agregado por ejecutable,
+              ver agrupar_procesos).
+              Retorna None en caso de error.
+    """
+    try:
+        cambios = _tracker.update()
+        muestra = _sampler.sample()
+        top = {criterio: _sampler.top(top_n, criterio) for criterio in CRITERIOS_TOP}
+        grupos = agrupar_procesos(_sampler.columns, _tracker.names.names)
+    except Exception as e:
+        logging.error(f"Error al obtener el estado de los procesos: {e}")
+        return None
+    return {'cambios': cambios, 'muestra': muestra, 'columnas': _sampler.columns, 'top': top, 'grupos': grupos}
+
+def cargar_nombres_procesos(catalog):
+    """
+    Carga en el diccionario de nombres compartido el catálogo persistido, para que los
+    name_id se mantengan entre reinicios del servicio.
+
+    Args:
+        catalog (dict): Catálogo nombre -> name_id.
+    """
+    _tracker.names.load(catalog)
+
+def obtener_nombres_nuevos_procesos():
+    """
+    Retorna los nombres de proceso registrados desde la última llamada.
+
+    Returns:
+        list: Tuplas (name_id, nombre) pendientes de persistir.
+    """
+    return _tracker.names.take_new()
+
+def obtener_eventos_procesos():
+    """
+    Retorna los eventos de inicio y fin de procesos registrados desde la última llamada.
+
+    Returns:
+        list: Eventos (ver ProcessTracker.take_events()).
+    """
+    return _tracker.take_events()
+
+def iniciar_revision_rapida_procesos(interval):
+    """
+    Arranca la revisión rápida de procesos del seguimiento compartido.
+
+    Args:
+        interval (float): Segundos entre revisiones.
+
+    Returns:
+        ProcessEventPoller: El hilo de revisión, o None si interval no es positivo.
+    """
+    if not interval or interval <= 0:
+        return None
+    poller = ProcessEventPoller(_tracker, interval)
+    poller.start()
+    return poller
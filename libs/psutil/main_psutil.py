@@ -1,62 +1,266 @@
 import psutil
 import logging
+import time
+from libs.psutil.main_procesos import obtener_seguimiento_procesos
 
-def obtener_metricas_psutil():
+def _cpu_total_time(times):
     """
-    Recopila métricas clave del sistema usando la biblioteca psutil.
-    
-    Returns:
-        dict: Un diccionario con las métricas del sistema. Retorna None en caso de error.
+    Suma todos los campos de una instantánea de cpu_times().
+    En Linux 'guest' y 'guest_nice' ya están incluidos en 'user' y 'nice',
+    por lo que se restan para no contarlos dos veces (mismo criterio que psutil).
     """
-    metricas = {}
-    try:
-        metricas['cpu_percent'] = psutil.cpu_percent(interval=1)
-        metricas['cpu_core_logical'] = psutil.cpu_count(logical=True)
-        metricas['cpu_core_physical'] = psutil.cpu_count(logical=False)
-        metricas['cpu_freq_current_mhz'] = psutil.cpu_freq().current if psutil.cpu_freq() else None
-        metricas['cpu_freq_min_mhz'] = psutil.cpu_freq().min if psutil.cpu_freq() else None
-        metricas['cpu_freq_max_mhz'] = psutil.cpu_freq().max if psutil.cpu_freq() else None
-        metricas['cpu_times_user'] = psutil.cpu_times().user
-        metricas['cpu_times_system'] = psutil.cpu_times().system
-        metricas['cpu_times_idle'] = psutil.cpu_times().idle
-        memoria = psutil.virtual_memory()
+    total = sum(times)
+    total -= getattr(times, 'guest', 0)
+    total -= getattr(times, 'guest_nice', 0)
+    return total
+
+def _cpu_busy_time(times):
+    """Tiempo ocupado de una instantánea: total menos 'idle' e 'iowait'."""
+    return _cpu_total_time(times) - times.idle - getattr(times, 'iowait', 0)
+
+def _cpu_percent_delta(previous, current):
+    """
+    Calcula el porcentaje de utilización entre dos instantáneas de cpu_times().
+    Si no hay instantánea previa se usa el acumulado desde el arranque.
+    """
+    if previous is None:
+        total_delta = _cpu_total_time(current)
+        busy_delta = _cpu_busy_time(current)
+    else:
+        total_delta = _cpu_total_time(current) - _cpu_total_time(previous)
+        busy_delta = _cpu_busy_time(current) - _cpu_busy_time(previous)
+    if total_delta <= 0:
+        return 0.0
+    percent = (busy_delta / total_delta) * 100
+    return round(min(max(percent, 0.0), 100.0), 2)
+
+def _sumar_cpu_times(per_core_times):
+    """Combina las instantáneas por núcleo en una instantánea total del mismo tipo."""
+    return type(per_core_times[0])(*map(sum, zip(*per_core_times)))
+
+class CPUSampler:
+    """
+    Muestreador de CPU sin bloqueo basado en deltas de psutil.cpu_times().
+
+    Conserva la instantánea anterior de los contadores por núcleo y calcula la
+    utilización (total y por núcleo) sobre el intervalo real transcurrido entre
+    dos llamadas, en lugar de bloquear el ciclo con psutil.cpu_percent(interval=1).
+    La primera llamada devuelve el promedio desde el arranque del sistema.
+    """
+
+    def __init__(self, cpu_times_func=None, clock=time.monotonic):
+        """
+        Args:
+            cpu_times_func (callable): Función que retorna la lista de cpu_times por núcleo.
+                                       Por defecto psutil.cpu_times(percpu=True).
+            clock (callable): Reloj monotónico usado para medir el intervalo transcurrido.
+        """
+        self._cpu_times_func = cpu_times_func or (lambda: psutil.cpu_times(percpu=True))
+        self._clock = clock
+        self._previous = None
+        self._previous_time = None
+
+    def sample(self, per_core_times=None):
+        """
+        Calcula la utilización de CPU desde la muestra anterior.
+
+        Args:
+            per_core_times (list): Instantánea de cpu_times por núcleo ya leída.
+                                   Si es None se lee con cpu_times_func.
+
+        Returns:
+            dict: 'cpu_percent' (total), 'cpu_percent_por_nucleo' (lista) e
+                  'intervalo_segundos' (None en la primera muestra).
+        """
+        if per_core_times is None:
+            per_core_times = self._cpu_times_func()
+        now = self._clock()
+
+        previous = self._previous
+        # Si cambia el número de núcleos (hotplug), se descarta la instantánea anterior.
+        if previous is not None and len(previous) != len(per_core_times):
+            previous = None
+
+        if previous is None:
+            previous_total = None
+            previous_cores = [None] * len(per_core_times)
+            elapsed = None
+        else:
+            previous_total = _sumar_cpu_times(previous)
+            previous_cores = previous
+            elapsed = round(now - self._previous_time, 3)
+
+        resultado = {
+            'cpu_percent': _cpu_percent_delta(previous_total, _sumar_cpu_times(per_core_times)),
+            'cpu_percent_por_nucleo': [
+                _cpu_percent_delta(prev, curr) for prev, curr in zip(previous_cores, per_core_times)
+            ],
+            'intervalo_segundos': elapsed,
+        }
+
+        self._previous = list(per_core_times)
+        self._previous_time = now
+        return resultado
+
+class PsutilSnapshot:
+    """
+    Capa de instantánea para la recolección con psutil.
+
+    Lee cada fuente de psutil exactamente una vez por ciclo y deriva todas las
+    métricas de esa única lectura. Los datos estáticos (número de núcleos y
+    frecuencias mínima/máxima) se cachean durante la vida del proceso y solo se
+    vuelven a leer con refresh_static(). Cada lectura se registra en un contador
+    por fuente para poder medir las llamadas realizadas.
+    """
+
+    def __init__(self, psutil_module=psutil, disk_path='C:'):
+        """
+        Args:
+            psutil_module (module): Módulo psutil (o un sustituto para pruebas).
+            disk_path (str): Punto de montaje usado para las métricas de disco.
+        """
+        self._psutil = psutil_module
+        self._disk_path = disk_path
+        self._static = None
+        self.call_counts = {}
+        self._cpu_sampler = CPUSampler(cpu_times_func=lambda: self._read('cpu_times', percpu=True))
+
+    def _read(self, source, *args, **kwargs):
+        """Invoca una fuente de psutil y registra la llamada en el contador."""
+        self.call_counts[source] = self.call_counts.get(source, 0) + 1
+        return getattr(self._psutil, source)(*args, **kwargs)
+
+    def refresh_static(self):
+        """
+        Vuelve a leer los datos estáticos del sistema.
+
+        Returns:
+            dict: Los datos estáticos cacheados.
+        """
+        freq = self._read('cpu_freq')
+        self._static = {
+            'cpu_core_logical': self._read('cpu_count', logical=True),
+            'cpu_core_physical': self._read('cpu_count', logical=False),
+            'cpu_freq_min_mhz': freq.min if freq else None,
+            'cpu_freq_max_mhz': freq.max if freq else None,
+        }
+        return self._static
+
+    def collect(self):
+        """
+        Realiza una lectura única de cada fuente y construye las métricas del ciclo.
+
+        Returns:
+            dict: Un diccionario con las métricas del sistema.
+        """
+        if self._static is None:
+            self.refresh_static()
+
+        per_core_times = self._read('cpu_times', percpu=True)
+        freq = self._read('cpu_freq')
+        memoria = self._read('virtual_memory')
+        swap = self._read('swap_memory')
+        disco = self._read('disk_usage', self._disk_path)
+        red = self._read('net_io_counters')
+        usuarios = self._read('users')
+
+        metricas = {}
+        # Utilización calculada sobre el intervalo real desde el ciclo anterior (sin bloqueo).
+        muestra_cpu = self._cpu_sampler.sample(per_core_times)
+        metricas['cpu_percent'] = muestra_cpu['cpu_percent']
+        metricas['cpu_percent_por_nucleo'] = muestra_cpu['cpu_percent_por_nucleo']
+        metricas.update(self._static)
+        metricas['cpu_freq_current_mhz'] = freq.current if freq else None
+        cpu_times = _sumar_cpu_times(per_core_times)
+        metricas['cpu_times_user'] = cpu_times.user
+        metricas['cpu_times_system'] = cpu_times.system
+        metricas['cpu_times_idle'] = cpu_times.idle
         metricas['memoria_total_gb'] = round(memoria.total / (1024 ** 3), 2)
         metricas['memoria_usada_gb'] = round(memoria.used / (1024 ** 3), 2)
         metricas['memoria_libre_gb'] = round(memoria.available / (1024 ** 3), 2)
         metricas['memoria_percent'] = memoria.percent
-        swap = psutil.swap_memory()
         metricas['swap_total_gb'] = round(swap.total / (1024 ** 3), 2)
         metricas['swap_usado_gb'] = round(swap.used / (1024 ** 3), 2)
         metricas['swap_percent'] = swap.percent
-        disco = psutil.disk_usage('C:')
         metricas['disco_total_gb'] = round(disco.total / (1024 ** 3), 2)
         metricas['disco_usado_gb'] = round(disco.used / (1024 ** 3), 2)
         metricas['disco_libre_gb'] = round(disco.free / (1024 ** 3), 2)
         metricas['disco_percent'] = disco.percent
-        red = psutil.net_io_counters()
+        # Contadores en bytes sin redondear para el esquema compacto de SQLite.
+        metricas['memoria_total_bytes'] = memoria.total
+        metricas['memoria_usada_bytes'] = memoria.used
+        metricas['memoria_libre_bytes'] = memoria.available
+        metricas['swap_total_bytes'] = swap.total
+        metricas['swap_usado_bytes'] = swap.used
+        metricas['disco_total_bytes'] = disco.total
+        metricas['disco_usado_bytes'] = disco.used
+        metricas['disco_libre_bytes'] = disco.free
         metricas['red_bytes_enviados'] = red.bytes_sent
         metricas['red_bytes_recibidos'] = red.bytes_recv
-        users = psutil.users()[0]
-        metricas['username'] = users.name if users else "n/a"
-        metricas['user_datetime'] = users.started if users else "n/a"
+        # Sin sesiones activas psutil.users() retorna una lista vacía.
+        usuario = usuarios[0] if usuarios else None
+        metricas['username'] = usuario.name if usuario else "n/a"
+        metricas['user_datetime'] = usuario.started if usuario else "n/a"
+        return metricas
 
+# Instantánea compartida entre ciclos de recolección.
+_snapshot = PsutilSnapshot()
+
+def obtener_metricas_psutil():
+    """
+    Recopila métricas clave del sistema usando la biblioteca psutil.
+    
+    Returns:
+        dict: Un diccionario con las métricas del sistema. Retorna None en caso de error.
+    """
+    try:
+        metricas = _snapshot.collect()
     except Exception as e:
         logging.error(f"Error al obtener métricas del sistema: {e}")
         return None
     return metricas
 
+def refrescar_datos_estaticos_psutil():
+    """
+    Fuerza la relectura de los datos estáticos cacheados (núcleos y frecuencias mín/máx).
+
+    Returns:
+        dict: Los nuevos datos estáticos. Retorna None en caso de error.
+    """
+    try:
+        return _snapshot.refresh_static()
+    except Exception as e:
+        logging.error(f"Error al refrescar los datos estáticos de psutil: {e}")
+        return None
+
+def obtener_contadores_psutil():
+    """
+    Retorna el número de llamadas realizadas a cada fuente de psutil desde el inicio.
+
+    Returns:
+        dict: Un diccionario {fuente: llamadas}.
+    """
+    return dict(_snapshot.call_counts)
+
 def obtener_lista_procesos():
     """
     Lista los procesos en ejecución y retorna su nombre y PID.
 
+    La tabla se obtiene del seguimiento incremental de procesos (main_procesos), por lo
+    que los atributos no se vuelven a leer en cada llamada. Solo se actualiza el
+    seguimiento si aún no se había hecho, para no consumir la diferencia de iniciados
+    y finalizados que entrega obtener_cambios_procesos().
+
     Returns:
         list: Una lista de diccionarios, donde cada diccionario representa un proceso
               con su 'pid' y 'name'.
     """
     procesos = []
     try:
-        for proc in psutil.process_iter(['pid', 'name']):
-            procesos.append({'pid': proc.pid, 'name': proc.name()})
+        tracker = obtener_seguimiento_procesos()
+        if not tracker.initialized:
+            tracker.update()
+        procesos = [{'pid': p['pid'], 'name': p['name']} for p in tracker.snapshot()]
     except Exception as e:
         logging.error(f"Error al listar procesos: {e}")
     return procesos
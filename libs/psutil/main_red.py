@@ -0,0 +1,193 @@
+import psutil
+import logging
+import json
+import os
+import time
+
+# Límite de los contadores de 32 bits que algunos controladores reportan en Windows.
+LIMITE_CONTADOR_32 = 2 ** 32
+
+# Un retroceso solo se interpreta como desbordamiento de 32 bits si la lectura anterior
+# estaba cerca del límite: el delta implícito no supera este valor (1/4 del rango).
+DESBORDAMIENTO_MAXIMO = LIMITE_CONTADOR_32 // 4
+
+# Tasas máximas plausibles de una interfaz (10 Gbit/s a velocidad de línea), usadas para
+# descartar un desbordamiento cuyo delta implícito no cabe en el intervalo.
+TASA_MAXIMA_BYTES = 1_250_000_000
+TASA_MAXIMA_PAQUETES = 14_880_000
+
+# Contadores de cada interfaz: los de tráfico se convierten en tasas por segundo
+# y los de errores/descartes en el número de eventos del intervalo.
+CONTADORES_TASA = ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv')
+CONTADORES_EVENTO = ('errin', 'errout', 'dropin', 'dropout')
+
+def _delta_contador(actual, anterior, max_delta=DESBORDAMIENTO_MAXIMO):
+    """
+    Diferencia entre dos lecturas de un contador monotónico.
+
+    Si el contador retrocede se interpreta como un reinicio (reinicio del controlador,
+    reconexión de una VPN, interfaz deshabilitada y habilitada) y se toma la lectura
+    actual como delta. Solo se asume un desbordamiento (wrap) de 32 bits si la lectura
+    anterior estaba cerca del límite y el delta implícito no supera max_delta.
+    """
+    if actual >= anterior:
+        return actual - anterior
+    if anterior < LIMITE_CONTADOR_32:
+        desbordado = actual + LIMITE_CONTADOR_32 - anterior
+        if desbordado <= min(max_delta, DESBORDAMIENTO_MAXIMO):
+            return desbordado
+    return actual
+
+class NetworkRateCollector:
+    """
+    Colector de tasas de red por interfaz.
+
+    En cada lectura compara los contadores de net_io_counters(pernic=True) con
+    la lectura anterior y calcula bytes/s, paquetes/s, errores y descartes por
+    interfaz. Los últimos contadores se persisten en disco junto con la hora de
+    arranque, de modo que la primera muestra tras reiniciar el servicio ya es
+    correcta. Si el equipo se reinició desde la última lectura, los contadores
+    parten de cero en el arranque.
+    """
+
+    def __init__(self, state_path=None, psutil_module=psutil, wall_clock=time.time, boot_time_func=None):
+        """
+        Args:
+            state_path (str): Ruta del archivo JSON con los últimos contadores. Si es None no se persisten.
+            psutil_module (module): Módulo psutil (o un sustituto para pruebas).
+            wall_clock (callable): Reloj de pared (epoch); debe ser comparable con la hora de arranque.
+            boot_time_func (callable): Retorna la hora de arranque del equipo (por defecto psutil.boot_time).
+        """
+        self._state_path = state_path
+        self._psutil = psutil_module
+        self._clock = wall_clock
+        self._boot_time_func = boot_time_func or psutil_module.boot_time
+        self._previous = None
+        self._previous_time = None
+        self._boot_time = None
+        self._load()
+
+    def _load(self):
+        """Carga los últimos contadores persistidos, si existen y son válidos."""
+        if not self._state_path or not os.path.exists(self._state_path):
+            return
+        try:
+            with open(self._state_path, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            self._previous = {nic: dict(contadores) for nic, contadores in estado['interfaces'].items()}
+            self._previous_time = float(estado['hora'])
+            self._boot_time = float(estado['hora_arranque'])
+        except Exception as e:
+            logging.warning(f"No se pudieron leer los contadores de red persistidos {self._state_path}: {e}")
+            self._previous = None
+            self._previous_time = None
+            self._boot_time = None
+
+    def _save(self):
+        """Persiste los últimos contadores de forma atómica (archivo temporal + reemplazo)."""
+        if not self._state_path:
+            return
+        try:
+            tmp_path = f"{self._state_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'hora_arranque': self._boot_time,
+                    'hora': self._previous_time,
+                    'interfaces': self._previous,
+                }, f)
+            os.replace(tmp_path, self._state_path)
+        except Exception as e:
+            logging.error(f"Error al guardar los contadores de red: {e}")
+
+    def _leer_contadores(self):
+        """Lee los contadores de cada interfaz como diccionarios simples."""
+        campos = CONTADORES_TASA + CONTADORES_EVENTO
+        return {
+            nic: {campo: getattr(contadores, campo) for campo in campos}
+            for nic, contadores in (self._psutil.net_io_counters(pernic=True) or {}).items()
+        }
+
+    def collect(self):
+        """
+        Calcula las tasas de red por interfaz desde la lectura anterior.
+
+        Returns:
+            dict: 'interfaces' (una fila por interfaz con lectura anterior; vacío si no
+                  hay lectura anterior)
+                  y los totales 'red_bytes_enviados_seg' y 'red_bytes_recibidos_seg'
+                  (None si no hay lectura anterior).
+        """
+        now = self._clock()
+        boot_time = self._boot_time_func()
+        counters = self._leer_contadores()
+
+        previous = self._previous
+        previous_time = self._previous_time
+        desde_arranque = False
+        if previous is not None and self._boot_time is not None and abs(boot_time - self._boot_time) > 1:
+            # Reinicio del equipo: los contadores volvieron a cero en el arranque.
+            logging.info("Reinicio del equipo detectado: las tasas de red se calculan desde el arranque.")
+            previous = {}
+            previous_time = boot_time
+            desde_arranque = True
+
+        interfaces = []
+        elapsed = now - previous_time if previous_time is not None else 0.0
+        if previous is not None and elapsed > 0:
+            ceros = dict.fromkeys(CONTADORES_TASA + CONTADORES_EVENTO, 0)
+            for nic, actual in counters.items():
+                anterior = previous.get(nic)
+                if anterior is None:
+                    if not desde_arranque:
+                        # Interfaz nueva o que reaparece: sus contadores no parten de cero en esta
+                        # lectura, que queda como referencia; la tasa se calcula en la siguiente.
+                        continue
+                    anterior = ceros
+                fila = {'interfaz': nic}
+                for campo in CONTADORES_TASA:
+                    tasa_maxima = TASA_MAXIMA_BYTES if campo.startswith('bytes') else TASA_MAXIMA_PAQUETES
+                    delta = _delta_contador(actual[campo], anterior[campo], elapsed * tasa_maxima)
+                    fila[f"{campo}_seg"] = round(delta / elapsed, 2)
+                for campo in CONTADORES_EVENTO:
+                    # Errores y descartes no superan la tasa de paquetes.
+                    fila[campo] = _delta_contador(actual[campo], anterior[campo], elapsed * TASA_MAXIMA_PAQUETES)
+                interfaces.append(fila)
+
+        self._previous = counters
+        self._previous_time = now
+        self._boot_time = boot_time
+        self._save()
+
+        hay_muestra = previous is not None and elapsed > 0
+        return {
+            'interfaces': interfaces,
+            'red_bytes_enviados_seg': round(sum(f['bytes_sent_seg'] for f in interfaces), 2) if hay_muestra else None,
+            'red_bytes_recibidos_seg': round(sum(f['bytes_recv_seg'] for f in interfaces), 2) if hay_muestra else None,
+        }
+
+# Colector compartido entre ciclos de recolección; se configura con configurar_red().
+_collector = NetworkRateCollector()
+
+def configurar_red(state_path):
+    """
+    Crea el colector compartido con persistencia de los últimos contadores.
+
+    Args:
+        state_path (str): Ruta del archivo JSON donde se guardan los contadores.
+    """
+    global _collector
+    _collector = NetworkRateCollector(state_path)
+
+def obtener_metricas_red():
+    """
+    Recopila las tasas de red por interfaz.
+
+    Returns:
+        dict: 'interfaces' y los totales de la máquina (ver NetworkRateCollector.collect()).
+              Retorna None en caso de error.
+    """
+    try:
+        return _collector.collect()
+    except Exception as e:
+        logging.error(f"Error al obtener métricas de red: {e}")
+        return None
@@ -1,59 +1,307 @@
 import wmi
 import logging
 import pythoncom
+import queue
+import threading
+import json
+import os
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
-def obtener_metricas_wmi():
+class WMISession:
     """
-    Recopila métricas específicas de Windows usando la biblioteca wmi.
+    Sesión WMI persistente servida por un único hilo con COM inicializado.
 
-    Returns:
-        dict: Un diccionario con las métricas de WMI. Retorna None en caso de error.
+    El hilo de la sesión inicializa COM una sola vez, mantiene abierta la conexión
+    wmi.WMI() entre ciclos y atiende las consultas que llegan por una cola. Si una
+    consulta falla, la conexión se descarta y se reintenta una vez con una nueva.
+    """
+
+    def __init__(self, connect_func=None, timeout=None):
+        """
+        Args:
+            connect_func (callable): Función que crea la conexión. Por defecto wmi.WMI.
+            timeout (float): Tiempo máximo en segundos que query() espera una respuesta.
+        """
+        self._connect_func = connect_func or wmi.WMI
+        self._timeout = timeout
+        self._requests = queue.Queue()
+        self._thread = None
+        self._connection = None
+        self.connects = 0
+        self.reconnects = 0
+
+    def start(self):
+        """Arranca el hilo de la sesión si no está en ejecución."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="wmi_sesion", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        """Solicita la parada del hilo de la sesión y espera a que termine."""
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def query(self, func, timeout=None):
+        """
+        Ejecuta una consulta en el hilo de la sesión.
+
+        Args:
+            func (callable): Función que recibe la conexión WMI y retorna el resultado.
+            timeout (float): Tiempo máximo de espera. Por defecto el de la sesión.
+
+        Returns:
+            El resultado de func. Lanza la excepción de la consulta o TimeoutError.
+        """
+        self.start()
+        future = Future()
+        self._requests.put((func, future))
+        try:
+            return future.result(timeout=timeout if timeout is not None else self._timeout)
+        except FutureTimeoutError:
+            # Si la consulta aún no empezó, se cancela para que el hilo no la ejecute.
+            future.cancel()
+            raise
+
+    def _run(self):
+        """Bucle del hilo de la sesión: inicializa COM y atiende la cola de consultas."""
+        pythoncom.CoInitialize()
+        try:
+            while True:
+                request = self._requests.get()
+                if request is None:
+                    break
+                func, future = request
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = self._execute(func)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            self._connection = None
+            pythoncom.CoUninitialize()
+
+    def _execute(self, func):
+        """Ejecuta func con la conexión persistente, reconectando una vez si falla."""
+        for intento in (1, 2):
+            if self._connection is None:
+                self._connection = self._connect_func()
+                self.connects += 1
+                if self.connects > 1:
+                    self.reconnects += 1
+                    logging.info(f"Sesión WMI reconectada (reconexiones: {self.reconnects}).")
+            try:
+                return func(self._connection)
+            except Exception as e:
+                self._connection = None
+                if intento == 2:
+                    raise
+                logging.warning(f"Fallo en la sesión WMI, se reintenta con una nueva conexión: {e}")
+
+# Propiedades consultadas por clase: las consultas se proyectan solo sobre estos campos.
+PROPIEDADES_SISTEMA_OPERATIVO = ['Caption', 'OSArchitecture', 'SerialNumber', 'LastBootUpTime']
+PROPIEDADES_PLACA_BASE = ['Manufacturer', 'Product', 'SerialNumber']
+PROPIEDADES_PROCESADOR = ['Name', 'NumberOfLogicalProcessors', 'NumberOfCores']
+PROPIEDADES_BATERIA = ['EstimatedChargeRemaining', 'BatteryStatus']
+
+def _leer_hora_arranque(c):
+    """Consulta solo la hora del último arranque (formato YYYYMMDDHHMMSS)."""
+    return c.Win32_OperatingSystem(['LastBootUpTime'])[0].LastBootUpTime.split('.')[0]
+
+def _leer_inventario(c):
+    """
+    Consulta el inventario estático sobre una conexión WMI.
+    Lanza una excepción si fallan todas las consultas (posible conexión caída).
     """
     metricas_wmi = {}
+    errores = 0
+    # Métrica: Sistema Operativo
+    try:
+        os_info = c.Win32_OperatingSystem(PROPIEDADES_SISTEMA_OPERATIVO)[0]
+        metricas_wmi['os_name'] = os_info.Caption
+        metricas_wmi['os_architecture'] = os_info.OSArchitecture
+        metricas_wmi['os_serial_number'] = os_info.SerialNumber
+        metricas_wmi['os_last_boot_up_time'] = os_info.LastBootUpTime.split('.')[0]
+    except Exception as e:
+        logging.error(f"Error al obtener métrica de sistema operativo: {e}")
+        errores += 1
+
+    # Métrica: Placa Base
     try:
-        c = wmi.WMI()
-        # Métrica: Sistema Operativo
+        board = c.Win32_BaseBoard(PROPIEDADES_PLACA_BASE)[0]
+        metricas_wmi['placa_base_fabricante'] = board.Manufacturer
+        metricas_wmi['placa_base_producto'] = board.Product
+        metricas_wmi['placa_base_numero_serie'] = board.SerialNumber
+    except Exception as e:
+        logging.error(f"Error al obtener métrica de placa base: {e}")
+        errores += 1
+
+    # Métrica: Procesador
+    try:
+        cpu_info = c.Win32_Processor(PROPIEDADES_PROCESADOR)[0]
+        metricas_wmi['procesador_nombre'] = cpu_info.Name.strip()
+        metricas_wmi['procesador_nucleos_logicos'] = cpu_info.NumberOfLogicalProcessors
+        metricas_wmi['procesador_nucleos_fisicos'] = cpu_info.NumberOfCores
+    except Exception as e:
+        logging.error(f"Error al obtener métrica de procesador: {e}")
+        errores += 1
+
+    if errores == 3:
+        raise RuntimeError("Fallaron todas las consultas de inventario WMI.")
+    return metricas_wmi
+
+def _leer_metricas_dinamicas(c):
+    """Consulta el estado de la batería sobre una conexión WMI."""
+    metricas_wmi = {}
+    # Métrica: estado de la batería
+    for battery in c.Win32_Battery(PROPIEDADES_BATERIA):
+        metricas_wmi['bateria_porcentaje'] = battery.EstimatedChargeRemaining
+        metricas_wmi['bateria_estado'] = battery.BatteryStatus
+        break
+    return metricas_wmi
+
+class WMIInventoryCache:
+    """
+    Caché del inventario estático de WMI indexada por la hora del último arranque.
+
+    El inventario (sistema operativo, placa base y procesador) solo cambia al
+    reiniciar, por lo que en cada consulta se lee únicamente LastBootUpTime y se
+    reutiliza el inventario guardado si coincide. La caché se persiste en disco
+    para sobrevivir a los reinicios del servicio y se usa como respaldo cuando
+    WMI no responde a tiempo.
+    """
+
+    def __init__(self, cache_path, timeout=5):
+        """
+        Args:
+            cache_path (str): Ruta del archivo JSON donde se persiste la caché.
+            timeout (float): Tiempo máximo de espera de las consultas antes de usar la caché.
+        """
+        self._cache_path = cache_path
+        self._timeout = timeout
+        self._inventory = self._load()
+
+    def _load(self):
+        """Carga el inventario persistido. Retorna None si no existe o es inválido."""
+        if not os.path.exists(self._cache_path):
+            return None
         try:
-            os_info = c.Win32_OperatingSystem()[0]
-            metricas_wmi['os_name'] = os_info.Caption
-            metricas_wmi['os_architecture'] = os_info.OSArchitecture
-            metricas_wmi['os_serial_number'] = os_info.SerialNumber
-            metricas_wmi['os_last_boot_up_time'] = os_info.LastBootUpTime.split('.')[0]
+            with open(self._cache_path, 'r', encoding='utf-8') as f:
+                inventory = json.load(f)
+            if inventory.get('os_last_boot_up_time'):
+                return inventory
         except Exception as e:
-            logging.error(f"Error al obtener métrica de sistema operativo: {e}")
-            pass
+            logging.warning(f"No se pudo leer la caché de inventario WMI {self._cache_path}: {e}")
+        return None
 
-        # Métrica: Placa Base
+    def _save(self, inventory):
+        """Persiste el inventario de forma atómica (archivo temporal + reemplazo)."""
         try:
-            board = c.Win32_BaseBoard()[0]
-            metricas_wmi['placa_base_fabricante'] = board.Manufacturer
-            metricas_wmi['placa_base_producto'] = board.Product
-            metricas_wmi['placa_base_numero_serie'] = board.SerialNumber
+            tmp_path = f"{self._cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(inventory, f, ensure_ascii=False)
+            os.replace(tmp_path, self._cache_path)
         except Exception as e:
-            logging.error(f"Error al obtener métrica de placa base: {e}")
-            pass
+            logging.error(f"Error al guardar la caché de inventario WMI: {e}")
 
-        # Métrica: Procesador
+    def _query(self, session, func):
+        """Ejecuta func en la sesión (con el timeout de la caché) o en una conexión nueva."""
+        if session is not None:
+            return session.query(func, timeout=self._timeout)
+        return func(wmi.WMI())
+
+    def get(self, session=None):
+        """
+        Retorna el inventario vigente, consultando WMI completo solo si cambió el arranque.
+
+        Args:
+            session (WMISession): Sesión persistente a usar. Si es None se abre una conexión nueva.
+
+        Returns:
+            dict: El inventario de WMI, o None si no hay datos disponibles.
+        """
         try:
-            cpu_info = c.Win32_Processor()[0]
-            metricas_wmi['procesador_nombre'] = cpu_info.Name.strip()
-            metricas_wmi['procesador_nucleos_logicos'] = cpu_info.NumberOfLogicalProcessors
-            metricas_wmi['procesador_nucleos_fisicos'] = cpu_info.NumberOfCores
+            boot_time = self._query(session, _leer_hora_arranque)
         except Exception as e:
-            logging.error(f"Error al obtener métrica de procesador: {e}")
-            pass
+            if self._inventory is not None:
+                logging.warning(f"WMI no respondió a tiempo, se usa el inventario en caché: {e!r}")
+                return dict(self._inventory)
+            raise
+
+        if self._inventory is not None and self._inventory.get('os_last_boot_up_time') == boot_time:
+            return dict(self._inventory)
 
-        # Métrica: estado de la batería
+        logging.info(f"Arranque {boot_time} sin inventario en caché. Consultando inventario completo de WMI.")
         try:
-            for battery in c.Win32_Battery():
-                metricas_wmi['bateria_porcentaje'] = battery.EstimatedChargeRemaining
-                metricas_wmi['bateria_estado'] = battery.BatteryStatus
-                break
+            inventory = self._query(session, _leer_inventario)
         except Exception as e:
-            logging.error(f"Error al obtener métrica de batería: {e}")
-            pass
+            if self._inventory is not None:
+                logging.warning(f"WMI no respondió a tiempo, se usa el inventario en caché: {e!r}")
+                return dict(self._inventory)
+            raise
+        if inventory.get('os_last_boot_up_time'):
+            self._inventory = inventory
+            self._save(inventory)
+        return dict(inventory)
+
+def obtener_inventario_wmi(session=None, cache=None):
+    """
+    Recopila el inventario estático de Windows (sistema operativo, placa base y
+    procesador) usando la biblioteca wmi. Estos datos solo cambian al reiniciar.
+
+    Args:
+        session (WMISession): Sesión persistente a usar. Si es None se abre una conexión nueva.
+        cache (WMIInventoryCache): Caché de inventario. Si se indica, solo se consulta
+                                   WMI completo cuando cambia la hora de arranque.
+
+    Returns:
+        dict: Un diccionario con el inventario de WMI. Retorna None en caso de error.
+    """
+    try:
+        if cache is not None:
+            return cache.get(session)
+        if session is not None:
+            return session.query(_leer_inventario)
+        return _leer_inventario(wmi.WMI())
+    except Exception as e:
+        logging.error(f"Error al obtener inventario de WMI: {e}")
+        return None
+
+def obtener_metricas_dinamicas_wmi(session=None):
+    """
+    Recopila las métricas de WMI que cambian durante la ejecución (estado de la batería).
+
+    Args:
+        session (WMISession): Sesión persistente a usar. Si es None se abre una conexión nueva.
 
+    Returns:
+        dict: Un diccionario con las métricas dinámicas de WMI. Retorna None en caso de error.
+    """
+    try:
+        if session is not None:
+            return session.query(_leer_metricas_dinamicas)
+        return _leer_metricas_dinamicas(wmi.WMI())
     except Exception as e:
         logging.error(f"Error al obtener métricas de WMI: {e}")
         return None
-    return metricas_wmi
+
+def obtener_metricas_wmi(session=None):
+    """
+    Recopila métricas específicas de Windows usando la biblioteca wmi
+    (inventario estático y métricas dinámicas).
+
+    Args:
+        session (WMISession): Sesión persistente a usar. Si es None se abre una conexión nueva.
+
+    Returns:
+        dict: Un diccionario con las métricas de WMI. Retorna None en caso de error.
+    """
+    inventario = obtener_inventario_wmi(session)
+    dinamicas = obtener_metricas_dinamicas_wmi(session)
+    if inventario is None or dinamicas is None:
+        return None
+    return {**inventario, **dinamicas}
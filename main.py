@@ -6,25 +6,53 @@ import socket
 import logging
 import os
 import configparser
-import time
 import sys
-import pythoncom
+import psutil
 from datetime import datetime
 # Importaciones de los módulos creados
 # Gestor de SQLite
 from sqlite.main_sqlite import DBManager
+from sqlite.main_escritor import SQLiteWriter
 # Gestor de Parquet con DuckDB
 from main_duckdb import ParquetManager
 # Libreria de obtención de metricas
 # Gestor de Psutil, WMI y OHM
-from libs.psutil.main_psutil import (
-    obtener_metricas_psutil,
-    obtener_lista_procesos
+from libs.psutil.main_psutil import obtener_metricas_psutil
+from libs.psutil.main_disco import obtener_metricas_discos
+from libs.psutil.main_red import configurar_red, obtener_metricas_red
+from libs.psutil.main_procesos import (
+    obtener_estado_procesos,
+    obtener_tabla_procesos,
+    cargar_nombres_procesos,
+    obtener_nombres_nuevos_procesos,
+    obtener_eventos_procesos,
+    iniciar_revision_rapida_procesos,
+    filtrar_procesos_activos
+)
+from libs.wmi.main_wmi import (
+    WMISession,
+    WMIInventoryCache,
+    obtener_inventario_wmi,
+    obtener_metricas_dinamicas_wmi
 )
-from libs.wmi.main_wmi import obtener_metricas_wmi
 from libs.ohm.main_ohm import (
     initialize_openhardwaremonitor,
-    obtener_metricas_ohm
+    configurar_actualizacion_ohm,
+    construir_indice_ohm,
+    construir_flujo_sensores_ohm,
+    obtener_metricas_ohm,
+    obtener_sensores_ohm
+)
+# Ejecutor concurrente de colectores
+from libs.muestra.main_muestra import MetricSample
+from libs.colectores.main_colectores import (
+    Collector,
+    CollectorExecutor,
+    MultiRateScheduler,
+    TickClock,
+    combinar_metricas,
+    ESTADO_OK,
+    ESTADO_TIMEOUT
 )
 
 # Importar win32timezone para asegurar que cx_Freeze lo empaquete
@@ -58,10 +86,50 @@ class PythonMonitorService(win32serviceutil.ServiceFramework):
         self.log_file_name = "agente_monitoreo.log"
         self.monitor_interval = 60
         self.open_hardware_monitor_handle = None
+        self.open_hardware_monitor_index = None
+        self.open_hardware_monitor_stream = None
         # Variables para los gestores
         self.db_manager = None
+        # Hilo escritor único de SQLite: tamaño de la cola y política al llenarse
+        self.db_writer = None
+        self.db_queue_size = 1000
+        self.db_queue_policy = 'volcar'
         self.parquet_manager = None
         self.parquet_retention_minutes = 60 # Tiempo de retención por defecto
+        # Escritura por lotes en SQLite: filas acumuladas y antigüedad máxima del lote (segundos)
+        self.db_batch_rows = 5
+        self.db_batch_seconds = 300
+        # Retención de SQLite por tabla (días, 0 = sin límite), filas por tramo y páginas por vacuum incremental
+        self.db_retention_days = {
+            'metricas_v2': 30, 'metricas_1m': 90, 'metricas_1h': 730, 'procesos': 7, 'procesos_grupos': 30,
+            'procesos_eventos': 30, 'volumenes': 30, 'discos_io': 30, 'red': 30, 'sensores_ohm': 14,
+        }
+        self.db_retention_chunk_rows = 5000
+        # Modo alternativo: un archivo SQLite por día para las series temporales (data/particiones)
+        self.db_partitioned = False
+        self.db_vacuum_pages = 256
+        # Ejecutor de colectores y plazos por colector (segundos)
+        self.collector_executor = None
+        self.collector_max_workers = 4
+        self.collector_timeouts = {'psutil': 5, 'wmi': 15, 'ohm': 10, 'procesos': 10, 'discos': 10, 'red': 5}
+        # Planificador multifrecuencia y periodos de los niveles lento y estático (segundos)
+        self.collector_scheduler = None
+        self.process_interval = 0
+        # Procesos por ranking (top CPU, RAM y disco)
+        self.process_top_n = 5
+        # Actividad mínima para guardar un proceso en la tabla 'procesos'
+        self.process_min_cpu_percent = 0.5
+        self.process_min_io_bytes_seg = 1024
+        # Revisión rápida de inicios/fin de procesos entre ciclos (segundos, 0 la desactiva)
+        self.process_poll_interval = 5
+        self.process_event_poller = None
+        self.inventory_interval = 3600
+        # Se activa si se pierde una diferencia de procesos (colector fuera de plazo)
+        self.process_table_stale = False
+        # Reloj de ciclos alineado y sin deriva
+        self.tick_clock = None
+        # Sesión WMI persistente
+        self.wmi_session = None
 
     def SvcStop(self):
         """
@@ -70,9 +138,14 @@ class PythonMonitorService(win32serviceutil.ServiceFramework):
         self.is_running = False
         self.ReportServiceStatus(win32service.SERVICE_STOP_PENDING)
         win32event.SetEvent(self.hWaitStop)
-        # Cierra la conexión de la base de datos usando el Singleton
-        if self.db_manager:
-            self.db_manager.close_connection()
+        # Detiene los hilos de los colectores sin esperar a los que estén bloqueados
+        if self.collector_executor:
+            self.collector_executor.shutdown(wait=False)
+        if self.wmi_session:
+            self.wmi_session.stop()
+        if self.process_event_poller:
+            self.process_event_poller.stop()
+        # El escritor lo detiene main_loop al salir del bucle, cuando ya no encola operaciones.
 
     def SvcDoRun(self):
         """
@@ -109,6 +182,10 @@ class PythonMonitorService(win32serviceutil.ServiceFramework):
 
         # Obtiene la instancia del Singleton de SQLite.
         self.db_manager = DBManager(db_path)
+        # Las filas de 'metricas' e 'info_maquina' se escriben por lotes en una sola transacción
+        self.db_manager.configure_batching(self.db_batch_rows, self.db_batch_seconds)
+        self.db_manager.configure_rollups(self.monitor_interval)
+        self.db_manager.configure_retention(self.db_retention_days, self.db_retention_chunk_rows)
 
         # Inicializar el handle de OpenHardwareMonitor una sola vez
         try:
@@ -116,110 +193,215 @@ class PythonMonitorService(win32serviceutil.ServiceFramework):
         except Exception as e:
             logging.error(f"Error al inicializar OpenHardwareMonitor: {e}")
             self.open_hardware_monitor_handle = None
+        # Un solo Update() por componente y ciclo, compartido por el índice y el flujo de sensores
+        configurar_actualizacion_ohm(self.monitor_interval / 2)
+        # Índice de sensores construido una sola vez tras la inicialización
+        self.open_hardware_monitor_index = construir_indice_ohm(self.open_hardware_monitor_handle)
             
         # Al iniciar, asegurar que las tablas existen
-        db_manager.create_table()
-        db_manager.create_machine_info_table()
+        self.db_manager.create_table()
+        self.db_manager.create_machine_info_table()
+        self.db_manager.create_sensor_tables()
+        self.db_manager.create_process_tables()
+        self.db_manager.create_disk_tables()
+        self.db_manager.create_network_table()
+        # Con las tablas ya creadas como plantilla, las series temporales pasan a archivos diarios
+        if self.db_partitioned:
+            self.db_manager.configure_partitioning(os.path.join(base_dir, "data", "particiones"))
+        # Los name_id de los procesos se mantienen entre reinicios del servicio
+        cargar_nombres_procesos(self.db_manager.load_process_names())
+        # Los procesos de vida corta se detectan entre ciclos sin ejecutar el colector completo
+        self.process_event_poller = iniciar_revision_rapida_procesos(self.process_poll_interval)
+
+        # Flujo genérico de todos los sensores OHM, con los sensor_id ya persistidos en el catálogo
+        self.open_hardware_monitor_stream = construir_flujo_sensores_ohm(
+            self.open_hardware_monitor_handle, self.db_manager.load_sensor_catalog()
+        )
 
-        # MODIFICACIÓN: Intentar vaciar la cola inmediatamente después de iniciar,
-        # en caso de que existan datos de una ejecución previa interrumpida.
-        db_manager.process_queue()
+        # A partir de aquí solo el hilo escritor usa la conexión: el bucle encola las escrituras sin bloquearse.
+        self.db_writer = SQLiteWriter(
+            self.db_manager,
+            max_queue=self.db_queue_size,
+            policy=self.db_queue_policy,
+            spill_path=os.path.join(base_dir, "data", "escritor_volcado.pkl")
+        )
+        self.db_writer.start()
+
+        # Sesión WMI persistente: un hilo con COM inicializado mantiene la conexión
+        # abierta entre ciclos y atiende las consultas de los colectores.
+        self.wmi_session = WMISession(timeout=self.collector_timeouts['wmi'])
+        self.wmi_session.start()
+        # Caché del inventario estático indexada por la hora de arranque y persistida en disco.
+        wmi_inventory_cache = WMIInventoryCache(os.path.join(base_dir, "data", "inventario_wmi.json"))
+        # Últimos contadores de red persistidos: la primera tasa tras reiniciar el servicio ya es válida.
+        configurar_red(os.path.join(base_dir, "data", "red_contadores.json"))
+
+        # Colectores ejecutados en paralelo, cada uno con su propio plazo.
+        handle = self.open_hardware_monitor_handle
+        ohm_index = self.open_hardware_monitor_index
+        sensor_stream = self.open_hardware_monitor_stream
+        session = self.wmi_session
+        self.collector_executor = CollectorExecutor(
+            [
+                Collector('psutil', obtener_metricas_psutil, self.collector_timeouts['psutil']),
+                Collector('wmi_dinamico', lambda: obtener_metricas_dinamicas_wmi(session), self.collector_timeouts['wmi']),
+                Collector('wmi_inventario', lambda: obtener_inventario_wmi(session, wmi_inventory_cache), self.collector_timeouts['wmi']),
+                Collector('ohm', lambda: obtener_metricas_ohm(handle, ohm_index), self.collector_timeouts['ohm']),
+                Collector('ohm_sensores', lambda: obtener_sensores_ohm(sensor_stream), self.collector_timeouts['ohm']),
+                Collector('discos', obtener_metricas_discos, self.collector_timeouts['discos']),
+                Collector('red', obtener_metricas_red, self.collector_timeouts['red']),
+                Collector('procesos', lambda: obtener_estado_procesos(self.process_top_n), self.collector_timeouts['procesos']),
+            ],
+            max_workers=self.collector_max_workers
+        )
+        # Niveles de frecuencia: rápido (cada ciclo), procesos y el inventario estático,
+        # que además se refresca cuando cambia la hora de arranque.
+        self.collector_scheduler = MultiRateScheduler(
+            self.collector_executor,
+            {
+                'psutil': 0,
+                'wmi_dinamico': 0,
+                'ohm': 0,
+                'ohm_sensores': 0,
+                'discos': 0,
+                'red': 0,
+                'procesos': self.process_interval,
+                'wmi_inventario': self.inventory_interval,
+            },
+            static=['wmi_inventario'],
+            boot_time_func=psutil.boot_time
+        )
+
+        # Ciclos alineados a múltiplos del intervalo; la espera termina en cuanto se señala hWaitStop.
+        self.tick_clock = TickClock(self.monitor_interval, self.wait_for_stop)
 
         while self.is_running:
+            tick_time = self.tick_clock.wait_next()
+            if tick_time is None or not self.is_running:
+                break
             try:
-                # Inicializar COM para que WMI funcione en el hilo del servicio
-                pythoncom.CoInitialize()
-
-                # Obtiene métricas del sistema
-                metricas_psutil = obtener_metricas_psutil()
-                # Obtiene métricas de WMI
-                metricas_wmi = obtener_metricas_wmi()
-                # Obtiene métricas de OHM
-                metricas_ohm = obtener_metricas_ohm(self.open_hardware_monitor_handle)
-                # Obtiene la lista de procesos
-                lista_procesos = obtener_lista_procesos()
-
-                if metricas_psutil and metricas_wmi and metricas_ohm:
-                    # Combinamos ambos diccionarios
-                    metricas_combinadas = {**metricas_psutil, **metricas_wmi, **metricas_ohm}
-                    metricas_combinadas['timestamp'] = datetime.now().isoformat()
+                # Se usa la marca de tiempo nominal del ciclo para que no dependa
+                # de la duración de los colectores ni de la espera.
+                timestamp = datetime.fromtimestamp(tick_time).isoformat()
+
+                # Obtiene en paralelo las métricas de los colectores que tocan en este ciclo
+                # y reutiliza el último valor de los niveles más lentos.
+                resultados, estados = self.collector_scheduler.run_cycle()
+                # Uso de todos los volúmenes y tasas de E/S por disco
+                if estados.get('discos') == ESTADO_OK:
+                    self.db_writer.submit('insert_disk_metrics', int(tick_time * 1000), resultados['discos'])
+                # Tasas de red por interfaz
+                if estados.get('red') == ESTADO_OK:
+                    self.db_writer.submit('insert_network_metrics', int(tick_time * 1000), resultados['red']['interfaces'])
+
+                # Nombres de proceso nuevos y eventos de inicio/fin, incluidos los de la revisión rápida
+                self.db_writer.submit('insert_process_names', obtener_nombres_nuevos_procesos())
+                # Los eventos se retiran del seguimiento al tomarlos: la operación es crítica y no se descarta.
+                eventos_procesos = obtener_eventos_procesos()
+                if eventos_procesos:
+                    self.db_writer.submit('insert_process_events', eventos_procesos)
+
+                # Diferencia de procesos iniciados/finalizados aplicada a 'procesos_activos'
+                if estados.get('procesos') == ESTADO_OK:
+                    cambios = resultados['procesos']['cambios']
+                    if self.process_table_stale:
+                        # Se perdió una diferencia anterior: se reemplaza la tabla completa.
+                        cambios = {'iniciados': obtener_tabla_procesos(), 'finalizados': [], 'completo': True}
+                        self.process_table_stale = False
+                    self.db_writer.submit('apply_process_changes', cambios)
+                    # Agregado por ejecutable (nombres codificados en 'procesos_nombres')
+                    self.db_writer.submit('insert_process_groups', int(tick_time * 1000), resultados['procesos']['grupos'])
+                    # Serie temporal por proceso, sin los procesos inactivos
+                    activos = filtrar_procesos_activos(
+                        resultados['procesos']['columnas'],
+                        self.process_min_cpu_percent,
+                        self.process_min_io_bytes_seg
+                    )
+                    self.db_writer.submit('insert_process_samples', int(tick_time * 1000), activos)
+                    # Procesos de mayor consumo calculados a partir de las tasas del ciclo
+                    top = resultados['procesos']['top']
+                    mensaje_top = " | ".join(
+                        f"Top {criterio.upper()}: " + ", ".join(
+                            f"{p['name']} ({p['pid']}) {p[campo]}"
+                            for p in top[criterio]
+                        )
+                        for criterio, campo in (('cpu', 'cpu_percent'), ('ram', 'rss_bytes'), ('disco', 'io_bytes_seg'))
+                    )
+                    logging.info(mensaje_top)
+                elif estados.get('procesos') == ESTADO_TIMEOUT:
+                    self.process_table_stale = True
+
+                # Todos los sensores OHM en formato largo (sensor_id, valor) en su tabla estrecha
+                if estados.get('ohm_sensores') == ESTADO_OK:
+                    self.db_writer.submit('upsert_sensor_catalog', sensor_stream.take_new_definitions())
+                    sensor_ids, valores = resultados['ohm_sensores']
+                    self.db_writer.submit('insert_sensor_readings', int(tick_time * 1000), sensor_ids, valores)
+
+                fuentes = ['psutil', 'wmi_inventario', 'wmi_dinamico', 'ohm']
+                if any(estados.get(fuente) == ESTADO_OK for fuente in fuentes):
+                    # Combinamos el último valor de cada nivel; las fuentes que faltan
+                    # quedan marcadas en 'fuente_<nombre>'.
+                    metricas_combinadas = combinar_metricas(resultados, estados, fuentes)
+                    metricas_combinadas['timestamp'] = timestamp
+                    metricas_combinadas['ts'] = int(tick_time * 1000)
                     metricas_combinadas['hostname'] = socket.gethostname()
-                    
+                    # Tasas de red totales de la máquina (los contadores acumulados no se guardan)
+                    if estados.get('red') == ESTADO_OK:
+                        metricas_combinadas['red_bytes_enviados_seg'] = resultados['red']['red_bytes_enviados_seg']
+                        metricas_combinadas['red_bytes_recibidos_seg'] = resultados['red']['red_bytes_recibidos_seg']
+
+                    # Muestra normalizada del ciclo, consumida por todos los destinos
+                    muestra = MetricSample.from_metrics(metricas_combinadas)
+
                     # Almacena las métricas en SQLite
-                    self.db_manager.insert_metrics(metricas_combinadas)
-                    self.db_manager.upsert_machine_info(metricas_combinadas)
+                    self.db_writer.submit('insert_metrics', muestra)
+                    self.db_writer.submit('upsert_machine_info', muestra)
                     
                     # --- Guardar a Parquet y Limpiar ---
                     if self.parquet_manager:
-                        # 1. Guardar la métrica actual como archivo Parquet
+                        # 1. Guardar la métrica actual como archivo Parquet (todas las claves de origen)
                         self.parquet_manager.save_metrics_to_parquet(metricas_combinadas)
                         
                         # 2. Limpiar archivos Parquet antiguos (de más de 1 hora/60 minutos)
                         self.parquet_manager.clean_old_parquet_files()
 
-                    # Adecuación de algunos datos
-                    cpu_percent = metricas_combinadas.get('cpu_percent') or metricas_combinadas.get('cpu_load_percent') or 0
-                    ram_percent = metricas_combinadas.get('memoria_percent') or metricas_combinadas.get('ram_load_percent') or 0
-                    ram_used = metricas_combinadas.get('memoria_usada_gb') or metricas_combinadas.get('ram_load_used_gb') or 0
-                    ram_free = metricas_combinadas.get('memoria_libre_gb') or metricas_combinadas.get('ram_load_free_gb') or 0
-                    disk_percent = metricas_combinadas.get('disco_percent') or metricas_combinadas.get('hdd_used_gb') or 0
-
-                    # Crea y registra un mensaje con las métricas combinadas
-                    mensaje = (
-                        f"Hostname: {metricas_combinadas.get('hostname', 'N/A')}"
-                        f" | User: {metricas_combinadas.get('username', 'N/A')}"
-                        f" | CPU %: {cpu_percent}"
-                        f" | CPU MHz: {metricas_combinadas.get('cpu_freq_current_mhz', 0)}"
-                        f" | CPU Bus MHz: {metricas_combinadas.get('cpu_clocks_mhz', 0)}"
-                        f" | RAM %: {ram_percent}"
-                        f" | RAM Used GB: {ram_used}"
-                        f" | RAM Total GB: {metricas_combinadas.get('memoria_total_gb', 0)}"
-                        f" | RAM free GB: {ram_free}"
-                        f" | Disco %: {disk_percent}"
-                        f" | Disco Used GB: {metricas_combinadas.get('disco_usado_gb', 0)}"
-                        f" | Disco Total GB: {metricas_combinadas.get('disco_total_gb', 0)}"
-                        f" | Disco Free GB: {metricas_combinadas.get('disco_libre_gb', 0)}"
-                        f" | SWAP %: {metricas_combinadas.get('swap_percent', 0)}"
-                        f" | SWAP Used GB: {metricas_combinadas.get('swap_usado_gb', 0)}"
-                        f" | SWAP Total GB: {metricas_combinadas.get('swap_total_gb', 0)}"
-                        f" | Red Bytes: Sent: {metricas_combinadas.get('red_bytes_enviados', 0)} - Recv: {metricas_combinadas.get('red_bytes_recibidos', 0)}"
-                        f" | CPU ºC: {metricas_combinadas.get('cpu_temperatura_celsius', 0)}"
-                        f" | Battery %: {metricas_combinadas.get('bateria_porcentaje', 0)}"
-                        f" | CPU W: {metricas_combinadas.get('cpu_power_package_watts', 0)}"
-                        f" | CPU Core W: {metricas_combinadas.get('cpu_power_cores_watts', 0)}"
-                        f" | CPU Core W: {metricas_combinadas.get('cpu_clocks_mhz', 0)}"
-                    )
-                    # Looging las metricas
-                    logging.info(mensaje)
-
-                    # Lógica para combinar la Placa Base
-                    placa_base_fabricante = metricas_combinadas.get('placa_base_fabricante', 'Desconocido')
-                    placa_base_producto = metricas_combinadas.get('placa_base_producto', 'Desconocido')
-                    # Formato: Fabricante - Producto. Se elimina el separador si ambos son 'Desconocido'.
-                    if placa_base_fabricante == 'Desconocido' and placa_base_producto == 'Desconocido':
-                        placa_base_combined = 'Desconocido'
-                    else:
-                        placa_base_combined = f"{placa_base_fabricante} - {placa_base_producto}".replace("Desconocido - ", "").replace(" - Desconocido", "")
-                    # Crea el mensaje de información de la maquina
-                    mensaje_info = (
-                        f"Hostname: {metricas_combinadas.get('hostname', 'N/A')}"
-                        f" | User: {metricas_combinadas.get('username', 'N/A')}"
-                        f" | OS Name: {metricas_combinadas.get('os_name', 'Desconocido')}"
-                        f" | Motherboard Name: {placa_base_combined}"
-                        f" | Processor Name: {metricas_combinadas.get('procesador_nombre', 'Desconocido')}"
-                        f" - Cores: Logical: {metricas_combinadas.get('procesador_nucleos_logicos', 'N/A')}"
-                        f" / Physical: {metricas_combinadas.get('procesador_nucleos_fisicos', 'N/A')}"
-                        f" | OS Last Bot Up Time: {metricas_combinadas.get('os_last_boot_up_time', 'Desconocido')}"
-                    )
-                    # Looging las metricas info
-                    logging.info(mensaje_info)
+                    # Looging las metricas y la información de la máquina
+                    logging.info(muestra.metrics_message())
+                    logging.info(muestra.machine_info_message())
+
+                else:
+                    logging.warning(f"Ninguna fuente de métricas respondió en este ciclo: {estados}")
+
+                # Migración por tramos de la tabla 'metricas' anterior al esquema compacto
+                if self.db_manager.legacy_pending:
+                    self.db_writer.submit('migrate_legacy_metrics')
+                # Filas escritas en el archivo principal antes de activar las particiones diarias
+                if self.db_manager.partition_backlog:
+                    self.db_writer.submit('migrate_to_partitions')
+                # Retención por tramos y devolución de páginas libres, en el hilo escritor
+                self.db_writer.submit('apply_retention')
+                self.db_writer.submit('incremental_vacuum', self.db_vacuum_pages)
+
+                # Profundidad de la cola, latencia de escritura y operaciones descartadas/volcadas
+                logging.info(f"Escritor SQLite: {self.db_writer.stats()}")
 
             except Exception as e:
                 logging.error(f"Error en el bucle principal: {e}")
-            finally:
-                pythoncom.CoUninitialize()
 
-            time.sleep(self.monitor_interval)
+        # Único punto de parada del escritor: vacía la cola con las operaciones del último
+        # ciclo, escribe el lote pendiente y cierra la conexión de la base de datos.
+        self.db_writer.stop()
+        logging.info(f"Agente de monitoreo detenido. Estadísticas de ciclos: {self.tick_clock.stats()}")
+
+    def wait_for_stop(self, timeout):
+        """
+        Espera sobre el evento de parada del servicio en lugar de dormir.
+
+        :param timeout: Tiempo máximo de espera en segundos.
+        :return: True si se solicitó la parada del servicio.
+        """
+        result = win32event.WaitForSingleObject(self.hWaitStop, int(timeout * 1000))
+        return result == win32event.WAIT_OBJECT_0
 
     def load_config(self):
         """
@@ -233,6 +415,27 @@ class PythonMonitorService(win32serviceutil.ServiceFramework):
             self.monitor_interval = config.getint('AGENTE', 'intervalo_monitoreo', fallback=60)
             self.log_file_name = config.get('AGENTE', 'nombre_archivo_log', fallback='agente_monitoreo.log')
             self.db_file_name = config.get('AGENTE', 'nombre_archivo_db', fallback='monitor_data.db')
+            # Plazos por colector y tamaño del pool de hilos
+            self.collector_max_workers = config.getint('COLECTORES', 'max_hilos', fallback=4)
+            for nombre in self.collector_timeouts:
+                self.collector_timeouts[nombre] = config.getfloat('COLECTORES', f'timeout_{nombre}', fallback=self.collector_timeouts[nombre])
+            # Periodos de los niveles lento (procesos) y estático (inventario WMI)
+            self.process_interval = config.getint('FRECUENCIAS', 'intervalo_procesos', fallback=0)
+            self.process_top_n = config.getint('PROCESOS', 'top_n', fallback=5)
+            self.process_min_cpu_percent = config.getfloat('PROCESOS', 'umbral_cpu_percent', fallback=0.5)
+            self.process_min_io_bytes_seg = config.getfloat('PROCESOS', 'umbral_io_bytes_seg', fallback=1024)
+            self.process_poll_interval = config.getfloat('PROCESOS', 'intervalo_revision_rapida', fallback=5)
+            self.inventory_interval = config.getint('FRECUENCIAS', 'intervalo_inventario', fallback=3600)
+            self.db_batch_rows = config.getint('SQLITE', 'lote_filas', fallback=5)
+            self.db_batch_seconds = config.getfloat('SQLITE', 'lote_segundos', fallback=300)
+            self.db_queue_size = config.getint('SQLITE', 'tamano_cola', fallback=1000)
+            self.db_queue_policy = config.get('SQLITE', 'politica_cola', fallback='volcar')
+            self.db_partitioned = config.getboolean('SQLITE', 'particionado_diario', fallback=False)
+            # Retención por tabla: dias_<tabla> en la sección [RETENCION]
+            for tabla in self.db_retention_days:
+                self.db_retention_days[tabla] = config.getfloat('RETENCION', f'dias_{tabla}', fallback=self.db_retention_days[tabla])
+            self.db_retention_chunk_rows = config.getint('RETENCION', 'lote_filas', fallback=5000)
+            self.db_vacuum_pages = config.getint('RETENCION', 'paginas_vacuum', fallback=256)
             # Se podría añadir la configuración de retención aquí si fuera necesario
             # self.parquet_retention_minutes = config.getint('DUCKDB', 'retencion_minutos', fallback=60)
         except Exception as e:
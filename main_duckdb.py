@@ -1,7 +1,10 @@
 import duckdb
 import logging
 import os
+import random
 import sys
+import threading
+import time
 
 # Se añade una función para manejar las excepciones de importación
 try:
@@ -13,18 +16,59 @@ except ImportError as e:
     logging.error(f"La librería duckdb no pudo ser importada. Asegúrese de que esté instalada y empaquetada correctamente. Error: {e}")
     DUCKDB_EXCEPTION = Exception # Usar Exception como fallback si la importación falla
 
+from libs.muestra.main_muestra import MetricSample, SQL_INSERT_METRICAS, SQL_UPSERT_INFO_MAQUINA
+from main_spool import SegmentSpool
+
+# Las métricas se insertan de forma idempotente: reescribir una muestra ya guardada
+# (p. ej. al reaplicar un segmento del spool tras un corte) no la duplica ni falla.
+SQL_INSERT_METRICAS_IDEMPOTENTE = f"{SQL_INSERT_METRICAS} ON CONFLICT DO NOTHING"
+
+# Sentencia de cada tabla que puede recibir filas del spool y columnas de su clave primaria.
+SQL_POR_TABLA = {
+    'metricas': (SQL_INSERT_METRICAS_IDEMPOTENTE, 1),
+    'info_maquina': (SQL_UPSERT_INFO_MAQUINA, 2),
+}
+FILAS_POR_SENTENCIA = 500
+
+def sql_varias_filas(sql, columnas, filas):
+    """Convierte un INSERT de una fila ('VALUES (?, ...)') en uno de 'filas' filas."""
+    fila = f"({', '.join('?' * columnas)})"
+    return sql.replace(f"VALUES {fila}", f"VALUES {', '.join([fila] * filas)}", 1)
+
+# Fragmentos del mensaje de DuckDB cuando otro proceso tiene el archivo bloqueado:
+# IOException 'Could not set lock on file ... Conflicting lock is held in ...'.
+MENSAJES_BLOQUEO = ('could not set lock', 'conflicting lock')
+
+def es_error_de_bloqueo(error):
+    """
+    Indica si un error de DuckDB se debe a que otro proceso tiene el archivo bloqueado.
+    Otros errores de E/S (ej. 'Could not read block') no se reintentan ni se desvían al spool.
+    """
+    mensaje = str(error).lower()
+    return any(fragmento in mensaje for fragmento in MENSAJES_BLOQUEO)
+
 class DBManager:
     """
     Clase Singleton para gestionar la ruta de la base de datos DuckDB,
-    implementando un mecanismo de cola para manejar bloqueos de archivos.
+    implementando un spool en disco para manejar bloqueos de archivos.
     
-    La escritura intenta primero en la DB principal. Si falla por un bloqueo,
-    la información se almacena en 'monitoreo_queue.duckdb'. Antes de cada escritura,
-    se intenta migrar la cola a la DB principal si esta está disponible.
+    La escritura intenta primero en la DB principal. Si falla por un bloqueo, la
+    fila se anexa al spool de segmentos ('monitoreo_spool/'), sin abrir ninguna otra
+    base de datos. Mientras el spool tiene filas pendientes, las escrituras siguientes
+    van directamente a él y solo cada 'probe_seconds' se sondea si la DB principal
+    se puede abrir; cuando se puede, el spool se vacía por segmentos completos
+    (una transacción por segmento) antes de la nueva escritura.
+
+    La conexión a la DB principal se mantiene abierta mientras llegan escrituras
+    (evita abrir la base, cargar el catálogo y hacer checkpoint en cada sentencia) y
+    se cierra tras un periodo sin uso para liberar el bloqueo del archivo a los
+    lectores externos. Un bloqueo al abrirla se reintenta con espera exponencial
+    aleatoria antes de desviar la escritura a la cola.
     """
     _instance = None
     _db_path = None
-    _queue_db_path = None # Nueva ruta para la base de datos de cola
+    _queue_db_path = None # Base de datos de cola de versiones anteriores (solo se migra)
+    _spool_dir = None
 
     def __new__(cls, db_path=None):
         """
@@ -42,14 +86,157 @@ class DBManager:
                 # Reemplaza .duckdb con _queue.duckdb
                 queue_file_name = file_name.replace(".duckdb", "_queue.duckdb")
                 cls._queue_db_path = os.path.join(base_dir, queue_file_name)
+                cls._spool_dir = os.path.join(base_dir, f"{os.path.splitext(file_name)[0]}_spool")
             else:
                 cls._queue_db_path = None
+                cls._spool_dir = None
+            cls._instance._init_connection()
         return cls._instance
 
+    def _init_connection(self):
+        """Inicializa el estado de la conexión persistente y sus estadísticas."""
+        self._connection = None
+        self._connection_lock = threading.RLock()
+        self._last_use = 0.0
+        self._idle_timer = None
+        self._idle_seconds = 5.0
+        self._lock_retries = 3
+        self._backoff_seconds = 0.05
+        self._spool = SegmentSpool(self._spool_dir) if self._spool_dir else None
+        self._probe_seconds = 30.0
+        self._next_probe = 0.0
+        self._stats = {
+            'aperturas': 0,
+            'reutilizaciones': 0,
+            'reintentos_bloqueo': 0,
+            'cierres_inactividad': 0,
+            'desvios_cola': 0,
+            'sondeos': 0,
+            'filas_vaciadas': 0,
+        }
+
+    def configure_connection(self, idle_seconds=5.0, lock_retries=3, backoff_seconds=0.05):
+        """
+        Configura la conexión persistente a la DB principal.
+
+        :param idle_seconds: Segundos sin escrituras tras los que se cierra la conexión y se libera el archivo.
+        :param lock_retries: Reintentos de apertura ante un bloqueo antes de desviar la escritura a la cola.
+        :param backoff_seconds: Espera base del primer reintento; se duplica en cada intento y se aplica con jitter.
+        """
+        with self._connection_lock:
+            self._idle_seconds = max(0.0, float(idle_seconds))
+            self._lock_retries = max(0, int(lock_retries))
+            self._backoff_seconds = max(0.0, float(backoff_seconds))
+
+    def configure_spool(self, probe_seconds=30.0, segment_bytes=1 << 20, fsync=True):
+        """
+        Configura el spool de filas pendientes.
+
+        :param probe_seconds: Segundos entre sondeos de la DB principal mientras el spool tiene filas pendientes.
+        :param segment_bytes: Tamaño a partir del cual se sella un segmento del spool.
+        :param fsync: Forzar cada fila del spool a disco antes de dar la escritura por buena.
+        """
+        with self._connection_lock:
+            self._probe_seconds = max(0.0, float(probe_seconds))
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = SegmentSpool(self._spool_dir, segment_bytes, fsync)
+
+    def stats(self):
+        """
+        Estadísticas de reutilización de la conexión persistente y del spool.
+
+        :return: Diccionario con aperturas, reutilizaciones, reintentos por bloqueo, cierres por
+                 inactividad, escrituras desviadas al spool, sondeos, filas vaciadas del spool,
+                 filas pendientes y si la conexión está abierta.
+        """
+        with self._connection_lock:
+            estadisticas = dict(self._stats)
+            estadisticas['conexion_abierta'] = self._connection is not None
+            estadisticas['spool_pendientes'] = self._spool.pending if self._spool else 0
+        return estadisticas
+
+    def _get_connection(self, retries=None):
+        """
+        Retorna la conexión persistente a la DB principal, abriéndola si hace falta.
+
+        Si el archivo está bloqueado por otro proceso, reintenta la apertura hasta
+        'lock_retries' veces con espera exponencial y jitter completo (0 a base * 2^intento)
+        para que varios agentes no reintenten a la vez.
+
+        :param retries: Reintentos ante un bloqueo (None = 'lock_retries').
+        :return: La conexión, o None si el archivo sigue bloqueado.
+        :raises DUCKDB_EXCEPTION: Si la apertura falla por un motivo distinto a un bloqueo.
+        """
+        if self._connection is not None:
+            self._stats['reutilizaciones'] += 1
+            return self._connection
+
+        retries = self._lock_retries if retries is None else retries
+        for intento in range(retries + 1):
+            try:
+                self._connection = duckdb.connect(database=self._db_path)
+                self._stats['aperturas'] += 1
+                logging.debug(f"Conexión persistente abierta en {os.path.basename(self._db_path)}.")
+                return self._connection
+            except DUCKDB_EXCEPTION as e:
+                if not es_error_de_bloqueo(e):
+                    raise
+                if intento == retries:
+                    logging.warning(f"{os.path.basename(self._db_path)} sigue bloqueado tras {intento} reintentos: {e}")
+                    return None
+                self._stats['reintentos_bloqueo'] += 1
+                time.sleep(random.uniform(0, self._backoff_seconds * (2 ** intento)))
+
+    def _schedule_idle_release(self):
+        """Programa el cierre de la conexión persistente cuando pase 'idle_seconds' sin uso."""
+        self._last_use = time.monotonic()
+        if self._idle_timer is None and self._connection is not None:
+            self._idle_timer = threading.Timer(self._idle_seconds, self.release_if_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def release_if_idle(self):
+        """
+        Cierra la conexión persistente si no se ha usado durante 'idle_seconds'; si se
+        usó más recientemente, vuelve a programar la comprobación para el tiempo restante.
+
+        :return: True si se cerró la conexión.
+        """
+        with self._connection_lock:
+            self._idle_timer = None
+            if self._connection is None:
+                return False
+            restante = self._last_use + self._idle_seconds - time.monotonic()
+            if restante > 0:
+                self._idle_timer = threading.Timer(restante, self.release_if_idle)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+                return False
+            self._close_persistent_connection()
+            self._stats['cierres_inactividad'] += 1
+            logging.debug(f"Conexión a {os.path.basename(self._db_path)} cerrada por inactividad.")
+            return True
+
+    def _close_persistent_connection(self):
+        """Cierra la conexión persistente (el cierre hace checkpoint y libera el bloqueo del archivo)."""
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception as e:
+                logging.error(f"Error al cerrar la conexión DuckDB: {e}")
+            self._connection = None
+
     def _connect_and_execute(self, db_path: str, query: str, params: tuple = None, is_write: bool = False) -> bool:
         """
-        Método privado de bajo nivel para establecer una conexión transitoria, 
-        ejecutar una consulta y cerrar la conexión en una ruta de DB específica.
+        Método privado de bajo nivel para ejecutar una consulta en una ruta de DB específica.
+
+        En la DB principal se usa la conexión persistente (con reintentos ante bloqueos);
+        en cualquier otra ruta (la cola) se abre una conexión transitoria que se cierra
+        al terminar.
 
         Se ha modificado la gestión de excepciones para ser más resiliente,
         utilizando la excepción DUCKDB_EXCEPTION (que es 'DuckDBError' o 
@@ -65,6 +252,9 @@ class DBManager:
             logging.error("Ruta de la base de datos DuckDB no configurada.")
             return False
 
+        if db_path == self._db_path:
+            return self._execute_persistent(query, params, is_write)
+
         conn = None
         try:
             # Abrir conexión.
@@ -91,6 +281,43 @@ class DBManager:
                 # CERRAR LA CONEXIÓN es clave para liberar el bloqueo del archivo.
                 conn.close()
 
+    def _execute_persistent(self, query: str, params: tuple = None, is_write: bool = False) -> bool:
+        """
+        Ejecuta una consulta en la DB principal con la conexión persistente.
+
+        Si la sentencia falla, la conexión se cierra para no arrastrar una transacción
+        abierta o una base adjuntada a medias a las escrituras siguientes.
+
+        :param query: La consulta SQL a ejecutar.
+        :param params: Parámetros para la consulta parametrizada.
+        :param is_write: Indica si la operación es de escritura, para propósitos de logging.
+        :return: True si la ejecución fue exitosa, False si el archivo sigue bloqueado o hubo un error de DuckDB.
+        """
+        with self._connection_lock:
+            try:
+                conn = self._get_connection()
+                if conn is None:
+                    return False
+
+                if params:
+                    conn.execute(query, params)
+                else:
+                    conn.execute(query)
+
+                if is_write:
+                    logging.debug(f"Operación de escritura exitosa en {os.path.basename(self._db_path)}.")
+                return True
+            except DUCKDB_EXCEPTION as e:
+                logging.debug(f"Fallo de DB en {os.path.basename(self._db_path)}: {e}")
+                self._close_persistent_connection()
+                return False
+            except Exception as e:
+                logging.error(f"Error CRÍTICO inesperado al ejecutar consulta en {os.path.basename(self._db_path)}: {e}. Consulta: {query}")
+                self._close_persistent_connection()
+                return False
+            finally:
+                self._schedule_idle_release()
+
     def _ensure_tables(self, db_path: str):
         """Asegura que las tablas 'metricas' e 'info_maquina' existan en la DB especificada."""
         # Nota: La lógica de creación de tablas ahora se llama con una ruta específica
@@ -123,8 +350,13 @@ class DBManager:
                 battery_percent DOUBLE,
                 cpu_power_package DOUBLE,
                 cpu_power_cores DOUBLE,
-                cpu_clocks DOUBLE
-            )
+                cpu_clocks DOUBLE,
+                red_bytes_enviados_seg DOUBLE,
+                red_bytes_recibidos_seg DOUBLE
+            );
+            -- Las bases creadas antes de guardar tasas de red no tienen las columnas de tasa.
+            ALTER TABLE metricas ADD COLUMN IF NOT EXISTS red_bytes_enviados_seg DOUBLE;
+            ALTER TABLE metricas ADD COLUMN IF NOT EXISTS red_bytes_recibidos_seg DOUBLE;
         """
         self._connect_and_execute(db_path, query, is_write=True)
         logging.debug(f"Tabla 'metricas' verificada/creada en {os.path.basename(db_path)}.")
@@ -163,48 +395,64 @@ class DBManager:
         Intenta migrar los datos desde la base de datos de cola 
         ('monitoreo_queue.duckdb') a la base de datos principal 
         ('monitoreo.duckdb') y luego elimina la cola.
+
+        La cola en DuckDB solo la generan versiones anteriores del agente (las filas
+        pendientes van ahora al spool); se migra una vez al vaciar el spool. Si la
+        migración falla, el siguiente intento espera al próximo sondeo.
+
+        :return: True si la cola se migró y se eliminó.
         """
         # Solo procede si el archivo de cola existe
         if not os.path.exists(self._queue_db_path):
-            return
+            return True
 
         logging.info(f"Intentando migrar datos de la cola ({os.path.basename(self._queue_db_path)}) a la base principal...")
 
         # **CORRECCIÓN:** Asegurar que las tablas de la DB principal existan antes de la migración
         self._ensure_tables(self._db_path)
 
+        # La cola puede venir de una versión con menos columnas: se copian por nombre,
+        # solo las que existen en la cola (la DB principal tiene todas las históricas).
+        columnas = self._queue_columns()
+        if columnas is None:
+            self._next_probe = time.monotonic() + self._probe_seconds
+            logging.warning("No se pudo leer el esquema de la cola. Se reintentará en el siguiente sondeo.")
+            return False
+
         # Utiliza el ATTACH/INSERT de DuckDB para una migración eficiente.
         # Esto solo funciona si podemos abrir la conexión a la DB principal.
-        migration_query_metrics = f"""
-            ATTACH '{self._queue_db_path}' AS queue_db;
-            BEGIN TRANSACTION;
-            INSERT INTO metricas SELECT * FROM queue_db.metricas;
-            COMMIT;
-            DETACH queue_db;
-        """
-        
-        migration_query_info = f"""
-            ATTACH '{self._queue_db_path}' AS queue_db;
-            BEGIN TRANSACTION;
-            -- Usamos UPSERT para la tabla info_maquina
-            INSERT INTO info_maquina 
-            SELECT * FROM queue_db.info_maquina 
-            ON CONFLICT (hostname, username) DO UPDATE SET
-                timestamp = excluded.timestamp,
-                os_name = excluded.os_name,
-                placa_base = excluded.placa_base,
-                procesador_nombre = excluded.procesador_nombre,
-                cores_logicos = excluded.cores_logicos,
-                cores_fisicos = excluded.cores_fisicos,
-                fecha_arranque = excluded.fecha_arranque;
-            COMMIT;
-            DETACH queue_db;
-        """
-        
-        # Intentar migrar métricas
-        metrics_migrated = self._connect_and_execute(self._db_path, migration_query_metrics, is_write=True)
-        # Intentar migrar info_maquina (solo si las métricas tuvieron éxito, o si falló, no importa, intentar de nuevo)
-        info_migrated = self._connect_and_execute(self._db_path, migration_query_info, is_write=True)
+        metrics_migrated = info_migrated = True
+        if columnas.get('metricas'):
+            lista = ", ".join(f'"{columna}"' for columna in columnas['metricas'])
+            migration_query_metrics = f"""
+                ATTACH '{self._queue_db_path}' AS queue_db;
+                BEGIN TRANSACTION;
+                INSERT INTO metricas ({lista}) SELECT {lista} FROM queue_db.metricas ON CONFLICT DO NOTHING;
+                COMMIT;
+                DETACH queue_db;
+            """
+            # Intentar migrar métricas
+            metrics_migrated = self._connect_and_execute(self._db_path, migration_query_metrics, is_write=True)
+
+        if columnas.get('info_maquina'):
+            lista = ", ".join(f'"{columna}"' for columna in columnas['info_maquina'])
+            actualizacion = ",\n                    ".join(
+                f'"{columna}" = excluded."{columna}"'
+                for columna in columnas['info_maquina'] if columna not in ('hostname', 'username')
+            )
+            migration_query_info = f"""
+                ATTACH '{self._queue_db_path}' AS queue_db;
+                BEGIN TRANSACTION;
+                -- Usamos UPSERT para la tabla info_maquina
+                INSERT INTO info_maquina ({lista})
+                SELECT {lista} FROM queue_db.info_maquina
+                ON CONFLICT (hostname, username) DO UPDATE SET
+                    {actualizacion};
+                COMMIT;
+                DETACH queue_db;
+            """
+            # Intentar migrar info_maquina (aunque fallen las métricas, para no perder el inventario)
+            info_migrated = self._connect_and_execute(self._db_path, migration_query_info, is_write=True)
 
         if metrics_migrated and info_migrated:
             # Si ambas migraciones tuvieron éxito, eliminar el archivo de cola
@@ -214,154 +462,216 @@ class DBManager:
             except Exception as e:
                 # Esto es un error no crítico, pero debe ser registrado
                 logging.error(f"Error al intentar eliminar el archivo de cola: {e}")
-        else:
-            logging.warning("Fallo la migración de la cola. El archivo principal sigue bloqueado o hubo un error de DuckDB.")
+            return True
 
-    def _execute_write_operation(self, query: str, params: tuple = None, table_name: str = 'metricas'):
+        # Sin aplazar el sondeo, cada escritura volvería a adjuntar la cola.
+        self._next_probe = time.monotonic() + self._probe_seconds
+        logging.warning("Fallo la migración de la cola. El archivo principal sigue bloqueado o hubo un error de DuckDB.")
+        return False
+
+    def _queue_columns(self):
         """
-        Lógica de escritura principal con fallback a la cola.
-        
-        :param query: Consulta SQL a ejecutar.
-        :param params: Parámetros de la consulta.
-        :param table_name: Nombre de la tabla (usado para asegurar la existencia en la cola).
+        Lee las columnas de las tablas de la cola DuckDB, en el orden de su definición.
+
+        :return: Diccionario tabla -> lista de columnas, o None si la cola no se pudo abrir.
         """
-        # 1. Intentar vaciar la cola antes de la nueva escritura (si la DB principal está libre)
-        self.process_queue()
+        conn = None
+        try:
+            conn = duckdb.connect(database=self._queue_db_path, read_only=True)
+            filas = conn.execute(
+                "SELECT table_name, column_name FROM duckdb_columns() "
+                "WHERE table_name IN ('metricas', 'info_maquina') ORDER BY table_name, column_index"
+            ).fetchall()
+        except DUCKDB_EXCEPTION as e:
+            logging.error(f"Error al leer el esquema de {os.path.basename(self._queue_db_path)}: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+        columnas = {}
+        for tabla, columna in filas:
+            columnas.setdefault(tabla, []).append(columna)
+        return columnas
 
-        # 2. Intentar escribir en la base de datos principal
-        main_success = self._connect_and_execute(self._db_path, query, params, is_write=True)
+    def _probe_main(self) -> bool:
+        """
+        Sondeo del bloqueo de la DB principal: un único intento de apertura, sin reintentos.
+        Si la conexión persistente ya está abierta, la DB es escribible sin más comprobaciones.
 
-        if main_success:
+        :return: True si la DB principal está abierta para este proceso.
+        """
+        if self._connection is not None:
             return True
-        else:
-            # 3. Fallback: Escribir en la base de datos de cola
-            logging.warning(f"Fallo la escritura en {os.path.basename(self._db_path)}. Redirigiendo a {os.path.basename(self._queue_db_path)}.")
-            
-            # Asegurar que las tablas de cola existan antes de escribir en ella por primera vez
-            # Al fallar la escritura principal, la DB de cola debe crearse/verificarse aquí.
-            self._ensure_tables(self._queue_db_path)
+        self._stats['sondeos'] += 1
+        try:
+            return self._get_connection(retries=0) is not None
+        except DUCKDB_EXCEPTION as e:
+            logging.error(f"Error al abrir {os.path.basename(self._db_path)}: {e}")
+            return False
 
-            queue_success = self._connect_and_execute(self._queue_db_path, query, params, is_write=True)
-            
-            if queue_success:
-                # logging.info(f"Escritura exitosa en la base de datos de cola.")
-                return True
-            else:
-                # logging.error(f"Fallo critico al escribir en la base de datos de cola. Los datos se perdieron en este ciclo.")
+    def _write_spooled(self, registros) -> bool:
+        """
+        Escribe las filas de un segmento del spool en la DB principal en una sola transacción,
+        con INSERT de varias filas por sentencia. En cada tabla se conserva la última fila de
+        cada clave primaria, y las métricas ya presentes se ignoran (ON CONFLICT DO NOTHING).
+
+        :param registros: Tuplas (tabla, fila) leídas del segmento.
+        :return: True si la transacción se confirmó.
+        """
+        por_tabla = {}
+        for tabla, fila in registros:
+            if tabla not in SQL_POR_TABLA:
+                logging.error(f"Fila del spool para la tabla desconocida '{tabla}' descartada.")
+                continue
+            por_tabla.setdefault(tabla, {})[fila[:SQL_POR_TABLA[tabla][1]]] = fila
+
+        conn = self._connection
+        try:
+            conn.execute("BEGIN TRANSACTION")
+            for tabla, filas in por_tabla.items():
+                sql = SQL_POR_TABLA[tabla][0]
+                filas = list(filas.values())
+                for i in range(0, len(filas), FILAS_POR_SENTENCIA):
+                    bloque = filas[i:i + FILAS_POR_SENTENCIA]
+                    conn.execute(sql_varias_filas(sql, len(bloque[0]), len(bloque)),
+                                 [valor for fila in bloque for valor in fila])
+            conn.execute("COMMIT")
+            return True
+        except DUCKDB_EXCEPTION as e:
+            logging.error(f"Error al escribir un segmento del spool en {os.path.basename(self._db_path)}: {e}")
+            self._close_persistent_connection()
+            return False
+
+    def _write_spooled_individually(self, registros):
+        """
+        Reintenta fila a fila un segmento cuya transacción falló con la DB abierta (fila dañada
+        o de un esquema anterior): las filas válidas se guardan y las demás se descartan con
+        un error en el log, para que el segmento no bloquee el spool indefinidamente.
+
+        :param registros: Tuplas (tabla, fila) leídas del segmento.
+        :return: True si la DB principal siguió disponible durante la reescritura.
+        """
+        for tabla, fila in registros:
+            if tabla not in SQL_POR_TABLA:
+                continue
+            if not self._connect_and_execute(self._db_path, SQL_POR_TABLA[tabla][0], fila, is_write=True):
+                if not self._probe_main():
+                    return False
+                logging.error(f"Fila del spool para '{tabla}' descartada por error de DuckDB: {fila[:2]}")
+        return True
+
+    def drain_spool(self) -> bool:
+        """
+        Vacía el spool en la DB principal si esta se puede abrir: migra antes la cola DuckDB
+        de versiones anteriores (si existe) y escribe cada segmento sellado, del más antiguo
+        al más reciente, eliminándolo solo después de confirmar su transacción. Un corte entre
+        la confirmación y el borrado reescribe el segmento en el siguiente vaciado sin duplicar
+        filas, porque las inserciones son idempotentes.
+
+        :return: True si el spool quedó vacío.
+        """
+        with self._connection_lock:
+            if not self._probe_main():
                 return False
+            if self._queue_db_path and os.path.exists(self._queue_db_path):
+                self.process_queue()
+            if self._spool is None or not self._spool.pending:
+                return True
+
+            self._ensure_tables(self._db_path)
+            self._spool.seal()
+            for ruta in self._spool.segments():
+                registros = self._spool.read_segment(ruta)
+                if not self._write_spooled(registros):
+                    if not self._probe_main() or not self._write_spooled_individually(registros):
+                        return False
+                self._spool.remove(ruta)
+                self._stats['filas_vaciadas'] += len(registros)
+            logging.info(f"Spool vaciado en {os.path.basename(self._db_path)}.")
+            self._schedule_idle_release()
+            return True
 
-    def upsert_machine_info(self, data):
+    def _to_spool(self, table_name: str, params: tuple) -> bool:
+        """Anexa la fila al spool y aplaza el próximo sondeo de la DB principal."""
+        self._stats['desvios_cola'] += 1
+        self._next_probe = time.monotonic() + self._probe_seconds
+        if self._spool is None:
+            return False
+        return self._spool.append(table_name, params)
+
+    def _execute_write_operation(self, query: str, params: tuple = None, table_name: str = 'metricas'):
+        """
+        Lógica de escritura principal con fallback al spool.
+
+        Con filas pendientes en el spool, la escritura va directamente a él hasta el
+        siguiente sondeo; si el sondeo encuentra la DB principal libre, el spool se vacía
+        antes de escribir la fila nueva para conservar el orden.
+        
+        :param query: Consulta SQL a ejecutar.
+        :param params: Parámetros de la consulta.
+        :param table_name: Tabla de destino (con ella se reaplica la fila guardada en el spool).
+        """
+        with self._connection_lock:
+            pending = self._spool is not None and self._spool.pending
+            legacy_queue = self._queue_db_path and os.path.exists(self._queue_db_path)
+            if pending or legacy_queue:
+                # 1. Sin sondeo pendiente, la fila va directamente al spool (o a la DB principal,
+                #    si solo queda por migrar la cola de versiones anteriores).
+                if time.monotonic() < self._next_probe:
+                    if pending:
+                        return self._to_spool(table_name, params)
+                elif not self.drain_spool():
+                    return self._to_spool(table_name, params)
+
+            # 2. Intentar escribir en la base de datos principal
+            if self._connect_and_execute(self._db_path, query, params, is_write=True):
+                return True
+
+            # 3. Fallback: anexar la fila al spool
+            logging.warning(f"Fallo la escritura en {os.path.basename(self._db_path)}. Redirigiendo al spool {os.path.basename(self._spool_dir)}.")
+            return self._to_spool(table_name, params)
+
+    def upsert_machine_info(self, sample):
         """
         Inserta o actualiza (UPSERT) la información de la máquina utilizando el 
         mecanismo de escritura con fallback.
+
+        :param sample: MetricSample del ciclo (o el diccionario combinado, que se normaliza).
         """
         try:
-            # Lógica para combinar la Placa Base (sin cambios)
-            placa_base_fabricante = data.get('placa_base_fabricante', 'Desconocido')
-            placa_base_producto = data.get('placa_base_producto', 'Desconocido')
-            
-            if placa_base_fabricante == 'Desconocido' and placa_base_producto == 'Desconocido':
-                placa_base_combined = 'Desconocido'
-            else:
-                placa_base_combined = f"{placa_base_fabricante} - {placa_base_producto}".replace("Desconocido - ", "").replace(" - Desconocido", "")
-
-            # Columnas y Valores para la inserción
-            values = (
-                data.get('hostname'),
-                data.get('username'),
-                data.get('timestamp'),
-                data.get('os_name'),
-                placa_base_combined,
-                data.get('procesador_nombre'),
-                data.get('procesador_nucleos_logicos'),
-                data.get('procesador_nucleos_fisicos'),
-                data.get('os_last_boot_up_time')
-            )
-            
-            # Consulta SQL con UPSERT (ON CONFLICT DO UPDATE)
-            sql_query = """
-                INSERT INTO info_maquina (
-                    hostname, username, timestamp, os_name, placa_base,
-                    procesador_nombre, cores_logicos, cores_fisicos, fecha_arranque
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT (hostname, username) DO UPDATE SET
-                    timestamp = excluded.timestamp,
-                    os_name = excluded.os_name,
-                    placa_base = excluded.placa_base,
-                    procesador_nombre = excluded.procesador_nombre,
-                    cores_logicos = excluded.cores_logicos,
-                    cores_fisicos = excluded.cores_fisicos,
-                    fecha_arranque = excluded.fecha_arranque
-            """
-            
+            if isinstance(sample, dict):
+                sample = MetricSample.from_metrics(sample)
             # Ejecución con la lógica de escritura y fallback
-            self._execute_write_operation(sql_query, values, table_name='info_maquina')
-            logging.debug(f"Información de máquina UPSERT gestionada para host: {data.get('hostname')}.")
+            self._execute_write_operation(SQL_UPSERT_INFO_MAQUINA, sample.machine_info_row(), table_name='info_maquina')
+            logging.debug(f"Información de máquina UPSERT gestionada para host: {sample.hostname}.")
 
         except Exception as e:
             logging.error(f"Error inesperado al procesar los datos de la máquina para UPSERT: {e}")
 
-    def insert_metrics(self, data):
+    def insert_metrics(self, sample):
         """
         Inserta un nuevo registro de métricas utilizando el mecanismo de 
-        escritura con fallback a la cola.
+        escritura con fallback al spool.
+
+        :param sample: MetricSample del ciclo (o el diccionario combinado, que se normaliza).
         """
         try:
-            # Lógica de extracción y fallback de datos (sin cambios)
-            cpu_percent = data.get('cpu_percent') or data.get('cpu_freq_current_mhz') or 0
-            ram_percent = data.get('memoria_percent') or data.get('ram_load_percent') or 0
-            ram_used = data.get('memoria_usada_gb') or data.get('ram_load_used_gb') or 0
-            ram_free = data.get('memoria_libre_gb') or data.get('ram_load_free_gb') or 0
-            disk_percent = data.get('disco_percent') or data.get('hdd_used_gb') or 0
-
-            # Valores para la inserción
-            values = (
-                data.get('timestamp'),
-                data.get('hostname'),
-                data.get('username'),
-                cpu_percent,
-                data.get('cpu_freq_current_mhz'),
-                ram_percent,
-                ram_used,
-                data.get('memoria_total_gb'),
-                ram_free,
-                disk_percent,
-                data.get('disco_usado_gb'),
-                data.get('disco_total_gb'),
-                data.get('disco_libre_gb'),
-                data.get('swap_percent'),
-                data.get('swap_usado_gb'),
-                data.get('swap_total_gb'),
-                data.get('red_bytes_enviados'),
-                data.get('red_bytes_recibidos'),
-                data.get('cpu_temperatura_celsius'),
-                data.get('bateria_porcentaje'),
-                data.get('cpu_power_package_watts'),
-                data.get('cpu_power_cores_watts'),
-                data.get('cpu_clocks_mhz')
-            )
-
-            # Consulta SQL para la inserción
-            sql_query = """
-                INSERT INTO metricas (
-                    timestamp, hostname, username, cpu_percent, cpu_freq,
-                    ram_percent, ram_used, ram_total, ram_free, disk_percent,
-                    disk_used, disk_total, disk_free, swap_percent, swap_usado,
-                    swap_total, red_bytes_sent, red_bytes_recv, cpu_temp_celsius,
-                    battery_percent, cpu_power_package, cpu_power_cores, cpu_clocks
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
+            if isinstance(sample, dict):
+                sample = MetricSample.from_metrics(sample)
             # Ejecución con la lógica de escritura y fallback
-            self._execute_write_operation(sql_query, values, table_name='metricas')
+            self._execute_write_operation(SQL_INSERT_METRICAS_IDEMPOTENTE, sample.metric_row(), table_name='metricas')
             logging.debug("Métricas gestionadas para inserción.")
 
         except Exception as e:
             logging.error(f"Error inesperado al insertar métricas: {e}")
 
-    # El método close_connection se mantiene como un stub, ya que la gestión es transitoria.
     def close_connection(self):
-        logging.info("La gestión de conexión DuckDB es transitoria. No hay conexión persistente para cerrar.")
+        """Cierra la conexión persistente (si está abierta) y libera el bloqueo del archivo."""
+        with self._connection_lock:
+            self._close_persistent_connection()
+            if self._spool is not None:
+                self._spool.close()
+        logging.info("Conexión DuckDB cerrada.")
 
 import os
 import logging
@@ -0,0 +1,217 @@
+import logging
+import os
+import pickle
+import struct
+import zlib
+
+# Cabecera de cada registro: longitud del contenido y CRC32 del contenido (little-endian).
+CABECERA = struct.Struct('<II')
+PREFIJO_SEGMENTO = 'segmento_'
+EXTENSION_SEGMENTO = '.spool'
+
+def nombre_segmento(secuencia):
+    """Nombre del archivo de un segmento: 'segmento_<secuencia>.spool' (ordenable como texto)."""
+    return f"{PREFIJO_SEGMENTO}{secuencia:010d}{EXTENSION_SEGMENTO}"
+
+def leer_registros(ruta):
+    """
+    Lee los registros de un segmento en orden.
+
+    Un registro con CRC incorrecto se omite (su longitud permite saltarlo); un registro
+    incompleto al final del archivo procede de un corte durante la escritura y termina
+    la lectura sin afectar a los anteriores.
+
+    Args:
+        ruta (str): Archivo del segmento.
+
+    Returns:
+        tuple: (lista de registros, número de registros dañados).
+    """
+    registros = []
+    corruptos = 0
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+    posicion = 0
+    while posicion + CABECERA.size <= len(datos):
+        longitud, crc = CABECERA.unpack_from(datos, posicion)
+        inicio = posicion + CABECERA.size
+        contenido = datos[inicio:inicio + longitud]
+        if len(contenido) < longitud:
+            corruptos += 1
+            break
+        posicion = inicio + longitud
+        if zlib.crc32(contenido) != crc:
+            corruptos += 1
+            continue
+        try:
+            registros.append(pickle.loads(contenido))
+        except Exception:
+            corruptos += 1
+    if 0 < len(datos) - posicion < CABECERA.size:
+        corruptos += 1
+    return registros, corruptos
+
+class SegmentSpool:
+    """
+    Spool de solo anexado para las filas que no pueden escribirse en la base principal.
+
+    Cada fila se guarda como un registro con prefijo de longitud y CRC32 al final del
+    segmento activo; al superar 'segment_bytes' (o al sellarlo para vaciarlo) se pasa a
+    un segmento nuevo. Los segmentos sellados son inmutables: el consumidor los lee
+    completos, escribe sus filas en una transacción y solo entonces los elimina, de modo
+    que un corte en cualquier punto deja como mucho filas repetidas que la inserción
+    idempotente (ON CONFLICT) descarta. Escribir en el spool no abre ninguna base de datos.
+    """
+
+    def __init__(self, directory, segment_bytes=1 << 20, fsync=True):
+        """
+        Args:
+            directory (str): Carpeta de los segmentos (se crea en la primera escritura).
+            segment_bytes (int): Tamaño a partir del cual se sella el segmento activo.
+            fsync (bool): Forzar cada registro a disco antes de confirmar la escritura.
+        """
+        self._directory = directory
+        self._segment_bytes = max(CABECERA.size + 1, int(segment_bytes))
+        self._fsync = fsync
+        self._active = None
+        self._active_path = None
+        self._active_size = 0
+        self._stats = {'anexados': 0, 'consumidos': 0, 'corruptos': 0, 'segmentos_eliminados': 0}
+        # Los segmentos de una ejecución anterior quedan sellados; se escribe siempre en uno nuevo.
+        self._next_sequence = 1
+        self._pending = 0
+        for ruta in self.segments():
+            self._next_sequence = max(self._next_sequence, self._sequence(ruta) + 1)
+            self._pending += self._count_records(ruta)
+        if self._pending:
+            logging.info(f"Spool {directory}: {self._pending} registros pendientes de una ejecución anterior.")
+
+    @staticmethod
+    def _sequence(ruta):
+        return int(os.path.basename(ruta)[len(PREFIJO_SEGMENTO):-len(EXTENSION_SEGMENTO)])
+
+    @staticmethod
+    def _count_records(ruta):
+        """Cuenta los registros completos de un segmento leyendo solo las cabeceras."""
+        registros = 0
+        tamano = os.path.getsize(ruta)
+        with open(ruta, 'rb') as f:
+            posicion = 0
+            while posicion + CABECERA.size <= tamano:
+                f.seek(posicion)
+                longitud, _ = CABECERA.unpack(f.read(CABECERA.size))
+                posicion += CABECERA.size + longitud
+                if posicion > tamano:
+                    break
+                registros += 1
+        return registros
+
+    @property
+    def pending(self):
+        """Registros escritos en el spool y todavía no consumidos."""
+        return self._pending
+
+    def append(self, table, row):
+        """
+        Añade una fila al segmento activo.
+
+        Args:
+            table (str): Tabla de destino de la fila.
+            row (tuple): Valores de la fila.
+
+        Returns:
+            bool: True si el registro quedó escrito (y sincronizado a disco si fsync está activo).
+        """
+        try:
+            contenido = pickle.dumps((table, tuple(row)), protocol=pickle.HIGHEST_PROTOCOL)
+            if self._active is None:
+                os.makedirs(self._directory, exist_ok=True)
+                self._active_path = os.path.join(self._directory, nombre_segmento(self._next_sequence))
+                self._next_sequence += 1
+                self._active = open(self._active_path, 'ab')
+                self._active_size = 0
+            # Cabecera y contenido en una sola escritura.
+            self._active.write(CABECERA.pack(len(contenido), zlib.crc32(contenido)) + contenido)
+            self._active.flush()
+            if self._fsync:
+                os.fsync(self._active.fileno())
+            self._active_size += CABECERA.size + len(contenido)
+            self._pending += 1
+            self._stats['anexados'] += 1
+            if self._active_size >= self._segment_bytes:
+                self.seal()
+            return True
+        except Exception as e:
+            logging.error(f"No se pudo escribir la fila de '{table}' en el spool: {e}")
+            return False
+
+    def seal(self):
+        """Cierra el segmento activo; la siguiente escritura abre uno nuevo."""
+        if self._active is not None:
+            try:
+                self._active.close()
+            except OSError as e:
+                logging.error(f"Error al cerrar el segmento {self._active_path}: {e}")
+            self._active = None
+            self._active_path = None
+
+    def segments(self):
+        """
+        Segmentos sellados, del más antiguo al más reciente.
+
+        Returns:
+            list: Rutas de los segmentos (sin el activo).
+        """
+        if not os.path.isdir(self._directory):
+            return []
+        rutas = [
+            os.path.join(self._directory, nombre) for nombre in sorted(os.listdir(self._directory))
+            if nombre.startswith(PREFIJO_SEGMENTO) and nombre.endswith(EXTENSION_SEGMENTO)
+        ]
+        return [ruta for ruta in rutas if ruta != self._active_path]
+
+    def read_segment(self, ruta):
+        """
+        Lee los registros de un segmento sellado.
+
+        Args:
+            ruta (str): Segmento retornado por segments().
+
+        Returns:
+            list: Tuplas (tabla, fila) en el orden en que se escribieron.
+        """
+        registros, corruptos = leer_registros(ruta)
+        if corruptos:
+            self._stats['corruptos'] += corruptos
+            logging.warning(f"Segmento {os.path.basename(ruta)}: {corruptos} registros dañados omitidos.")
+        return registros
+
+    def remove(self, ruta):
+        """
+        Elimina un segmento cuyas filas ya se escribieron en la base principal.
+
+        Args:
+            ruta (str): Segmento consumido.
+        """
+        try:
+            registros = self._count_records(ruta)
+            os.remove(ruta)
+        except OSError as e:
+            logging.error(f"No se pudo eliminar el segmento {ruta}: {e}")
+            return
+        self._pending = max(0, self._pending - registros)
+        self._stats['consumidos'] += registros
+        self._stats['segmentos_eliminados'] += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Registros anexados, consumidos, corruptos y pendientes, y segmentos eliminados.
+        """
+        estadisticas = dict(self._stats)
+        estadisticas['pendientes'] = self._pending
+        return estadisticas
+
+    def close(self):
+        """Sella el segmento activo (los registros pendientes se conservan en disco)."""
+        self.seal()
@@ -0,0 +1,281 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import deque
+
+# Políticas cuando la cola está llena.
+POLITICA_DESCARTAR_NUEVO = 'descartar_nuevo'        # Se descarta la operación que llega.
+POLITICA_DESCARTAR_ANTIGUO = 'descartar_antiguo'    # Se descarta la operación descartable más antigua.
+POLITICA_VOLCAR = 'volcar'                          # La operación se vuelca a disco y se reaplica después.
+POLITICAS = (POLITICA_DESCARTAR_NUEVO, POLITICA_DESCARTAR_ANTIGUO, POLITICA_VOLCAR)
+
+# Operaciones que nunca se descartan ni se vuelcan: de ellas depende la coherencia de
+# otras tablas (diferencias de 'procesos_activos', diccionarios de nombres y sensores)
+# o sus datos ya se retiraron del productor (eventos de procesos, que no se repiten).
+# Son pequeñas y no cuentan para el límite de la cola.
+OPERACIONES_CRITICAS = frozenset({
+    'apply_process_changes',
+    'insert_process_events',
+    'insert_process_names',
+    'upsert_sensor_catalog',
+    'upsert_machine_info',
+})
+
+class SQLiteWriter:
+    """
+    Escritor único de la base de datos SQLite.
+
+    Un solo hilo es dueño de la conexión del DBManager y ejecuta, en orden, las
+    operaciones que los productores encolan con submit() sin bloquearse. La cola
+    está acotada: al llenarse se aplica la política configurada (descartar la
+    operación nueva, descartar la más antigua o volcarla a un archivo en disco que
+    se reaplica cuando la cola se vacía). Las operaciones críticas se encolan
+    siempre. stats() expone la profundidad de la cola, la latencia de escritura y
+    los contadores de operaciones descartadas y volcadas.
+    """
+
+    def __init__(self, db_manager, max_queue=1000, policy=POLITICA_VOLCAR, spill_path=None, idle_interval=1.0):
+        """
+        Args:
+            db_manager (DBManager): Gestor de la base de datos; solo el hilo escritor lo usa tras start().
+            max_queue (int): Operaciones descartables que admite la cola.
+            policy (str): Política al llenarse la cola (ver POLITICAS).
+            spill_path (str): Archivo de volcado para POLITICA_VOLCAR. Sin él se descarta la operación nueva.
+            idle_interval (float): Segundos de espera sin operaciones antes de revisar el lote por antigüedad.
+        """
+        if policy not in POLITICAS:
+            logging.warning(f"Política de cola desconocida '{policy}'. Se usa '{POLITICA_VOLCAR}'.")
+            policy = POLITICA_VOLCAR
+        self._db = db_manager
+        self._max_queue = max(1, int(max_queue))
+        self._policy = policy
+        self._spill_path = spill_path
+        self._idle_interval = idle_interval
+        self._queue = deque()
+        self._droppable = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._stopped = False
+        self._busy = False
+        self._thread = None
+        self._stats = {
+            'encoladas': 0,
+            'procesadas': 0,
+            'descartadas': 0,
+            'volcadas': 0,
+            'recuperadas': 0,
+            'errores': 0,
+            'profundidad_max': 0,
+        }
+        self._latency_total = 0.0
+        self._latency_last = 0.0
+        self._latency_max = 0.0
+
+    def start(self):
+        """Inicia el hilo escritor. Las operaciones volcadas en una ejecución anterior se reaplican."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._stopped = False
+            # El hilo está ocupado hasta reaplicar el volcado pendiente y vaciar la cola.
+            self._busy = True
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+        logging.info(f"Escritor SQLite iniciado (cola: {self._max_queue}, política: {self._policy}).")
+
+    def stop(self, timeout=10):
+        """
+        Detiene el hilo escritor tras procesar la cola y cierra la conexión
+        (lo que escribe el lote pendiente del DBManager).
+
+        Args:
+            timeout (float): Tiempo máximo de espera en segundos.
+        """
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logging.warning("El escritor SQLite no terminó a tiempo; la conexión queda abierta.")
+                return
+        self._db.close_connection()
+        logging.info(f"Escritor SQLite detenido. Estadísticas: {self.stats()}")
+
+    def submit(self, operation, *args):
+        """
+        Encola una operación del DBManager sin bloquear al productor.
+
+        Las operaciones encoladas antes de start() se ejecutan al arrancar; tras stop()
+        se rechazan, porque el hilo ya no las ejecutaría y la conexión está cerrada.
+
+        Args:
+            operation (str): Nombre del método del DBManager (ej. 'insert_metrics').
+            *args: Argumentos del método.
+
+        Returns:
+            bool: True si la operación quedó encolada o volcada; False si se descartó.
+        """
+        critica = operation in OPERACIONES_CRITICAS
+        with self._condition:
+            if self._stopped:
+                self._stats['descartadas'] += 1
+                logging.error(f"Escritor SQLite detenido: se rechaza la operación '{operation}'.")
+                return False
+            if not critica and self._droppable >= self._max_queue:
+                if not self._on_full(operation, args):
+                    return False
+                if self._policy == POLITICA_VOLCAR and self._spill_path:
+                    return True
+            self._queue.append((operation, args, critica))
+            if not critica:
+                self._droppable += 1
+            self._stats['encoladas'] += 1
+            self._stats['profundidad_max'] = max(self._stats['profundidad_max'], len(self._queue))
+            self._condition.notify()
+        return True
+
+    def _on_full(self, operation, args):
+        """Aplica la política de cola llena. Retorna False si la operación nueva se descarta."""
+        if self._policy == POLITICA_VOLCAR and self._spill_path:
+            return self._spill(operation, args)
+        if self._policy == POLITICA_DESCARTAR_ANTIGUO:
+            for i, (_, _, critica) in enumerate(self._queue):
+                if not critica:
+                    antigua = self._queue[i][0]
+                    del self._queue[i]
+                    self._droppable -= 1
+                    self._stats['descartadas'] += 1
+                    logging.warning(f"Cola del escritor llena: se descarta la operación más antigua '{antigua}'.")
+                    return True
+        self._stats['descartadas'] += 1
+        logging.warning(f"Cola del escritor llena: se descarta la operación '{operation}'.")
+        return False
+
+    def _spill(self, operation, args):
+        """Añade la operación al archivo de volcado. Retorna False si no se pudo escribir."""
+        try:
+            with open(self._spill_path, 'ab') as f:
+                pickle.dump((operation, args), f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._stats['volcadas'] += 1
+            return True
+        except Exception as e:
+            self._stats['descartadas'] += 1
+            logging.error(f"No se pudo volcar la operación '{operation}' a disco: {e}")
+            return False
+
+    def _take_spilled(self):
+        """
+        Toma y elimina el archivo de volcado. Retorna la lista de operaciones volcadas.
+        El archivo se renombra bajo el bloqueo para no perder lo que los productores vuelcan mientras se lee.
+        """
+        if not self._spill_path:
+            return []
+        en_curso = f"{self._spill_path}.reaplicar"
+        with self._condition:
+            # Un archivo '.reaplicar' previo procede de una ejecución interrumpida y se reaplica primero.
+            if not os.path.exists(en_curso):
+                if not os.path.exists(self._spill_path):
+                    return []
+                os.replace(self._spill_path, en_curso)
+        operaciones = []
+        try:
+            with open(en_curso, 'rb') as f:
+                while True:
+                    try:
+                        operaciones.append(pickle.load(f))
+                    except EOFError:
+                        break
+        except Exception as e:
+            # Un registro truncado (corte durante la escritura) se descarta; los anteriores se conservan.
+            logging.error(f"Archivo de volcado del escritor dañado tras {len(operaciones)} operaciones: {e}")
+        try:
+            os.remove(en_curso)
+        except OSError as e:
+            logging.error(f"No se pudo eliminar el archivo de volcado del escritor: {e}")
+        return operaciones
+
+    def _execute(self, operation, args):
+        """Ejecuta una operación sobre el DBManager y registra su latencia."""
+        inicio = time.perf_counter()
+        try:
+            getattr(self._db, operation)(*args)
+        except Exception as e:
+            self._stats['errores'] += 1
+            logging.error(f"Error en la operación '{operation}' del escritor SQLite: {e}")
+        latencia = time.perf_counter() - inicio
+        self._latency_last = latencia
+        self._latency_total += latencia
+        self._latency_max = max(self._latency_max, latencia)
+        self._stats['procesadas'] += 1
+
+    def _replay_spilled(self):
+        """Reaplica las operaciones volcadas a disco durante la saturación de la cola."""
+        for operation, args in self._take_spilled():
+            self._execute(operation, args)
+            self._stats['recuperadas'] += 1
+
+    def _run(self):
+        """Bucle del hilo escritor: ninguna escritura se ejecuta con el bloqueo de la cola tomado."""
+        self._replay_spilled()
+        while True:
+            with self._condition:
+                if not self._queue and self._running:
+                    self._busy = False
+                    self._condition.notify_all()
+                    self._condition.wait(self._idle_interval)
+                siguiente = None
+                if self._queue:
+                    operation, args, critica = self._queue.popleft()
+                    if not critica:
+                        self._droppable -= 1
+                    siguiente = (operation, args)
+                    self._busy = True
+                terminar = not self._queue and not self._running
+            if siguiente is not None:
+                self._execute(*siguiente)
+            else:
+                # Sin operaciones: el lote del DBManager se revisa por antigüedad.
+                self._db.flush_if_due()
+            if not self._queue:
+                # La cola se vació: se reaplican las operaciones volcadas durante la saturación.
+                self._replay_spilled()
+            if terminar and not self._queue:
+                break
+        with self._condition:
+            self._busy = False
+            self._condition.notify_all()
+
+    def wait_idle(self, timeout=None):
+        """
+        Espera a que la cola se vacíe y el hilo no esté ejecutando ninguna operación.
+
+        Returns:
+            bool: True si el escritor quedó inactivo antes del plazo.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def stats(self):
+        """
+        Métricas del escritor.
+
+        Returns:
+            dict: Profundidad actual y máxima de la cola, operaciones encoladas, procesadas,
+                  descartadas, volcadas, recuperadas y con error, y latencia de escritura
+                  (última, media y máxima) en milisegundos.
+        """
+        with self._condition:
+            estadisticas = dict(self._stats)
+            estadisticas['profundidad'] = len(self._queue)
+        procesadas = estadisticas['procesadas']
+        estadisticas['latencia_ultima_ms'] = round(self._latency_last * 1000, 3)
+        estadisticas['latencia_media_ms'] = round(self._latency_total / procesadas * 1000, 3) if procesadas else 0.0
+        estadisticas['latencia_max_ms'] = round(self._latency_max * 1000, 3)
+        return estadisticas
@@ -0,0 +1,208 @@
+import glob
+import logging
+import os
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+DIA_MS = 86400000
+
+# Tablas de series temporales que, en modo particionado, se guardan en un archivo por día
+# (UTC). Las tablas diccionario, 'info_maquina', 'procesos_activos' y los agregados
+# ('metricas_1m', 'metricas_1h') siguen en el archivo principal.
+TABLAS_PARTICIONADAS = (
+    'metricas_v2', 'procesos', 'procesos_grupos', 'procesos_eventos',
+    'volumenes', 'discos_io', 'red', 'sensores_ohm',
+)
+
+def dia_de(ts):
+    """Día UTC (días desde epoch) de una marca de tiempo en milisegundos epoch."""
+    return ts // DIA_MS
+
+def nombre_archivo_particion(dia):
+    """Nombre del archivo de la partición de un día: 'metricas_AAAAMMDD.db' (fecha UTC)."""
+    return f"metricas_{datetime.fromtimestamp(dia * 86400, tz=timezone.utc):%Y%m%d}.db"
+
+class PartitionSet:
+    """
+    Particiones diarias de las series temporales de la base SQLite.
+
+    Cada día UTC se escribe en su propio archivo SQLite, adjuntado (ATTACH) a la
+    conexión principal con el esquema 'p<día>': los índices de cada archivo son
+    pequeños y la retención consiste en borrar archivos (o eliminar tablas vencidas,
+    con auto_vacuum=FULL para que el archivo se reduzca). Las tablas del archivo
+    principal sirven de plantilla para crear las de cada partición, y el
+    catálogo 'particiones' del archivo principal enruta las consultas. Solo se
+    mantienen adjuntadas las particiones más recientes; los días cerrados quedan
+    como archivos inmutables que pueden comprimirse o enviarse completos.
+    """
+
+    def __init__(self, connection, directory, max_attached=2):
+        """
+        Args:
+            connection (sqlite3.Connection): Conexión principal del DBManager.
+            directory (str): Carpeta de los archivos de partición.
+            max_attached (int): Particiones adjuntadas a la vez (la del día y la anterior para filas tardías).
+        """
+        self._connection = connection
+        self._directory = directory
+        self._max_attached = max(1, int(max_attached))
+        # dia -> esquema adjuntado, del menos al más recientemente usado.
+        self._attached = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS particiones (
+                dia INTEGER PRIMARY KEY,
+                archivo TEXT NOT NULL
+            )
+        ''')
+        self._connection.commit()
+
+    def table(self, tabla, ts):
+        """
+        Nombre calificado de una tabla particionada para una marca de tiempo (adjunta la partición si hace falta).
+
+        Args:
+            tabla (str): Tabla de TABLAS_PARTICIONADAS.
+            ts (int): Marca de tiempo en milisegundos epoch.
+
+        Returns:
+            str: '<esquema>.<tabla>'.
+        """
+        return f"{self._attach(dia_de(ts))}.{tabla}"
+
+    def _attach(self, dia):
+        """Adjunta la partición de un día (creando archivo y tablas si es nueva) y retorna su esquema."""
+        esquema = self._attached.get(dia)
+        if esquema is not None:
+            self._attached.move_to_end(dia)
+            return esquema
+
+        # ATTACH y DETACH no se permiten dentro de una transacción.
+        self._connection.commit()
+        while len(self._attached) >= self._max_attached:
+            _, antiguo = self._attached.popitem(last=False)
+            self._connection.execute(f"DETACH DATABASE {antiguo}")
+
+        esquema = f"p{dia}"
+        archivo = nombre_archivo_particion(dia)
+        self._connection.execute("ATTACH DATABASE ? AS " + esquema, (os.path.join(self._directory, archivo),))
+        # auto_vacuum solo se puede fijar antes de crear la primera tabla: DROP TABLE libera el espacio.
+        self._connection.execute(f"PRAGMA {esquema}.auto_vacuum=FULL")
+        self._connection.execute(f"PRAGMA {esquema}.journal_mode=WAL").fetchone()
+        self._connection.execute(f"PRAGMA {esquema}.synchronous=NORMAL")
+        self._create_tables(esquema)
+        self._connection.execute("INSERT OR IGNORE INTO particiones (dia, archivo) VALUES (?, ?)", (dia, archivo))
+        self._connection.commit()
+        self._attached[dia] = esquema
+        logging.debug(f"Partición {archivo} adjuntada como '{esquema}'.")
+        return esquema
+
+    def _create_tables(self, esquema):
+        """Crea en la partición las tablas e índices particionados a partir de las plantillas del archivo principal."""
+        plantillas = self._connection.execute(
+            f"SELECT type, name, tbl_name, sql FROM main.sqlite_master "
+            f"WHERE tbl_name IN ({', '.join('?' * len(TABLAS_PARTICIONADAS))}) AND sql IS NOT NULL",
+            TABLAS_PARTICIONADAS
+        ).fetchall()
+        for tipo, nombre, _, sql in sorted(plantillas, key=lambda p: p[0] != 'table'):
+            # SQLite guarda la sentencia como 'CREATE TABLE <nombre> ...' / 'CREATE INDEX <nombre> ...'.
+            prefijo = f"CREATE {tipo.upper()} {nombre}"
+            if sql.startswith(prefijo):
+                self._connection.execute(f"CREATE {tipo.upper()} IF NOT EXISTS {esquema}.{nombre}{sql[len(prefijo):]}")
+
+    def days(self, start_ms=None, end_ms=None):
+        """
+        Días del catálogo que se solapan con un rango.
+
+        Args:
+            start_ms (int): Inicio del rango en milisegundos epoch (incluido). None = sin límite.
+            end_ms (int): Fin del rango en milisegundos epoch (excluido). None = sin límite.
+
+        Returns:
+            list: Tuplas (dia, ruta del archivo) ordenadas por día.
+        """
+        desde = dia_de(start_ms) if start_ms is not None else -1
+        hasta = dia_de(end_ms - 1) if end_ms is not None else 1 << 40
+        filas = self._connection.execute(
+            "SELECT dia, archivo FROM particiones WHERE dia BETWEEN ? AND ? ORDER BY dia", (desde, hasta)
+        ).fetchall()
+        return [(dia, os.path.join(self._directory, archivo)) for dia, archivo in filas]
+
+    def query(self, sql, params, start_ms, end_ms):
+        """
+        Ejecuta una consulta sobre cada partición del rango con una conexión de solo lectura
+        y concatena los resultados en orden de día. La sentencia usa los nombres de tabla sin
+        esquema y se ejecuta tal cual en cada archivo.
+
+        Args:
+            sql (str): Consulta a ejecutar en cada partición.
+            params (tuple): Parámetros de la consulta.
+            start_ms (int): Inicio del rango en milisegundos epoch (incluido).
+            end_ms (int): Fin del rango en milisegundos epoch (excluido).
+
+        Returns:
+            list: Filas de todas las particiones.
+        """
+        filas = []
+        for _, ruta in self.days(start_ms, end_ms):
+            if not os.path.exists(ruta):
+                continue
+            con = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+            try:
+                filas.extend(con.execute(sql, params).fetchall())
+            except sqlite3.OperationalError as e:
+                # Una tabla eliminada por la retención de la partición no tiene filas que aportar.
+                logging.debug(f"Partición {ruta} omitida en la consulta: {e}")
+            finally:
+                con.close()
+        return filas
+
+    def apply_retention(self, retention_ms, now_ms):
+        """
+        Retención por archivo: en cada partición vencida se eliminan las tablas cuya retención
+        terminó y, si todas vencieron, se borra el archivo completo en lugar de ejecutar DELETE.
+
+        Args:
+            retention_ms (dict): Tabla -> milisegundos a conservar (solo las que tienen retención).
+            now_ms (int): Instante de referencia en milisegundos epoch.
+
+        Returns:
+            int: Número de archivos de partición borrados.
+        """
+        borrados = 0
+        for dia, ruta in self.days():
+            fin_ms = (dia + 1) * DIA_MS
+            vencidas = [t for t in TABLAS_PARTICIONADAS if t in retention_ms and fin_ms <= now_ms - retention_ms[t]]
+            if not vencidas:
+                continue
+            esquema = self._attached.pop(dia, None)
+            if esquema is not None:
+                self._connection.commit()
+                self._connection.execute(f"DETACH DATABASE {esquema}")
+            if len(vencidas) == len(TABLAS_PARTICIONADAS):
+                for archivo in glob.glob(f"{glob.escape(ruta)}*"):
+                    os.remove(archivo)
+                self._connection.execute("DELETE FROM particiones WHERE dia = ?", (dia,))
+                self._connection.commit()
+                borrados += 1
+                logging.info(f"Partición {os.path.basename(ruta)} eliminada por retención.")
+            elif os.path.exists(ruta):
+                con = sqlite3.connect(ruta)
+                try:
+                    for tabla in vencidas:
+                        con.execute(f"DROP TABLE IF EXISTS {tabla}")
+                    con.commit()
+                    # Las particiones creadas sin auto_vacuum se compactan (el día ya está cerrado).
+                    if con.execute("PRAGMA auto_vacuum").fetchone()[0] == 0 and con.execute("PRAGMA freelist_count").fetchone()[0]:
+                        con.execute("VACUUM")
+                finally:
+                    con.close()
+        return borrados
+
+    def detach_all(self):
+        """Separa todas las particiones adjuntadas (antes de cerrar la conexión)."""
+        self._connection.commit()
+        while self._attached:
+            _, esquema = self._attached.popitem(last=False)
+            self._connection.execute(f"DETACH DATABASE {esquema}")
@@ -1,10 +1,121 @@
 import sqlite3
 import logging
 import os
+import threading
+import time
+from datetime import datetime
+
+from libs.muestra.main_muestra import MetricSample, COLUMNAS_METRICAS_V2, SQL_UPSERT_INFO_MAQUINA
+from sqlite.main_particiones import PartitionSet, TABLAS_PARTICIONADAS, DIA_MS, dia_de
+
+# Versión del esquema (PRAGMA user_version): 2 = 'metricas_v2' con claves enteras.
+VERSION_ESQUEMA = 2
+
+# Plantilla de inserción; {tabla} es 'metricas_v2' o, en modo particionado, '<esquema>.metricas_v2'.
+SQL_INSERT_METRICAS_V2 = (
+    f"INSERT INTO {{tabla}} (ts, host_id, user_id, {', '.join(COLUMNAS_METRICAS_V2)}) "
+    f"VALUES ({', '.join('?' * (len(COLUMNAS_METRICAS_V2) + 3))})"
+)
+
+# Agregados incrementales de 'metricas_v2': (tabla, segundos por intervalo), del más grueso al más fino.
+NIVELES_AGREGADOS = (('metricas_1h', 3600), ('metricas_1m', 60))
+
+# Métricas agregadas (los totales son constantes y no se agregan). Por cada una se guarda
+# <col>_min, <col>_max, <col>_suma, <col>_n (valores no nulos) y <col>_ultimo.
+COLUMNAS_AGREGADAS = tuple(c for c in COLUMNAS_METRICAS_V2 if not c.endswith('_total_bytes'))
+
+def _sql_crear_agregado(tabla):
+    """Sentencia CREATE TABLE de un nivel de agregados."""
+    columnas = ",\n".join(
+        f"{c}_min REAL, {c}_max REAL, {c}_suma REAL, {c}_n INTEGER, {c}_ultimo REAL" for c in COLUMNAS_AGREGADAS
+    )
+    return (
+        f"CREATE TABLE IF NOT EXISTS {tabla} (\n"
+        f"ts INTEGER NOT NULL, host_id INTEGER NOT NULL, muestras INTEGER NOT NULL, ultimo_ts INTEGER NOT NULL,\n"
+        f"{columnas},\nPRIMARY KEY (ts, host_id)) WITHOUT ROWID"
+    )
+
+def _sql_upsert_agregado(tabla, segundos):
+    """
+    UPSERT de un nivel de agregados que recibe directamente las filas de 'metricas_v2'
+    (parámetros numerados: ?1 = ts, ?2 = host_id, ?4... = valores), de modo que el lote
+    se agrega con un solo executemany y sin recalcular el intervalo completo.
+    """
+    periodo = segundos * 1000
+    columnas, valores, cambios = ['ts', 'host_id', 'muestras', 'ultimo_ts'], [f"?1 - ?1 % {periodo}", "?2", "1", "?1"], [
+        "muestras = muestras + 1",
+        "ultimo_ts = max(ultimo_ts, excluded.ultimo_ts)",
+    ]
+    for c in COLUMNAS_AGREGADAS:
+        v = f"?{COLUMNAS_METRICAS_V2.index(c) + 4}"
+        columnas += [f"{c}_min", f"{c}_max", f"{c}_suma", f"{c}_n", f"{c}_ultimo"]
+        valores += [v, v, v, f"{v} IS NOT NULL", v]
+        cambios += [
+            # min()/max() escalares de SQLite retornan NULL si un argumento es NULL.
+            f"{c}_min = min(coalesce({c}_min, excluded.{c}_min), coalesce(excluded.{c}_min, {c}_min))",
+            f"{c}_max = max(coalesce({c}_max, excluded.{c}_max), coalesce(excluded.{c}_max, {c}_max))",
+            f"{c}_suma = coalesce({c}_suma + excluded.{c}_suma, {c}_suma, excluded.{c}_suma)",
+            f"{c}_n = {c}_n + excluded.{c}_n",
+            # Último valor no nulo; una fila que llega fuera de orden no lo reemplaza.
+            f"{c}_ultimo = CASE WHEN excluded.ultimo_ts >= ultimo_ts THEN coalesce(excluded.{c}_ultimo, {c}_ultimo) "
+            f"ELSE coalesce({c}_ultimo, excluded.{c}_ultimo) END",
+        ]
+    return (
+        f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join(valores)}) "
+        f"ON CONFLICT (ts, host_id) DO UPDATE SET {', '.join(cambios)}"
+    )
+
+SQL_UPSERT_AGREGADOS = {tabla: _sql_upsert_agregado(tabla, segundos) for tabla, segundos in NIVELES_AGREGADOS}
+
+# Tablas con ts en milisegundos epoch como primera columna de la clave (o de un índice)
+# sobre las que se aplica la retención por antigüedad.
+TABLAS_RETENCION = (
+    'metricas_v2', 'metricas_1m', 'metricas_1h', 'procesos', 'procesos_grupos', 'procesos_eventos',
+    'volumenes', 'discos_io', 'red', 'sensores_ohm',
+)
+
+# La migración conserva una fila ya escrita con el esquema nuevo para el mismo (ts, host).
+SQL_MIGRAR_METRICAS_V2 = SQL_INSERT_METRICAS_V2.replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+
+# Columnas en bytes de 'metricas_v2' -> columnas en GB de la tabla anterior 'metricas'.
+_COLUMNAS_GB_V1 = {
+    'ram_used_bytes': 'ram_used', 'ram_total_bytes': 'ram_total', 'ram_free_bytes': 'ram_free',
+    'disk_used_bytes': 'disk_used', 'disk_total_bytes': 'disk_total', 'disk_free_bytes': 'disk_free',
+    'swap_used_bytes': 'swap_usado', 'swap_total_bytes': 'swap_total',
+}
+_BYTES_POR_GB = 1024 ** 3
+
+def epoch_ms(timestamp):
+    """
+    Convierte una marca de tiempo ISO 8601 (hora local, como la escribe el agente) a milisegundos epoch.
+
+    :param timestamp: Cadena ISO 8601.
+    :return: Milisegundos epoch (int).
+    """
+    return int(round(datetime.fromisoformat(timestamp).timestamp() * 1000))
 
 class DBManager:
     """
     Clase Singleton para gestionar la conexión a la base de datos SQLite.
+
+    Las métricas del ciclo se guardan en 'metricas_v2': clave (ts en milisegundos
+    epoch, host_id) sin rowid, de modo que la tabla queda agrupada por tiempo, con
+    hostname y username sustituidos por ids de las tablas diccionario 'hosts' y
+    'usuarios' y los tamaños en bytes enteros. La tabla anterior 'metricas' (clave
+    TEXT ISO 8601, tamaños en GB) se migra por tramos con migrate_legacy_metrics().
+    Los agregados de 1 minuto y 1 hora ('metricas_1m', 'metricas_1h') se actualizan
+    con un UPSERT en la misma transacción que escribe cada lote; query_metrics()
+    lee del nivel más grueso que cumple la resolución pedida.
+
+    La retención por tabla (configure_retention) borra las filas vencidas por tramos
+    sobre el índice de tiempo y el archivo se reduce con auto_vacuum=INCREMENTAL
+    (incremental_vacuum), sin pausas largas en el hilo escritor.
+
+    Las filas de 'metricas_v2' e 'info_maquina' pueden acumularse en memoria y
+    escribirse por lotes (executemany en una sola transacción) al alcanzar un
+    número de filas o una antigüedad máxima; ver configure_batching(). La base
+    usa journal WAL con synchronous=NORMAL, de modo que un commit no fuerza un
+    fsync del archivo principal.
     """
     _instance = None
     _connection = None
@@ -18,17 +129,52 @@ class DBManager:
         if cls._instance is None:
             # Si no existe una instancia, la creamos
             cls._instance = super(DBManager, cls).__new__(cls)
+            cls._instance._init_batching()
             if db_path:
                 cls._db_path = db_path
                 cls._instance._connect()
         return cls._instance
 
+    def _init_batching(self):
+        """Inicializa el lote pendiente; por defecto cada fila se escribe de inmediato."""
+        # Serializa el lote y la conexión entre el bucle principal y SvcStop.
+        self._lock = threading.RLock()
+        self._batch_rows = 1
+        self._batch_seconds = 0
+        self._pending_metrics = []
+        self._pending_info = {}
+        self._pending_since = None
+        self._machine_info_ready = False
+        # Caché de las tablas diccionario: (tabla, valor) -> id.
+        self._dimension_ids = {}
+        self._legacy_pending = False
+        # Niveles de agregados mantenidos (ver configure_rollups).
+        self._rollup_levels = NIVELES_AGREGADOS
+        # Retención: tabla -> milisegundos a conservar (ver configure_retention).
+        self._retention_ms = {}
+        self._retention_chunk = 5000
+        self._retention_backlog = False
+        self._auto_vacuum_pending = False
+        # Particiones diarias de las series temporales (ver configure_partitioning).
+        self._partitions = None
+        self._partition_retention_day = None
+        # Tablas particionadas con filas en el archivo principal, escritas antes de activar las particiones.
+        self._partition_backlog = []
+
     def _connect(self):
         """Método privado para establecer la conexión."""
         if not self._connection:
             try:
-                self._connection = sqlite3.connect(self._db_path)
+                # La conexión se comparte con SvcStop (otro hilo), que vacía el lote al detener el servicio.
+                self._connection = sqlite3.connect(self._db_path, check_same_thread=False)
                 self._cursor = self._connection.cursor()
+                # auto_vacuum solo se puede fijar antes de crear la primera tabla; las bases
+                # anteriores se convierten con un VACUUM único (ver incremental_vacuum).
+                self._cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                self._auto_vacuum_pending = self._cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+                # WAL + synchronous=NORMAL: los commits solo escriben en el WAL, sin fsync por transacción.
+                self._cursor.execute("PRAGMA journal_mode=WAL").fetchone()
+                self._cursor.execute("PRAGMA synchronous=NORMAL")
                 logging.info(f"Conexión a la base de datos {self._db_path} establecida.")
                 # Llama a la función existente para asegurar que la tabla 'metricas' existe
                 self.create_table() 
@@ -37,51 +183,635 @@ class DBManager:
                 self._connection = None
 
     def close_connection(self):
-        """Cierra la conexión a la base de datos."""
-        if self._connection:
-            self._connection.close()
-            self._connection = None
-            logging.info("Conexión a la base de datos cerrada.")
+        """Escribe el lote pendiente y cierra la conexión a la base de datos."""
+        with self._lock:
+            if self._connection:
+                self.flush()
+                if self._partitions:
+                    self._partitions.detach_all()
+                # Cerrar el cursor primero permite a SQLite hacer el checkpoint del WAL al cerrar.
+                self._cursor.close()
+                self._connection.close()
+                self._connection = None
+                logging.info("Conexión a la base de datos cerrada.")
+
+    # --- Escritura por lotes de 'metricas' e 'info_maquina' ---
+
+    def configure_batching(self, max_rows, max_age_seconds):
+        """
+        Configura la escritura por lotes.
+
+        :param max_rows: Filas de 'metricas' acumuladas que disparan la escritura (1 = inmediata).
+        :param max_age_seconds: Antigüedad máxima en segundos de la fila más antigua del lote.
+        """
+        with self._lock:
+            self._batch_rows = max(1, int(max_rows))
+            self._batch_seconds = max(0, max_age_seconds)
+            logging.info(f"Escritura por lotes de métricas: {self._batch_rows} filas o {self._batch_seconds} s.")
+            self.flush_if_due()
+
+    def pending_rows(self):
+        """Retorna el número de filas de 'metricas' pendientes de escribir."""
+        return len(self._pending_metrics)
+
+    def flush_if_due(self):
+        """Escribe el lote si alcanzó el número de filas o la antigüedad máxima."""
+        with self._lock:
+            if not self._pending_metrics and not self._pending_info:
+                return
+            if (len(self._pending_metrics) >= self._batch_rows
+                    or time.monotonic() - self._pending_since >= self._batch_seconds):
+                self.flush()
+
+    def flush(self):
+        """
+        Escribe el lote pendiente con executemany en una única transacción.
+        Si la transacción falla, las filas se reintentan una a una y se descartan las que fallen.
+
+        :return: True si el lote se escribió completo.
+        """
+        with self._lock:
+            if not self._pending_metrics and not self._pending_info:
+                return True
+            if not self._connection:
+                logging.error("No hay conexión a la base de datos.")
+                return False
+
+            metricas = self._pending_metrics
+            info = list(self._pending_info.values())
+            self._pending_metrics = []
+            self._pending_info = {}
+            self._pending_since = None
+            completo = True
+            try:
+                # En modo particionado cada día se escribe en su propia transacción.
+                for tabla, filas in self._partition_groups('metricas_v2', metricas):
+                    sql = SQL_INSERT_METRICAS_V2.format(tabla=tabla)
+                    try:
+                        with self._connection:
+                            self._cursor.executemany(sql, filas)
+                            self._update_rollups(filas)
+                    except sqlite3.Error as e:
+                        logging.error(f"Error al escribir el lote de métricas: {e}. Se reintenta fila a fila.")
+                        self._write_rows_individually(sql, filas, rollups=True)
+                        completo = False
+                if info:
+                    try:
+                        with self._connection:
+                            self._cursor.executemany(SQL_UPSERT_INFO_MAQUINA, info)
+                    except sqlite3.Error as e:
+                        logging.error(f"Error al escribir el lote de info_maquina: {e}. Se reintenta fila a fila.")
+                        self._write_rows_individually(SQL_UPSERT_INFO_MAQUINA, info)
+                        completo = False
+                logging.debug(f"Lote escrito: {len(metricas)} filas de métricas y {len(info)} de info_maquina.")
+            except sqlite3.Error as e:
+                logging.error(f"Error al abrir la partición del lote de métricas: {e}")
+                completo = False
+            return completo
+
+    def _write_rows_individually(self, sql, filas, rollups=False):
+        """
+        Escribe cada fila por separado (mismo comportamiento que la escritura inmediata).
+
+        :param sql: Sentencia de inserción.
+        :param filas: Filas a escribir.
+        :param rollups: True para sumar a los agregados las filas de 'metricas_v2' escritas.
+        """
+        for fila in filas:
+            try:
+                self._cursor.execute(sql, fila)
+                if rollups:
+                    # Solo las filas escritas se suman a los agregados.
+                    self._update_rollups([fila])
+            except sqlite3.Error as e:
+                logging.error(f"Error al insertar métricas: {e}")
+        try:
+            self._connection.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error al confirmar las filas del lote: {e}")
+
+    def _update_rollups(self, filas):
+        """
+        Suma las filas de 'metricas_v2' a los agregados de 1 minuto y 1 hora (dentro de la transacción en curso).
+
+        :param filas: Filas de 'metricas_v2' recién escritas.
+        """
+        for tabla, _ in self._rollup_levels:
+            self._cursor.executemany(SQL_UPSERT_AGREGADOS[tabla], filas)
+
+    def configure_rollups(self, sample_interval_seconds):
+        """
+        Mantiene solo los niveles de agregados más gruesos que el intervalo de muestreo:
+        con una muestra por minuto, 'metricas_1m' repetiría cada fila de 'metricas_v2'.
+
+        :param sample_interval_seconds: Segundos entre muestras del agente.
+        """
+        with self._lock:
+            self._rollup_levels = tuple((t, s) for t, s in NIVELES_AGREGADOS if s > sample_interval_seconds)
+            logging.info(f"Agregados de métricas mantenidos: {[t for t, _ in self._rollup_levels] or 'ninguno'}.")
+
+    # --- Particiones diarias ---
+
+    def configure_partitioning(self, directory, max_attached=2):
+        """
+        Activa el modo particionado: las series temporales (TABLAS_PARTICIONADAS) se escriben
+        en un archivo SQLite por día UTC dentro de 'directory' (ver PartitionSet). Debe
+        llamarse tras crear las tablas, que sirven de plantilla para las particiones.
+        Las filas que esas tablas ya tenían se mueven a sus particiones por tramos con
+        migrate_to_partitions(); hasta entonces la retención las sigue borrando del archivo principal.
+
+        :param directory: Carpeta de los archivos de partición.
+        :param max_attached: Particiones adjuntadas a la vez a la conexión.
+        """
+        with self._lock:
+            if not self._connection:
+                logging.error("No hay conexión a la base de datos.")
+                return
+            try:
+                self.flush()
+                self._partitions = PartitionSet(self._connection, directory, max_attached)
+                existentes = {fila[0] for fila in self._cursor.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+                self._partition_backlog = [
+                    tabla for tabla in TABLAS_PARTICIONADAS
+                    if tabla in existentes and self._cursor.execute(f"SELECT 1 FROM main.{tabla} LIMIT 1").fetchone()
+                ]
+                logging.info(f"Modo particionado por día activo en {directory}.")
+                if self._partition_backlog:
+                    logging.info(f"Filas del archivo principal pendientes de mover a particiones: {self._partition_backlog}.")
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"Error al activar las particiones diarias: {e}. Se usa un único archivo.")
+                self._partitions = None
+
+    @property
+    def partition_backlog(self):
+        """True mientras quedan filas del archivo principal por mover a las particiones diarias."""
+        return bool(self._partition_backlog)
+
+    def migrate_to_partitions(self, chunk_rows=5000):
+        """
+        Mueve un tramo de las filas que una tabla particionada tenía en el archivo principal
+        antes de activar las particiones: las más antiguas, de un solo día, se copian a su
+        partición y se borran del archivo principal. Los agregados ya las incluyen.
+
+        :param chunk_rows: Filas por tramo; acota el tiempo que la conexión queda ocupada.
+        :return: Número de filas movidas en el tramo.
+        """
+        with self._lock:
+            if not self._connection or self._partitions is None or not self._partition_backlog:
+                return 0
+
+            tabla = self._partition_backlog[0]
+            try:
+                primera = self._cursor.execute(f"SELECT ts FROM main.{tabla} ORDER BY ts LIMIT 1").fetchone()
+                if primera is None:
+                    self._partition_backlog.pop(0)
+                    logging.info(f"Filas de '{tabla}' movidas a las particiones diarias.")
+                    return 0
+                fin_dia = (dia_de(primera[0]) + 1) * DIA_MS
+                # ts de la última fila del tramo dentro del día; sin ella se mueve el resto del día.
+                limite = self._cursor.execute(
+                    f"SELECT ts FROM main.{tabla} WHERE ts < ? ORDER BY ts LIMIT 1 OFFSET ?",
+                    (fin_dia, max(1, int(chunk_rows)) - 1)
+                ).fetchone()
+                condicion, parametro = ("ts <= ?", limite[0]) if limite else ("ts < ?", fin_dia)
+                destino = self._partitions.table(tabla, primera[0])
+                # Las particiones se crean con las mismas columnas que la plantilla. Si el proceso se
+                # interrumpe entre los commits de ambos archivos, INSERT OR IGNORE hace el tramo repetible.
+                with self._connection:
+                    self._cursor.execute(
+                        f"INSERT OR IGNORE INTO {destino} SELECT * FROM main.{tabla} WHERE {condicion}", (parametro,)
+                    )
+                    self._cursor.execute(f"DELETE FROM main.{tabla} WHERE {condicion}", (parametro,))
+                    movidas = self._cursor.rowcount
+                logging.debug(f"{movidas} filas de '{tabla}' movidas a '{destino}'.")
+                return movidas
+            except sqlite3.Error as e:
+                logging.error(f"Error al mover la tabla '{tabla}' a las particiones: {e}")
+                return 0
+
+    def _table(self, tabla, ts):
+        """Tabla donde escribir una fila de ts dado: la del archivo principal o la de su partición diaria."""
+        if self._partitions is None or tabla not in TABLAS_PARTICIONADAS:
+            return tabla
+        return self._partitions.table(tabla, ts)
+
+    def _partition_groups(self, tabla, filas):
+        """
+        Agrupa filas (con el ts en la primera posición) por partición, en orden de llegada.
+        Sin particiones retorna un único grupo con la tabla del archivo principal.
+
+        :return: Generador de tuplas (tabla calificada, filas); cada partición se adjunta al pedir su grupo.
+        """
+        if self._partitions is None:
+            if filas:
+                yield tabla, filas
+            return
+        grupos = {}
+        for fila in filas:
+            grupos.setdefault(dia_de(fila[0]), []).append(fila)
+        for grupo in grupos.values():
+            yield self._partitions.table(tabla, grupo[0][0]), grupo
+
+    def list_partitions(self):
+        """
+        Retorna las particiones del catálogo (los días anteriores al actual son archivos cerrados
+        que pueden comprimirse o enviarse completos).
+
+        :return: Lista de tuplas (día UTC desde epoch, ruta del archivo). Vacía sin modo particionado.
+        """
+        with self._lock:
+            return self._partitions.days() if self._partitions else []
+
+    def query_range(self, tabla, start_ms, end_ms, columns=('*',)):
+        """
+        Lee las filas de una serie temporal en un rango, de una o varias particiones.
+
+        :param tabla: Tabla con ts en milisegundos epoch (ver TABLAS_RETENCION).
+        :param start_ms: Inicio del rango en milisegundos epoch (incluido).
+        :param end_ms: Fin del rango en milisegundos epoch (excluido).
+        :param columns: Columnas a leer.
+        :return: Lista de filas ordenadas por ts. Vacía si no hay conexión o en caso de error.
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return []
+        sql = f"SELECT {', '.join(columns)} FROM {tabla} WHERE ts >= ? AND ts < ? ORDER BY ts"
+        try:
+            with self._lock:
+                self.flush()
+                if self._partitions is not None and tabla in TABLAS_PARTICIONADAS:
+                    # Cada archivo es un día: concatenar en orden de día mantiene el orden por ts.
+                    return self._partitions.query(sql, (start_ms, end_ms), start_ms, end_ms)
+                return self._connection.execute(sql, (start_ms, end_ms)).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Error al consultar la tabla '{tabla}': {e}")
+            return []
+
+    # --- Retención y vacuum incremental ---
+
+    def configure_retention(self, days_by_table, chunk_rows=5000):
+        """
+        Configura la retención por antigüedad de cada tabla.
+
+        :param days_by_table: Diccionario tabla -> días a conservar (0 = sin límite). Ver TABLAS_RETENCION.
+        :param chunk_rows: Filas borradas como máximo por tabla en cada llamada a apply_retention().
+        """
+        with self._lock:
+            self._retention_ms = {}
+            for tabla, dias in days_by_table.items():
+                if tabla not in TABLAS_RETENCION:
+                    logging.warning(f"Tabla '{tabla}' sin retención por antigüedad; se ignora.")
+                elif dias and dias > 0:
+                    self._retention_ms[tabla] = int(dias * 86400000)
+            self._retention_chunk = max(1, int(chunk_rows))
+            logging.info(f"Retención de SQLite (días): { {t: ms / 86400000 for t, ms in self._retention_ms.items()} }.")
+
+    def apply_retention(self, now_ms=None):
+        """
+        Borra un tramo de filas vencidas de cada tabla con retención. Cada tramo recorre el
+        índice por ts desde el principio y se confirma en su propia transacción, de modo que
+        la conexión nunca queda ocupada más que lo que tarda en borrar chunk_rows filas.
+        En modo particionado las series temporales vencen borrando archivos de partición; en
+        el archivo principal solo quedan las filas aún no movidas (ver migrate_to_partitions).
+
+        :param now_ms: Instante de referencia en milisegundos epoch (por defecto, ahora).
+        :return: Número de filas borradas.
+        """
+        with self._lock:
+            if not self._connection or not self._retention_ms:
+                return 0
+
+            ahora = int(time.time() * 1000) if now_ms is None else now_ms
+            borradas = 0
+            self._retention_backlog = False
+            if self._partitions is not None and self._partition_retention_day != dia_de(ahora):
+                # Las particiones vencen por días completos: se revisan una vez al día.
+                try:
+                    self._partitions.apply_retention(self._retention_ms, ahora)
+                    self._partition_retention_day = dia_de(ahora)
+                except (sqlite3.Error, OSError) as e:
+                    logging.error(f"Error al aplicar la retención de las particiones: {e}")
+            for tabla, conservar in self._retention_ms.items():
+                corte = ahora - conservar
+                try:
+                    # ts de la última fila del tramo; sin ella quedan menos filas vencidas que un tramo.
+                    limite = self._cursor.execute(
+                        f"SELECT ts FROM {tabla} WHERE ts < ? ORDER BY ts LIMIT 1 OFFSET ?",
+                        (corte, self._retention_chunk - 1)
+                    ).fetchone()
+                    with self._connection:
+                        if limite is None:
+                            self._cursor.execute(f"DELETE FROM {tabla} WHERE ts < ?", (corte,))
+                        else:
+                            # Se borra el ts completo para que el siguiente tramo avance.
+                            self._cursor.execute(f"DELETE FROM {tabla} WHERE ts <= ?", (limite[0],))
+                            self._retention_backlog = True
+                    borradas += self._cursor.rowcount
+                except sqlite3.Error as e:
+                    logging.error(f"Error al aplicar la retención de la tabla '{tabla}': {e}")
+            if borradas:
+                logging.debug(f"Retención de SQLite: {borradas} filas vencidas borradas.")
+            return borradas
+
+    def incremental_vacuum(self, pages=256):
+        """
+        Devuelve al sistema de archivos hasta 'pages' páginas libres (auto_vacuum=INCREMENTAL).
+        Una base creada antes de activar auto_vacuum se convierte con un VACUUM único cuando la
+        retención y la migración de 'metricas' terminaron, es decir, cuando el archivo ya solo
+        contiene las filas vigentes y la copia es la más corta posible.
+
+        :param pages: Páginas liberadas como máximo por llamada.
+        :return: Número de páginas liberadas.
+        """
+        with self._lock:
+            if not self._connection:
+                return 0
+
+            try:
+                # El lote pendiente no se escribe aquí: se llama en cada ciclo y anularía la escritura por lotes.
+                libres = self._cursor.execute("PRAGMA freelist_count").fetchone()[0]
+                if self._auto_vacuum_pending:
+                    if self._retention_backlog or self._legacy_pending or self._partition_backlog:
+                        return 0
+                    logging.info("Conversión de la base de datos a auto_vacuum=INCREMENTAL (VACUUM único).")
+                    self._connection.execute("VACUUM")
+                    self._auto_vacuum_pending = self._cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+                    return libres
+                if not libres:
+                    return 0
+                # executescript ejecuta el PRAGMA hasta el final; execute() solo libera una página.
+                self._connection.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+                liberadas = libres - self._cursor.execute("PRAGMA freelist_count").fetchone()[0]
+                logging.debug(f"Vacuum incremental: {liberadas} páginas liberadas.")
+                return liberadas
+            except sqlite3.Error as e:
+                logging.error(f"Error en el vacuum incremental: {e}")
+                return 0
 
     def create_table(self):
-        """Crea la tabla si no existe para almacenar las métricas."""
+        """
+        Crea, si no existen, la tabla 'metricas_v2', sus agregados 'metricas_1m' y 'metricas_1h'
+        y las tablas diccionario 'hosts' y 'usuarios'.
+        Si la base conserva la tabla anterior 'metricas', queda pendiente su migración.
+        """
         if not self._connection:
             logging.error("No hay conexión a la base de datos.")
             return
 
         try:
             self._cursor.execute('''
-                CREATE TABLE IF NOT EXISTS metricas (
-                    timestamp TEXT PRIMARY KEY,
-                    hostname TEXT,
-                    username TEXT,
+                CREATE TABLE IF NOT EXISTS hosts (
+                    host_id INTEGER PRIMARY KEY,
+                    hostname TEXT NOT NULL UNIQUE
+                )
+            ''')
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS usuarios (
+                    user_id INTEGER PRIMARY KEY,
+                    username TEXT NOT NULL UNIQUE
+                )
+            ''')
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metricas_v2 (
+                    ts INTEGER NOT NULL,
+                    host_id INTEGER NOT NULL,
+                    user_id INTEGER,
                     cpu_percent REAL,
                     cpu_freq REAL,
                     ram_percent REAL,
-                    ram_used REAL,
-                    ram_total REAL,
-                    ram_free REAL,
+                    ram_used_bytes INTEGER,
+                    ram_total_bytes INTEGER,
+                    ram_free_bytes INTEGER,
                     disk_percent REAL,
-                    disk_used REAL,
-                    disk_total REAL,
-                    disk_free REAL,
+                    disk_used_bytes INTEGER,
+                    disk_total_bytes INTEGER,
+                    disk_free_bytes INTEGER,
                     swap_percent REAL,
-                    swap_usado REAL,
-                    swap_total REAL,
-                    red_bytes_sent INTEGER,
-                    red_bytes_recv INTEGER,
+                    swap_used_bytes INTEGER,
+                    swap_total_bytes INTEGER,
                     cpu_temp_celsius REAL,
                     battery_percent REAL,
                     cpu_power_package REAL,
                     cpu_power_cores REAL,
-                    cpu_clocks REAL
-                )
+                    cpu_clocks REAL,
+                    red_bytes_enviados_seg REAL,
+                    red_bytes_recibidos_seg REAL,
+                    PRIMARY KEY (ts, host_id)
+                ) WITHOUT ROWID
             ''')
+            for tabla, _ in NIVELES_AGREGADOS:
+                self._cursor.execute(_sql_crear_agregado(tabla))
             self._connection.commit()
-            logging.debug("Tabla 'metricas' verificada/creada exitosamente.")
+            self._legacy_pending = self._cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metricas'"
+            ).fetchone() is not None
+            if not self._legacy_pending:
+                self._cursor.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+            logging.debug("Tablas 'metricas_v2', 'metricas_1m', 'metricas_1h', 'hosts' y 'usuarios' verificadas/creadas exitosamente.")
         except sqlite3.Error as e:
             logging.error(f"Error al crear la tabla: {e}")
 
+    @property
+    def legacy_pending(self):
+        """True mientras quedan filas de la tabla anterior 'metricas' por migrar."""
+        return self._legacy_pending
+
+    def _dimension_id(self, tabla, columna, valor):
+        """
+        Retorna el id de un valor en una tabla diccionario ('hosts' o 'usuarios'), insertándolo si es nuevo.
+
+        :param tabla: Nombre de la tabla diccionario.
+        :param columna: Columna con el valor ('hostname' o 'username').
+        :param valor: Valor a resolver. None se guarda como NULL.
+        :return: El id del valor, o None.
+        """
+        if valor is None:
+            return None
+        clave = (tabla, valor)
+        id_valor = self._dimension_ids.get(clave)
+        if id_valor is None:
+            self._cursor.execute(f"INSERT OR IGNORE INTO {tabla} ({columna}) VALUES (?)", (valor,))
+            id_valor = self._cursor.execute(f"SELECT rowid FROM {tabla} WHERE {columna} = ?", (valor,)).fetchone()[0]
+            self._connection.commit()
+            self._dimension_ids[clave] = id_valor
+        return id_valor
+
+    def query_metrics(self, start_ms, end_ms, resolution_seconds, columns=('cpu_percent',), hostname=None):
+        """
+        Consulta las métricas de un rango agrupadas en intervalos de la resolución pedida.
+        Se lee del nivel mantenido más grueso cuyo intervalo divide la resolución
+        ('metricas_1h', 'metricas_1m' o, si ninguno, 'metricas_v2'), de modo que un gráfico de un mes
+        recorre cientos de filas en lugar de decenas de miles.
+
+        :param start_ms: Inicio del rango en milisegundos epoch (incluido).
+        :param end_ms: Fin del rango en milisegundos epoch (excluido).
+        :param resolution_seconds: Segundos por intervalo del resultado.
+        :param columns: Métricas a consultar (ver COLUMNAS_AGREGADAS).
+        :param hostname: Limita la consulta a un equipo; None consulta todos.
+        :return: Diccionario con 'nivel' (tabla leída), 'columnas' y 'filas': tuplas
+                 (ts, hostname, <col>_avg, <col>_min, <col>_max, ...) ordenadas por ts.
+                 Vacío si no hay conexión o en caso de error.
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return {}
+        invalidas = [c for c in columns if c not in COLUMNAS_AGREGADAS]
+        if invalidas or resolution_seconds <= 0:
+            logging.error(f"Consulta de métricas inválida: columnas {invalidas}, resolución {resolution_seconds} s.")
+            return {}
+
+        nivel = next((t for t, segundos in self._rollup_levels if resolution_seconds % segundos == 0), 'metricas_v2')
+        if nivel == 'metricas_v2':
+            agregados = [f"avg(m.{c}), min(m.{c}), max(m.{c})" for c in columns]
+        else:
+            agregados = [f"sum(m.{c}_suma) / nullif(sum(m.{c}_n), 0), min(m.{c}_min), max(m.{c}_max)" for c in columns]
+        periodo = int(resolution_seconds * 1000)
+        sql = (
+            f"SELECT m.ts - m.ts % {periodo} AS intervalo, h.hostname, {', '.join(agregados)} "
+            f"FROM {nivel} m JOIN hosts h USING (host_id) "
+            f"WHERE m.ts >= ? AND m.ts < ?{' AND h.hostname = ?' if hostname is not None else ''} "
+            f"GROUP BY intervalo, m.host_id ORDER BY intervalo"
+        )
+        parametros = (start_ms, end_ms) + ((hostname,) if hostname is not None else ())
+        try:
+            with self._lock:
+                # Las filas del lote pendiente se escriben antes de consultar.
+                self.flush()
+                if nivel == 'metricas_v2' and self._partitions is not None:
+                    filas = self._query_partitioned_metrics(start_ms, end_ms, periodo, columns, hostname)
+                else:
+                    filas = self._connection.execute(sql, parametros).fetchall()
+            return {
+                'nivel': nivel,
+                'columnas': ['ts', 'hostname'] + [f"{c}_{a}" for c in columns for a in ('avg', 'min', 'max')],
+                'filas': filas,
+            }
+        except sqlite3.Error as e:
+            logging.error(f"Error al consultar las métricas: {e}")
+            return {}
+
+    def _query_partitioned_metrics(self, start_ms, end_ms, periodo, columns, hostname):
+        """
+        Versión de query_metrics sobre 'metricas_v2' particionada: cada partición aporta suma,
+        cuenta, mínimo y máximo por intervalo y equipo, y se combinan aquí (un intervalo que no
+        divide el día puede repartirse entre dos archivos).
+        """
+        hosts = dict(self._connection.execute("SELECT host_id, hostname FROM hosts").fetchall())
+        filtro = ""
+        parametros = (start_ms, end_ms)
+        if hostname is not None:
+            ids = [i for i, nombre in hosts.items() if nombre == hostname]
+            if not ids:
+                return []
+            filtro, parametros = " AND host_id = ?", parametros + (ids[0],)
+        parciales = [f"sum({c}), count({c}), min({c}), max({c})" for c in columns]
+        sql = (
+            f"SELECT ts - ts % {periodo} AS intervalo, host_id, {', '.join(parciales)} FROM metricas_v2 "
+            f"WHERE ts >= ? AND ts < ?{filtro} GROUP BY intervalo, host_id"
+        )
+        combinados = {}
+        for intervalo, host_id, *valores in self._partitions.query(sql, parametros, start_ms, end_ms):
+            actual = combinados.get((intervalo, host_id))
+            if actual is None:
+                combinados[(intervalo, host_id)] = valores
+                continue
+            for i in range(0, len(valores), 4):
+                suma, cuenta, minimo, maximo = valores[i:i + 4]
+                if cuenta:
+                    actual[i] = suma if actual[i] is None else actual[i] + suma
+                    actual[i + 1] += cuenta
+                    actual[i + 2] = minimo if actual[i + 2] is None else min(actual[i + 2], minimo)
+                    actual[i + 3] = maximo if actual[i + 3] is None else max(actual[i + 3], maximo)
+        filas = []
+        for (intervalo, host_id), valores in sorted(combinados.items()):
+            fila = [intervalo, hosts.get(host_id)]
+            for i in range(0, len(valores), 4):
+                suma, cuenta, minimo, maximo = valores[i:i + 4]
+                fila += [suma / cuenta if cuenta else None, minimo, maximo]
+            filas.append(tuple(fila))
+        return filas
+
+    def _host_id(self, hostname):
+        """host_id de la clave de 'metricas_v2'; un hostname ausente se guarda como cadena vacía."""
+        return self._dimension_id('hosts', 'hostname', hostname if hostname is not None else '')
+
+    def migrate_legacy_metrics(self, chunk_rows=2000):
+        """
+        Migra un tramo de la tabla anterior 'metricas' a 'metricas_v2' sin detener el agente:
+        cada llamada copia las filas más antiguas (ISO 8601 -> milisegundos epoch, GB -> bytes)
+        y las borra de la tabla anterior en una sola transacción. Cuando la tabla anterior queda
+        vacía se elimina y se marca el esquema con PRAGMA user_version = 2.
+
+        :param chunk_rows: Filas por tramo; acota el tiempo que la conexión queda ocupada.
+        :return: Número de filas de la tabla anterior procesadas en el tramo.
+        """
+        with self._lock:
+            if not self._connection or not self._legacy_pending:
+                return 0
+
+            try:
+                existentes = {fila[1] for fila in self._cursor.execute("PRAGMA table_info(metricas)")}
+                origen = ['timestamp', 'hostname', 'username'] + [
+                    _COLUMNAS_GB_V1.get(columna, columna) for columna in COLUMNAS_METRICAS_V2
+                ]
+                # Las bases anteriores a las tasas de red no tienen esas columnas.
+                seleccion = ", ".join(c if c in existentes else "NULL" for c in origen)
+                filas = self._cursor.execute(
+                    f"SELECT {seleccion} FROM metricas ORDER BY timestamp LIMIT ?", (chunk_rows,)
+                ).fetchall()
+
+                if not filas:
+                    with self._connection:
+                        self._cursor.execute("DROP TABLE metricas")
+                    self._cursor.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+                    self._legacy_pending = False
+                    logging.info("Migración de 'metricas' a 'metricas_v2' completada.")
+                    return 0
+
+                en_bytes = [columna in _COLUMNAS_GB_V1 for columna in COLUMNAS_METRICAS_V2]
+                convertidas = []
+                ultima = None
+                consumidas = 0
+                for fila in filas:
+                    try:
+                        ts = epoch_ms(fila[0])
+                    except (TypeError, ValueError):
+                        logging.warning(f"Fila de 'metricas' con marca de tiempo inválida '{fila[0]}' descartada.")
+                        ultima = fila[0]
+                        consumidas += 1
+                        continue
+                    if self._partitions is not None and convertidas and dia_de(ts) != dia_de(convertidas[0][0]):
+                        # En modo particionado cada tramo migra un solo día (una partición).
+                        break
+                    ultima = fila[0]
+                    consumidas += 1
+                    valores = tuple(
+                        int(round(valor * _BYTES_POR_GB)) if bytes_ and valor is not None else valor
+                        for valor, bytes_ in zip(fila[3:], en_bytes)
+                    )
+                    convertidas.append((
+                        ts,
+                        self._host_id(fila[1]),
+                        self._dimension_id('usuarios', 'username', fila[2]),
+                    ) + valores)
+
+                tabla = self._table('metricas_v2', convertidas[0][0]) if convertidas else 'metricas_v2'
+                sql = SQL_MIGRAR_METRICAS_V2.format(tabla=tabla)
+                insertadas = []
+                with self._connection:
+                    for fila in convertidas:
+                        self._cursor.execute(sql, fila)
+                        # Solo las filas insertadas (no las ignoradas por existir ya) se suman a los agregados.
+                        if self._cursor.rowcount == 1:
+                            insertadas.append(fila)
+                    self._update_rollups(insertadas)
+                    self._cursor.execute("DELETE FROM metricas WHERE timestamp <= ?", (ultima,))
+                logging.debug(f"{len(insertadas)} de {len(convertidas)} filas de 'metricas' migradas a '{tabla}'.")
+                return consumidas
+            except sqlite3.Error as e:
+                logging.error(f"Error al migrar la tabla 'metricas': {e}")
+                return 0
+
     # --- Nueva funcionalidad para info_maquina ---
 
     def create_machine_info_table(self):
@@ -109,157 +839,526 @@ class DBManager:
                 )
             ''')
             self._connection.commit()
+            self._machine_info_ready = True
             logging.debug("Tabla 'info_maquina' verificada/creada exitosamente.")
         except sqlite3.Error as e:
             logging.error(f"Error al crear la tabla 'info_maquina': {e}")
 
 
-    def upsert_machine_info(self, data):
+    def upsert_machine_info(self, sample):
         """
         Inserta o actualiza la información estática/semi-estática de la máquina en la tabla 'info_maquina'.
         La lógica de actualización/inserción (UPSERT) se basa en la coincidencia de 'hostname' y 'username'.
-        Combina 'placa_base_fabricante' y 'placa_base_producto' en el campo 'placa_base'.
+        Con la escritura por lotes solo se conserva la última fila de cada (hostname, username).
 
-        :param data: Diccionario con la información de la máquina.
+        :param sample: MetricSample del ciclo (o el diccionario combinado, que se normaliza).
         """
         if not self._connection:
             logging.error("No hay conexión a la base de datos.")
             return
 
-        # 1. Verificar/Crear la tabla 'info_maquina' si no existe.
-        self.create_machine_info_table()
+        # 1. Verificar/Crear la tabla 'info_maquina' una sola vez por conexión.
+        if not self._machine_info_ready:
+            self.create_machine_info_table()
+
+        try:
+            if isinstance(sample, dict):
+                sample = MetricSample.from_metrics(sample)
+            # 2. Si hay un conflicto en (hostname, username), actualiza las demás columnas.
+            with self._lock:
+                self._pending_info[(sample.hostname, sample.username)] = sample.machine_info_row()
+                if self._pending_since is None:
+                    self._pending_since = time.monotonic()
+                self.flush_if_due()
+            logging.debug(f"Información de máquina UPSERT gestionada para host: {sample.hostname}, user: {sample.username}.")
+
+        except Exception as e:
+            logging.error(f"Error inesperado al procesar los datos de la máquina: {e}")
+
+    # --- Fin de la nueva funcionalidad ---
+
+    # --- Tabla de procesos activos ---
+
+    def create_process_tables(self):
+        """
+        Crea la tabla 'procesos_activos' si no existe.
+        Utiliza (pid, create_time) como clave primaria para distinguir PIDs reutilizados.
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
 
         try:
-            # 2. Lógica para combinar la Placa Base
-            placa_base_fabricante = data.get('placa_base_fabricante', 'Desconocido')
-            placa_base_producto = data.get('placa_base_producto', 'Desconocido')
-            
-            # Formato: Fabricante - Producto. Se elimina el separador si ambos son 'Desconocido'.
-            if placa_base_fabricante == 'Desconocido' and placa_base_producto == 'Desconocido':
-                placa_base_combined = 'Desconocido'
-            else:
-                placa_base_combined = f"{placa_base_fabricante} - {placa_base_producto}".replace("Desconocido - ", "").replace(" - Desconocido", "")
-
-
-            # Columnas a insertar/actualizar
-            cols = [
-                'hostname', 
-                'username', 
-                'timestamp', 
-                'os_name', 
-                'placa_base', 
-                'procesador_nombre', 
-                'cores_logicos', 
-                'cores_fisicos', 
-                'fecha_arranque'
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS procesos_activos (
+                    pid INTEGER NOT NULL,
+                    create_time REAL NOT NULL,
+                    name TEXT,
+                    ppid INTEGER,
+                    username TEXT,
+                    PRIMARY KEY (pid, create_time)
+                ) WITHOUT ROWID
+            ''')
+            # Diccionario de nombres de proceso: las tablas de procesos guardan solo el name_id.
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS procesos_nombres (
+                    name_id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                )
+            ''')
+            # Agregado por ejecutable de cada ciclo (ts en milisegundos epoch).
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS procesos_grupos (
+                    ts INTEGER NOT NULL,
+                    name_id INTEGER NOT NULL,
+                    procesos INTEGER,
+                    cpu REAL,
+                    rss INTEGER,
+                    io_bytes_seg REAL,
+                    PRIMARY KEY (ts, name_id)
+                ) WITHOUT ROWID
+            ''')
+            # Serie temporal por proceso: solo los procesos con actividad en el ciclo.
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS procesos (
+                    ts INTEGER NOT NULL,
+                    pid INTEGER NOT NULL,
+                    name_id INTEGER NOT NULL,
+                    cpu REAL,
+                    rss INTEGER,
+                    io_read INTEGER,
+                    io_write INTEGER,
+                    PRIMARY KEY (ts, pid)
+                ) WITHOUT ROWID
+            ''')
+            # Eventos de inicio y fin de procesos (solo inserciones, en orden de llegada).
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS procesos_eventos (
+                    ts INTEGER NOT NULL,
+                    evento TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    create_time REAL,
+                    name_id INTEGER,
+                    ppid INTEGER,
+                    username TEXT,
+                    duracion_segundos REAL
+                )
+            ''')
+            # Índice por tiempo para la retención por tramos.
+            self._cursor.execute('CREATE INDEX IF NOT EXISTS procesos_eventos_ts ON procesos_eventos (ts)')
+            self._connection.commit()
+            logging.debug("Tablas de procesos verificadas/creadas exitosamente.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al crear las tablas de procesos: {e}")
+
+    def load_process_names(self):
+        """
+        Carga el diccionario de nombres de proceso persistido.
+
+        :return: Diccionario nombre -> name_id. Vacío si no hay conexión o en caso de error.
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return {}
+
+        try:
+            self._cursor.execute('SELECT name, name_id FROM procesos_nombres')
+            return dict(self._cursor.fetchall())
+        except sqlite3.Error as e:
+            logging.error(f"Error al cargar los nombres de proceso: {e}")
+            return {}
+
+    def insert_process_names(self, names):
+        """
+        Inserta los nombres de proceso nuevos en 'procesos_nombres'.
+
+        :param names: Lista de tuplas (name_id, nombre).
+        """
+        if not self._connection or not names:
+            return
+
+        try:
+            self._cursor.executemany('INSERT OR IGNORE INTO procesos_nombres (name_id, name) VALUES (?, ?)', names)
+            self._connection.commit()
+            logging.debug(f"{len(names)} nombres de proceso nuevos insertados.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al insertar nombres de proceso: {e}")
+
+    def insert_process_samples(self, ts, columns):
+        """
+        Inserta en bloque las muestras por proceso de un ciclo en la tabla 'procesos'.
+        Las tasas de E/S se guardan como bytes/s enteros.
+
+        :param ts: Marca de tiempo del ciclo en milisegundos epoch.
+        :param columns: Columnas NumPy de los procesos a guardar (pid, name_id, cpu_percent,
+                        rss_bytes, io_read_bytes_seg, io_write_bytes_seg).
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
+
+        try:
+            rows = zip(
+                [ts] * len(columns['pid']),
+                columns['pid'].tolist(),
+                columns['name_id'].tolist(),
+                columns['cpu_percent'].round(2).tolist(),
+                columns['rss_bytes'].tolist(),
+                columns['io_read_bytes_seg'].round().astype('int64').tolist(),
+                columns['io_write_bytes_seg'].round().astype('int64').tolist()
+            )
+            self._cursor.executemany(f'''
+                INSERT OR REPLACE INTO {self._table('procesos', ts)} (ts, pid, name_id, cpu, rss, io_read, io_write)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            self._connection.commit()
+            logging.debug(f"{len(columns['pid'])} muestras de procesos insertadas.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al insertar muestras de procesos: {e}")
+
+    def insert_process_events(self, events):
+        """
+        Agrega los eventos de inicio y fin de procesos a 'procesos_eventos'.
+
+        :param events: Lista de diccionarios con ts, evento, pid, create_time, name_id,
+                       ppid, username y (en los de fin) duracion_segundos.
+        """
+        if not self._connection or not events:
+            return
+
+        try:
+            filas = [
+                (e['ts'], e['evento'], e['pid'], e.get('create_time'), e.get('name_id'),
+                 e.get('ppid'), e.get('username'), e.get('duracion_segundos'))
+                for e in events
             ]
+            for tabla, grupo in self._partition_groups('procesos_eventos', filas):
+                self._cursor.executemany(f'''
+                    INSERT INTO {tabla} (ts, evento, pid, create_time, name_id, ppid, username, duracion_segundos)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', grupo)
+                self._connection.commit()
+            logging.debug(f"{len(events)} eventos de procesos insertados.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al insertar eventos de procesos: {e}")
+
+    def insert_process_groups(self, ts, groups):
+        """
+        Inserta el agregado por ejecutable de un ciclo en 'procesos_grupos'.
+
+        :param ts: Marca de tiempo del ciclo en milisegundos epoch.
+        :param groups: Columnas por grupo (resultado de agrupar_procesos).
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
 
-            # Valores a insertar (asegúrate de que las keys de 'data' coincidan con estas)
-            values = (
-                data.get('hostname'),
-                data.get('username'),
-                data.get('timestamp'),
-                data.get('os_name'),
-                placa_base_combined, 
-                data.get('procesador_nombre'),
-                data.get('procesador_nucleos_logicos'),
-                data.get('procesador_nucleos_fisicos'),
-                data.get('os_last_boot_up_time')
+        try:
+            rows = zip(
+                [ts] * len(groups['name_id']),
+                groups['name_id'].tolist(),
+                groups['procesos'].tolist(),
+                groups['cpu_percent'].tolist(),
+                groups['rss_bytes'].tolist(),
+                groups['io_bytes_seg'].tolist()
             )
+            self._cursor.executemany(f'''
+                INSERT OR REPLACE INTO {self._table('procesos_grupos', ts)} (ts, name_id, procesos, cpu, rss, io_bytes_seg)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            self._connection.commit()
+            logging.debug(f"{len(groups['name_id'])} grupos de procesos insertados.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al insertar grupos de procesos: {e}")
+
+    def apply_process_changes(self, changes):
+        """
+        Aplica de forma incremental la diferencia de procesos a 'procesos_activos':
+        inserta los iniciados y elimina los finalizados en una sola transacción.
+        Si la diferencia es completa (primer ciclo) se reemplaza la tabla entera.
+
+        :param changes: Diccionario con 'iniciados', 'finalizados' y 'completo'
+                        (resultado de ProcessTracker.update()).
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
 
-            # Usamos ON CONFLICT DO UPDATE para el UPSERT
-            # Si hay un conflicto en (hostname, username), actualiza las demás columnas.
-            sql_query = f'''
-                INSERT INTO info_maquina ({', '.join(cols)})
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT (hostname, username) DO UPDATE SET
-                    timestamp = excluded.timestamp,
-                    os_name = excluded.os_name, -- Columna 'os_name' actualizada
-                    placa_base = excluded.placa_base,
-                    procesador_nombre = excluded.procesador_nombre,
-                    cores_logicos = excluded.cores_logicos,
-                    cores_fisicos = excluded.cores_fisicos,
-                    fecha_arranque = excluded.fecha_arranque
-            '''
-
-            self._cursor.execute(sql_query, values)
+        try:
+            if changes.get('completo'):
+                # Tras un reinicio del servicio la tabla persistida puede estar desactualizada.
+                self._cursor.execute('DELETE FROM procesos_activos')
+            self._cursor.executemany(
+                'DELETE FROM procesos_activos WHERE pid = :pid AND create_time = :create_time',
+                changes.get('finalizados', [])
+            )
+            self._cursor.executemany('''
+                INSERT OR REPLACE INTO procesos_activos (pid, create_time, name, ppid, username)
+                VALUES (:pid, :create_time, :name, :ppid, :username)
+            ''', changes.get('iniciados', []))
             self._connection.commit()
-            logging.debug(f"Información de máquina UPSERT completada para host: {data.get('hostname')}, user: {data.get('username')}.")
+            logging.debug(f"Procesos activos actualizados: +{len(changes.get('iniciados', []))} -{len(changes.get('finalizados', []))}.")
+        except sqlite3.Error as e:
+            self._connection.rollback()
+            logging.error(f"Error al actualizar la tabla de procesos activos: {e}")
+
+    # --- Volúmenes y discos ---
+
+    def create_disk_tables(self):
+        """
+        Crea las tablas estrechas 'volumenes' (uso por punto de montaje) y 'discos_io'
+        (tasas de E/S por disco), con ts en milisegundos epoch.
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
 
+        try:
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS volumenes (
+                    ts INTEGER NOT NULL,
+                    mountpoint TEXT NOT NULL,
+                    total INTEGER,
+                    usado INTEGER,
+                    libre INTEGER,
+                    percent REAL,
+                    PRIMARY KEY (ts, mountpoint)
+                ) WITHOUT ROWID
+            ''')
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS discos_io (
+                    ts INTEGER NOT NULL,
+                    disco TEXT NOT NULL,
+                    lectura_bytes_seg REAL,
+                    escritura_bytes_seg REAL,
+                    lecturas_seg REAL,
+                    escrituras_seg REAL,
+                    ocupado_percent REAL,
+                    PRIMARY KEY (ts, disco)
+                ) WITHOUT ROWID
+            ''')
+            self._connection.commit()
+            logging.debug("Tablas 'volumenes' y 'discos_io' verificadas/creadas exitosamente.")
         except sqlite3.Error as e:
-            logging.error(f"Error al insertar/actualizar la información de la máquina: {e}")
-        except Exception as e:
-            logging.error(f"Error inesperado al procesar los datos de la máquina: {e}")
+            logging.error(f"Error al crear las tablas de discos: {e}")
 
-    # --- Fin de la nueva funcionalidad ---
+    def insert_disk_metrics(self, ts, data):
+        """
+        Inserta el uso de los volúmenes y las tasas de E/S por disco de un ciclo.
+
+        :param ts: Marca de tiempo del ciclo en milisegundos epoch.
+        :param data: Diccionario con 'volumenes' y 'discos' (resultado de DiskCollector.collect()).
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
+
+        try:
+            self._cursor.executemany(f'''
+                INSERT OR REPLACE INTO {self._table('volumenes', ts)} (ts, mountpoint, total, usado, libre, percent)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [
+                (ts, v['mountpoint'], v['total_bytes'], v['usado_bytes'], v['libre_bytes'], v['percent'])
+                for v in data.get('volumenes', [])
+            ])
+            self._cursor.executemany(f'''
+                INSERT OR REPLACE INTO {self._table('discos_io', ts)} (ts, disco, lectura_bytes_seg, escritura_bytes_seg, lecturas_seg, escrituras_seg, ocupado_percent)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (ts, d['disco'], d['lectura_bytes_seg'], d['escritura_bytes_seg'], d['lecturas_seg'], d['escrituras_seg'], d['ocupado_percent'])
+                for d in data.get('discos', [])
+            ])
+            self._connection.commit()
+            logging.debug(f"Métricas de {len(data.get('volumenes', []))} volúmenes y {len(data.get('discos', []))} discos insertadas.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al insertar métricas de discos: {e}")
 
+    # --- Tasas de red por interfaz ---
 
-    def insert_metrics(self, data):
-        """Inserta un nuevo registro de métricas en la base de datos."""
+    def create_network_table(self):
+        """
+        Crea la tabla estrecha 'red' con las tasas de cada interfaz de red por ciclo
+        (ts en milisegundos epoch).
+        """
         if not self._connection:
             logging.error("No hay conexión a la base de datos.")
             return
 
         try:
-            # Lógica de extracción y fallback de datos (sin cambios)
-            cpu_percent = data.get('cpu_percent') or data.get('cpu_freq_current_mhz') or 0
-            ram_percent = data.get('memoria_percent') or data.get('ram_load_percent') or 0
-            ram_used = data.get('memoria_usada_gb') or data.get('ram_load_used_gb') or 0
-            ram_free = data.get('memoria_libre_gb') or data.get('ram_load_free_gb') or 0
-            disk_percent = data.get('disco_percent') or data.get('hdd_used_gb') or 0
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS red (
+                    ts INTEGER NOT NULL,
+                    interfaz TEXT NOT NULL,
+                    bytes_enviados_seg REAL,
+                    bytes_recibidos_seg REAL,
+                    paquetes_enviados_seg REAL,
+                    paquetes_recibidos_seg REAL,
+                    errores_entrada INTEGER,
+                    errores_salida INTEGER,
+                    descartes_entrada INTEGER,
+                    descartes_salida INTEGER,
+                    PRIMARY KEY (ts, interfaz)
+                ) WITHOUT ROWID
+            ''')
+            self._connection.commit()
+            logging.debug("Tabla 'red' verificada/creada exitosamente.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al crear la tabla de red: {e}")
+
+    def insert_network_metrics(self, ts, interfaces):
+        """
+        Inserta las tasas de red de cada interfaz de un ciclo.
 
+        :param ts: Marca de tiempo del ciclo en milisegundos epoch.
+        :param interfaces: Lista de filas por interfaz (resultado de NetworkRateCollector.collect()).
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
+
+        try:
+            self._cursor.executemany(f'''
+                INSERT OR REPLACE INTO {self._table('red', ts)} (
+                    ts, interfaz, bytes_enviados_seg, bytes_recibidos_seg, paquetes_enviados_seg,
+                    paquetes_recibidos_seg, errores_entrada, errores_salida, descartes_entrada, descartes_salida
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (ts, f['interfaz'], f['bytes_sent_seg'], f['bytes_recv_seg'], f['packets_sent_seg'],
+                 f['packets_recv_seg'], f['errin'], f['errout'], f['dropin'], f['dropout'])
+                for f in interfaces
+            ])
+            self._connection.commit()
+            logging.debug(f"Tasas de red de {len(interfaces)} interfaces insertadas.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al insertar métricas de red: {e}")
+
+    # --- Sensores de OpenHardwareMonitor en formato largo ---
+
+    def create_sensor_tables(self):
+        """
+        Crea la tabla diccionario 'sensores_ohm_catalogo' y la tabla estrecha 'sensores_ohm'.
+        Cada lectura ocupa una fila (ts en milisegundos epoch, sensor_id, valor) sin rowid,
+        de modo que la clave primaria es el propio índice agrupado.
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
+
+        try:
             self._cursor.execute('''
-                INSERT INTO metricas (
-                    timestamp,
-                    hostname,
-                    username,
-                    cpu_percent,
-                    cpu_freq,
-                    ram_percent,
-                    ram_used,
-                    ram_total,
-                    ram_free,
-                    disk_percent,
-                    disk_used,
-                    disk_total,
-                    disk_free,
-                    swap_percent,
-                    swap_usado,
-                    swap_total,
-                    red_bytes_sent,
-                    red_bytes_recv,
-                    cpu_temp_celsius,
-                    battery_percent,
-                    cpu_power_package,
-                    cpu_power_cores,
-                    cpu_clocks
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data.get('timestamp'),
-                data.get('hostname'),
-                data.get('username'),
-                cpu_percent,
-                data.get('cpu_freq_current_mhz'),
-                ram_percent,
-                ram_used,
-                data.get('memoria_total_gb'),
-                ram_free,
-                disk_percent,
-                data.get('disco_usado_gb'),
-                data.get('disco_total_gb'),
-                data.get('disco_libre_gb'),
-                data.get('swap_percent'),
-                data.get('swap_usado_gb'),
-                data.get('swap_total_gb'),
-                data.get('red_bytes_enviados'),
-                data.get('red_bytes_recibidos'),
-                data.get('cpu_temperatura_celsius'),
-                data.get('bateria_porcentaje'),
-                data.get('cpu_power_package_watts'),
-                data.get('cpu_power_cores_watts'),
-                data.get('cpu_clocks_mhz')
-            ))
+                CREATE TABLE IF NOT EXISTS sensores_ohm_catalogo (
+                    sensor_id INTEGER PRIMARY KEY,
+                    clave TEXT NOT NULL UNIQUE,
+                    hardware TEXT,
+                    tipo_hardware TEXT,
+                    nombre TEXT,
+                    tipo TEXT,
+                    unidad TEXT
+                )
+            ''')
+            self._cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sensores_ohm (
+                    ts INTEGER NOT NULL,
+                    sensor_id INTEGER NOT NULL,
+                    valor REAL,
+                    PRIMARY KEY (ts, sensor_id)
+                ) WITHOUT ROWID
+            ''')
             self._connection.commit()
-            logging.debug("Métricas insertadas en la base de datos.")
+            logging.debug("Tablas 'sensores_ohm_catalogo' y 'sensores_ohm' verificadas/creadas exitosamente.")
         except sqlite3.Error as e:
+            logging.error(f"Error al crear las tablas de sensores: {e}")
+
+    def load_sensor_catalog(self):
+        """
+        Carga el catálogo de sensores persistido.
+
+        :return: Diccionario clave -> sensor_id. Vacío si no hay conexión o en caso de error.
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return {}
+
+        try:
+            self._cursor.execute('SELECT clave, sensor_id FROM sensores_ohm_catalogo')
+            return dict(self._cursor.fetchall())
+        except sqlite3.Error as e:
+            logging.error(f"Error al cargar el catálogo de sensores: {e}")
+            return {}
+
+    def upsert_sensor_catalog(self, definitions):
+        """
+        Inserta o actualiza las definiciones de sensores en 'sensores_ohm_catalogo'.
+
+        :param definitions: Lista de diccionarios con sensor_id, clave, hardware,
+                            tipo_hardware, nombre, tipo y unidad.
+        """
+        if not self._connection or not definitions:
+            return
+
+        try:
+            self._cursor.executemany('''
+                INSERT INTO sensores_ohm_catalogo (sensor_id, clave, hardware, tipo_hardware, nombre, tipo, unidad)
+                VALUES (:sensor_id, :clave, :hardware, :tipo_hardware, :nombre, :tipo, :unidad)
+                ON CONFLICT (sensor_id) DO UPDATE SET
+                    hardware = excluded.hardware,
+                    nombre = excluded.nombre,
+                    unidad = excluded.unidad
+            ''', definitions)
+            self._connection.commit()
+            logging.debug(f"Catálogo de sensores actualizado con {len(definitions)} sensores.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al actualizar el catálogo de sensores: {e}")
+
+    def insert_sensor_readings(self, ts, sensor_ids, values):
+        """
+        Inserta las lecturas de un ciclo en la tabla 'sensores_ohm'.
+
+        :param ts: Marca de tiempo del ciclo en milisegundos epoch.
+        :param sensor_ids: Arreglo con los sensor_id.
+        :param values: Arreglo paralelo con los valores (float32).
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
+
+        try:
+            # Se redondea a 2 decimales como el resto de métricas; SQLite guarda los
+            # valores enteros de columnas REAL como enteros compactos.
+            rows = [(ts, sensor_id, round(value, 2)) for sensor_id, value in zip(sensor_ids.tolist(), values.tolist())]
+            self._cursor.executemany(
+                f"INSERT OR REPLACE INTO {self._table('sensores_ohm', ts)} (ts, sensor_id, valor) VALUES (?, ?, ?)", rows
+            )
+            self._connection.commit()
+            logging.debug(f"{len(rows)} lecturas de sensores insertadas en la base de datos.")
+        except sqlite3.Error as e:
+            logging.error(f"Error al insertar lecturas de sensores: {e}")
+
+
+    def insert_metrics(self, sample):
+        """
+        Inserta un nuevo registro de métricas en 'metricas_v2' (o lo añade al lote pendiente).
+        La clave es el ts de la muestra en milisegundos epoch (o su timestamp ISO convertido).
+
+        :param sample: MetricSample del ciclo (o el diccionario combinado, que se normaliza).
+        """
+        if not self._connection:
+            logging.error("No hay conexión a la base de datos.")
+            return
+
+        try:
+            if isinstance(sample, dict):
+                sample = MetricSample.from_metrics(sample)
+            ts = sample.ts if sample.ts is not None else epoch_ms(sample.timestamp)
+            with self._lock:
+                fila = (
+                    ts,
+                    self._host_id(sample.hostname),
+                    self._dimension_id('usuarios', 'username', sample.username),
+                ) + sample.metric_values_v2()
+                self._pending_metrics.append(fila)
+                if self._pending_since is None:
+                    self._pending_since = time.monotonic()
+                self.flush_if_due()
+        except Exception as e:
             logging.error(f"Error al insertar métricas: {e}")